@@ -21,8 +21,8 @@ except ImportError:
     AUDIO_AVAILABLE = False
 
 try:
-    import cv2
     from core.distress_detection import distress_detector
+    from core.camera_service import camera_service
     VIDEO_AVAILABLE = True
 except ImportError:
     VIDEO_AVAILABLE = False
@@ -192,31 +192,25 @@ class AI7SecondAnalyzer:
             return
         
         try:
-            cap = cv2.VideoCapture(0)
+            # Shared camera, rate-limited to what the old every-3rd-frame loop analyzed
+            cap = camera_service.subscribe("ai_7second", max_fps=4, queue_size=1)
             
             if not cap.isOpened():
                 return
             
             start_time = time.time()
-            frame_count = 0
             
             while time.time() - start_time < duration and self.analyzing:
                 ret, frame = cap.read()
                 if not ret:
                     continue
                 
-                frame_count += 1
+                result = distress_detector.analyze_frame(frame)
                 
-                # Analyze every 3rd frame for performance
-                if frame_count % 3 == 0:
-                    result = distress_detector.analyze_frame(frame)
-                    
-                    if result['distress_detected']:
-                        self.analysis_results['video_distress'] = True
-                        self.analysis_results['distress_score'] += result['distress_score']
-                        print(f"📹 VIDEO DISTRESS: {result['indicators']}")
-                
-                time.sleep(0.1)
+                if result['distress_detected']:
+                    self.analysis_results['video_distress'] = True
+                    self.analysis_results['distress_score'] += result['distress_score']
+                    print(f"📹 VIDEO DISTRESS: {result['indicators']}")
             
             cap.release()
             
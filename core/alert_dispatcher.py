@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Alert Dispatcher
+Sends one alert through every configured channel at the same time
+- All channels start together on a shared thread pool
+- dispatch() returns at the first confirmed delivery, when every channel
+  has finished, or at the overall deadline, whichever comes first
+- Channels still running keep going in the background; their final
+  outcome is reported through on_complete
+- Each channel has its own timeout after which it is reported as 'timeout'
+  (a result arriving after its timeout is still recorded, flagged as late)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Seconds before a channel is reported as timed out (its own network timeout may be longer)
+DEFAULT_CHANNEL_TIMEOUTS = {
+    'twilio': 10.0,
+    'email': 15.0,
+    'telegram': 10.0,
+    'discord': 10.0,
+    'sms': 10.0
+}
+
+DEFAULT_DEADLINE = 15.0
+
+
+class AlertDispatcher:
+    """Concurrent, deadline-bounded fan-out of one alert to many channels"""
+
+    def __init__(self, max_workers=16):
+        # Sized for stuck channels still holding threads while new alerts arrive
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alert-channel")
+
+    def dispatch(self, channels, alert_data, deadline=DEFAULT_DEADLINE, timeouts=None, on_complete=None):
+        """
+        Start all channels and wait for the first success (or deadline)
+
+        Args:
+            channels: dict name -> callable(alert_data) returning True on delivery, or
+                {'delivered': [recipients]} for channels that fan out to several recipients
+            alert_data: Payload passed to every channel
+            deadline: Maximum seconds to block the caller
+            timeouts: dict name -> seconds before the channel counts as timed out
+            on_complete: Optional callback(report) once every channel has finished
+
+        Returns:
+            report dict: first_success, first_success_latency, returned_after and
+            per-channel status ('sent', 'failed', 'timeout', 'pending'), latency, error
+            and recipients (None unless the channel reported them)
+        """
+        timeouts = dict(DEFAULT_CHANNEL_TIMEOUTS, **(timeouts or {}))
+        start = time.monotonic()
+        changed = threading.Condition()
+        report = {
+            'channels': {name: {'status': 'pending', 'latency': None, 'error': None, 'late': False,
+                                'recipients': None}
+                         for name in channels},
+            'first_success': None,
+            'first_success_latency': None,
+            'returned_after': None,
+            'complete': not channels
+        }
+        remaining = [len(channels)]
+
+        def run(name, channel):
+            recipients = None
+            try:
+                result, error = channel(alert_data), None
+                if isinstance(result, dict):
+                    recipients = list(result.get('delivered') or [])
+                    delivered = bool(recipients)
+                else:
+                    delivered = bool(result)
+            except Exception as e:
+                delivered, error = False, str(e)
+            latency = time.monotonic() - start
+
+            with changed:
+                entry = report['channels'][name]
+                entry.update(late=latency >= timeouts.get(name, deadline), latency=latency, error=error,
+                             status='sent' if delivered else 'failed', recipients=recipients)
+                if delivered and report['first_success'] is None:
+                    report['first_success'] = name
+                    report['first_success_latency'] = latency
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+                report['complete'] = finished
+                changed.notify_all()
+
+            if finished and on_complete:
+                try:
+                    on_complete(report)
+                except Exception as e:
+                    print(f"[DISPATCH] Completion callback error: {e}")
+
+        for name, channel in channels.items():
+            self.executor.submit(run, name, channel)
+
+        with changed:
+            while report['first_success'] is None and remaining[0] > 0:
+                elapsed = time.monotonic() - start
+                # Mark channels past their own timeout
+                pending = [name for name, entry in report['channels'].items() if entry['status'] == 'pending']
+                for name in pending:
+                    if elapsed >= timeouts.get(name, deadline):
+                        report['channels'][name]['status'] = 'timeout'
+                if elapsed >= deadline:
+                    break
+                next_timeout = min([timeouts.get(name, deadline) for name in pending
+                                    if report['channels'][name]['status'] == 'pending'] + [deadline])
+                changed.wait(max(0.01, next_timeout - elapsed))
+            report['returned_after'] = time.monotonic() - start
+
+        if not channels and on_complete:
+            on_complete(report)
+        return report
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+def format_channel_report(report):
+    """One line per channel: outcome and latency"""
+    lines = []
+    for name, entry in report['channels'].items():
+        latency = f"{entry['latency']:.2f}s" if entry['latency'] is not None else "-"
+        note = " (late)" if entry.get('late') else ""
+        error = f" - {entry['error']}" if entry.get('error') else ""
+        lines.append(f"{name}: {entry['status']}{note} in {latency}{error}")
+    return lines
+
+
+# Global instance
+alert_dispatcher = AlertDispatcher()
+
+
+# Example usage
+if __name__ == "__main__":
+    import random
+
+    def fake_channel(delay, result):
+        def send(alert_data):
+            time.sleep(delay)
+            return result
+        return send
+
+    channels = {
+        'telegram': fake_channel(random.uniform(0.2, 1.0), True),
+        'email': fake_channel(3.0, True),
+        'discord': fake_channel(0.5, False),
+        'sms': fake_channel(20.0, True)
+    }
+    done = threading.Event()
+    report = alert_dispatcher.dispatch(channels, {'reason': 'test'}, deadline=5.0,
+                                       on_complete=lambda final: done.set())
+    print(f"⚡ Returned after {report['returned_after']:.2f}s, first success: {report['first_success']}")
+    for line in format_channel_report(report):
+        print(f"  {line}")
+    done.wait(25)
+    print("📊 Final:")
+    for line in format_channel_report(report):
+        print(f"  {line}")
@@ -1,4 +1,3 @@
-from twilio.rest import Client
 from core.firebase_service import get_user_contacts
 from core.enhanced_location_service import EnhancedLocationService
 from core.user_config import user_config
@@ -9,12 +8,22 @@ from core.sms_alert import SMSAlert
 from core.fast2sms_alert import Fast2SMSAlert
 from core.voice_alert import send_voice_alert
 from core.offline_alert_system import OfflineAlertSystem
-import datetime, os
+from core.sms_engine import sms_engine
+from core.alert_payload import AlertPayload
+from core.alert_dispatcher import alert_dispatcher, format_channel_report, DEFAULT_DEADLINE
+from core.alert_outbox import alert_outbox
+from core.incident_manager import new_incident_id
+import datetime, os, threading
 
-def send_alert(user_email, reason="Distress detected"):
+# Outbox rows wait this long for the live attempt before workers take over
+OUTBOX_HOLD = 120
+
+def send_alert(user_email, reason="Distress detected", incident_id=None):
     """
     Enhanced alert system with offline capabilities and improved location services.
     Supports multiple messaging services with automatic fallback to offline methods.
+    Every delivery is also recorded in the durable alert outbox, which retries
+    whatever the live attempt could not deliver.
     """
     try:
         # Initialize enhanced services
@@ -27,6 +36,7 @@ def send_alert(user_email, reason="Distress detected"):
         location_description = location_info.get('description', 'Location not available')
         
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        incident_id = incident_id or new_incident_id()
 
         # Get user info and messaging config
         user_info = user_config.get_user_info()
@@ -41,92 +51,75 @@ def send_alert(user_email, reason="Distress detected"):
             "location_info": location_info,
             "location_description": location_description,
             "timestamp": timestamp,
-            "user_info": user_info
+            "user_info": user_info,
+            "incident_id": incident_id
         }
 
-        success_count = 0
-        failed_services = []
-
-        # Try online services first
-        online_success = False
-        
-        # Send via configured service(s)
-        if service == "twilio" or "twilio" in str(service).split(','):
-            if send_twilio_alert(alert_data):
-                success_count += 1
-                online_success = True
-            else:
-                failed_services.append("twilio")
-
-        if service == "email" or "email" in str(service).split(','):
-            if send_email_alert(alert_data):
-                success_count += 1
-                online_success = True
-            else:
-                failed_services.append("email")
-
-        if service == "telegram" or "telegram" in str(service).split(','):
-            if send_telegram_alert(alert_data):
-                success_count += 1
-                online_success = True
-            else:
-                failed_services.append("telegram")
+        # Render every channel format once, before anything is dispatched
+        payload = AlertPayload.from_alert_data(alert_data).prerender()
+        alert_data["payload"] = payload
 
-        if service == "discord" or "discord" in str(service).split(','):
-            if send_discord_alert(alert_data):
-                success_count += 1
-                online_success = True
-            else:
-                failed_services.append("discord")
+        # Launch every configured channel at once; return at the first confirmed delivery
+        enabled = [name for name in CHANNEL_SENDERS if service == name or name in str(service).split(',')]
+        fallback = {'stored': False, 'lock': threading.Lock()}
 
-        if service == "sms" or "sms" in str(service).split(','):
-            if send_sms_alert(alert_data):
-                success_count += 1
-                online_success = True
-            else:
-                failed_services.append("sms")
+        # Durable copy first: if the app dies mid-dispatch the outbox still delivers
+        try:
+            alert_outbox.enqueue_incident(incident_id, payload, enabled, hold=OUTBOX_HOLD)
+            alert_outbox.start()
+        except Exception as e:
+            print(f"[OUTBOX ERROR] {e}")
+
+        def store_offline():
+            """Offline storage/broadcast, at most once per alert"""
+            with fallback['lock']:
+                if fallback['stored']:
+                    return True
+                print("[FALLBACK] Using offline alert methods...")
+                fallback['stored'] = _send_offline_fallback(offline_system, payload, location_info, user_info,
+                                                            incident_id)
+                return fallback['stored']
+
+        def on_complete(final_report):
+            # Channels that finished after send_alert returned
+            failed = [name for name, entry in final_report['channels'].items() if entry['status'] != 'sent']
+            try:
+                for name, entry in final_report['channels'].items():
+                    if entry['status'] == 'sent':
+                        alert_outbox.mark_channel_sent(incident_id, name, entry.get('recipients'))
+                    # Recipients the live attempt did not reach are due in the outbox now
+                    alert_outbox.release(incident_id, name)
+            except Exception as e:
+                print(f"[OUTBOX ERROR] {e}")
+            if failed:
+                store_offline()
+            log_delivery_report(timestamp, final_report)
+
+        report = alert_dispatcher.dispatch(
+            {name: CHANNEL_SENDERS[name] for name in enabled},
+            alert_data,
+            deadline=messaging_config.get("dispatch_deadline", DEFAULT_DEADLINE),
+            timeouts=messaging_config.get("channel_timeouts"),
+            on_complete=on_complete
+        )
+
+        online_success = report['first_success'] is not None
+        success_count = sum(1 for entry in report['channels'].values() if entry['status'] == 'sent')
+        failed_services = [name for name, entry in report['channels'].items()
+                           if entry['status'] in ('failed', 'timeout')]
+        if online_success:
+            print(f"[DISPATCH] First delivery via {report['first_success']} "
+                  f"in {report['first_success_latency']:.2f}s")
 
         # If online methods failed, use offline methods
         if not online_success or failed_services:
-            print("[FALLBACK] Using offline alert methods...")
-            
-            # Create comprehensive alert message for offline storage
-            offline_message = f"""
-🚨 EMERGENCY ALERT 🚨
-User: {user_info.get('name', 'Unknown')}
-Email: {user_email}
-Phone: {user_info.get('phone', 'Not provided')}
-Reason: {reason}
-Time: {timestamp}
-
-Location Information:
-{location_description}
-
-Emergency Contacts:
-{chr(10).join(f"• {contact}" for contact in user_info.get('emergency_contacts', []))}
-
-Medical Information:
-• Blood Type: {user_info.get('medical_info', {}).get('blood_type', 'Not specified')}
-• Allergies: {', '.join(user_info.get('medical_info', {}).get('allergies', [])) or 'None'}
-• Medications: {', '.join(user_info.get('medical_info', {}).get('medications', [])) or 'None'}
-• Conditions: {', '.join(user_info.get('medical_info', {}).get('conditions', [])) or 'None'}
-
-This alert was generated automatically by HerShield Safety System.
-"""
-            
-            # Send via offline methods
-            if offline_system.send_offline_alert(
-                'emergency_alert',
-                offline_message,
-                location_info.get('coordinates'),
-                user_info
-            ):
+            if store_offline():
                 success_count += 1
                 print("[OFFLINE ALERT] Emergency alert stored and broadcasted offline")
 
         # Send voice alerts to emergency services (for official use)
         # Uncomment the line below for production use with emergency services
-        # if send_voice_alert(alert_data['reason'], alert_data['location']):
+        # if send_voice_alert(alert_data['reason'], alert_data['location'], payload=payload):
         #     success_count += 1
 
         if success_count == 0:
@@ -134,7 +127,7 @@ This alert was generated automatically by HerShield Safety System.
             return False
 
         # Log the alert with enhanced information
-        log_alert(user_email, reason, location_url, timestamp, location_info, failed_services)
+        log_alert(user_email, reason, location_url, timestamp, location_info, failed_services, report)
         
         if online_success:
             print(f"[SUCCESS] Alert sent via {success_count} method(s)")
@@ -153,7 +146,8 @@ This alert was generated automatically by HerShield Safety System.
                 'system_failure',
                 f"Alert system failure: {reason} - {str(e)}",
                 None,
-                {'user_email': user_email, 'error': str(e)}
+                {'user_email': user_email, 'error': str(e)},
+                incident_id
             )
             print("[EMERGENCY FALLBACK] Alert stored in emergency offline storage")
         except:
@@ -161,8 +155,18 @@ This alert was generated automatically by HerShield Safety System.
         
         return False
 
+def _send_offline_fallback(offline_system, payload, location_info, user_info, incident_id=None):
+    """Store and broadcast the alert through the offline alert system"""
+    return offline_system.send_offline_alert(
+        'emergency_alert',
+        payload.render('text'),
+        location_info.get('coordinates'),
+        user_info,
+        incident_id
+    )
+
 def send_twilio_alert(alert_data):
-    """Send alert via Twilio SMS"""
+    """Send alert via Twilio SMS; returns {'delivered': [phone numbers reached]}"""
     try:
         twilio_config = user_config.get_messaging_config()["twilio_config"]
 
@@ -170,14 +174,11 @@ def send_twilio_alert(alert_data):
             print("[WARN] Twilio not configured")
             return False
 
-        client = Client(twilio_config["sid"], twilio_config["auth_token"])
+        if not twilio_config.get("messaging_service_sid") and not twilio_config.get("phone_number"):
+            print("[ERROR] No Twilio sender configured")
+            return False
 
-        # Create SMS message
-        msg = (f"🚨 HER SHIELD ALERT 🚨\n"
-               f"User: {alert_data['user_info']['name']}\n"
-               f"Reason: {alert_data['reason']}\n"
-               f"Location: {alert_data['location']}\n"
-               f"Time: {alert_data['timestamp']}")
+        msg = alert_data['payload'].render('sms')
 
         # Get contacts (prefer user config over Firebase)
         contacts = user_config.get_emergency_contacts()
@@ -188,7 +189,7 @@ def send_twilio_alert(alert_data):
                 print("[WARN] No emergency contacts configured")
                 return False
 
-        sent_count = 0
+        messages = []
         for contact in contacts:
             if not contact or not isinstance(contact, str) or not contact.strip():
                 continue
@@ -198,53 +199,42 @@ def send_twilio_alert(alert_data):
                 phone = contact.split(':')[1].strip()
             else:
                 phone = contact.strip()
+            messages.append((phone, msg))
 
-            try:
-                # Use Messaging Service SID if available, otherwise use phone number
-                if twilio_config.get("messaging_service_sid"):
-                    message = client.messages.create(
-                        to=phone,
-                        messaging_service_sid=twilio_config["messaging_service_sid"],
-                        body=msg
-                    )
-                elif twilio_config.get("phone_number"):
-                    message = client.messages.create(
-                        to=phone,
-                        from_=twilio_config["phone_number"],
-                        body=msg
-                    )
-                else:
-                    print("[ERROR] No Twilio sender configured")
-                    return False
-
-                print(f"[SMS SENT] Alert sent to {phone} (SID: {message.sid})")
-                sent_count += 1
-
-            except Exception as e:
-                print(f"[SMS ERROR] Failed to send to {phone}: {e}")
+        # All contacts at once, within Twilio's rate limits
+        batch = sms_engine.send_batch('twilio', messages, twilio_config)
+        for result in batch['results']:
+            if result['success']:
+                print(f"[SMS SENT] Alert sent to {result['to']} (SID: {result['sid']}, {result['latency']:.2f}s)")
+            else:
+                print(f"[SMS ERROR] Failed to send to {result['to']}: {result['error']}")
 
-        return sent_count > 0
+        return {'delivered': [result['to'] for result in batch['results'] if result['success']]}
 
     except Exception as e:
         print(f"[TWILIO ERROR] {e}")
         return False
 
 def send_email_alert(alert_data):
-    """Send alert via email"""
+    """Send alert via email; returns {'delivered': [addresses reached]}"""
     try:
         email_alert = EmailAlert()
         location = alert_data['location']
-        return email_alert.send_alert(alert_data['user_email'], alert_data['reason'], location)
+        email_alert.send_alert(alert_data['user_email'], alert_data['reason'], location,
+                               payload=alert_data.get('payload'))
+        return {'delivered': email_alert.delivered}
     except Exception as e:
         print(f"[EMAIL ERROR] {e}")
         return False
 
 def send_telegram_alert(alert_data):
-    """Send alert via Telegram"""
+    """Send alert via Telegram; returns {'delivered': [chat IDs reached]}"""
     try:
         telegram_alert = TelegramAlert()
         location = alert_data['location']
-        return telegram_alert.send_alert(alert_data['user_email'], alert_data['reason'], location)
+        telegram_alert.send_alert(alert_data['user_email'], alert_data['reason'], location,
+                                  payload=alert_data.get('payload'))
+        return {'delivered': telegram_alert.delivered}
     except Exception as e:
         print(f"[TELEGRAM ERROR] {e}")
         return False
@@ -254,7 +244,8 @@ def send_discord_alert(alert_data):
     try:
         discord_alert = DiscordAlert()
         location = alert_data['location']
-        return discord_alert.send_alert(alert_data['user_email'], alert_data['reason'], location)
+        return discord_alert.send_alert(alert_data['user_email'], alert_data['reason'], location,
+                                payload=alert_data.get('payload'))
     except Exception as e:
         print(f"[DISCORD ERROR] {e}")
         return False
@@ -264,12 +255,22 @@ def send_sms_alert(alert_data):
     try:
         sms_alert = Fast2SMSAlert()
         location = alert_data['location']
-        return sms_alert.send_alert(alert_data['user_email'], alert_data['reason'], location)
+        return sms_alert.send_alert(alert_data['user_email'], alert_data['reason'], location,
+                                payload=alert_data.get('payload'))
     except Exception as e:
         print(f"[SMS ERROR] {e}")
         return False
 
-def log_alert(user_email, reason, location, timestamp, location_info=None, failed_services=None):
+# Channel name -> sender, in the order channels are listed in reports
+CHANNEL_SENDERS = {
+    "twilio": send_twilio_alert,
+    "email": send_email_alert,
+    "telegram": send_telegram_alert,
+    "discord": send_discord_alert,
+    "sms": send_sms_alert
+}
+
+def log_alert(user_email, reason, location, timestamp, location_info=None, failed_services=None, channel_report=None):
     """Enhanced alert logging with detailed information"""
     try:
         os.makedirs("logs", exist_ok=True)
@@ -289,9 +290,26 @@ def log_alert(user_email, reason, location, timestamp, location_info=None, faile
             
             if failed_services:
                 f.write(f"Failed Services: {', '.join(failed_services)}\n")
+
+            if channel_report:
+                f.write(f"Dispatch returned after: {channel_report['returned_after']:.2f}s\n")
+                for line in format_channel_report(channel_report):
+                    f.write(f"  {line}\n")
             
             f.write("-" * 60 + "\n")
         
         print("[LOGGED] Enhanced alert record created")
     except Exception as e:
         print(f"[LOG ERROR] {e}")
+
+def log_delivery_report(timestamp, report):
+    """Record the final per-channel outcome once every channel has finished"""
+    try:
+        os.makedirs("logs", exist_ok=True)
+        with open("logs/alerts.log", "a", encoding='utf-8') as f:
+            f.write(f"\n[{timestamp}] DELIVERY REPORT\n")
+            for line in format_channel_report(report):
+                f.write(f"  {line}\n")
+            f.write("-" * 60 + "\n")
+    except Exception as e:
+        print(f"[LOG ERROR] {e}")
@@ -0,0 +1,732 @@
+#!/usr/bin/env python3
+"""
+Alert Outbox
+Durable, idempotent delivery of alerts, one row per incident/channel/recipient
+- Rows live in SQLite (WAL), so undelivered alerts survive crashes and restarts
+- The idempotency key (incident, channel, recipient) means an alert is queued
+  once per recipient no matter how often it is re-submitted, and a delivered
+  row is never sent again
+- Worker threads claim due rows in batches, send them through the channel
+  adapters and record the outcome; failures back off exponentially with jitter
+- A rate-limited send (429) is not a failed attempt: the row and the rest of
+  its channel wait for Retry-After and the attempt budget is left untouched
+- Rows that are given up on are reported to on_failure callbacks and kept
+  for get_failed(), so the user learns which contacts were not reached
+- Every claim carries a per-row token: the lease is renewed before each send
+  and the outcome is only recorded while the token still matches, so a row
+  whose lease expired mid-batch is not sent again by the worker that lost it
+- When connectivity returns, every waiting row becomes due immediately
+"""
+
+import hashlib
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+from core.alert_payload import AlertPayload
+from core.user_config import user_config
+
+
+class DeliveryError(Exception):
+    """
+    Delivery failed; retryable=False for errors a resend cannot fix,
+    retry_after (seconds) when the provider rate-limited the request
+    """
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable or retry_after is not None
+        self.retry_after = retry_after
+
+
+def _retry_after(response, default=1.0):
+    """Seconds from a 429's Retry-After header (or Telegram's parameters.retry_after)"""
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(response.json()['parameters']['retry_after'])
+    except Exception:
+        return default
+
+
+def idempotency_key(incident_id, channel, recipient):
+    return hashlib.sha256(f"{incident_id}|{channel}|{recipient}".encode('utf-8')).hexdigest()[:32]
+
+
+def _contact_value(contact):
+    """'Name: value' or plain 'value' contact entries"""
+    if not contact or not isinstance(contact, str):
+        return None
+    return (contact.split(':', 1)[1] if ':' in contact else contact).strip() or None
+
+
+# Channel adapters: recipients(config) -> list of recipient ids,
+# send(payload, recipient, key) -> provider message id or raises DeliveryError
+
+def _twilio_recipients():
+    return [phone for phone in map(_contact_value, user_config.get_emergency_contacts()) if phone]
+
+
+def _twilio_send(payload, recipient, key):
+    from core.sms_engine import sms_engine
+    twilio_config = user_config.get_messaging_config()["twilio_config"]
+    result = sms_engine.send_batch('twilio', [(recipient, payload.render('sms'))], twilio_config)['results'][0]
+    if not result['success']:
+        raise DeliveryError(result['error'], retry_after=result.get('retry_after'))
+    return result['sid']
+
+
+def _email_recipients():
+    return [email for email in map(_contact_value, user_config.get_emergency_contacts()) if email and '@' in email]
+
+
+def _email_send(payload, recipient, key):
+    from core.email_alert import EmailAlert
+    from core.smtp_pool import get_smtp_pool
+    email_alert = EmailAlert()
+    msg = email_alert.build_message(payload, recipient)
+    msg['Message-ID'] = f"<{key}@hershield>"
+    result = get_smtp_pool(email_alert.config).send_messages([msg])[0]
+    if not result['sent']:
+        raise DeliveryError(result['error'])
+    return None
+
+
+def _telegram_recipients():
+    return [str(chat_id) for chat_id in user_config.get_messaging_config()["telegram_config"].get("chat_ids", [])]
+
+
+def _telegram_send(payload, recipient, key):
+    from core.http_client import http_client
+    bot_token = user_config.get_messaging_config()["telegram_config"]["bot_token"]
+    try:
+        response = http_client.post(f"https://api.telegram.org/bot{bot_token}/sendMessage",
+                                    data={"chat_id": recipient, "text": payload.render('telegram'),
+                                          "parse_mode": "HTML"}, timeout=10)
+    except Exception as e:
+        raise DeliveryError(f"Telegram request failed: {e}")
+    if response.status_code == 429:
+        raise DeliveryError(f"Telegram HTTP 429: {response.text}", retry_after=_retry_after(response))
+    if response.status_code != 200:
+        raise DeliveryError(f"Telegram HTTP {response.status_code}: {response.text}",
+                            retryable=response.status_code >= 500)
+    return str(response.json().get('result', {}).get('message_id', '')) or None
+
+
+def _discord_recipients():
+    config = user_config.get_messaging_config()["discord_config"]
+    if config.get("webhook_url"):
+        return ["webhook"]
+    if config.get("bot_token") and config.get("channel_id"):
+        return [f"channel:{config['channel_id']}"]
+    return []
+
+
+def _discord_send(payload, recipient, key):
+    from core.discord_alert import DiscordAlert
+    discord_alert = DiscordAlert()
+    if recipient == "webhook":
+        sent = discord_alert._send_via_webhook(payload.render_bytes('discord_webhook'))
+    else:
+        sent = discord_alert._send_via_bot(payload.render_bytes('discord_bot'))
+    if not sent:
+        raise DeliveryError("Discord delivery failed")
+    return None
+
+
+def _fast2sms_recipients():
+    phones = []
+    for phone in map(_contact_value, user_config.get_user_info().get('emergency_contacts', [])):
+        phone = ''.join(filter(str.isdigit, phone or ''))
+        if len(phone) >= 10:
+            phones.append(phone)
+    return phones
+
+
+def _fast2sms_send(payload, recipient, key):
+    from core.fast2sms_alert import Fast2SMSAlert
+    if not Fast2SMSAlert()._send_sms(payload.render('sms'), [recipient]):
+        raise DeliveryError("Fast2SMS delivery failed")
+    return None
+
+
+CHANNEL_ADAPTERS = {
+    'twilio': (_twilio_recipients, _twilio_send),
+    'email': (_email_recipients, _email_send),
+    'telegram': (_telegram_recipients, _telegram_send),
+    'discord': (_discord_recipients, _discord_send),
+    'sms': (_fast2sms_recipients, _fast2sms_send)
+}
+
+
+def internet_available(timeout=3):
+    """Same reachability probe the SMS service uses"""
+    try:
+        socket.create_connection(("8.8.8.8", 53), timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+class AlertOutbox:
+    """
+    SQLite-backed alert outbox with background delivery workers
+    States: pending -> in_flight -> sent | failed (gave up)
+    The database is created on first use, not when the module is imported
+    """
+
+    def __init__(self, db_path="data/alert_outbox.db", workers=2, batch_size=10, base_backoff=2.0,
+                 max_backoff=600.0, max_attempts=10, lease=120.0, adapters=None, connectivity_check=None,
+                 connectivity_interval=5.0):
+        """
+        Args:
+            workers: Delivery threads
+            batch_size: Rows a worker claims at a time
+            max_attempts: Attempts before a row is marked failed
+            lease: Seconds after which an in-flight row of a crashed worker is reclaimed
+            adapters: Override or extend CHANNEL_ADAPTERS
+            connectivity_check: Callable returning True when online (default: DNS probe)
+            connectivity_interval: Seconds between probes while deliveries are waiting
+        """
+        self.db_path = db_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.adapters = dict(CHANNEL_ADAPTERS, **(adapters or {}))
+        self.connectivity_check = connectivity_check or internet_available
+        self.connectivity_interval = connectivity_interval
+
+        self.running = False
+        self.threads = []
+        self.wakeup = threading.Event()
+        self.db_lock = threading.Lock()
+        self.init_lock = threading.Lock()
+        self.initialized = False
+        self.payloads = {}
+        self.online = True
+        self.reconnect_callbacks = []
+        self.failure_callbacks = []
+        # channel -> time before which it is rate limited (Retry-After)
+        self.paused_until = {}
+
+        self.lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'delivered': 0, 'retries': 0, 'rate_limited': 0, 'failed': 0, 'reconnects': 0}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _db(self):
+        if not self.initialized:
+            self.init_database()
+        return self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL + NORMAL: commits survive a crash of the app; only an OS crash can lose the last one
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def init_database(self):
+        """Create the deliveries and payloads tables (once; on first use by default)"""
+        with self.init_lock:
+            if self.initialized:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS deliveries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT UNIQUE NOT NULL,
+                    incident_id TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    state TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    claimed_at REAL,
+                    claim_token TEXT,
+                    last_error TEXT,
+                    provider_id TEXT,
+                    created_at REAL,
+                    sent_at REAL
+                )
+            ''')
+            # Databases created before claims carried a token
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(deliveries)')]
+            if 'claim_token' not in columns:
+                conn.execute('ALTER TABLE deliveries ADD COLUMN claim_token TEXT')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_deliveries_due ON deliveries (state, next_attempt_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_deliveries_incident ON deliveries (incident_id, channel)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS payloads (
+                    incident_id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created_at REAL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+            self.initialized = True
+
+    def enqueue(self, incident_id, channel, payload, recipients=None, hold=0.0):
+        """
+        Queue one delivery per recipient of a channel (duplicates are ignored)
+
+        Args:
+            incident_id: Incident the alert belongs to
+            channel: Adapter name (twilio, email, telegram, discord, sms)
+            payload: AlertPayload for the incident
+            recipients: Explicit recipients (default: the adapter's configured list)
+            hold: Seconds before workers may pick the rows up (a live attempt is running)
+
+        Returns:
+            Number of new rows
+        """
+        if recipients is None:
+            recipients = self.recipients(channel)
+        now = time.time()
+        rows = [(idempotency_key(incident_id, channel, recipient), incident_id, channel, str(recipient), now + hold, now)
+                for recipient in recipients]
+
+        with self.db_lock:
+            conn = self._db()
+            before = conn.total_changes
+            conn.execute('INSERT OR IGNORE INTO payloads (incident_id, payload, created_at) VALUES (?, ?, ?)',
+                         (incident_id, json.dumps(payload.as_dict()), now))
+            # The first payload stored for an incident is the one every row is sent with
+            payload_stored = conn.total_changes > before
+            before = conn.total_changes
+            conn.executemany('''
+                INSERT OR IGNORE INTO deliveries
+                    (idempotency_key, incident_id, channel, recipient, next_attempt_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            added = conn.total_changes - before
+            conn.commit()
+            conn.close()
+
+        if payload_stored:
+            with self.lock:
+                self.payloads[incident_id] = payload
+        self._count('enqueued', added)
+        if added and not hold:
+            self.wakeup.set()
+        return added
+
+    def configured_channels(self):
+        """Channels enabled by the messaging_service setting"""
+        service = str(user_config.get_messaging_config().get("messaging_service", ""))
+        return [name for name in self.adapters if name in service.split(',')]
+
+    def recipients(self, channel):
+        """Configured recipients of a channel (empty on configuration errors)"""
+        try:
+            return self.adapters[channel][0]()
+        except Exception as e:
+            self.logger.error(f"Outbox: no recipients for {channel}: {e}")
+            return []
+
+    def enqueue_incident(self, incident_id, payload, channels=None, hold=0.0):
+        """
+        Queue an incident for every channel (default: the configured messaging services)
+
+        Returns:
+            dict channel -> number of new rows
+        """
+        if channels is None:
+            channels = self.configured_channels()
+        return {channel: self.enqueue(incident_id, channel, payload, hold=hold) for channel in channels}
+
+    def mark_channel_sent(self, incident_id, channel, recipients=None):
+        """
+        A live (non-outbox) send reached the channel: settle its queued rows
+
+        Args:
+            recipients: Recipients the live send reached (default: every row of the channel)
+        """
+        query = "UPDATE deliveries SET state = 'sent', sent_at = ? WHERE incident_id = ? AND channel = ? " \
+                "AND state = 'pending'"
+        params = [time.time(), incident_id, channel]
+        if recipients is not None:
+            if not recipients:
+                return
+            query += f" AND recipient IN ({','.join('?' * len(recipients))})"
+            params.extend(str(recipient) for recipient in recipients)
+        with self.db_lock:
+            conn = self._db()
+            conn.execute(query, params)
+            conn.commit()
+            conn.close()
+
+    def release(self, incident_id, channel=None):
+        """Make held rows due now (the live attempt failed)"""
+        query = "UPDATE deliveries SET next_attempt_at = ? WHERE incident_id = ? AND state = 'pending'"
+        params = [time.time(), incident_id]
+        if channel:
+            query += " AND channel = ?"
+            params.append(channel)
+        with self.db_lock:
+            conn = self._db()
+            conn.execute(query, params)
+            conn.commit()
+            conn.close()
+        self.wakeup.set()
+
+    def _claim(self, limit):
+        """Atomically move up to `limit` due rows to in_flight, each with its own claim token"""
+        now = time.time()
+        with self.db_lock:
+            conn = self._db()
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute('''
+                SELECT * FROM deliveries
+                WHERE (state = 'pending' AND next_attempt_at <= ?)
+                   OR (state = 'in_flight' AND claimed_at < ?)
+                ORDER BY next_attempt_at, id LIMIT ?
+            ''', (now, now - self.lease, limit)).fetchall()
+            rows = [dict(row, claim_token=uuid.uuid4().hex) for row in rows]
+            if rows:
+                conn.executemany("UPDATE deliveries SET state = 'in_flight', claimed_at = ?, claim_token = ? "
+                                 "WHERE id = ?", [(now, row['claim_token'], row['id']) for row in rows])
+            conn.commit()
+            conn.close()
+        return rows
+
+    def _renew(self, row):
+        """Extend the lease right before sending; False if another worker has reclaimed the row"""
+        with self.db_lock:
+            conn = self._db()
+            renewed = conn.execute('''
+                UPDATE deliveries SET claimed_at = ?
+                WHERE id = ? AND claim_token = ? AND state = 'in_flight'
+            ''', (time.time(), row['id'], row['claim_token'])).rowcount
+            conn.commit()
+            conn.close()
+        return renewed == 1
+
+    def get_payload(self, incident_id):
+        """Payload stored for an incident (None if it was never queued)"""
+        with self.lock:
+            payload = self.payloads.get(incident_id)
+        if payload:
+            return payload
+        conn = self._db()
+        row = conn.execute('SELECT payload FROM payloads WHERE incident_id = ?', (incident_id,)).fetchone()
+        conn.close()
+        if not row:
+            return None
+        payload = AlertPayload.from_dict(json.loads(row['payload']))
+        with self.lock:
+            # Bounded cache: payloads are small but incidents accumulate over time
+            if len(self.payloads) >= 64:
+                self.payloads.pop(next(iter(self.payloads)))
+            self.payloads[incident_id] = payload
+        return payload
+
+    def _paused(self, channel):
+        """Time the channel's Retry-After pause ends, or None"""
+        with self.lock:
+            until = self.paused_until.get(channel)
+        return until if until and until > time.time() else None
+
+    def _pause(self, channel, retry_after):
+        """Hold every row of a rate-limited channel until Retry-After has passed"""
+        until = time.time() + min(self.max_backoff, max(0.0, retry_after))
+        with self.lock:
+            self.paused_until[channel] = max(until, self.paused_until.get(channel, 0.0))
+            return self.paused_until[channel]
+
+    def _deliver(self, row):
+        """Send one row through its channel adapter and record the result"""
+        if not self._renew(row):
+            self.logger.info(f"Outbox: lease on {row['channel']} -> {row['recipient']} lost, skipping")
+            return False
+        paused_until = self._paused(row['channel'])
+        if paused_until:
+            # Not sent, so not an attempt
+            self._record(row, state='pending', next_attempt_at=paused_until)
+            return False
+        payload = self.get_payload(row['incident_id'])
+        adapter = self.adapters.get(row['channel'])
+        attempts = row['attempts'] + 1
+        try:
+            if not payload or not adapter:
+                raise DeliveryError(f"No {'payload' if not payload else 'adapter'} for delivery", retryable=False)
+            provider_id = adapter[1](payload, row['recipient'], row['idempotency_key'])
+        except Exception as e:
+            retryable = getattr(e, 'retryable', True)
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is not None:
+                # The provider asked us to slow down: come back at Retry-After
+                # without spending one of the row's attempts
+                if self._record(row, state='pending', next_attempt_at=self._pause(row['channel'], retry_after),
+                                last_error=str(e)):
+                    self._count('rate_limited')
+            elif retryable and attempts < self.max_attempts:
+                delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+                delay *= random.uniform(0.5, 1.0)
+                if self._record(row, state='pending', attempts=attempts, next_attempt_at=time.time() + delay,
+                                last_error=str(e)):
+                    self._count('retries')
+            elif self._record(row, state='failed', attempts=attempts, last_error=str(e)):
+                self._count('failed')
+                self.logger.error(f"Outbox gave up on {row['channel']} -> {row['recipient']}: {e}")
+                self._report_failure(dict(row, state='failed', attempts=attempts, last_error=str(e)))
+            return False
+
+        if self._record(row, state='sent', attempts=attempts, provider_id=provider_id, sent_at=time.time(),
+                        last_error=None):
+            self._count('delivered')
+        return True
+
+    def _record(self, row, **fields):
+        """Store the outcome of a claimed row; False if the claim was lost meanwhile"""
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.db_lock:
+            conn = self._db()
+            updated = conn.execute(f"UPDATE deliveries SET {assignments} "
+                                   f"WHERE id = ? AND claim_token = ? AND state = 'in_flight'",
+                                   list(fields.values()) + [row['id'], row['claim_token']]).rowcount
+            conn.commit()
+            conn.close()
+        return updated == 1
+
+    def _next_due_in(self):
+        conn = self._db()
+        row = conn.execute("SELECT MIN(next_attempt_at) FROM deliveries WHERE state = 'pending'").fetchone()
+        conn.close()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                rows = self._claim(self.batch_size)
+            except sqlite3.Error as e:
+                self.logger.error(f"Outbox claim error: {e}")
+                rows = []
+            if rows:
+                for row in rows:
+                    if not self.running:
+                        # Hand unsent rows back instead of waiting for the lease
+                        self._record(row, state='pending')
+                        continue
+                    self._deliver(row)
+                continue
+            due_in = self._next_due_in()
+            self.wakeup.wait(30.0 if due_in is None else min(30.0, max(0.05, due_in)))
+            self.wakeup.clear()
+
+    def _connectivity_loop(self):
+        """Drain immediately when the network comes back"""
+        while self.running:
+            time.sleep(self.connectivity_interval)
+            if not self.running or (self.pending_count() == 0 and not self.reconnect_callbacks):
+                continue
+            online = self.connectivity_check()
+            if online and not self.online:
+                self._count('reconnects')
+                self.logger.info("Connectivity restored: draining alert outbox")
+                for callback in list(self.reconnect_callbacks):
+                    try:
+                        callback()
+                    except Exception as e:
+                        self.logger.error(f"Reconnect callback error: {e}")
+                with self.db_lock:
+                    conn = self._db()
+                    conn.execute("UPDATE deliveries SET next_attempt_at = ? WHERE state = 'pending'", (time.time(),))
+                    conn.commit()
+                    conn.close()
+                self.wakeup.set()
+            self.online = online
+
+    def on_reconnect(self, callback):
+        """Call `callback` whenever connectivity returns (e.g. to hand over stored offline alerts)"""
+        if callback not in self.reconnect_callbacks:
+            self.reconnect_callbacks.append(callback)
+
+    def on_failure(self, callback):
+        """Call `callback(row)` when a delivery is given up on, so the user can be told"""
+        if callback not in self.failure_callbacks:
+            self.failure_callbacks.append(callback)
+
+    def _report_failure(self, row):
+        for callback in list(self.failure_callbacks):
+            try:
+                callback(row)
+            except Exception as e:
+                self.logger.error(f"Failure callback error: {e}")
+
+    def get_failed(self, incident_id=None):
+        """Deliveries that were given up on (recipient, channel, last_error), newest first"""
+        return [row for row in reversed(self.get_deliveries(incident_id)) if row['state'] == 'failed']
+
+    def start(self):
+        """Start delivery workers (no-op if already running)"""
+        if self.running:
+            return True
+        self.running = True
+        self.threads = [threading.Thread(target=self._worker_loop, daemon=True) for _ in range(self.workers)]
+        self.threads.append(threading.Thread(target=self._connectivity_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def drain(self, timeout=60):
+        """Block until nothing is pending or in flight; returns True when empty"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.pending_count() == 0:
+                return True
+            self.wakeup.set()
+            time.sleep(0.05)
+        return self.pending_count() == 0
+
+    def pending_count(self):
+        conn = self._db()
+        count = conn.execute("SELECT COUNT(*) FROM deliveries WHERE state IN ('pending', 'in_flight')").fetchone()[0]
+        conn.close()
+        return count
+
+    def get_deliveries(self, incident_id=None):
+        conn = self._db()
+        if incident_id:
+            rows = conn.execute('SELECT * FROM deliveries WHERE incident_id = ? ORDER BY id', (incident_id,)).fetchall()
+        else:
+            rows = conn.execute('SELECT * FROM deliveries ORDER BY id').fetchall()
+        conn.close()
+        return [dict(row) for row in rows]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        conn = self._db()
+        stats['states'] = dict(conn.execute('SELECT state, COUNT(*) FROM deliveries GROUP BY state').fetchall())
+        conn.close()
+        return stats
+
+
+# Global instance (the database file appears on first use)
+alert_outbox = AlertOutbox()
+
+
+def start_alert_outbox(offline_system=None, on_failure=None):
+    """
+    Start delivering anything left in the outbox from earlier sessions
+
+    Args:
+        offline_system: OfflineAlertSystem whose stored alerts are handed to
+            the outbox now and whenever connectivity returns
+        on_failure: Callback(row) for each delivery the outbox gives up on
+    """
+    if on_failure is not None:
+        alert_outbox.on_failure(on_failure)
+    alert_outbox.start()
+    if offline_system is not None:
+        alert_outbox.on_reconnect(offline_system.retry_pending_alerts)
+        threading.Thread(target=offline_system.retry_pending_alerts, daemon=True).start()
+    return True
+
+
+def measure_outbox_throughput(deliveries=200, workers=4, batch_size=10, latency=0.02, server_rate=None):
+    """
+    Push deliveries through a temporary outbox into the local Twilio stand-in
+
+    Args:
+        deliveries: Rows to deliver (one incident, distinct recipients)
+        server_rate: Server-side requests/s before 429 (None = unlimited)
+
+    Returns:
+        dict with deliveries/s, retries and final row states
+    """
+    import shutil
+    import tempfile
+    from core.sms_engine import SMSEngine
+    from core.twilio_standin_server import TwilioStandInServer
+
+    work_dir = tempfile.mkdtemp(prefix="hershield_outbox_bench_")
+    server = TwilioStandInServer(latency=latency, rate=server_rate)
+    endpoint = server.start()
+    engine = SMSEngine(limits={'twilio': {'rate': 10000, 'burst': 10000, 'concurrency': workers}},
+                       api_base=endpoint, max_attempts=1, max_rate_limited=0)
+    account = {'sid': "AC" + "0" * 32, 'auth_token': server.auth_token, 'phone_number': "+15550000000"}
+
+    def standin_send(payload, recipient, key):
+        result = engine.send_batch('twilio', [(recipient, payload.render('sms'))], account)['results'][0]
+        if not result['success']:
+            raise DeliveryError(result['error'], retry_after=result.get('retry_after'))
+        return result['sid']
+
+    try:
+        outbox = AlertOutbox(db_path=os.path.join(work_dir, "outbox.db"), workers=workers, batch_size=batch_size,
+                             base_backoff=0.05, max_backoff=1.0,
+                             adapters={'standin': (lambda: [], standin_send)},
+                             connectivity_check=lambda: True)
+        payload = AlertPayload("bench@example.com", "Outbox benchmark",
+                               location_url="https://maps.google.com/?q=0,0", user_info={'name': 'Benchmark'})
+        outbox.enqueue("bench-incident", 'standin', payload,
+                       recipients=[f"+1555{i:07d}" for i in range(deliveries)])
+        # Re-submitting the same incident adds nothing
+        duplicates = outbox.enqueue("bench-incident", 'standin', payload,
+                                    recipients=[f"+1555{i:07d}" for i in range(deliveries)])
+
+        start = time.time()
+        outbox.start()
+        drained = outbox.drain(timeout=300)
+        elapsed = time.time() - start
+        outbox.stop()
+
+        stats = outbox.get_stats()
+        return {
+            'drained': drained,
+            'deliveries': deliveries,
+            'duplicates_queued': duplicates,
+            'seconds': elapsed,
+            'deliveries_per_sec': stats['delivered'] / elapsed if elapsed else 0.0,
+            'retries': stats['retries'],
+            'rate_limited': stats['rate_limited'],
+            'states': stats['states'],
+            'server': dict(server.stats)
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark alert outbox delivery against a local stand-in")
+    parser.add_argument("--deliveries", type=int, default=200, help="Rows to deliver")
+    parser.add_argument("--workers", type=int, default=4, help="Delivery threads")
+    parser.add_argument("--batch", type=int, default=10, help="Rows claimed per batch")
+    parser.add_argument("--latency", type=float, default=0.02, help="Provider latency (s)")
+    parser.add_argument("--server-rate", type=float, default=None, help="Provider requests/s before 429")
+    args = parser.parse_args()
+
+    result = measure_outbox_throughput(args.deliveries, args.workers, args.batch, args.latency, args.server_rate)
+    print(f"📬 Delivered {result['states'].get('sent', 0)}/{result['deliveries']} in {result['seconds']:.2f}s "
+          f"({result['deliveries_per_sec']:.1f} deliveries/s, {result['retries']} retries, "
+          f"{result['rate_limited']} rate limited)")
+    print(f"🔁 Duplicate rows queued on re-submit: {result['duplicates_queued']}")
+    print(f"📊 States: {result['states']} | server: {result['server']}")
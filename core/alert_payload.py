@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Alert Payload
+Immutable snapshot of one incident's alert, rendered once for every channel
+- Created once per incident from the resolved location and user profile
+- Each format (SMS-160, plain text, HTML, Telegram, Discord embed/bodies,
+  TwiML) is rendered on first use and cached; prerender() fills the cache
+  before dispatch so channels only pull ready-made strings/bytes
+- Follow-up triggers of an open incident are sent as update payloads
+  (update_number set), which render to a compact message on every channel
+"""
+
+import json
+import threading
+from datetime import datetime
+from html import escape as html_escape
+from types import MappingProxyType
+from xml.sax.saxutils import escape as xml_escape
+
+
+SMS_LIMIT = 160
+DISCORD_AVATAR_URL = "https://i.imgur.com/4M34hi2.png"  # Shield icon
+
+
+def _freeze(value):
+    """Read-only copy of nested config data"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class AlertPayload:
+    """
+    One alert, immutable after creation
+    Renderings are cached per format and safe to pull from many threads
+    """
+
+    def __init__(self, user_email, reason, location_url=None, location_description=None,
+                 coordinates=None, user_info=None, timestamp=None, incident_id=None, update_number=None):
+        user_info = user_info or {}
+        medical = user_info.get('medical_info') or {}
+        values = {
+            'incident_id': incident_id,
+            'update_number': update_number,
+            'user_email': user_email,
+            'reason': reason,
+            'location_url': location_url if location_url and location_url != 'Location not available' else None,
+            'location_description': location_description or location_url or 'Location not available',
+            'coordinates': _freeze(coordinates) if coordinates else None,
+            'timestamp': timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'name': user_info.get('name') or 'Unknown',
+            'email': user_info.get('email') or user_email,
+            'phone': user_info.get('phone') or '',
+            'blood_type': medical.get('blood_type') or '',
+            'allergies': _freeze(medical.get('allergies') or []),
+            'medications': _freeze(medical.get('medications') or []),
+            'conditions': _freeze(medical.get('conditions') or []),
+            'emergency_contacts': _freeze(user_info.get('emergency_contacts') or [])
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+        object.__setattr__(self, '_renderings', {})
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AlertPayload is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("AlertPayload is immutable")
+
+    @classmethod
+    def from_alert_data(cls, alert_data, incident_id=None):
+        """Build from the alert_data dict assembled in alert_manager.send_alert"""
+        location_info = alert_data.get('location_info') or {}
+        return cls(alert_data.get('user_email'), alert_data.get('reason'),
+                   location_url=alert_data.get('location'),
+                   location_description=alert_data.get('location_description'),
+                   coordinates=location_info.get('coordinates'),
+                   user_info=alert_data.get('user_info'),
+                   timestamp=alert_data.get('timestamp'),
+                   incident_id=incident_id or alert_data.get('incident_id'))
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a payload from as_dict() output (e.g. after a restart)"""
+        user_info = {
+            'name': data.get('name'),
+            'email': data.get('email'),
+            'phone': data.get('phone'),
+            'medical_info': {key: data.get(key) for key in ('blood_type', 'allergies', 'medications', 'conditions')},
+            'emergency_contacts': data.get('emergency_contacts')
+        }
+        return cls(data.get('user_email'), data.get('reason'), location_url=data.get('location_url'),
+                   location_description=data.get('location_description'), coordinates=data.get('coordinates'),
+                   user_info=user_info, timestamp=data.get('timestamp'), incident_id=data.get('incident_id'),
+                   update_number=data.get('update_number'))
+
+    def render(self, fmt):
+        """Rendered text for a format (see RENDERERS), cached after the first call"""
+        cached = self._renderings.get(fmt)
+        if cached is None:
+            renderer = UPDATE_RENDERERS.get(fmt) if self.update_number else None
+            text = (renderer or RENDERERS[fmt])(self)
+            with self._lock:
+                cached = self._renderings.setdefault(fmt, text)
+        return cached
+
+    def render_bytes(self, fmt):
+        """UTF-8 encoded rendering, cached like render()"""
+        key = fmt + ':bytes'
+        cached = self._renderings.get(key)
+        if cached is None:
+            data = self.render(fmt).encode('utf-8')
+            with self._lock:
+                cached = self._renderings.setdefault(key, data)
+        return cached
+
+    def prerender(self, formats=None):
+        """Render ahead of dispatch so channels never format on the hot path"""
+        for fmt in formats or RENDERERS:
+            self.render_bytes(fmt)
+        return self
+
+    def as_dict(self):
+        """Plain copy of the snapshot fields (for logs and offline storage)"""
+        fields = ('incident_id', 'update_number', 'user_email', 'reason', 'location_url', 'location_description', 'timestamp',
+                  'name', 'email', 'phone', 'blood_type')
+        data = {field: getattr(self, field) for field in fields}
+        data.update(allergies=list(self.allergies), medications=list(self.medications),
+                    conditions=list(self.conditions), emergency_contacts=list(self.emergency_contacts))
+        data['coordinates'] = dict(self.coordinates) if self.coordinates else None
+        return data
+
+
+# Renderers
+
+def _render_sms(payload, header="🚨 HER SHIELD ALERT 🚨\n"):
+    """Single-SMS text; the reason is shortened first so the location link survives"""
+    tail = f"\nLocation: {payload.location_url}" if payload.location_url else ""
+    tail += f"\nTime: {payload.timestamp[11:16]}" if len(payload.timestamp) >= 16 else ""
+    head = f"{payload.name}: "
+    room = SMS_LIMIT - len(header) - len(head) - len(tail)
+    reason = payload.reason or ""
+    if room < 4:
+        message = f"{header}{head}{reason}{tail}"
+        return message[:SMS_LIMIT - 3] + "..." if len(message) > SMS_LIMIT else message
+    if len(reason) > room:
+        reason = reason[:room - 3] + "..."
+    return f"{header}{head}{reason}{tail}"
+
+
+def _render_text(payload):
+    contacts = "\n".join(f"• {contact}" for contact in payload.emergency_contacts)
+    return f"""
+🚨 EMERGENCY ALERT 🚨
+User: {payload.name}
+Email: {payload.email}
+Phone: {payload.phone or 'Not provided'}
+Reason: {payload.reason}
+Time: {payload.timestamp}
+
+Location Information:
+{payload.location_description}
+{f'Map: {payload.location_url}' if payload.location_url else ''}
+
+Emergency Contacts:
+{contacts}
+
+Medical Information:
+• Blood Type: {payload.blood_type or 'Not specified'}
+• Allergies: {', '.join(payload.allergies) or 'None'}
+• Medications: {', '.join(payload.medications) or 'None'}
+• Conditions: {', '.join(payload.conditions) or 'None'}
+
+This alert was generated automatically by HerShield Safety System.
+Please respond immediately if you receive this message.
+"""
+
+
+def _render_html(payload):
+    e = html_escape
+    location = e(payload.location_description)
+    if payload.location_url:
+        location += f'<br><a href="{e(payload.location_url)}">View on map</a>'
+    contacts = "".join(f"<li>{e(contact)}</li>" for contact in payload.emergency_contacts)
+    return f"""<html><body style="font-family: sans-serif">
+<h2 style="color: #d00000">🚨 HER SHIELD EMERGENCY ALERT 🚨</h2>
+<p><b>User:</b> {e(payload.name)}<br>
+<b>Email:</b> {e(payload.email)}<br>
+<b>Phone:</b> {e(payload.phone or 'Not provided')}<br>
+<b>Reason:</b> {e(payload.reason or '')}<br>
+<b>Time:</b> {e(payload.timestamp)}</p>
+<h3>📍 Location</h3>
+<p>{location}</p>
+<h3>🏥 Medical Information</h3>
+<ul>
+<li>Blood Type: {e(payload.blood_type or 'Not specified')}</li>
+<li>Allergies: {e(', '.join(payload.allergies) or 'None specified')}</li>
+<li>Medications: {e(', '.join(payload.medications) or 'None specified')}</li>
+<li>Conditions: {e(', '.join(payload.conditions) or 'None specified')}</li>
+</ul>
+<h3>📞 Emergency Contacts</h3>
+<ul>{contacts}</ul>
+<p><i>This is an automated emergency alert from HerShield safety system.
+Please respond immediately if you receive this message.</i></p>
+</body></html>"""
+
+
+def _render_telegram(payload):
+    """Telegram message text for parse_mode=HTML (user values escaped)"""
+    e = html_escape
+    contacts = "\n".join(f"• {e(contact)}" for contact in payload.emergency_contacts)
+    location = f"📍 Location: {e(payload.location_url)}\n" if payload.location_url else ""
+    return f"""
+🚨 <b>HER SHIELD EMERGENCY ALERT</b> 🚨
+
+👤 User: {e(payload.name)}
+📧 Email: {e(payload.email)}
+📱 Phone: {e(payload.phone or 'Not provided')}
+⚠️ Reason: {e(payload.reason or '')}
+
+{location}
+🏥 Medical Information:
+🩸 Blood Type: {e(payload.blood_type or 'Not specified')}
+🤧 Allergies: {e(', '.join(payload.allergies) or 'None')}
+💊 Medications: {e(', '.join(payload.medications) or 'None')}
+🩺 Conditions: {e(', '.join(payload.conditions) or 'None')}
+
+📞 Emergency Contacts:
+{contacts}
+
+---
+🤖 Automated alert from HerShield safety system
+"""
+
+
+def _discord_embed(payload):
+    embed = {
+        "title": "🚨 HER SHIELD EMERGENCY ALERT 🚨",
+        "color": 16711680,  # Red color
+        "fields": [
+            {"name": "👤 User", "value": payload.name, "inline": True},
+            {"name": "📧 Email", "value": payload.email, "inline": True},
+            {"name": "📱 Phone", "value": payload.phone or 'Not provided', "inline": True},
+            {"name": "⚠️ Reason", "value": payload.reason or 'Emergency alert', "inline": False}
+        ]
+    }
+    if payload.location_url:
+        embed["fields"].append({"name": "📍 Location", "value": f"[View on Maps]({payload.location_url})",
+                                "inline": False})
+
+    medical_info = []
+    if payload.blood_type:
+        medical_info.append(f"🩸 Blood Type: {payload.blood_type}")
+    if payload.allergies:
+        medical_info.append(f"🤧 Allergies: {', '.join(payload.allergies)}")
+    if payload.medications:
+        medical_info.append(f"💊 Medications: {', '.join(payload.medications)}")
+    if payload.conditions:
+        medical_info.append(f"🩺 Conditions: {', '.join(payload.conditions)}")
+    if medical_info:
+        embed["fields"].append({"name": "🏥 Medical Information", "value": "\n".join(medical_info),
+                                "inline": False})
+
+    if payload.emergency_contacts:
+        embed["fields"].append({"name": "📞 Emergency Contacts",
+                                "value": "\n".join(f"• {contact}" for contact in payload.emergency_contacts),
+                                "inline": False})
+    return embed
+
+
+def _render_discord_embed(payload):
+    return json.dumps(_discord_embed(payload), ensure_ascii=False)
+
+
+def _render_discord_webhook(payload):
+    return json.dumps({"embeds": [_discord_embed(payload)], "username": "HerShield Alert",
+                       "avatar_url": DISCORD_AVATAR_URL}, ensure_ascii=False)
+
+
+def _render_discord_bot(payload):
+    return json.dumps({"embeds": [_discord_embed(payload)]}, ensure_ascii=False)
+
+
+def _render_twiml(payload):
+    """Voice call script: announcement, confirmation gather, voicemail fallback"""
+    location = payload.location_description if payload.location_description != 'Location not available' \
+        else (payload.location_url or 'unknown')
+    intro = xml_escape(f"Emergency alert from HerShield safety system. Reason: {payload.reason}. "
+                       f"Location: {location}. "
+                       "Press 1 to confirm you are responding to this emergency. "
+                       "If you do not respond, a voicemail will be recorded.")
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<Response>'
+            f'<Say voice="alice">{intro}</Say>'
+            '<Gather action="/voice/confirm" method="POST" numDigits="1" timeout="10">'
+            '<Say>Press 1 if you can respond to this emergency call.</Say>'
+            '</Gather>'
+            '<Say>No response received. Please leave a message after the beep.</Say>'
+            '<Record action="/voice/voicemail" maxLength="30" method="POST" transcribe="true"/>'
+            '<Say>Thank you. Emergency services have been notified.</Say>'
+            '</Response>')
+
+
+# Compact updates for an incident contacts were already alerted about
+
+def _update_title(payload):
+    return f"HER SHIELD UPDATE #{payload.update_number}"
+
+
+def _render_update_sms(payload):
+    return _render_sms(payload, header=f"🔄 {_update_title(payload)}\n")
+
+
+def _render_update_text(payload):
+    location = f"\nMap: {payload.location_url}" if payload.location_url else ""
+    return (f"🔄 {_update_title(payload)}\n{payload.name}: {payload.reason}{location}\n"
+            f"Time: {payload.timestamp}\nIncident: {payload.incident_id}")
+
+
+def _render_update_html(payload):
+    e = html_escape
+    location = f'<br><a href="{e(payload.location_url)}">View on map</a>' if payload.location_url else ""
+    return (f'<html><body style="font-family: sans-serif"><h3 style="color: #d00000">🔄 {_update_title(payload)}</h3>'
+            f"<p><b>{e(payload.name)}:</b> {e(payload.reason or '')}{location}<br>"
+            f"<b>Time:</b> {e(payload.timestamp)}<br><b>Incident:</b> {e(str(payload.incident_id))}</p></body></html>")
+
+
+def _render_update_telegram(payload):
+    e = html_escape
+    location = f"\n📍 {e(payload.location_url)}" if payload.location_url else ""
+    return f"🔄 <b>{_update_title(payload)}</b>\n{e(payload.name)}: {e(payload.reason or '')}{location}"
+
+
+def _update_embed(payload):
+    embed = {"title": f"🔄 {_update_title(payload)}", "color": 16744192,  # Orange
+             "description": f"{payload.name}: {payload.reason}"}
+    if payload.location_url:
+        embed["description"] += f"\n[View on Maps]({payload.location_url})"
+    return embed
+
+
+UPDATE_RENDERERS = {
+    'sms': _render_update_sms,
+    'text': _render_update_text,
+    'html': _render_update_html,
+    'telegram': _render_update_telegram,
+    'discord_embed': lambda payload: json.dumps(_update_embed(payload), ensure_ascii=False),
+    'discord_webhook': lambda payload: json.dumps({"embeds": [_update_embed(payload)], "username": "HerShield Alert",
+                                                   "avatar_url": DISCORD_AVATAR_URL}, ensure_ascii=False),
+    'discord_bot': lambda payload: json.dumps({"embeds": [_update_embed(payload)]}, ensure_ascii=False)
+}
+
+
+RENDERERS = {
+    'sms': _render_sms,
+    'text': _render_text,
+    'html': _render_html,
+    'telegram': _render_telegram,
+    'discord_embed': _render_discord_embed,
+    'discord_webhook': _render_discord_webhook,
+    'discord_bot': _render_discord_bot,
+    'twiml': _render_twiml
+}
+
+
+def create_alert_payload(user_email, reason, location=None, location_info=None, incident_id=None):
+    """Payload from the current user profile (for channels used outside send_alert)"""
+    from core.user_config import user_config
+
+    location_info = location_info or {}
+    return AlertPayload(user_email, reason, location_url=location or location_info.get('url'),
+                        location_description=location_info.get('description'),
+                        coordinates=location_info.get('coordinates'),
+                        user_info=user_config.get_user_info(), incident_id=incident_id)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    payload = AlertPayload(
+        "user@example.com", "Distress keyword detected: help",
+        location_url="https://maps.google.com/?q=19.0760,72.8777",
+        location_description="Mumbai, Maharashtra, India",
+        user_info={'name': 'Test User', 'phone': '+919876543210',
+                   'medical_info': {'blood_type': 'O+', 'allergies': ['Penicillin']},
+                   'emergency_contacts': ['Mom: +919876543211', 'Friend: friend@example.com']})
+
+    start = time.perf_counter()
+    payload.prerender()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    payload.prerender()
+    cached = time.perf_counter() - start
+    print(f"🧾 Rendered {len(RENDERERS)} formats in {first * 1000:.2f} ms, cached pull {cached * 1000:.3f} ms")
+    print(f"📱 SMS ({len(payload.render('sms'))} chars):\n{payload.render('sms')}")
+    print(f"📞 TwiML: {payload.render_bytes('twiml')[:80]}...")
@@ -5,14 +5,28 @@ import time
 import os
 import logging
 
+from core.camera_service import camera_service
+from core.pretrigger_buffer import pretrigger_buffer
+from core.evidence_encoder import FrameEncoder
+from core.evidence_index import evidence_index
+from core.evidence_proxy import proxy_transcoder
+from core.evidence_uploader import evidence_uploader
+import core.evidence_crypto as evidence_crypto
+
 class EnhancedCameraCapture:
     """Enhanced camera system with video recording and evidence collection"""
     
     def __init__(self):
         self.is_recording = False
-        self.video_writer = None
+        self.encoder = None
         self.camera = None
         self.recording_thread = None
+        # Cipher for the recording in progress (None: stored in plaintext)
+        self.recording_cipher = None
+        # Evidence name of the recording in progress (its work file differs when encrypted)
+        self.recording_filename = None
+        # Incident the evidence being captured belongs to (set per emergency)
+        self.incident_id = None
         
         # Ensure data directory exists
         os.makedirs("data/evidence", exist_ok=True)
@@ -20,26 +34,36 @@ class EnhancedCameraCapture:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
 
+    def _save_image(self, filename, frame):
+        """Write a snapshot (encrypted in memory when encryption at rest is on) and index it"""
+        cipher = evidence_crypto.evidence_cipher
+        if cipher is not None:
+            ok, jpeg = cv2.imencode('.jpg', frame)
+            if not ok:
+                return None
+            filename += evidence_crypto.ENCRYPTED_SUFFIX
+            evidence_crypto.write_encrypted_bytes(filename, jpeg.tobytes(), cipher)
+        elif not cv2.imwrite(filename, frame):
+            return None
+        evidence_index.record(filename, incident_id=self.incident_id, media_type='snapshot')
+        return filename
+
     def capture_image(self, prefix="capture"):
         """Capture a single image"""
         try:
-            cam = cv2.VideoCapture(0)
-            if not cam.isOpened():
-                self.logger.error("Could not open camera")
+            # Taken from the shared camera stream, not a second device handle
+            frame = camera_service.snapshot()
+            if frame is None:
+                self.logger.error("Failed to capture image")
                 return None
             
-            ret, frame = cam.read()
-            if ret:
-                timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"data/evidence/{prefix}_{timestamp}.jpg"
-                cv2.imwrite(filename, frame)
-                self.logger.info(f"Image captured: {filename}")
-                cam.release()
-                return filename
-            else:
-                self.logger.error("Failed to capture image")
-                cam.release()
+            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = self._save_image(f"data/evidence/{prefix}_{timestamp}.jpg", frame)
+            if not filename:
+                self.logger.error("Failed to save image")
                 return None
+            self.logger.info(f"Image captured: {filename}")
+            return filename
                 
         except Exception as e:
             self.logger.error(f"Image capture error: {e}")
@@ -52,7 +76,7 @@ class EnhancedCameraCapture:
             return None
         
         try:
-            self.camera = cv2.VideoCapture(0)
+            self.camera = camera_service.subscribe("recorder", queue_size=8)
             if not self.camera.isOpened():
                 self.logger.error("Could not open camera for recording")
                 return None
@@ -62,15 +86,29 @@ class EnhancedCameraCapture:
             width = int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))
             height = int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
             
-            # Create video writer
+            # Encoding runs on its own thread at a constant output FPS
             timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"data/evidence/{prefix}_video_{timestamp}.mp4"
+            self.recording_cipher = evidence_crypto.evidence_cipher
+            self.recording_filename = filename
+            if self.recording_cipher is not None:
+                # Recorded in the private plaintext directory, encrypted into data/evidence on stop
+                filename = evidence_crypto.plaintext_path(filename)
             
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            self.video_writer = cv2.VideoWriter(filename, fourcc, fps, (width, height))
+            # Evidence opens with the pre-trigger ring, up to the first live frame
+            self.encoder = FrameEncoder(
+                filename, fps, (width, height), fourcc='mp4v',
+                on_first_frame=lambda writer, first_ts: pretrigger_buffer.write_video_prefix(
+                    writer, fps, (width, height), first_ts)
+            )
             
-            if not self.video_writer.isOpened():
+            if not self.encoder.start():
                 self.logger.error("Could not create video writer")
+                self.encoder = None
+                if self.recording_cipher is not None and os.path.exists(filename):
+                    os.remove(filename)
+                self.camera.release()
+                self.camera = None
                 return None
             
             self.is_recording = True
@@ -81,7 +119,10 @@ class EnhancedCameraCapture:
             )
             self.recording_thread.start()
             
-            self.logger.info(f"Video recording started: {filename} (duration: {duration}s)")
+            self.logger.info(f"Video recording started: {self.recording_filename} (duration: {duration}s)")
+            if self.recording_cipher is not None:
+                # Encrypted when the recording closes; this is the name it will have
+                return self.recording_filename + evidence_crypto.ENCRYPTED_SUFFIX
             return filename
             
         except Exception as e:
@@ -95,17 +136,15 @@ class EnhancedCameraCapture:
         
         try:
             while self.is_recording and (time.time() - start_time) < duration:
-                ret, frame = self.camera.read()
+                ret, frame, captured_at = self.camera.read_with_timestamp()
                 if ret:
-                    self.video_writer.write(frame)
+                    self.encoder.submit(frame, captured_at)
                     frame_count += 1
                 else:
                     self.logger.warning("Failed to read frame")
                     break
-                
-                time.sleep(0.01)  # Small delay to prevent excessive CPU usage
             
-            self.logger.info(f"Video recording completed: {frame_count} frames recorded")
+            self.logger.info(f"Video recording completed: {frame_count} frames captured")
             
         except Exception as e:
             self.logger.error(f"Recording loop error: {e}")
@@ -120,9 +159,31 @@ class EnhancedCameraCapture:
         self.is_recording = False
         
         try:
-            if self.video_writer:
-                self.video_writer.release()
-                self.video_writer = None
+            if self.encoder:
+                filename = self.encoder.filename
+                try:
+                    stats = self.encoder.stop()
+                except Exception:
+                    if self.recording_cipher is not None and os.path.exists(filename):
+                        os.remove(filename)
+                    raise
+                self.encoder = None
+                self.logger.info(
+                    f"Encoder: capture {stats['capture_fps']:.1f} FPS, encode {stats['encode_fps']:.1f} FPS, "
+                    f"{stats['written']} frames at {stats['output_fps']:.0f} FPS "
+                    f"({stats['prefix_frames']} pre-trigger, {stats['duplicated']} duplicated, "
+                    f"{stats['dropped_rate'] + stats['dropped_queue']} dropped)")
+                if self.recording_cipher is not None:
+                    # Stream-encrypt the closed file into data/evidence; the
+                    # private plaintext is removed even if encryption fails
+                    encrypted = self.recording_filename + evidence_crypto.ENCRYPTED_SUFFIX
+                    evidence_crypto.encrypt_file(filename, encrypted, self.recording_cipher)
+                    filename = encrypted
+                # Closed file: index it, then hand it to the upload queue
+                evidence_index.record(filename, incident_id=self.incident_id, media_type='video')
+                evidence_uploader.enqueue(filename, kind='video')
+                # Low-bitrate proxy and contact sheet overtake the original in the upload queue
+                proxy_transcoder.submit(filename)
             
             if self.camera:
                 self.camera.release()
@@ -138,7 +199,9 @@ class EnhancedCameraCapture:
         evidence_files = []
         
         try:
-            cam = cv2.VideoCapture(0)
+            # Rate-limited subscriber: one frame per interval from the shared stream
+            cam = camera_service.subscribe("evidence_sequence", max_fps=1.0 / interval if interval else None,
+                                           queue_size=1)
             if not cam.isOpened():
                 self.logger.error("Could not open camera for evidence capture")
                 return evidence_files
@@ -146,15 +209,12 @@ class EnhancedCameraCapture:
             timestamp_base = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
             
             for i in range(num_images):
-                ret, frame = cam.read()
+                ret, frame = cam.read(timeout=interval + 2)
                 if ret:
-                    filename = f"data/evidence/evidence_{timestamp_base}_{i+1:02d}.jpg"
-                    cv2.imwrite(filename, frame)
-                    evidence_files.append(filename)
+                    filename = self._save_image(f"data/evidence/evidence_{timestamp_base}_{i+1:02d}.jpg", frame)
+                    if filename:
+                        evidence_files.append(filename)
                     self.logger.info(f"Evidence image {i+1}/{num_images}: {filename}")
-                    
-                    if i < num_images - 1:  # Don't wait after the last image
-                        time.sleep(interval)
                 else:
                     self.logger.warning(f"Failed to capture evidence image {i+1}")
             
@@ -166,13 +226,23 @@ class EnhancedCameraCapture:
             self.logger.error(f"Evidence capture error: {e}")
             return evidence_files
 
-    def emergency_capture_all(self, video_duration=30):
-        """Capture both images and video for emergency evidence"""
+    def emergency_capture_all(self, video_duration=30, incident_id=None, priority='auto_confirmed'):
+        """
+        Capture both images and video for emergency evidence
+
+        Args:
+            video_duration: Seconds of video to record
+            incident_id: Alert id the evidence belongs to (default: generated)
+            priority: Incident priority used by evidence retention
+        """
         evidence = {
             'images': [],
             'video': None,
             'timestamp': datetime.datetime.now().isoformat()
         }
+        self.incident_id = incident_id or f"incident_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        evidence['incident_id'] = self.incident_id
+        evidence_index.set_incident_priority(self.incident_id, priority)
         
         try:
             # Capture immediate image
@@ -189,6 +259,11 @@ class EnhancedCameraCapture:
             sequence_images = self.capture_evidence_sequence(3, 2)
             evidence['images'].extend(sequence_images)
             
+            # Snapshots are queued ahead of any video upload
+            for image in evidence['images']:
+                evidence_uploader.enqueue(image, kind='snapshot')
+                proxy_transcoder.submit(image)
+            
             self.logger.info(f"Emergency evidence capture initiated")
             return evidence
             
@@ -214,6 +289,12 @@ class EnhancedCameraCapture:
     def test_camera(self, camera_index=0):
         """Test camera functionality"""
         try:
+            # The shared camera is already open; opening it again would fail
+            if camera_index == camera_service.camera_index and camera_service.is_running():
+                if camera_service.snapshot() is not None:
+                    return True, "Camera working properly"
+                return False, "Camera accessible but cannot capture frames"
+            
             cam = cv2.VideoCapture(camera_index)
             if not cam.isOpened():
                 return False, "Camera not accessible"
@@ -229,6 +310,27 @@ class EnhancedCameraCapture:
         except Exception as e:
             return False, f"Camera test error: {e}"
 
+    def cleanup_old_evidence(self, max_age_hours=24, max_files=50):
+        """Clean up old evidence files to save space (indexed query, no directory scan)"""
+        try:
+            result = evidence_index.cleanup("data/evidence", max_age_hours=max_age_hours, max_files=max_files)
+            if result['files_removed'] > 0:
+                self.logger.info(f"Cleanup complete: {result['files_removed']} files removed "
+                                 f"({result['bytes_freed'] / (1024 * 1024):.1f} MB)")
+            return result
+                
+        except Exception as e:
+            self.logger.error(f"Evidence cleanup error: {e}")
+
+# Global cleanup function
+def cleanup_evidence_files():
+    """Global function to cleanup evidence files (one bounded retention pass)"""
+    try:
+        from core.evidence_retention import evidence_retention
+        return evidence_retention.run_pass()
+    except Exception as e:
+        print(f"Evidence cleanup error: {e}")
+
 # Backward compatibility functions
 def capture_image():
     """Simple image capture (backward compatibility)"""
@@ -239,10 +341,10 @@ def capture_image():
     else:
         print("[ERROR] Failed to capture image")
 
-def capture_emergency_evidence():
+def capture_emergency_evidence(incident_id=None, priority='auto_confirmed'):
     """Capture comprehensive emergency evidence"""
     capture_system = EnhancedCameraCapture()
-    evidence = capture_system.emergency_capture_all()
+    evidence = capture_system.emergency_capture_all(incident_id=incident_id, priority=priority)
     
     print("[EMERGENCY EVIDENCE] Capture initiated:")
     if evidence['images']:
@@ -269,61 +371,7 @@ if __name__ == "__main__":
             print(f"✅ Image captured: {image_file}")
         
         # Test emergency evidence capture
-        evidence = capture_system.emergency_capture_all(10)  # 10 second video for test
+        evidence = capture_system.emergency_capture_all(10, priority='test')  # 10 second video for test
         print(f"✅ Emergency evidence: {evidence}")
     else:
         print("❌ No camera available for testing")
-    def cleanup_old_evidence(self, max_age_hours=24, max_files=50):
-        """Clean up old evidence files to save space"""
-        try:
-            evidence_dir = "data/evidence"
-            if not os.path.exists(evidence_dir):
-                return
-            
-            import glob
-            import time
-            
-            # Get all evidence files
-            files = glob.glob(os.path.join(evidence_dir, "*"))
-            
-            # Sort by modification time (newest first)
-            files.sort(key=os.path.getmtime, reverse=True)
-            
-            current_time = time.time()
-            files_removed = 0
-            
-            # Remove files older than max_age_hours
-            for file_path in files:
-                file_age = current_time - os.path.getmtime(file_path)
-                if file_age > (max_age_hours * 3600):  # Convert hours to seconds
-                    try:
-                        os.remove(file_path)
-                        files_removed += 1
-                        self.logger.info(f"Removed old evidence: {os.path.basename(file_path)}")
-                    except Exception as e:
-                        self.logger.error(f"Failed to remove {file_path}: {e}")
-            
-            # Keep only the most recent max_files
-            if len(files) > max_files:
-                for file_path in files[max_files:]:
-                    try:
-                        os.remove(file_path)
-                        files_removed += 1
-                        self.logger.info(f"Removed excess evidence: {os.path.basename(file_path)}")
-                    except Exception as e:
-                        self.logger.error(f"Failed to remove {file_path}: {e}")
-            
-            if files_removed > 0:
-                self.logger.info(f"Cleanup complete: {files_removed} files removed")
-                
-        except Exception as e:
-            self.logger.error(f"Evidence cleanup error: {e}")
-
-# Global cleanup function
-def cleanup_evidence_files():
-    """Global function to cleanup evidence files"""
-    try:
-        camera = EnhancedCameraCapture()
-        camera.cleanup_old_evidence(max_age_hours=2, max_files=20)  # Keep only 2 hours, max 20 files
-    except Exception as e:
-        print(f"Evidence cleanup error: {e}")
\ No newline at end of file
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Shared Camera Service
+One owner for the camera device; frames are fanned out to every consumer
+(video recorder, snapshots, distress detectors, live streamer)
+
+Opening the same V4L2/DirectShow device from several threads either
+serializes or fails, so consumers subscribe here instead of creating
+their own cv2.VideoCapture. Subscriptions mimic the VideoCapture calls
+the existing loops use (isOpened, read, get, release).
+"""
+
+import threading
+import time
+from collections import deque
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+
+class CameraSubscription:
+    """
+    Per-consumer view of the shared camera
+    Holds only the newest few frames; older ones are dropped, never queued
+    Frames are shared between subscribers and must not be modified in place
+    """
+
+    def __init__(self, service, name, max_fps=None, queue_size=2):
+        self.service = service
+        self.name = name
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.frames = deque(maxlen=queue_size)
+        self.condition = threading.Condition()
+        self.last_delivery = 0.0
+        self.active = True
+        self.delivered = 0
+        self.skipped = 0
+
+    def _offer(self, frame, timestamp):
+        """Called by the capture thread; applies this subscriber's rate limit"""
+        if timestamp - self.last_delivery < self.min_interval:
+            self.skipped += 1
+            return
+        self.last_delivery = timestamp
+        with self.condition:
+            self.frames.append((frame, timestamp))
+            self.delivered += 1
+            self.condition.notify()
+
+    def isOpened(self):
+        return self.active and self.service.is_running()
+
+    def read(self, timeout=1.0):
+        """Wait for the next frame; returns (ret, frame) like VideoCapture.read"""
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return False, None
+            frame, _ = self.frames.popleft()
+        return True, frame
+
+    def read_with_timestamp(self, timeout=1.0):
+        """Like read() but also returns the capture timestamp"""
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return False, None, None
+            frame, timestamp = self.frames.popleft()
+        return True, frame, timestamp
+
+    def get(self, prop):
+        """Camera property (FPS, frame size) from the shared device"""
+        return self.service.get(prop)
+
+    def release(self):
+        """Unsubscribe; the device closes once nobody is subscribed"""
+        if self.active:
+            self.active = False
+            self.service.unsubscribe(self)
+            with self.condition:
+                self.condition.notify_all()
+
+
+class CameraService:
+    """
+    Owns the camera device and publishes frames to subscribers
+    The device is opened and warmed up once, on first subscription, and
+    closed idle_timeout seconds after the last subscriber leaves
+    """
+
+    def __init__(self, camera_index=0, warmup_frames=5, idle_timeout=3.0):
+        self.camera_index = camera_index
+        self.warmup_frames = warmup_frames
+        self.idle_timeout = idle_timeout
+
+        self.cap = None
+        self.running = False
+        self.capture_thread = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.lock)
+
+        self.latest_frame = None
+        self.latest_timestamp = None
+        self.properties = {}
+        self.frames_captured = 0
+        self.open_count = 0
+
+    def is_running(self):
+        return self.running
+
+    def _open(self):
+        """Open and warm up the device (caller holds the lock)"""
+        if self.running:
+            return True
+        if not CV2_AVAILABLE:
+            print("⚠️ OpenCV not available, camera service disabled")
+            return False
+
+        cap = cv2.VideoCapture(self.camera_index)
+        if not cap.isOpened():
+            print("❌ Camera not available")
+            cap.release()
+            return False
+
+        # Auto exposure/white balance settle during the first frames
+        for _ in range(self.warmup_frames):
+            cap.read()
+
+        self.cap = cap
+        self.properties = {
+            cv2.CAP_PROP_FPS: cap.get(cv2.CAP_PROP_FPS) or 20.0,
+            cv2.CAP_PROP_FRAME_WIDTH: cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+            cv2.CAP_PROP_FRAME_HEIGHT: cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+        }
+        self.running = True
+        self.open_count += 1
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+        print(f"📷 Camera {self.camera_index} opened")
+        return True
+
+    def _capture_loop(self):
+        """Read frames and fan them out until idle for idle_timeout"""
+        idle_since = None
+        cap = self.cap
+
+        while True:
+            ret, frame = cap.read()
+            timestamp = time.time()
+
+            with self.lock:
+                if not self.subscribers:
+                    idle_since = idle_since or timestamp
+                    if timestamp - idle_since >= self.idle_timeout:
+                        # Released under the lock so a new subscriber reopens cleanly
+                        cap.release()
+                        self.running = False
+                        self.cap = None
+                        self.latest_frame = None
+                        break
+                else:
+                    idle_since = None
+
+                if ret:
+                    self.latest_frame = frame
+                    self.latest_timestamp = timestamp
+                    self.frames_captured += 1
+                    self.frame_ready.notify_all()
+                subscribers = list(self.subscribers)
+
+            if not ret:
+                time.sleep(0.01)
+                continue
+
+            for subscription in subscribers:
+                subscription._offer(frame, timestamp)
+
+        print(f"📷 Camera {self.camera_index} released")
+
+    def subscribe(self, name, max_fps=None, queue_size=2):
+        """
+        Register a frame consumer
+
+        Args:
+            name: Consumer name (for logging)
+            max_fps: Deliver at most this many frames per second
+            queue_size: Frames kept for a slow consumer before dropping
+
+        Returns:
+            CameraSubscription (isOpened() is False if the camera failed)
+        """
+        subscription = CameraSubscription(self, name, max_fps, queue_size)
+        with self.lock:
+            if self._open():
+                self.subscribers.append(subscription)
+            else:
+                subscription.active = False
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+
+    def has_subscriber(self, *names):
+        """True if any active subscriber has one of the given names"""
+        with self.lock:
+            return any(s.name in names for s in self.subscribers)
+
+    def get(self, prop):
+        """Property of the open device (0 if unknown)"""
+        return self.properties.get(prop, 0)
+
+    def snapshot(self, timeout=2.0):
+        """
+        Most recent frame, opening the camera if needed
+        Snapshots are taken from the shared stream, never a second device
+        """
+        subscription = None
+        with self.lock:
+            if not self.running:
+                if not self._open():
+                    return None
+                # Keep the device alive until the first frame arrives
+                subscription = CameraSubscription(self, "snapshot")
+                self.subscribers.append(subscription)
+            if self.latest_frame is None:
+                self.frame_ready.wait(timeout)
+            frame = self.latest_frame
+
+        if subscription:
+            subscription.release()
+        return frame.copy() if frame is not None else None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'running': self.running,
+                'frames_captured': self.frames_captured,
+                'open_count': self.open_count,
+                'subscribers': {s.name: {'delivered': s.delivered, 'skipped': s.skipped}
+                                for s in self.subscribers}
+            }
+
+
+# Global instance
+camera_service = CameraService()
+
+
+# Example usage
+if __name__ == "__main__":
+    recorder = camera_service.subscribe("recorder")
+    detector = camera_service.subscribe("detector", max_fps=5)
+
+    if not recorder.isOpened():
+        print("❌ No camera available for testing")
+    else:
+        start = time.time()
+        while time.time() - start < 5:
+            recorder.read()
+            detector.read(timeout=0)
+
+        frame = camera_service.snapshot()
+        print(f"✅ Snapshot: {frame.shape if frame is not None else None}")
+        print(f"📊 {camera_service.get_stats()}")
+
+        recorder.release()
+        detector.release()
@@ -4,8 +4,9 @@ Discord alert system as free alternative to Twilio SMS
 Supports both webhooks and bot APIs
 """
 
-import requests
 from core.user_config import user_config
+from core.http_client import http_client
+from core.alert_payload import create_alert_payload
 
 class DiscordAlert:
     """Send emergency alerts via Discord"""
@@ -14,97 +15,31 @@ class DiscordAlert:
         self.config = user_config.get_messaging_config()["discord_config"]
         self.user_info = user_config.get_user_info()
 
-    def send_alert(self, user_email, reason="Emergency alert", location=None):
-        """Send emergency alert via Discord"""
+    def send_alert(self, user_email, reason="Emergency alert", location=None, payload=None):
+        """Send emergency alert via Discord (payload: pre-rendered AlertPayload)"""
 
         if not self.config["webhook_url"] and not (self.config["bot_token"] and self.config["channel_id"]):
             print("[ERROR] Discord not configured")
             return False
 
-        # Create embed message (rich formatting)
-        embed = {
-            "title": "🚨 HER SHIELD EMERGENCY ALERT 🚨",
-            "color": 16711680,  # Red color
-            "fields": [
-                {
-                    "name": "👤 User",
-                    "value": self.user_info['name'],
-                    "inline": True
-                },
-                {
-                    "name": "📧 Email",
-                    "value": self.user_info['email'],
-                    "inline": True
-                },
-                {
-                    "name": "📱 Phone",
-                    "value": self.user_info['phone'] or 'Not provided',
-                    "inline": True
-                },
-                {
-                    "name": "⚠️ Reason",
-                    "value": reason,
-                    "inline": False
-                }
-            ],
-            "timestamp": None  # Will be set by Discord
-        }
-
-        # Add location if available
-        if location:
-            embed["fields"].append({
-                "name": "📍 Location",
-                "value": f"[View on Maps]({location})",
-                "inline": False
-            })
-
-        # Add medical information
-        medical_info = []
-        if self.user_info['medical_info']['blood_type']:
-            medical_info.append(f"🩸 Blood Type: {self.user_info['medical_info']['blood_type']}")
-        if self.user_info['medical_info']['allergies']:
-            medical_info.append(f"🤧 Allergies: {', '.join(self.user_info['medical_info']['allergies'])}")
-        if self.user_info['medical_info']['medications']:
-            medical_info.append(f"💊 Medications: {', '.join(self.user_info['medical_info']['medications'])}")
-        if self.user_info['medical_info']['conditions']:
-            medical_info.append(f"🩺 Conditions: {', '.join(self.user_info['medical_info']['conditions'])}")
-
-        if medical_info:
-            embed["fields"].append({
-                "name": "🏥 Medical Information",
-                "value": "\n".join(medical_info),
-                "inline": False
-            })
-
-        # Add emergency contacts
-        if self.user_info['emergency_contacts']:
-            contacts_text = "\n".join(f"• {contact}" for contact in self.user_info['emergency_contacts'])
-            embed["fields"].append({
-                "name": "📞 Emergency Contacts",
-                "value": contacts_text,
-                "inline": False
-            })
+        # Rich embed message, rendered once per incident
+        payload = payload or create_alert_payload(user_email, reason, location)
 
         # Send via webhook (preferred method)
         if self.config["webhook_url"]:
-            return self._send_via_webhook(embed)
+            return self._send_via_webhook(payload.render_bytes('discord_webhook'))
 
         # Send via bot API
         elif self.config["bot_token"] and self.config["channel_id"]:
-            return self._send_via_bot(embed)
+            return self._send_via_bot(payload.render_bytes('discord_bot'))
 
         return False
 
-    def _send_via_webhook(self, embed):
-        """Send alert via Discord webhook"""
+    def _send_via_webhook(self, body):
+        """Send alert via Discord webhook (body: JSON bytes)"""
         try:
-            data = {
-                "embeds": [embed],
-                "username": "HerShield Alert",
-                "avatar_url": "https://i.imgur.com/4M34hi2.png"  # Shield icon
-            }
-
-            response = requests.post(self.config["webhook_url"], json=data, timeout=10)
+            response = http_client.post(self.config["webhook_url"], data=body,
+                                        headers={"Content-Type": "application/json"}, timeout=10)
 
             if response.status_code == 204:
                 print("[DISCORD WEBHOOK] Alert sent successfully")
@@ -117,8 +52,8 @@ class DiscordAlert:
             print(f"[DISCORD WEBHOOK ERROR] {e}")
             return False
 
-    def _send_via_bot(self, embed):
-        """Send alert via Discord bot API"""
+    def _send_via_bot(self, body):
+        """Send alert via Discord bot API (body: JSON bytes)"""
         try:
             url = f"https://discord.com/api/v10/channels/{self.config['channel_id']}/messages"
             headers = {
@@ -126,11 +61,7 @@ class DiscordAlert:
                 "Content-Type": "application/json"
             }
 
-            data = {
-                "embeds": [embed]
-            }
-
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            response = http_client.post(url, headers=headers, data=body, timeout=10)
 
             if response.status_code == 200:
                 print("[DISCORD BOT] Alert sent successfully")
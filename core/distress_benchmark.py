@@ -0,0 +1,810 @@
+#!/usr/bin/env python3
+"""
+Distress Detector Benchmark
+Measures per-frame cost of DistressDetector and records its decisions
+so detector changes can be compared before and after
+Includes synthetic scene fixtures (static, running, shove, blood-like
+splatter, red clothing, lighting flicker) and a stored baseline
+"""
+
+import json
+import os
+import time
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from core.distress_detection import (
+    DistressDetector, FrameContext, build_red_lut, quantize_bgr,
+    red_mask_from_lut, red_rule_mask
+)
+
+
+FLOW_RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+
+SCENE_RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+SCENE_FRAMES = 30
+SCENE_MIN_RATE = 0.5  # an expected indicator/distress must fire on at least this share of frames
+DEFAULT_BASELINE_PATH = os.path.join("data", "benchmarks", "distress_baseline.json")
+
+# Stages timed per frame; each runs on its own detector so state stays consistent
+STAGES = ['detect_rapid_movement', 'detect_red_color', 'detect_pushing_motion', 'analyze_frame']
+
+# (flow_mode, flow_scale) combinations compared by benchmark_flow_modes;
+# 'sparse' switches to Lucas-Kanade tracking with dense fallback
+FLOW_MODES = [
+    ('full', 1.0),
+    ('scaled', 0.5),
+    ('scaled', 0.25),
+    ('scaled', 'auto'),
+    ('roi', 1.0),
+    ('roi', 'auto'),
+    ('sparse', 'auto')
+]
+
+
+def _percentile(values, pct):
+    """Percentile of a list (0 for empty input)"""
+    if not values:
+        return 0.0
+    return float(np.percentile(values, pct))
+
+
+def _timing_summary(wall_ms, cpu_ms):
+    """Summarize per-frame wall and CPU timings"""
+    return {
+        'frames': len(wall_ms),
+        'mean_ms': float(np.mean(wall_ms)) if wall_ms else 0.0,
+        'p50_ms': _percentile(wall_ms, 50),
+        'p95_ms': _percentile(wall_ms, 95),
+        'cpu_mean_ms': float(np.mean(cpu_ms)) if cpu_ms else 0.0,
+        'fps': 1000.0 / float(np.mean(wall_ms)) if wall_ms and np.mean(wall_ms) > 0 else 0.0
+    }
+
+
+def summarize_result(result):
+    """Reduce an analyze_frame result to the fields used for decision comparison"""
+    motion = result['motion']
+    red = result['red_color']
+    pushing = result['pushing']
+    return {
+        'motion_type': motion.get('type', 'NONE'),
+        'motion_detected': bool(motion.get('motion_detected')),
+        'motion_intensity': float(motion.get('intensity', 0)),
+        'red_detected': bool(red.get('red_detected')),
+        'red_regions': int(red.get('region_count', 0)),
+        'pushing_detected': bool(pushing.get('pushing_detected')),
+        'push_magnitude': float(pushing.get('magnitude', 0)),
+        'push_direction': pushing.get('direction', 'UNKNOWN'),
+        'distress_score': float(result['distress_score']),
+        'distress_detected': bool(result['distress_detected'])
+    }
+
+
+def benchmark_frames(frames, detector=None):
+    """
+    Time analyze_frame over a sequence of frames
+
+    Args:
+        frames: Iterable of BGR frames (in time order)
+        detector: DistressDetector to use (a fresh one by default)
+
+    Returns:
+        dict with timing summary and per-frame decision summaries
+    """
+    if not CV2_AVAILABLE:
+        return {'error': 'OpenCV not available'}
+
+    detector = detector or DistressDetector()
+    wall_ms = []
+    cpu_ms = []
+    outputs = []
+
+    for frame in frames:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = detector.analyze_frame(frame)
+        cpu_ms.append((time.process_time() - cpu_start) * 1000)
+        wall_ms.append((time.perf_counter() - wall_start) * 1000)
+        outputs.append(summarize_result(result))
+
+    return {
+        'timing': _timing_summary(wall_ms, cpu_ms),
+        'outputs': outputs
+    }
+
+
+def benchmark_shared_context(resolutions=None, scene='running', num_frames=30, repeats=3):
+    """
+    Compare analyze_frame (one FrameContext shared by all detectors) with
+    running each detector on the raw frame, which converts it separately
+
+    Returns:
+        list of dicts with the median per-frame cost of both paths
+    """
+    if not CV2_AVAILABLE:
+        return [{'error': 'OpenCV not available'}]
+
+    def separate(detector, frame):
+        detector.detect_rapid_movement(frame)
+        detector.detect_red_color(frame)
+        detector.detect_pushing_motion(frame)
+
+    def shared(detector, frame):
+        detector.analyze_frame(frame)
+
+    report = []
+    for width, height in resolutions or FLOW_RESOLUTIONS:
+        frames = synthesize_scene(scene, width, height, num_frames)
+        row = {'resolution': f"{width}x{height}"}
+        for name, run in (('separate_ms', separate), ('shared_ms', shared)):
+            medians = []
+            for _ in range(repeats):
+                detector = DistressDetector()
+                frame_ms = []
+                for frame in frames:
+                    start = time.perf_counter()
+                    run(detector, frame)
+                    frame_ms.append((time.perf_counter() - start) * 1000)
+                # First frame only initializes the temporal detectors
+                medians.append(_percentile(frame_ms[1:], 50))
+            row[name] = min(medians)
+        gray_ms = []
+        for frame in frames:
+            start = time.perf_counter()
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            gray_ms.append((time.perf_counter() - start) * 1000)
+        row['gray_ms'] = _percentile(gray_ms, 50)
+        row['saved_ms'] = row['separate_ms'] - row['shared_ms']
+        report.append(row)
+
+    return report
+
+
+def _shove_sequence(width, height, num_frames=20, step=(6, 2), seed=7):
+    """
+    Textured background with a darker textured block pushed across it
+    Used to compare flow modes on identical input
+
+    The fine texture gives optical flow something to track; the block is
+    darker than the background so its edges survive the motion detector's
+    blur and frame differencing produces motion boxes for 'roi' mode.
+    """
+    rng = np.random.RandomState(seed)
+    background = cv2.GaussianBlur(rng.randint(100, 256, (height, width, 3)).astype(np.uint8), (5, 5), 0)
+    block_h, block_w = height // 3, width // 4
+    block = cv2.GaussianBlur(rng.randint(0, 110, (block_h, block_w, 3)).astype(np.uint8), (3, 3), 0)
+
+    frames = []
+    x, y = width // 8, height // 3
+    for i in range(num_frames):
+        frame = background.copy()
+        frame[y:y + block_h, x:x + block_w] = block
+        frames.append(frame)
+        x = min(width - block_w, x + step[0] * width // 640)
+        y = min(height - block_h, y + step[1] * height // 480)
+    return frames
+
+
+def benchmark_flow_modes(resolutions=None, modes=None, num_frames=20):
+    """
+    Compare optical-flow modes of detect_pushing_motion
+    Accuracy is agreement with full-resolution flow on the same frames:
+    pushing decision (and its direction when pushing), and relative error
+    of the motion speed
+    (magnitude-weighted mean, which unlike the frame mean does not depend
+    on how much of the frame a mode samples)
+
+    Returns:
+        list of dicts, one per (resolution, mode)
+    """
+    if not CV2_AVAILABLE:
+        return [{'error': 'OpenCV not available'}]
+
+    report = []
+    for width, height in resolutions or FLOW_RESOLUTIONS:
+        frames = _shove_sequence(width, height, num_frames)
+        reference = None
+
+        for mode, scale in modes or FLOW_MODES:
+            detector = DistressDetector()
+            if mode == 'sparse':
+                detector.flow_method = 'sparse'
+            else:
+                detector.flow_mode = mode
+            detector.flow_scale = scale
+
+            flow_ms = []
+            outputs = []
+            for frame in frames:
+                ctx = FrameContext(frame)
+                # ROI mode needs the motion detector's contours for this frame
+                detector.detect_rapid_movement(ctx)
+                start = time.perf_counter()
+                result = detector.detect_pushing_motion(ctx)
+                flow_ms.append((time.perf_counter() - start) * 1000)
+                outputs.append(result)
+
+            # First frame only initializes the detector
+            flow_ms = flow_ms[1:]
+            outputs = outputs[1:]
+            if reference is None:
+                reference = outputs
+
+            # Direction only means something when pushing is detected
+            agree = sum(1 for out, ref in zip(outputs, reference)
+                        if out.get('pushing_detected') == ref.get('pushing_detected')
+                        and (not ref.get('pushing_detected') or out.get('direction') == ref.get('direction')))
+            magnitude_error = [abs(out.get('motion_speed', 0) - ref.get('motion_speed', 0)) /
+                               max(ref.get('motion_speed', 0), 1e-6)
+                               for out, ref in zip(outputs, reference)]
+
+            report.append({
+                'resolution': f"{width}x{height}",
+                'mode': mode,
+                'scale': scale,
+                'final_scale': outputs[-1].get('flow_scale') if outputs else None,
+                'mean_ms': float(np.mean(flow_ms)) if flow_ms else 0.0,
+                'fps': 1000.0 / float(np.mean(flow_ms)) if flow_ms else 0.0,
+                'decision_agreement': agree / float(len(outputs)) if outputs else 0.0,
+                # Sparse mode: frames that fell back to dense flow
+                'dense_fraction': (sum(1 for out in outputs if out.get('flow_mode') != 'sparse') /
+                                   float(len(outputs)) if mode == 'sparse' and outputs else None),
+                'magnitude_error': float(np.mean(magnitude_error)) if magnitude_error else 0.0
+            })
+
+    return report
+
+
+def benchmark_red_mask(resolutions=None, bits=5, repeats=20, seed=3):
+    """
+    Compare the LUT blood-candidate mask with the HSV+LAB conversion path
+    Correctness is checked against the rules applied to the quantized frame,
+    which the LUT must reproduce exactly
+
+    Returns:
+        list of dicts with per-frame cost of both paths and mismatch count
+    """
+    if not CV2_AVAILABLE:
+        return [{'error': 'OpenCV not available'}]
+
+    rng = np.random.RandomState(seed)
+    build_start = time.perf_counter()
+    build_red_lut(bits)
+    build_ms = (time.perf_counter() - build_start) * 1000
+
+    report = []
+    for width, height in resolutions or FLOW_RESOLUTIONS:
+        frame = rng.randint(0, 256, (height, width, 3)).astype(np.uint8)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            red_rule_mask(cv2.cvtColor(frame, cv2.COLOR_BGR2HSV), cv2.cvtColor(frame, cv2.COLOR_BGR2LAB))
+        convert_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            lut_mask = red_mask_from_lut(frame, bits)
+        lut_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        quantized = quantize_bgr(frame, bits)
+        expected = red_rule_mask(cv2.cvtColor(quantized, cv2.COLOR_BGR2HSV),
+                                 cv2.cvtColor(quantized, cv2.COLOR_BGR2LAB))
+
+        report.append({
+            'resolution': f"{width}x{height}",
+            'bits': bits,
+            'lut_build_ms': build_ms,
+            'convert_ms': convert_ms,
+            'lut_ms': lut_ms,
+            'speedup': convert_ms / lut_ms if lut_ms else 0.0,
+            'mismatched_pixels': int(np.count_nonzero(lut_mask != expected))
+        })
+
+    return report
+
+
+def _textured_background(width, height, rng):
+    """Smooth random texture, so flow and differencing have something to track"""
+    noise = rng.randint(60, 200, (height // 8 + 1, width // 8 + 1, 3)).astype(np.uint8)
+    background = cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.GaussianBlur(background, (7, 7), 0)
+
+
+def _with_sensor_noise(frame, rng, amplitude=3):
+    """Add small per-pixel noise like a real camera"""
+    noise = rng.randint(-amplitude, amplitude + 1, frame.shape).astype(np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def _scene_static(width, height, num_frames, rng):
+    background = _textured_background(width, height, rng)
+    return [_with_sensor_noise(background, rng) for _ in range(num_frames)]
+
+
+def _scene_running(width, height, num_frames, rng):
+    """Person-sized dark blob crossing the frame quickly"""
+    background = _textured_background(width, height, rng)
+    axes = (max(4, width // 14), max(8, height // 4))
+    step = max(2, width // 18)
+    frames = []
+    for i in range(num_frames):
+        frame = background.copy()
+        x = (width // 10 + i * step) % width
+        cv2.ellipse(frame, (x, height // 2), axes, 0, 0, 360, (40, 35, 30), -1)
+        frames.append(_with_sensor_noise(frame, rng))
+    return frames
+
+
+def _scene_shove(width, height, num_frames, rng):
+    return _shove_sequence(width, height, num_frames, step=(14, 3), seed=rng.randint(1 << 30))
+
+
+def _scene_red_splatter(width, height, num_frames, rng):
+    """Irregular dark-red splatter appearing a third of the way in"""
+    background = _textured_background(width, height, rng)
+    splatter = background.copy()
+    cx, cy = width // 2, height // 2
+    spread = min(width, height) // 5
+    for _ in range(40):
+        x = int(cx + rng.randn() * spread)
+        y = int(cy + rng.randn() * spread * 0.6)
+        radius = max(2, int(abs(rng.randn()) * spread / 4))
+        color = (int(rng.randint(10, 40)), int(rng.randint(10, 30)), int(rng.randint(120, 190)))
+        cv2.circle(splatter, (x, y), radius, color, -1)
+
+    frames = []
+    for i in range(num_frames):
+        frame = splatter if i >= num_frames // 3 else background
+        frames.append(_with_sensor_noise(frame, rng))
+    return frames
+
+
+def _scene_red_clothing(width, height, num_frames, rng):
+    """Solid red rectangle (a shirt), present throughout"""
+    background = _textured_background(width, height, rng)
+    cv2.rectangle(background, (width // 3, height // 4), (2 * width // 3, 3 * height // 4), (30, 30, 200), -1)
+    return [_with_sensor_noise(background, rng) for _ in range(num_frames)]
+
+
+def _scene_flicker(width, height, num_frames, rng):
+    """Static scene under flickering light (global brightness swing)"""
+    background = _textured_background(width, height, rng).astype(np.float32)
+    frames = []
+    for i in range(num_frames):
+        gain = 1.0 + 0.15 * np.sin(i * 2.1)
+        frames.append(_with_sensor_noise(np.clip(background * gain, 0, 255).astype(np.uint8), rng))
+    return frames
+
+
+# name -> (generator, indicator the scene should trigger, indicator it must
+# not trigger, whether distress is expected - None for no expectation)
+# Blood alone scores at most 35, below the distress threshold, so the
+# splatter scene expects the blood indicator rather than a distress flag
+SCENES = {
+    'static': (_scene_static, None, 'motion_detected', False),
+    'running': (_scene_running, 'motion_detected', None, True),
+    'shove': (_scene_shove, 'pushing_detected', None, True),
+    'red_splatter': (_scene_red_splatter, 'red_detected', None, None),
+    'red_clothing': (_scene_red_clothing, None, 'red_detected', False),
+    'flicker': (_scene_flicker, None, 'motion_detected', False)
+}
+
+
+def synthesize_scene(name, width, height, num_frames=SCENE_FRAMES, seed=11):
+    """
+    Deterministic synthetic frame sequence for a named scene
+
+    Returns:
+        list of BGR frames
+    """
+    generator = SCENES[name][0]
+    return generator(width, height, num_frames, np.random.RandomState(seed))
+
+
+def write_scene_videos(out_dir, resolutions=None, scenes=None, fps=15):
+    """Write every synthetic scene as an MP4 fixture (e.g. for evidence_video_scorer)"""
+    if not CV2_AVAILABLE:
+        return []
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for width, height in resolutions or SCENE_RESOLUTIONS:
+        for name in scenes or SCENES:
+            path = os.path.join(out_dir, f"{name}_{width}x{height}.mp4")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            for frame in synthesize_scene(name, width, height):
+                writer.write(frame)
+            writer.release()
+            written.append(path)
+    return written
+
+
+def _make_detector(options):
+    detector = DistressDetector()
+    for key, value in (options or {}).items():
+        setattr(detector, key, value)
+    return detector
+
+
+def _reference_ms(frame):
+    """
+    Time a fixed OpenCV workload (gray conversion + blur) on a frame
+    Run next to each stage so its timing can be compared as a ratio, which
+    stays comparable across machines and load
+    """
+    start = time.perf_counter()
+    cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (21, 21), 0)
+    return (time.perf_counter() - start) * 1000
+
+
+def _rate(outputs, key):
+    """Share of frames (after the first, which only initializes) where key fired"""
+    frames = outputs[1:]
+    if not key or not frames:
+        return 0.0
+    return sum(1 for o in frames if o[key]) / float(len(frames))
+
+
+def scene_failures(case):
+    """
+    Expectations a benchmark_scenes case did not meet
+
+    Returns:
+        list of messages, empty if the scene behaved as expected
+    """
+    failures = []
+    if case['indicator'] and case['indicator_rate'] < SCENE_MIN_RATE:
+        failures.append(f"{case['indicator']} on {case['indicator_rate']:.0%} of frames, "
+                        f"expected at least {SCENE_MIN_RATE:.0%}")
+    if case['false_indicator'] and case['false_indicator_rate'] > 0:
+        failures.append(f"{case['false_indicator']} on {case['false_indicator_rate']:.0%} of frames, "
+                        f"expected none")
+    if case['distress_expected'] and case['distress_rate'] < SCENE_MIN_RATE:
+        failures.append(f"distress on {case['distress_rate']:.0%} of frames, "
+                        f"expected at least {SCENE_MIN_RATE:.0%}")
+    if case['distress_expected'] is False and case['distress_rate'] > 0:
+        failures.append(f"distress on {case['distress_rate']:.0%} of frames, expected none")
+    return failures
+
+
+def benchmark_scenes(resolutions=None, scenes=None, num_frames=SCENE_FRAMES, detector_options=None):
+    """
+    Time every detector stage on every synthetic scene and record decisions
+
+    Args:
+        resolutions: List of (width, height)
+        scenes: Scene names (all of SCENES by default)
+        detector_options: Attributes set on each DistressDetector, e.g.
+            {'motion_method': 'background'}
+
+    Returns:
+        dict keyed by "scene@WxH" with per-stage timing (including the
+        median reference workload time measured alongside), per-frame decisions, the fraction of frames flagged as
+        distress, the fractions that triggered the scene's expected and
+        forbidden indicators, and the failed expectations
+    """
+    if not CV2_AVAILABLE:
+        return {'error': 'OpenCV not available'}
+
+    report = {}
+    for width, height in resolutions or SCENE_RESOLUTIONS:
+        for name in scenes or SCENES:
+            frames = synthesize_scene(name, width, height, num_frames)
+            timings = {}
+            outputs = []
+
+            for stage in STAGES:
+                detector = _make_detector(detector_options)
+                method = getattr(detector, stage)
+                wall_ms = []
+                cpu_ms = []
+                reference_ms = []
+                for frame in frames:
+                    reference_ms.append(_reference_ms(frame))
+                    wall_start = time.perf_counter()
+                    cpu_start = time.process_time()
+                    result = method(frame)
+                    cpu_ms.append((time.process_time() - cpu_start) * 1000)
+                    wall_ms.append((time.perf_counter() - wall_start) * 1000)
+                    if stage == 'analyze_frame':
+                        outputs.append(summarize_result(result))
+                timings[stage] = _timing_summary(wall_ms, cpu_ms)
+                timings[stage]['reference_ms'] = _percentile(reference_ms, 50)
+
+            flagged = sum(1 for o in outputs if o['distress_detected'])
+            _, indicator, false_indicator, distress_expected = SCENES[name]
+            case = {
+                'scene': name,
+                'resolution': f"{width}x{height}",
+                'indicator': indicator,
+                'indicator_rate': _rate(outputs, indicator),
+                'false_indicator': false_indicator,
+                'false_indicator_rate': _rate(outputs, false_indicator),
+                'distress_expected': distress_expected,
+                'distress_rate': flagged / float(len(outputs)) if outputs else 0.0,
+                'timing': timings,
+                'outputs': outputs
+            }
+            case['failures'] = scene_failures(case)
+            report[f"{name}@{width}x{height}"] = case
+
+    return report
+
+
+def save_baseline(report, path=DEFAULT_BASELINE_PATH):
+    """Store a benchmark_scenes report as the reference for later runs"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+    return path
+
+
+def load_baseline(path=DEFAULT_BASELINE_PATH):
+    """Load a stored baseline (None if there is none yet)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare_to_baseline(report, baseline, compare_timing=False, slowdown_tolerance=0.25, min_ms=0.5):
+    """
+    Compare a benchmark_scenes report against a stored baseline
+    Decisions are compared frame by frame. Absolute timings vary too much
+    between runs to compare, so timing is opt-in and uses each stage's
+    median time as a ratio to the reference workload timed alongside it
+
+    Args:
+        compare_timing: Also report slowdowns and speedups
+        slowdown_tolerance: Relative change of a stage's ratio allowed
+        min_ms: Ignore stages faster than this in the baseline (timer noise)
+
+    Returns:
+        dict with lists of decision changes, slowdowns and speedups
+    """
+    comparison = {'slowdowns': [], 'speedups': [], 'decision_changes': [], 'missing': []}
+    decision_keys = ('motion_type', 'red_detected', 'pushing_detected', 'distress_detected')
+
+    for key, current in report.items():
+        reference = baseline.get(key)
+        if reference is None:
+            comparison['missing'].append(key)
+            continue
+
+        for index, (out, ref) in enumerate(zip(current['outputs'], reference['outputs'])):
+            changed = [k for k in decision_keys if out.get(k) != ref.get(k)]
+            if changed:
+                comparison['decision_changes'].append({
+                    'case': key,
+                    'frame': index,
+                    'fields': {k: (ref.get(k), out.get(k)) for k in changed}
+                })
+
+        if not compare_timing:
+            continue
+        for stage, timing in current['timing'].items():
+            before = reference['timing'].get(stage, {})
+            if before.get('p50_ms', 0) < min_ms or not before.get('reference_ms') or not timing['reference_ms']:
+                continue
+            before_ratio = before['p50_ms'] / before['reference_ms']
+            after_ratio = timing['p50_ms'] / timing['reference_ms']
+            change = (after_ratio - before_ratio) / before_ratio
+            entry = {'case': key, 'stage': stage, 'before_ratio': before_ratio,
+                     'after_ratio': after_ratio, 'change': change}
+            if change > slowdown_tolerance:
+                comparison['slowdowns'].append(entry)
+            elif change < -slowdown_tolerance:
+                comparison['speedups'].append(entry)
+
+    return comparison
+
+
+def benchmark_pipeline(scene='running', width=640, height=480, num_frames=150, fps=30, pipeline=None):
+    """
+    Feed a synthetic scene through FramePipeline at a fixed frame rate
+    Accuracy is agreement with one DistressDetector analyzing every frame
+    in order, which is what the workers' carried-over state should match
+
+    Args:
+        pipeline: FramePipeline to use (a default one if None); it is stopped
+
+    Returns:
+        dict with pipeline stats and decision/intensity agreement
+    """
+    if not CV2_AVAILABLE:
+        return {'error': 'OpenCV not available'}
+
+    from core.frame_pipeline import FramePipeline
+
+    frames = synthesize_scene(scene, width, height, num_frames)
+    sequential = DistressDetector()
+    expected = [summarize_result(sequential.analyze_frame(frame)) for frame in frames]
+
+    pipeline = pipeline or FramePipeline()
+    pipeline.start(frames[0].shape)
+    indices = {}
+    results = []
+    start = time.time()
+    for index, frame in enumerate(frames):
+        # Pace submissions like a camera
+        time.sleep(max(0.0, start + index / float(fps) - time.time()))
+        timestamp = time.time()
+        if pipeline.submit(frame, timestamp):
+            indices[timestamp] = index
+        results.extend(pipeline.results())
+
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        results.extend(pipeline.results())
+        stats = pipeline.get_stats()
+        if stats['analyzed'] + stats['dropped_stale'] >= stats['submitted']:
+            break
+        time.sleep(0.05)
+    results.extend(pipeline.results())
+    stats = pipeline.get_stats()
+    pipeline.stop()
+
+    decision_keys = ('motion_type', 'red_detected', 'pushing_detected', 'distress_detected')
+    agree = 0
+    same_intensity = 0
+    for result in results:
+        ref = expected[indices[result['frame_timestamp']]]
+        out = summarize_result(result)
+        agree += all(out[k] == ref[k] for k in decision_keys)
+        same_intensity += abs(out['motion_intensity'] - ref['motion_intensity']) < 1e-6
+
+    analyzed = len(results)
+    return {
+        'scene': scene,
+        'resolution': f"{width}x{height}",
+        'fps': fps,
+        'workers': stats['workers'],
+        'analyzed': analyzed,
+        'dropped': stats['dropped_busy'] + stats['dropped_stale'],
+        'primed': stats['primed'],
+        'analyzed_fps': stats['analyzed_fps'],
+        'latency_p95_ms': stats['latency_p95_ms'],
+        'decision_agreement': agree / float(analyzed) if analyzed else 0.0,
+        'intensity_agreement': same_intensity / float(analyzed) if analyzed else 0.0
+    }
+
+
+def benchmark_video(video_path, max_frames=300, every=1):
+    """Benchmark analyze_frame on frames read from a video file"""
+    if not CV2_AVAILABLE:
+        return {'error': 'OpenCV not available'}
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    index = 0
+
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % every == 0:
+            frames.append(frame)
+        index += 1
+
+    cap.release()
+
+    if not frames:
+        return {'error': f'No frames read from {video_path}'}
+
+    report = benchmark_frames(frames)
+    report['source'] = video_path
+    report['resolution'] = f"{frames[0].shape[1]}x{frames[0].shape[0]}"
+    return report
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m core.distress_benchmark <video_file> | --flow | --red | --context | --pipeline | "
+              "--scenes [--motion background|mog2] [--save-baseline | --timing]")
+        sys.exit(1)
+
+    if sys.argv[1] == "--flow":
+        for row in benchmark_flow_modes():
+            if row.get('error'):
+                print(f"❌ {row['error']}")
+                break
+            print(f"{row['resolution']:>10} {row['mode']:>6} scale={str(row['scale']):>5} "
+                  f"-> {row['mean_ms']:6.1f} ms ({row['fps']:5.1f} FPS), "
+                  f"agreement {row['decision_agreement']:.0%}, "
+                  f"magnitude error {row['magnitude_error']:.1%}" +
+                  (f", dense fallback {row['dense_fraction']:.0%}" if row['dense_fraction'] is not None else ""))
+        sys.exit(0)
+
+    if sys.argv[1] == "--context":
+        for row in benchmark_shared_context():
+            if row.get('error'):
+                print(f"❌ {row['error']}")
+                break
+            print(f"{row['resolution']:>10} separate {row['separate_ms']:6.1f} ms, shared {row['shared_ms']:6.1f} ms "
+                  f"(saved {row['saved_ms']:.2f} ms; one gray conversion {row['gray_ms']:.2f} ms)")
+        sys.exit(0)
+
+    if sys.argv[1] == "--pipeline":
+        for width, height in [(640, 480), (1280, 720)]:
+            row = benchmark_pipeline(width=width, height=height)
+            if row.get('error'):
+                print(f"❌ {row['error']}")
+                break
+            print(f"{row['resolution']:>10} {row['workers']} workers @ {row['fps']} FPS: "
+                  f"{row['analyzed']} analyzed ({row['analyzed_fps']:.1f} FPS), {row['dropped']} dropped, "
+                  f"{row['primed']} primed, p95 {row['latency_p95_ms']:.0f} ms, "
+                  f"decisions {row['decision_agreement']:.0%}, intensity {row['intensity_agreement']:.0%}")
+        sys.exit(0)
+
+    if sys.argv[1] == "--red":
+        for row in benchmark_red_mask():
+            if row.get('error'):
+                print(f"❌ {row['error']}")
+                break
+            print(f"{row['resolution']:>10} convert {row['convert_ms']:6.2f} ms, "
+                  f"LUT {row['lut_ms']:6.2f} ms ({row['speedup']:.1f}x), "
+                  f"mismatches {row['mismatched_pixels']}")
+        sys.exit(0)
+
+    if sys.argv[1] == "--scenes":
+        options = {}
+        if "--motion" in sys.argv:
+            options['motion_method'] = sys.argv[sys.argv.index("--motion") + 1]
+        report = benchmark_scenes(detector_options=options)
+        if report.get('error'):
+            print(f"❌ {report['error']}")
+            sys.exit(1)
+
+        for key, case in report.items():
+            stages = ", ".join(f"{stage.replace('detect_', '')} {t['mean_ms']:.1f}"
+                               for stage, t in case['timing'].items())
+            expected = {True: "expect distress", False: "expect calm", None: "no expectation"}[case['distress_expected']]
+            indicator = ""
+            if case['indicator']:
+                indicator = f", {case['indicator'].replace('_detected', '')} {case['indicator_rate']:.0%}"
+            if case['false_indicator']:
+                indicator += f", no {case['false_indicator'].replace('_detected', '')} " \
+                             f"{case['false_indicator_rate']:.0%}"
+            status = "✅" if not case['failures'] else "❌"
+            print(f"{status} {key:>22}: {stages} ms | flagged {case['distress_rate']:.0%} ({expected}){indicator}")
+            for failure in case['failures']:
+                print(f"      {failure}")
+
+        if "--save-baseline" in sys.argv:
+            print(f"💾 Baseline saved to {save_baseline(report)}")
+        else:
+            baseline = load_baseline()
+            if baseline is None:
+                print("ℹ️ No baseline yet, run with --save-baseline to create one")
+            else:
+                comparison = compare_to_baseline(report, baseline, compare_timing="--timing" in sys.argv)
+                for entry in comparison['slowdowns']:
+                    print(f"🐢 {entry['case']} {entry['stage']}: {entry['before_ratio']:.1f}x -> "
+                          f"{entry['after_ratio']:.1f}x reference ({entry['change']:+.0%})")
+                for entry in comparison['speedups']:
+                    print(f"⚡ {entry['case']} {entry['stage']}: {entry['before_ratio']:.1f}x -> "
+                          f"{entry['after_ratio']:.1f}x reference ({entry['change']:+.0%})")
+                for entry in comparison['decision_changes']:
+                    print(f"⚠️ {entry['case']} frame {entry['frame']}: {entry['fields']}")
+                if not comparison['slowdowns'] and not comparison['decision_changes']:
+                    print("✅ No slowdowns or decision changes against baseline")
+        sys.exit(0)
+
+    report = benchmark_video(sys.argv[1])
+    if report.get('error'):
+        print(f"❌ {report['error']}")
+    else:
+        timing = report['timing']
+        detections = sum(1 for o in report['outputs'] if o['distress_detected'])
+        print(f"📹 {report['source']} ({report['resolution']}): {timing['frames']} frames")
+        print(f"   mean {timing['mean_ms']:.1f} ms, p95 {timing['p95_ms']:.1f} ms, "
+              f"CPU {timing['cpu_mean_ms']:.1f} ms/frame, {timing['fps']:.1f} FPS")
+        print(f"   distress frames: {detections}")
@@ -18,6 +18,138 @@ except ImportError:
     print("⚠️ OpenCV not available for distress detection")
 
 
+def red_rule_mask(hsv, lab):
+    """
+    Blood-candidate mask from the HSV/LAB color rules
+    
+    Args:
+        hsv: Frame converted to HSV (OpenCV 8-bit ranges)
+        lab: Same frame converted to L*a*b*
+    
+    Returns:
+        uint8 mask, 255 where a pixel matches
+    """
+    # Enhanced red color ranges for blood detection
+    # Dark red (dried blood)
+    lower_red1 = np.array([0, 80, 80])
+    upper_red1 = np.array([10, 255, 255])
+    # Bright red (fresh blood)
+    lower_red2 = np.array([160, 80, 80])
+    upper_red2 = np.array([180, 255, 255])
+    
+    # Create masks
+    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
+    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
+    red_mask = cv2.bitwise_or(mask1, mask2)
+    
+    # Additional filtering using LAB color space
+    # Blood has specific L*a*b* values
+    l_channel, a_channel, b_channel = cv2.split(lab)
+    # High 'a' channel indicates red
+    a_mask = cv2.inRange(a_channel, 140, 255)
+    
+    # Combine masks
+    return cv2.bitwise_and(red_mask, a_mask)
+
+
+def quantize_bgr(frame, bits=5):
+    """Snap each channel to the center of its 2**bits bin (what the LUT sees)"""
+    shift = 8 - bits
+    half = (1 << shift) >> 1
+    return ((frame >> shift) << shift) + np.uint8(half)
+
+
+# Built lazily, keyed by bits per channel
+_RED_LUTS = {}
+
+
+def build_red_lut(bits=5):
+    """
+    Precompute the blood-candidate rules for every quantized BGR color
+    
+    Returns:
+        flat uint8 array of 2**(3*bits) entries indexed by (b, g, r) bins
+    """
+    if bits not in _RED_LUTS:
+        levels = 1 << bits
+        shift = 8 - bits
+        centers = (np.arange(levels, dtype=np.uint16) << shift) + ((1 << shift) >> 1)
+        b, g, r = np.meshgrid(centers, centers, centers, indexing='ij')
+        # All colors as a single-row image so the same cv2 rules apply
+        colors = np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(1, -1, 3)
+        hsv = cv2.cvtColor(colors, cv2.COLOR_BGR2HSV)
+        lab = cv2.cvtColor(colors, cv2.COLOR_BGR2LAB)
+        _RED_LUTS[bits] = red_rule_mask(hsv, lab).reshape(-1)
+    return _RED_LUTS[bits]
+
+
+def red_mask_from_lut(frame, bits=5):
+    """Blood-candidate mask via a single vectorized LUT gather"""
+    lut = build_red_lut(bits)
+    shift = 8 - bits
+    q = (frame >> shift).astype(np.uint16 if bits <= 5 else np.uint32)
+    index = (q[..., 0] << (2 * bits)) | (q[..., 1] << bits) | q[..., 2]
+    return lut[index]
+
+
+class FrameContext:
+    """
+    Per-frame analysis context
+    Color-space conversions are computed lazily on first use and shared
+    by every detector that looks at the same frame
+    """
+    
+    def __init__(self, frame):
+        self.frame = frame
+        self._gray = None
+        self._blurred_gray = None
+        self._hsv = None
+        self._lab = None
+        # Bounding boxes of moving regions, filled in by the motion detector
+        self.motion_boxes = None
+    
+    @property
+    def shape(self):
+        return self.frame.shape
+    
+    @property
+    def gray(self):
+        """Grayscale frame"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        return self._gray
+    
+    @property
+    def blur_size(self):
+        """Adaptive Gaussian kernel size based on frame height (always odd)"""
+        blur_size = max(15, min(25, self.frame.shape[0] // 30))
+        if blur_size % 2 == 0:
+            blur_size += 1
+        return blur_size
+    
+    @property
+    def blurred_gray(self):
+        """Gaussian-blurred grayscale frame for frame differencing"""
+        if self._blurred_gray is None:
+            size = self.blur_size
+            self._blurred_gray = cv2.GaussianBlur(self.gray, (size, size), 0)
+        return self._blurred_gray
+    
+    @property
+    def hsv(self):
+        """HSV frame"""
+        if self._hsv is None:
+            self._hsv = cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV)
+        return self._hsv
+    
+    @property
+    def lab(self):
+        """L*a*b* frame"""
+        if self._lab is None:
+            self._lab = cv2.cvtColor(self.frame, cv2.COLOR_BGR2LAB)
+        return self._lab
+
+
 class DistressDetector:
     """
     Detects physical distress indicators:
@@ -31,24 +163,84 @@ class DistressDetector:
         # Enhanced thresholds for better accuracy
         self.motion_threshold = 3000  # Lower threshold for earlier detection
         self.red_threshold = 0.08  # More sensitive to blood detection
-        self.prev_frame = None
-        self.motion_history = []
+        
+        # Each temporal detector keeps its own reference frame:
+        # motion differencing compares blurred gray, optical flow raw gray
+        self.prev_motion_frame = None
+        self.prev_flow_frame = None
         self.max_history = 15  # Longer history for better pattern analysis
+        self.motion_history = []  # fixed NumPy ring, see _push_motion_history
+        
+        # Motion method: 'difference' (pairwise frames), 'background'
+        # (running-average model) or 'mog2' (OpenCV MOG2 subtractor)
+        self.motion_method = 'difference'
+        self.motion_width = 160  # background model width in pixels
+        self.motion_contour_fraction = 0.01  # trace contours above this foreground
+        self.bg_learning_rate = 0.05
+        self.bg_threshold = 25
+        self.bg_history = 200
+        self.bg_absorb_frames = 5  # unchanged foreground this long is a static object
+        self.bg_stable_threshold = 6  # frame-to-frame change still counted as unchanged
+        self._bg_model = None
+        self._bg_subtractor = None
+        self._bg_prev_small = None
+        self._bg_stable = None  # frames each foreground pixel has been unchanged
         
         # Advanced detection parameters
         self.motion_variance_threshold = 2.5  # Detect sudden motion changes
         self.red_cluster_min_size = 300  # Minimum red region size
+        self.red_mask_method = 'lut'  # 'lut' (quantized lookup) or 'convert' (HSV+LAB)
+        self.red_lut_bits = 5  # bits per channel for the lookup table
         self.optical_flow_threshold = 2.8  # Pushing detection sensitivity
         
+        # Optical flow resolution: 'full', 'scaled' or 'roi' (motion contours)
+        self.flow_mode = 'scaled'
+        self.flow_scale = 'auto'  # or a fixed factor such as 0.5
+        self.flow_scales = (1.0, 0.5, 0.25)  # pyramid levels tried by 'auto'
+        self.flow_time_budget_ms = 20.0
+        self.flow_min_size = 120  # never run flow on fewer pixels than this per side
+        self.flow_roi_padding = 16
+        self._flow_level = 1
+        self._flow_time_ema = None
+        
+        # Flow method: 'dense' (Farneback) or 'sparse' (pyramidal Lucas-Kanade
+        # on tracked features, falling back to dense when tracking degrades)
+        self.flow_method = 'dense'
+        self.lk_max_features = 300
+        self.lk_reseed_interval = 15  # frames between feature re-detection
+        self.lk_min_features = 40
+        self.lk_min_tracked_ratio = 0.6  # tracking quality below this -> dense
+        self.lk_max_error = 20.0  # LK matching error above this counts as lost
+        self.lk_large_contour_fraction = 0.15  # motion box this big -> dense
+        # Sparse decision thresholds (tracked vectors are biased towards
+        # texture, see _summarize_sparse_flow)
+        self.lk_motion_px = 1.0  # a tracked feature moving more than this is moving
+        self.lk_min_moving = 10  # moving features needed for pushing
+        self.lk_max_moving_fraction = 0.5  # more than this moves: global motion
+        self._lk_points = None
+        self._lk_frames_since_seed = 0
+        self._lk_fallback_reason = None
+        
         # Calibration for different lighting conditions
         self.adaptive_threshold = True
         self.frame_count = 0
+    
+    @staticmethod
+    def _context(frame):
+        """Wrap a raw frame in a FrameContext (no-op if already wrapped)"""
+        if isinstance(frame, FrameContext):
+            return frame
+        return FrameContext(frame)
         
     def detect_rapid_movement(self, frame):
         """
         ENHANCED: Detect rapid movement with improved accuracy
         Uses adaptive thresholding and motion pattern analysis
         
+        motion_method='difference' compares against the previous frame;
+        'background' and 'mog2' keep an incremental scene model instead
+        (see _background_motion).
+        
         Returns:
             dict with motion_detected, intensity, type, and confidence
         """
@@ -57,60 +249,25 @@ class DistressDetector:
         
         try:
             self.frame_count += 1
+            ctx = self._context(frame)
             
-            # Convert to grayscale with enhanced preprocessing
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Adaptive Gaussian blur based on frame size
-            blur_size = max(15, min(25, frame.shape[0] // 30))
-            if blur_size % 2 == 0:
-                blur_size += 1
-            gray = cv2.GaussianBlur(gray, (blur_size, blur_size), 0)
+            if self.motion_method in ('background', 'mog2'):
+                measured = self._background_motion(ctx)
+            else:
+                measured = self._difference_motion(ctx)
             
             # First frame initialization
-            if self.prev_frame is None:
-                self.prev_frame = gray
+            if measured is None:
                 return {'motion_detected': False, 'reason': 'Initializing', 'confidence': 0}
-            
-            # Compute difference with enhanced sensitivity
-            frame_delta = cv2.absdiff(self.prev_frame, gray)
-            
-            # Adaptive thresholding based on lighting
-            if self.adaptive_threshold:
-                threshold_value = max(20, min(35, int(np.mean(frame_delta) * 1.5)))
-            else:
-                threshold_value = 25
-            
-            thresh = cv2.threshold(frame_delta, threshold_value, 255, cv2.THRESH_BINARY)[1]
-            
-            # Enhanced morphological operations
-            kernel = np.ones((3, 3), np.uint8)
-            thresh = cv2.dilate(thresh, kernel, iterations=2)
-            thresh = cv2.erode(thresh, kernel, iterations=1)
-            
-            # Find contours with hierarchy
-            contours, hierarchy = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Calculate total motion with weighted areas
-            total_motion = 0
-            significant_contours = 0
-            max_contour_area = 0
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area > 100:  # Filter noise
-                    total_motion += area
-                    significant_contours += 1
-                    max_contour_area = max(max_contour_area, area)
+            total_motion, significant_contours, max_contour_area = measured
             
             # Update history
-            self.motion_history.append(total_motion)
-            if len(self.motion_history) > self.max_history:
-                self.motion_history.pop(0)
+            self._push_motion_history(total_motion)
+            history = self._motion_ring[:self._motion_count]
             
             # Advanced motion pattern analysis
-            avg_motion = np.mean(self.motion_history) if self.motion_history else 0
-            std_motion = np.std(self.motion_history) if len(self.motion_history) > 2 else 0
+            avg_motion = float(np.mean(history)) if self._motion_count else 0
+            std_motion = float(np.std(history)) if self._motion_count > 2 else 0
             
             # Detect motion spikes (sudden movements)
             motion_spike = total_motion > (avg_motion + std_motion * self.motion_variance_threshold)
@@ -118,9 +275,6 @@ class DistressDetector:
             # Calculate motion variance (erratic movement indicator)
             motion_variance = std_motion / (avg_motion + 1)  # Avoid division by zero
             
-            # Update previous frame
-            self.prev_frame = gray
-            
             # Enhanced motion type classification with confidence
             motion_type = "NONE"
             confidence = 0
@@ -147,12 +301,191 @@ class DistressDetector:
                 'variance': motion_variance,
                 'confidence': confidence,
                 'contour_count': significant_contours,
-                'max_area': max_contour_area
+                'max_area': max_contour_area,
+                'method': self.motion_method
             }
             
         except Exception as e:
             return {'motion_detected': False, 'error': str(e), 'confidence': 0}
     
+    def _difference_motion(self, ctx):
+        """
+        Pairwise frame differencing against the previous frame
+        
+        Returns:
+            (total_motion, significant_contours, max_contour_area) or None
+            on the first frame
+        """
+        # Grayscale with adaptive Gaussian blur based on frame size
+        gray = ctx.blurred_gray
+        
+        if self.prev_motion_frame is None:
+            self.prev_motion_frame = gray
+            return None
+        
+        # Compute difference with enhanced sensitivity
+        frame_delta = cv2.absdiff(self.prev_motion_frame, gray)
+        
+        # Adaptive thresholding based on lighting
+        if self.adaptive_threshold:
+            threshold_value = max(20, min(35, int(np.mean(frame_delta) * 1.5)))
+        else:
+            threshold_value = 25
+        
+        thresh = cv2.threshold(frame_delta, threshold_value, 255, cv2.THRESH_BINARY)[1]
+        
+        # Enhanced morphological operations
+        kernel = np.ones((3, 3), np.uint8)
+        thresh = cv2.dilate(thresh, kernel, iterations=2)
+        thresh = cv2.erode(thresh, kernel, iterations=1)
+        
+        # Find contours with hierarchy
+        contours, hierarchy = cv2.findContours(thresh.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        # Calculate total motion with weighted areas
+        total_motion = 0
+        significant_contours = 0
+        max_contour_area = 0
+        
+        motion_boxes = []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area > 100:  # Filter noise
+                total_motion += area
+                significant_contours += 1
+                max_contour_area = max(max_contour_area, area)
+                motion_boxes.append(cv2.boundingRect(contour))
+        ctx.motion_boxes = motion_boxes
+        
+        # Update previous frame
+        self.prev_motion_frame = gray
+        
+        return total_motion, significant_contours, max_contour_area
+    
+    def _motion_small_gray(self, ctx):
+        """Downscaled, lightly blurred gray frame for the background model"""
+        height, width = ctx.shape[:2]
+        scale = min(1.0, float(self.motion_width) / width)
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        small = cv2.resize(ctx.gray, size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+    
+    def _seed_background(self, small):
+        """Initialize the background model from a frame; False if already running"""
+        if self.motion_method == 'mog2':
+            if self._bg_subtractor is not None:
+                return False
+            self._bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=self.bg_history, varThreshold=self.bg_threshold, detectShadows=False)
+            self._bg_subtractor.apply(small, learningRate=1.0)
+            return True
+        
+        if self._bg_model is not None:
+            return False
+        self._bg_model = small.astype(np.float32)
+        return True
+    
+    def _background_motion(self, ctx):
+        """
+        Foreground area against an incrementally updated background model
+        The model is updated in place on a downscaled frame; foreground area
+        is one countNonZero, and contours are only traced when the
+        foreground fraction exceeds motion_contour_fraction
+        
+        Returns:
+            (total_motion, significant_contours, max_contour_area) or None
+            while the model is being seeded
+        """
+        small = self._motion_small_gray(ctx)
+        if self._seed_background(small):
+            self._bg_prev_small = small
+            self._bg_stable = None
+            ctx.motion_boxes = []
+            return None
+        
+        if self.motion_method == 'mog2':
+            mask = self._bg_subtractor.apply(small, learningRate=self.bg_learning_rate)
+        else:
+            mask = cv2.absdiff(small, cv2.convertScaleAbs(self._bg_model))
+            cv2.threshold(mask, self.bg_threshold, 255, cv2.THRESH_BINARY, dst=mask)
+            cv2.accumulateWeighted(small, self._bg_model, self.bg_learning_rate)
+        mask = self._absorb_stable_foreground(small, mask)
+        
+        # Areas are reported in full-resolution pixels so thresholds still apply
+        height, width = ctx.shape[:2]
+        fx = float(width) / mask.shape[1]
+        fy = float(height) / mask.shape[0]
+        area_factor = fx * fy
+        
+        foreground = cv2.countNonZero(mask)
+        total_motion = foreground * area_factor
+        significant_contours = 0
+        max_contour_area = 0
+        motion_boxes = []
+        
+        if foreground > self.motion_contour_fraction * mask.size:
+            contours, hierarchy = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for contour in contours:
+                area = cv2.contourArea(contour) * area_factor
+                if area > 100:  # Filter noise
+                    significant_contours += 1
+                    max_contour_area = max(max_contour_area, area)
+                    x, y, w, h = cv2.boundingRect(contour)
+                    motion_boxes.append((int(x * fx), int(y * fy), int(np.ceil(w * fx)), int(np.ceil(h * fy))))
+        ctx.motion_boxes = motion_boxes
+        
+        return total_motion, significant_contours, max_contour_area
+    
+    def _absorb_stable_foreground(self, small, mask):
+        """
+        Foreground that has not changed for bg_absorb_frames frames is an
+        object that appeared and stayed (a bag, a stain), not motion: it is
+        copied into the running-average model and removed from the mask.
+        MOG2 learns it on its own schedule, so there it is only masked.
+        
+        Returns:
+            the foreground mask without absorbed pixels
+        """
+        prev = self._bg_prev_small
+        self._bg_prev_small = small
+        if prev is None or prev.shape != small.shape:
+            self._bg_stable = None
+            return mask
+        if self._bg_stable is None or self._bg_stable.shape != small.shape:
+            self._bg_stable = np.zeros(small.shape, dtype=np.uint16)
+        
+        stable = (mask > 0) & (cv2.absdiff(small, prev) <= self.bg_stable_threshold)
+        self._bg_stable = np.where(stable, np.minimum(self._bg_stable + 1, self.bg_absorb_frames), 0).astype(np.uint16)
+        absorbed = self._bg_stable >= self.bg_absorb_frames
+        if absorbed.any():
+            if self._bg_model is not None:
+                self._bg_model[absorbed] = small[absorbed]
+            mask[absorbed] = 0
+        return mask
+    
+    @property
+    def motion_history(self):
+        """Recent motion intensities, oldest first"""
+        if self._motion_count < len(self._motion_ring):
+            return self._motion_ring[:self._motion_count].tolist()
+        return np.roll(self._motion_ring, -self._motion_pos).tolist()
+    
+    @motion_history.setter
+    def motion_history(self, values):
+        values = list(values)[-self.max_history:]
+        self._motion_ring = np.zeros(self.max_history, dtype=np.float64)
+        self._motion_ring[:len(values)] = values
+        self._motion_count = len(values)
+        self._motion_pos = len(values) % self.max_history
+    
+    def _push_motion_history(self, value):
+        """Append to the fixed-size motion ring, overwriting the oldest entry"""
+        if len(self._motion_ring) != self.max_history:
+            self.motion_history = self.motion_history
+        self._motion_ring[self._motion_pos] = value
+        self._motion_pos = (self._motion_pos + 1) % self.max_history
+        self._motion_count = min(self._motion_count + 1, self.max_history)
+    
     def detect_red_color(self, frame):
         """
         ENHANCED: Detect red color with improved accuracy
@@ -166,31 +499,14 @@ class DistressDetector:
             return {'red_detected': False, 'reason': 'OpenCV not available'}
         
         try:
-            # Convert to multiple color spaces for better detection
-            hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+            ctx = self._context(frame)
+            frame = ctx.frame
             
-            # Enhanced red color ranges for blood detection
-            # Dark red (dried blood)
-            lower_red1 = np.array([0, 80, 80])
-            upper_red1 = np.array([10, 255, 255])
-            # Bright red (fresh blood)
-            lower_red2 = np.array([160, 80, 80])
-            upper_red2 = np.array([180, 255, 255])
-            
-            # Create masks
-            mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-            mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-            red_mask = cv2.bitwise_or(mask1, mask2)
-            
-            # Additional filtering using LAB color space
-            # Blood has specific L*a*b* values
-            l_channel, a_channel, b_channel = cv2.split(lab)
-            # High 'a' channel indicates red
-            a_mask = cv2.inRange(a_channel, 140, 255)
-            
-            # Combine masks
-            combined_mask = cv2.bitwise_and(red_mask, a_mask)
+            if self.red_mask_method == 'lut':
+                # One table gather per pixel instead of HSV + LAB conversions
+                combined_mask = red_mask_from_lut(frame, self.red_lut_bits)
+            else:
+                combined_mask = red_rule_mask(ctx.hsv, ctx.lab)
             
             # Morphological operations to remove noise
             kernel = np.ones((5, 5), np.uint8)
@@ -262,6 +578,16 @@ class DistressDetector:
         ENHANCED: Detect pushing/shoving with improved accuracy
         Uses dense optical flow and directional analysis
         
+        With flow_method='sparse', a few hundred good features are tracked
+        with pyramidal Lucas-Kanade instead; dense flow is only used when
+        tracking quality drops (LK status and matching error) or the motion
+        detector sees large contours.
+        
+        Dense flow runs at a reduced resolution according to flow_mode:
+        'full' uses the whole frame, 'scaled' a downscaled pyramid level and
+        'roi' only the area around the motion detector's contours. With
+        flow_scale='auto' the scale adapts to meet flow_time_budget_ms.
+        
         Returns:
             dict with pushing_detected, direction, and confidence
         """
@@ -269,106 +595,405 @@ class DistressDetector:
             return {'pushing_detected': False, 'reason': 'OpenCV not available'}
         
         try:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            ctx = self._context(frame)
+            gray = ctx.gray
             
-            if self.prev_frame is None:
-                self.prev_frame = gray
+            if self.prev_flow_frame is None:
+                self.prev_flow_frame = gray
                 return {'pushing_detected': False, 'reason': 'Initializing', 'confidence': 0}
             
-            # Enhanced optical flow parameters for better accuracy
-            flow = cv2.calcOpticalFlowFarneback(
-                self.prev_frame, gray, None,
-                pyr_scale=0.5,      # Pyramid scale
-                levels=3,           # Number of pyramid layers
-                winsize=15,         # Window size
-                iterations=3,       # Iterations at each level
-                poly_n=5,           # Polynomial expansion
-                poly_sigma=1.2,     # Gaussian sigma
-                flags=0
-            )
-            
-            # Analyze flow magnitude and direction
-            magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-            
-            # Statistical analysis
-            avg_magnitude = np.mean(magnitude)
-            max_magnitude = np.max(magnitude)
-            std_magnitude = np.std(magnitude)
-            
-            # Detect pushing: sudden, strong, directional movement
-            # Enhanced threshold using standard deviation
-            pushing_threshold = avg_magnitude + (std_magnitude * self.optical_flow_threshold)
-            pushing_detected = max_magnitude > pushing_threshold and avg_magnitude > 0.5
-            
-            # Analyze direction consistency (pushing has consistent direction)
-            angle_degrees = np.degrees(angle)
-            
-            # Calculate dominant direction
-            hist, bins = np.histogram(angle_degrees.flatten(), bins=8, range=(0, 360))
-            dominant_direction_idx = np.argmax(hist)
-            dominant_direction_angle = bins[dominant_direction_idx]
-            
-            # Direction consistency (higher = more consistent = more likely pushing)
-            direction_consistency = hist[dominant_direction_idx] / np.sum(hist)
-            
-            # Determine primary direction with enhanced accuracy
-            direction = "UNKNOWN"
-            if pushing_detected:
-                if 337.5 <= dominant_direction_angle or dominant_direction_angle < 22.5:
-                    direction = "RIGHT"
-                elif 22.5 <= dominant_direction_angle < 67.5:
-                    direction = "DOWN-RIGHT"
-                elif 67.5 <= dominant_direction_angle < 112.5:
-                    direction = "DOWN"
-                elif 112.5 <= dominant_direction_angle < 157.5:
-                    direction = "DOWN-LEFT"
-                elif 157.5 <= dominant_direction_angle < 202.5:
-                    direction = "LEFT"
-                elif 202.5 <= dominant_direction_angle < 247.5:
-                    direction = "UP-LEFT"
-                elif 247.5 <= dominant_direction_angle < 292.5:
-                    direction = "UP"
-                else:
-                    direction = "UP-RIGHT"
-            
-            # Calculate confidence
-            confidence = 0
-            if pushing_detected:
-                # Magnitude score
-                magnitude_score = min(40, (max_magnitude / pushing_threshold) * 40)
-                # Consistency score
-                consistency_score = direction_consistency * 40
-                # Strength score
-                strength_score = min(20, avg_magnitude * 20)
-                
-                confidence = magnitude_score + consistency_score + strength_score
-            
-            self.prev_frame = gray
+            flow_start = time.perf_counter()
+            sparse = self._sparse_flow(ctx) if self.flow_method == 'sparse' else None
+            if sparse is not None:
+                magnitude, angle, flow_info = sparse
+                result = self._summarize_sparse_flow(magnitude, angle, flow_info.get('moving_area'))
+                result.update(flow_info)
+            else:
+                result = self._dense_result(ctx)
+                if self.flow_method == 'sparse':
+                    result['fallback_reason'] = self._lk_fallback_reason
+            flow_ms = (time.perf_counter() - flow_start) * 1000
+            if sparse is None:
+                self._update_flow_scale(flow_ms)
             
-            return {
-                'pushing_detected': pushing_detected and direction_consistency > 0.3,
-                'magnitude': float(avg_magnitude),
-                'max_magnitude': float(max_magnitude),
-                'direction': direction,
-                'consistency': float(direction_consistency),
-                'confidence': min(100, confidence)
-            }
+            self.prev_flow_frame = gray
+            result['flow_ms'] = flow_ms
+            return result
             
         except Exception as e:
             return {'pushing_detected': False, 'error': str(e), 'confidence': 0}
     
+    def _dense_result(self, ctx):
+        """Dense flow for this frame, summarized into a pushing result"""
+        magnitude, angle, flow_info = self._dense_flow(ctx)
+        if magnitude is None:
+            # ROI mode with no moving contours: nothing can be pushing
+            result = self._empty_flow_result()
+        else:
+            result = self._summarize_flow(magnitude, angle, flow_info.get('flow_coverage', 1.0))
+        result.update(flow_info)
+        return result
+    
+    def _current_flow_scale(self, width, height):
+        """Scale for the flow stage, never below flow_min_size pixels"""
+        if self.flow_scale == 'auto':
+            scale = self.flow_scales[self._flow_level]
+        else:
+            scale = float(self.flow_scale)
+        
+        min_dim = min(width, height)
+        if min_dim * scale < self.flow_min_size:
+            scale = min(1.0, self.flow_min_size / float(min_dim))
+        return scale
+    
+    def _update_flow_scale(self, flow_ms):
+        """Move one pyramid level coarser/finer to track the time budget"""
+        if self.flow_scale != 'auto':
+            return
+        
+        if self._flow_time_ema is None:
+            self._flow_time_ema = flow_ms
+        else:
+            self._flow_time_ema = 0.7 * self._flow_time_ema + 0.3 * flow_ms
+        
+        if self._flow_time_ema > self.flow_time_budget_ms and \
+                self._flow_level < len(self.flow_scales) - 1:
+            self._flow_level += 1
+            self._flow_time_ema = None
+        # One level finer costs roughly 4x; only step up with clear headroom
+        elif self._flow_time_ema * 4 < self.flow_time_budget_ms * 0.8 and self._flow_level > 0:
+            self._flow_level -= 1
+            self._flow_time_ema = None
+    
+    def _flow_roi(self, ctx):
+        """
+        Padded union of the motion detector's boxes for this frame
+        Returns None to use the whole frame, or an empty tuple if nothing moved
+        """
+        boxes = ctx.motion_boxes
+        if boxes is None:
+            return None
+        if not boxes:
+            return ()
+        
+        height, width = ctx.shape[:2]
+        pad = self.flow_roi_padding
+        x0 = max(0, min(b[0] for b in boxes) - pad)
+        y0 = max(0, min(b[1] for b in boxes) - pad)
+        x1 = min(width, max(b[0] + b[2] for b in boxes) + pad)
+        y1 = min(height, max(b[1] + b[3] for b in boxes) + pad)
+        
+        # A ROI covering most of the frame saves nothing over scaling
+        if (x1 - x0) * (y1 - y0) > 0.5 * width * height:
+            return None
+        return (x0, y0, x1, y1)
+    
+    def _dense_flow(self, ctx):
+        """
+        Farneback flow between the previous and current gray frames
+        
+        Returns:
+            (magnitude, angle, info) with magnitudes in full-resolution pixels,
+            or (None, None, info) when the ROI is empty
+        """
+        prev_gray = self.prev_flow_frame
+        gray = ctx.gray
+        mode = self.flow_mode
+        coverage = 1.0
+        
+        if mode == 'roi':
+            roi = self._flow_roi(ctx)
+            if roi == ():
+                return None, None, {'flow_mode': 'roi', 'flow_scale': 0.0, 'flow_coverage': 0.0}
+            if roi is None:
+                mode = 'scaled'
+            else:
+                x0, y0, x1, y1 = roi
+                coverage = float((x1 - x0) * (y1 - y0)) / (gray.shape[0] * gray.shape[1])
+                prev_gray = prev_gray[y0:y1, x0:x1]
+                gray = gray[y0:y1, x0:x1]
+        
+        if mode == 'full':
+            scale = 1.0
+        else:
+            scale = self._current_flow_scale(gray.shape[1], gray.shape[0])
+        
+        if scale < 1.0:
+            size = (max(1, int(gray.shape[1] * scale)), max(1, int(gray.shape[0] * scale)))
+            prev_gray = cv2.resize(prev_gray, size, interpolation=cv2.INTER_AREA)
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        
+        # Downscaling already covers the coarse pyramid levels
+        levels = 3 if scale >= 1.0 else (2 if scale >= 0.5 else 1)
+        
+        # Enhanced optical flow parameters for better accuracy
+        flow = cv2.calcOpticalFlowFarneback(
+            prev_gray, gray, None,
+            pyr_scale=0.5,      # Pyramid scale
+            levels=levels,      # Number of pyramid layers
+            winsize=15,         # Window size
+            iterations=3,       # Iterations at each level
+            poly_n=5,           # Polynomial expansion
+            poly_sigma=1.2,     # Gaussian sigma
+            flags=0
+        )
+        
+        # Analyze flow magnitude and direction
+        magnitude, angle = cv2.cartToPolar(flow[..., 0], flow[..., 1])
+        if scale < 1.0:
+            magnitude /= scale
+        
+        return magnitude, angle, {'flow_mode': mode, 'flow_scale': scale, 'flow_coverage': coverage}
+    
+    def _sparse_flow(self, ctx):
+        """
+        Pyramidal Lucas-Kanade flow on tracked features
+        
+        Returns:
+            (magnitude, angle, info) for the tracked vectors, or None when
+            the caller should fall back to dense flow
+        """
+        prev_gray = self.prev_flow_frame
+        gray = ctx.gray
+        height, width = gray.shape[:2]
+        
+        # Large moving regions: feature tracks break up, use dense flow
+        moving_area = None
+        if ctx.motion_boxes is not None:
+            areas = [w * h for _, _, w, h in ctx.motion_boxes]
+            if areas and max(areas) > self.lk_large_contour_fraction * width * height:
+                self._lk_points = None
+                self._lk_fallback_reason = 'large_motion'
+                return None
+            moving_area = min(1.0, sum(areas) / float(width * height))
+        
+        # Periodically re-seed so tracks cover newly visible texture
+        if self._lk_points is None or len(self._lk_points) < self.lk_min_features or \
+                self._lk_frames_since_seed >= self.lk_reseed_interval:
+            self._lk_points = cv2.goodFeaturesToTrack(
+                prev_gray,
+                maxCorners=self.lk_max_features,
+                qualityLevel=0.01,
+                minDistance=7,
+                blockSize=7
+            )
+            self._lk_frames_since_seed = 0
+            if self._lk_points is None or len(self._lk_points) < self.lk_min_features:
+                self._lk_points = None
+                self._lk_fallback_reason = 'too_few_features'
+                return None
+        
+        next_points, status, error = cv2.calcOpticalFlowPyrLK(
+            prev_gray, gray, self._lk_points, None,
+            winSize=(21, 21),
+            maxLevel=3,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+        
+        # A feature counts as tracked if LK found it with a low matching error
+        tracked = (status.reshape(-1) == 1) & (error.reshape(-1) <= self.lk_max_error)
+        quality = float(np.count_nonzero(tracked)) / len(tracked)
+        if quality < self.lk_min_tracked_ratio or np.count_nonzero(tracked) < self.lk_min_features:
+            self._lk_points = None
+            self._lk_fallback_reason = 'tracking_lost'
+            return None
+        
+        old = self._lk_points.reshape(-1, 2)[tracked]
+        new = next_points.reshape(-1, 2)[tracked]
+        vectors = (new - old).astype(np.float32)
+        magnitude, angle = cv2.cartToPolar(vectors[:, 0], vectors[:, 1])
+        
+        self._lk_points = new.reshape(-1, 1, 2)
+        self._lk_frames_since_seed += 1
+        
+        return magnitude, angle, {
+            'flow_mode': 'sparse',
+            'flow_scale': 1.0,
+            'tracked_features': int(len(new)),
+            'tracking_quality': quality,
+            'moving_area': moving_area
+        }
+    
+    def _empty_flow_result(self):
+        """Pushing result for a frame without any flow"""
+        return {
+            'pushing_detected': False,
+            'magnitude': 0.0,
+            'max_magnitude': 0.0,
+            'motion_speed': 0.0,
+            'direction': "UNKNOWN",
+            'consistency': 0.0,
+            'confidence': 0
+        }
+    
+    def _summarize_flow(self, magnitude, angle, coverage=1.0):
+        """
+        Pushing statistics from flow magnitudes (pixels) and angles (radians)
+        
+        Args:
+            magnitude: Flow magnitudes of the analyzed area
+            angle: Flow angles of the analyzed area
+            coverage: Fraction of the frame the flow covers; the rest (outside
+                a motion ROI) counts as still, so statistics match full-frame flow
+        
+        Returns:
+            dict with pushing_detected, magnitude, direction and confidence
+        """
+        # Statistical analysis
+        avg_magnitude = np.mean(magnitude)
+        max_magnitude = np.max(magnitude)
+        std_magnitude = np.std(magnitude)
+        if coverage < 1.0:
+            # ROI flow: pixels outside the ROI count as still, so the
+            # statistics stay comparable with full-frame flow
+            count = magnitude.size / max(coverage, 1e-6)
+            avg_magnitude = np.sum(magnitude) / count
+            std_magnitude = np.sqrt(max(0.0, np.sum(np.square(magnitude)) / count - avg_magnitude ** 2))
+        # Magnitude-weighted mean: the speed of whatever is moving (reported
+        # for comparing flow modes, not used in the decision)
+        total = float(np.sum(magnitude))
+        motion_speed = float(np.sum(np.square(magnitude))) / total if total > 0 else 0.0
+        
+        # Detect pushing: sudden, strong, directional movement
+        # Enhanced threshold using standard deviation
+        pushing_threshold = avg_magnitude + (std_magnitude * self.optical_flow_threshold)
+        pushing_detected = max_magnitude > pushing_threshold and avg_magnitude > 0.5
+        
+        # Analyze direction consistency (pushing has consistent direction)
+        angle_degrees = np.degrees(angle)
+        
+        # Calculate dominant direction
+        hist, bins = np.histogram(angle_degrees.flatten(), bins=8, range=(0, 360))
+        if coverage < 1.0:
+            # Still pixels outside the ROI have noisy angles, spread over all bins
+            hist = hist + (magnitude.size / max(coverage, 1e-6) - magnitude.size) / len(hist)
+        dominant_direction_idx = np.argmax(hist)
+        dominant_direction_angle = bins[dominant_direction_idx]
+        
+        # Direction consistency (higher = more consistent = more likely pushing)
+        direction_consistency = hist[dominant_direction_idx] / np.sum(hist)
+        
+        # Determine primary direction with enhanced accuracy
+        direction = "UNKNOWN"
+        if pushing_detected:
+            if 337.5 <= dominant_direction_angle or dominant_direction_angle < 22.5:
+                direction = "RIGHT"
+            elif 22.5 <= dominant_direction_angle < 67.5:
+                direction = "DOWN-RIGHT"
+            elif 67.5 <= dominant_direction_angle < 112.5:
+                direction = "DOWN"
+            elif 112.5 <= dominant_direction_angle < 157.5:
+                direction = "DOWN-LEFT"
+            elif 157.5 <= dominant_direction_angle < 202.5:
+                direction = "LEFT"
+            elif 202.5 <= dominant_direction_angle < 247.5:
+                direction = "UP-LEFT"
+            elif 247.5 <= dominant_direction_angle < 292.5:
+                direction = "UP"
+            else:
+                direction = "UP-RIGHT"
+        
+        # Calculate confidence
+        confidence = 0
+        if pushing_detected:
+            # Magnitude score
+            magnitude_score = min(40, (max_magnitude / pushing_threshold) * 40)
+            # Consistency score
+            consistency_score = direction_consistency * 40
+            # Strength score
+            strength_score = min(20, avg_magnitude * 20)
+            
+            confidence = magnitude_score + consistency_score + strength_score
+        
+        return {
+            'pushing_detected': bool(pushing_detected and direction_consistency > 0.3),
+            'magnitude': float(avg_magnitude),
+            'max_magnitude': float(max_magnitude),
+            'motion_speed': float(motion_speed),
+            'direction': direction,
+            'consistency': float(direction_consistency),
+            'confidence': min(100, confidence)
+        }
+    
+    def _summarize_sparse_flow(self, magnitude, angle, moving_area=None):
+        """
+        Pushing statistics from tracked-feature vectors
+        Features cluster on texture, so their share is not the share of the
+        frame that moves. The dense test is applied to frame-level estimates
+        instead: the moving features stand for the motion detector's moving
+        area, the rest of the frame is still with noise angles spread over
+        all direction bins
+        
+        Args:
+            magnitude: Tracked-feature displacements (pixels)
+            angle: Displacement angles (radians)
+            moving_area: Fraction of the frame in motion boxes; the moving
+                feature fraction is used when the motion detector did not run
+        
+        Returns:
+            dict in the same form as _summarize_flow
+        """
+        magnitude = magnitude.flatten()
+        moving = magnitude > self.lk_motion_px
+        moving_count = int(np.count_nonzero(moving))
+        moving_fraction = moving_count / float(magnitude.size)
+        if moving_area is None:
+            moving_area = moving_fraction
+        
+        motion_speed = float(np.mean(magnitude[moving])) if moving_count else 0.0
+        # Frame mean magnitude: still pixels contribute nothing
+        avg_magnitude = moving_area * motion_speed
+        
+        direction = "UNKNOWN"
+        direction_consistency = 0.0
+        if moving_count:
+            hist, bins = np.histogram(np.degrees(angle.flatten()[moving]), bins=8, range=(0, 360))
+            dominant = int(np.argmax(hist))
+            moving_consistency = float(hist[dominant]) / moving_count
+            direction_consistency = moving_area * moving_consistency + (1 - moving_area) / len(hist)
+            # Bins start at 0 degrees (RIGHT) and step 45 degrees clockwise
+            direction = ["RIGHT", "DOWN-RIGHT", "DOWN", "DOWN-LEFT",
+                         "LEFT", "UP-LEFT", "UP", "UP-RIGHT"][dominant]
+        
+        # More than lk_max_moving_fraction moving is whole-view motion, which
+        # fails the dense outlier test
+        pushing_detected = (moving_count >= self.lk_min_moving and
+                            moving_fraction <= self.lk_max_moving_fraction and
+                            avg_magnitude > 0.5 and
+                            direction_consistency > 0.3)
+        
+        confidence = 0
+        if pushing_detected:
+            # Same terms as the dense score; the outlier test passed, so the
+            # magnitude term is at its maximum
+            confidence = 40 + direction_consistency * 40 + min(20, avg_magnitude * 20)
+        
+        return {
+            'pushing_detected': bool(pushing_detected),
+            'magnitude': float(avg_magnitude),
+            'max_magnitude': float(np.max(magnitude)),
+            'motion_speed': motion_speed,
+            'direction': direction if pushing_detected else "UNKNOWN",
+            'consistency': float(direction_consistency),
+            'moving_fraction': moving_fraction,
+            'confidence': min(100, confidence)
+        }
+    
     def analyze_frame(self, frame):
         """
         Comprehensive frame analysis for all distress indicators
+        All detectors share one FrameContext, so each color conversion
+        happens at most once per frame
         
         Returns:
             dict with all detection results and overall distress score
         """
+        ctx = self._context(frame)
         results = {
             'timestamp': datetime.now().isoformat(),
-            'motion': self.detect_rapid_movement(frame),
-            'red_color': self.detect_red_color(frame),
-            'pushing': self.detect_pushing_motion(frame),
+            'motion': self.detect_rapid_movement(ctx),
+            'red_color': self.detect_red_color(ctx),
+            'pushing': self.detect_pushing_motion(ctx),
             'distress_detected': False,
             'distress_score': 0,
             'indicators': []
@@ -449,10 +1074,46 @@ class DistressDetector:
         
         return results
     
+    def prime(self, frame, motion_history=None):
+        """
+        Load previous-frame state from a frame without analyzing it
+        Used when consecutive frames go to different detector instances
+        (see core.frame_pipeline); tracked LK points are dropped because
+        they belong to whatever frame this detector saw last
+
+        Args:
+            frame: The frame preceding the next one to analyze
+            motion_history: Recent motion intensities to continue from
+        """
+        if not CV2_AVAILABLE:
+            return
+
+        ctx = self._context(frame)
+        self.prev_motion_frame = ctx.blurred_gray
+        self.prev_flow_frame = ctx.gray
+        if self.motion_method in ('background', 'mog2'):
+            small = self._motion_small_gray(ctx)
+            self._seed_background(small)
+            self._bg_prev_small = small
+        self._lk_points = None
+        self._lk_frames_since_seed = 0
+        if motion_history is not None:
+            self.motion_history = list(motion_history)[-self.max_history:]
+
     def reset(self):
         """Reset detector state"""
-        self.prev_frame = None
+        self.prev_motion_frame = None
+        self.prev_flow_frame = None
         self.motion_history = []
+        self._bg_model = None
+        self._bg_subtractor = None
+        self._bg_prev_small = None
+        self._bg_stable = None
+        self._flow_level = 1
+        self._flow_time_ema = None
+        self._lk_points = None
+        self._lk_frames_since_seed = 0
+        self._lk_fallback_reason = None
 
 
 # Global instance
@@ -482,14 +1143,17 @@ def analyze_video_for_distress(video_source=0, duration=10):
         all_indicators = set()
         
         while time.time() - start_time < duration:
-            ret, frame = cap.read()
-            if not ret:
+            # Skipped frames are only grabbed, not decoded
+            if not cap.grab():
                 break
             
             frame_count += 1
             
             # Analyze every 5th frame for performance
             if frame_count % 5 == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
                 result = distress_detector.analyze_frame(frame)
                 
                 if result['distress_detected']:
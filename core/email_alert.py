@@ -7,6 +7,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from core.user_config import user_config
+from core.smtp_pool import get_smtp_pool
+from core.alert_payload import create_alert_payload
 
 class EmailAlert:
     """Send emergency alerts via email"""
@@ -14,53 +16,18 @@ class EmailAlert:
     def __init__(self):
         self.config = user_config.get_messaging_config()["email_config"]
         self.user_info = user_config.get_user_info()
+        # Addresses reached by the last send_alert (partial deliveries settle per address)
+        self.delivered = []
 
-    def send_alert(self, user_email, reason="Emergency alert", location=None):
-        """Send emergency alert via email"""
+    def send_alert(self, user_email, reason="Emergency alert", location=None, payload=None):
+        """Send emergency alert via email (payload: pre-rendered AlertPayload)"""
 
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.config["username"]
-            msg['Subject'] = f"🚨 HER SHIELD EMERGENCY ALERT - {self.user_info['name']}"
-
-            # Email body
-            body = f"""
-🚨 HER SHIELD EMERGENCY ALERT 🚨
-
-User: {self.user_info['name']}
-Email: {self.user_info['email']}
-Phone: {self.user_info['phone']}
-Reason: {reason}
-
-{f'Location: {location}' if location else ''}
-
-Medical Information:
-- Blood Type: {self.user_info['medical_info']['blood_type'] or 'Not specified'}
-- Allergies: {', '.join(self.user_info['medical_info']['allergies']) or 'None specified'}
-- Medications: {', '.join(self.user_info['medical_info']['medications']) or 'None specified'}
-- Conditions: {', '.join(self.user_info['medical_info']['conditions']) or 'None specified'}
-
-Emergency Contacts:
-{chr(10).join(f"- {contact}" for contact in self.user_info['emergency_contacts'])}
-
----
-This is an automated emergency alert from HerShield safety system.
-Please respond immediately if you receive this message.
-"""
-
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Connect to SMTP server
-            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"])
-            if self.config["use_tls"]:
-                server.starttls()
+            payload = payload or create_alert_payload(user_email, reason, location)
 
-            server.login(self.config["username"], self.config["password"])
-
-            # Send to all emergency contacts
+            # Send to all emergency contacts over pooled, already-authenticated sessions
             contacts = user_config.get_emergency_contacts()
-            sent_count = 0
+            messages = []
 
             for contact in contacts:
                 # Extract email if contact is in "Name: email" format
@@ -71,12 +38,17 @@ Please respond immediately if you receive this message.
                     email = contact.strip()
 
                 if '@' in email:  # Basic email validation
-                    msg['To'] = email
-                    server.send_message(msg)
-                    print(f"[EMAIL SENT] Alert sent to {email}")
-                    sent_count += 1
+                    messages.append(self.build_message(payload, email))
 
-            server.quit()
+            sent_count = 0
+            self.delivered = []
+            for result in get_smtp_pool(self.config).send_messages(messages):
+                if result['sent']:
+                    print(f"[EMAIL SENT] Alert sent to {result['to']} ({result['latency']:.2f}s)")
+                    sent_count += 1
+                    self.delivered.append(str(result['to']))
+                else:
+                    print(f"[EMAIL ERROR] Failed to send to {result['to']}: {result['error']}")
 
             if sent_count > 0:
                 print(f"[SUCCESS] Email alerts sent to {sent_count} contacts")
@@ -89,6 +61,19 @@ Please respond immediately if you receive this message.
             print(f"[ERROR] Failed to send email alert: {e}")
             return False
 
+    def build_message(self, payload, email):
+        """Alert email for one recipient (text and HTML alternatives)"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.config["username"]
+        msg['To'] = email
+        if payload.update_number:
+            msg['Subject'] = f"🔄 HER SHIELD UPDATE #{payload.update_number} - {payload.name}"
+        else:
+            msg['Subject'] = f"🚨 HER SHIELD EMERGENCY ALERT - {payload.name}"
+        msg.attach(MIMEText(payload.render('text'), 'plain'))
+        msg.attach(MIMEText(payload.render('html'), 'html'))
+        return msg
+
 def test_email_config():
     """Test email configuration"""
     print("Testing email configuration...")
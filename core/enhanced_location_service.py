@@ -9,7 +9,7 @@ import json
 import os
 import time
 import threading
-import requests
+from core.http_client import http_client
 from geopy.geocoders import Nominatim
 import socket
 import subprocess
@@ -74,7 +74,7 @@ class EnhancedLocationService:
             
             for service in services:
                 try:
-                    response = requests.get(service, timeout=3)  # Faster timeout
+                    response = http_client.get(service, timeout=3)  # Faster timeout
                     if response.status_code == 200:
                         data = response.json()
                         
@@ -190,7 +190,6 @@ class EnhancedLocationService:
         """Try alternative geocoding services"""
         try:
             # Try OpenStreetMap Nominatim with more details
-            import requests
             url = f"https://nominatim.openstreetmap.org/reverse"
             params = {
                 'lat': lat,
@@ -200,7 +199,7 @@ class EnhancedLocationService:
                 'zoom': 18
             }
             
-            response = requests.get(url, params=params, timeout=3)
+            response = http_client.get(url, params=params, timeout=3)
             if response.status_code == 200:
                 data = response.json()
                 if 'display_name' in data:
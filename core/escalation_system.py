@@ -31,6 +31,13 @@ from .user_config import user_config
 from .alert_manager import send_alert
 from .offline_alert_system import OfflineAlertSystem
 from .enhanced_location_service import EnhancedLocationService
+from .incident_manager import incident_manager
+
+try:
+    from .evidence_index import evidence_index
+    EVIDENCE_INDEX_AVAILABLE = True
+except ImportError:
+    EVIDENCE_INDEX_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
@@ -184,14 +191,29 @@ if __name__ == "__main__":
         except Exception as e:
             logger.error(f"TTS alert failed: {e}")
     
-    def start_escalation(self, alert_id, alert_type, message, location_data=None, evidence_data=None):
-        """Start escalation process for an alert"""
+    def start_escalation(self, alert_id, alert_type, message, location_data=None, evidence_data=None,
+                         incident=None):
+        """
+        Start escalation process for an alert (triggers of an open incident become updates)
+
+        Args:
+            incident: incident_manager.report() result when the caller already
+                reported the trigger (to file its evidence under the incident)
+        """
         if alert_id in self.active_alerts:
             logger.warning(f"Alert {alert_id} already active")
             return
         
+        if incident is None:
+            incident = incident_manager.report(alert_type, message, alert_id=alert_id, location=location_data)
+        if not incident['new'] and incident['alert_id'] in self.active_alerts:
+            logger.info(f"Alert {alert_id} joined incident {incident['incident_id']} "
+                        f"(escalation {incident['alert_id']})")
+            return
+        
         alert_info = {
             'id': alert_id,
+            'incident_id': incident['incident_id'],
             'type': alert_type,
             'message': message,
             'location': location_data,
@@ -265,8 +287,9 @@ if __name__ == "__main__":
         except Exception as e:
             logger.error(f"Escalation worker error for {alert_id}: {e}")
         finally:
-            # Cleanup
+            # Cleanup (the escalation is over, so is its incident)
             if alert_id in self.active_alerts:
+                incident_manager.close(self.active_alerts[alert_id].get('incident_id'))
                 del self.active_alerts[alert_id]
             if alert_id in self.escalation_threads:
                 del self.escalation_threads[alert_id]
@@ -279,16 +302,17 @@ if __name__ == "__main__":
         
         # Send standard alerts
         try:
-            send_alert(user_info.get('email', ''), alert_info['message'])
+            send_alert(user_info.get('email', ''), alert_info['message'], incident_id=alert_info['incident_id'])
         except Exception as e:
             logger.error(f"Failed to send initial alert: {e}")
         
-        # Store offline alert
+        # Store offline alert (same incident: a later retry adds no duplicate deliveries)
         self.offline_system.send_offline_alert(
             alert_info['type'],
             alert_info['message'],
             alert_info['location'] or {},
-            alert_info['evidence'] or {}
+            alert_info['evidence'] or {},
+            alert_info['incident_id']
         )
         
         # Play initial sound
@@ -310,12 +334,15 @@ if __name__ == "__main__":
         
         user_info = user_config.get_user_info()
         
-        # Send to all emergency contacts
-        for contact in user_info.get('emergency_contacts', []):
-            try:
-                send_alert(contact, enhanced_message)
-            except Exception as e:
-                logger.error(f"Failed to send enhanced alert to {contact}: {e}")
+        # One compact update to all emergency contacts (previously a full alert per contact)
+        try:
+            incident_manager.send_update(
+                alert_info['incident_id'],
+                "ESCALATED: active for 15 seconds without acknowledgment. Immediate attention required!",
+                broadcasts=len(user_info.get('emergency_contacts', []))
+            )
+        except Exception as e:
+            logger.error(f"Failed to send enhanced alert: {e}")
         
         # Create visual alert file
         try:
@@ -344,11 +371,15 @@ if __name__ == "__main__":
         user_info = user_config.get_user_info()
         
         # Broadcast to everyone
-        for contact in user_info.get('emergency_contacts', []):
-            try:
-                send_alert(contact, max_priority_message)
-            except Exception as e:
-                logger.error(f"Failed to send max priority alert to {contact}: {e}")
+        try:
+            incident_manager.send_update(
+                alert_info['incident_id'],
+                "MAXIMUM PRIORITY: automatic emergency calling initiated, no acknowledgment for 30+ seconds. "
+                "CONTACT EMERGENCY SERVICES IMMEDIATELY!",
+                broadcasts=len(user_info.get('emergency_contacts', []))
+            )
+        except Exception as e:
+            logger.error(f"Failed to send max priority alert: {e}")
         
         # Create multiple alert files
         try:
@@ -394,11 +425,12 @@ if __name__ == "__main__":
             # Play sound reminder
             threading.Thread(target=self.play_emergency_sound, args=("beep",), daemon=True).start()
             
-            # Send reminder alert
-            reminder_message = f"🔄 ONGOING EMERGENCY ALERT\n\n{alert_info['message']}\n\nAlert has been active for {int((datetime.now() - alert_info['start_time']).total_seconds() / 60)} minutes.\n\nPress any key to acknowledge or contact emergency services."
-            
-            user_info = user_config.get_user_info()
-            send_alert(user_info.get('email', ''), reminder_message)
+            # Send reminder update
+            minutes = int((datetime.now() - alert_info['start_time']).total_seconds() / 60)
+            incident_manager.send_update(
+                alert_info['incident_id'],
+                f"ONGOING: alert active for {minutes} minute(s) without acknowledgment"
+            )
             
         except Exception as e:
             logger.error(f"Failed to send reminder alert: {e}")
@@ -417,11 +449,30 @@ if __name__ == "__main__":
         else:
             return f"Coordinates: {lat}, {lon}"
     
-    def acknowledge_alert(self, alert_id):
-        """Acknowledge an active alert to stop escalation"""
+    def acknowledge_alert(self, alert_id, false_alarm=False):
+        """
+        Acknowledge an active alert to stop escalation
+        
+        Args:
+            alert_id: Alert (or coalesced trigger) to acknowledge
+            false_alarm: The user reported a false alarm; its evidence is
+                classified so retention expires it first
+        """
+        # Coalesced triggers share the escalation of their incident
+        alert_id = incident_manager.resolve_alert_id(alert_id)
         if alert_id in self.active_alerts:
-            self.active_alerts[alert_id]['acknowledged'] = True
-            logger.info(f"Alert {alert_id} acknowledged by user")
+            alert_info = self.active_alerts[alert_id]
+            incident_manager.close(alert_info.get('incident_id'))
+            alert_info['acknowledged'] = True
+            logger.info(f"Alert {alert_id} acknowledged by user{' (false alarm)' if false_alarm else ''}")
+            
+            # Evidence is filed under the incident the escalation belongs to
+            evidence_incident = alert_info.get('incident_id')
+            if false_alarm and evidence_incident and EVIDENCE_INDEX_AVAILABLE:
+                try:
+                    evidence_index.set_incident_priority(evidence_incident, 'false_alarm')
+                except Exception as e:
+                    logger.warning(f"Failed to classify evidence of {alert_id}: {e}")
             
             # Clean up alert files
             try:
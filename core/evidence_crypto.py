@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Evidence Encryption at Rest
+Streaming, chunked authenticated encryption (AES-256-GCM) for evidence
+files. Plaintext is processed in fixed-size chunks, so a 100 MB video
+never sits in memory, and any chunk can be decrypted on its own for
+playback or upload.
+
+File layout (".enc" appended to the original name):
+    header  : b"HSE1" | version u8 | chunk_size u32 | nonce prefix (8 bytes)
+    chunk i : AES-GCM(plaintext[i]) with a 16-byte tag
+              nonce = prefix | i (u32, big endian)
+              AAD   = header | i (u32) | final flag (u8)
+
+Every chunk except the last holds exactly chunk_size bytes, so chunk i
+starts at a fixed offset. The final flag is authenticated, so a file cut
+at a chunk boundary fails to decrypt instead of silently losing its tail.
+"""
+
+import atexit
+import contextlib
+import io
+import os
+import shutil
+import struct
+import tempfile
+import time
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+
+MAGIC = b"HSE1"
+VERSION = 1
+HEADER_FORMAT = ">4sBI8s"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ENCRYPTED_SUFFIX = ".enc"
+DEFAULT_KEY_PATH = "data/evidence.key"
+PLAINTEXT_DIR_PREFIX = "hershield_plain_"
+
+
+class EvidenceCryptoError(Exception):
+    """Encrypted evidence is malformed or failed authentication"""
+
+
+def load_or_create_key(key_path=DEFAULT_KEY_PATH):
+    """
+    Read the 32-byte evidence key, creating it (mode 0600) on first use
+    HERSHIELD_EVIDENCE_KEY (hex) overrides the key file
+    """
+    env_key = os.environ.get("HERSHIELD_EVIDENCE_KEY")
+    if env_key:
+        return bytes.fromhex(env_key)
+
+    if os.path.exists(key_path):
+        with open(key_path, 'rb') as f:
+            return f.read()
+
+    os.makedirs(os.path.dirname(key_path) or ".", exist_ok=True)
+    key = os.urandom(32)
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+        f.flush()
+        os.fsync(f.fileno())
+    return key
+
+
+class EvidenceCipher:
+    """AES-256-GCM chunked encryption with a fixed chunk size"""
+
+    def __init__(self, key, chunk_size=DEFAULT_CHUNK_SIZE):
+        if not CRYPTO_AVAILABLE:
+            raise RuntimeError("cryptography package not installed")
+        if len(key) != 32:
+            raise ValueError("Evidence key must be 32 bytes")
+        self.key = key
+        self.aead = AESGCM(key)
+        self.chunk_size = chunk_size
+
+    def __reduce__(self):
+        # Rebuilt from the key so pool initializers can hand the cipher to spawned workers
+        return (EvidenceCipher, (self.key, self.chunk_size))
+
+    def new_header(self):
+        return struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.chunk_size, os.urandom(8))
+
+    def encrypt_chunk(self, header, index, data, final):
+        prefix = header[-8:]
+        nonce = prefix + struct.pack(">I", index)
+        return self.aead.encrypt(nonce, data, header + struct.pack(">IB", index, int(final)))
+
+    def decrypt_chunk(self, header, index, data, final):
+        prefix = header[-8:]
+        nonce = prefix + struct.pack(">I", index)
+        try:
+            return self.aead.decrypt(nonce, data, header + struct.pack(">IB", index, int(final)))
+        except Exception:
+            raise EvidenceCryptoError(f"Chunk {index} failed authentication")
+
+    def encrypt_stream(self, src, dst):
+        """
+        Encrypt a readable stream into a writable one, one chunk in memory at a time
+
+        Returns:
+            plaintext bytes processed
+        """
+        header = self.new_header()
+        dst.write(header)
+        total = 0
+        index = 0
+        chunk = src.read(self.chunk_size)
+        while True:
+            # Read ahead one chunk so the last one can be flagged as final
+            next_chunk = src.read(self.chunk_size) if len(chunk) == self.chunk_size else b''
+            final = not next_chunk
+            dst.write(self.encrypt_chunk(header, index, chunk, final))
+            total += len(chunk)
+            if final:
+                return total
+            chunk = next_chunk
+            index += 1
+
+    def encrypt_bytes(self, data):
+        """Encrypt an in-memory buffer (e.g. an encoded JPEG)"""
+        out = io.BytesIO()
+        self.encrypt_stream(io.BytesIO(data), out)
+        return out.getvalue()
+
+    def open(self, path):
+        """Random-access plaintext reader for an encrypted file"""
+        return EncryptedEvidenceReader(path, self)
+
+
+class EncryptedEvidenceReader(io.RawIOBase):
+    """
+    Seekable, read-only plaintext view of an encrypted evidence file
+    Only the chunks touched by a read are decrypted (one cached at a time),
+    so it can back wave.open(), HTTP range uploads or playback
+    """
+
+    def __init__(self, path, cipher):
+        super().__init__()
+        self.path = path
+        self.cipher = cipher
+        self.file = open(path, 'rb')
+        self.header = self.file.read(HEADER_SIZE)
+        if len(self.header) != HEADER_SIZE:
+            raise EvidenceCryptoError("Truncated header")
+        magic, version, self.chunk_size, _ = struct.unpack(HEADER_FORMAT, self.header)
+        if magic != MAGIC or version != VERSION:
+            raise EvidenceCryptoError("Not an encrypted evidence file")
+
+        stored = os.path.getsize(path) - HEADER_SIZE
+        sealed = self.chunk_size + TAG_SIZE
+        self.chunk_count = max(1, -(-stored // sealed))
+        self.size = stored - self.chunk_count * TAG_SIZE
+        if self.size < 0:
+            raise EvidenceCryptoError("Truncated file")
+
+        self.position = 0
+        self._cached = (None, b'')
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def read_chunk(self, index):
+        """Plaintext of chunk `index` (authenticated)"""
+        if self._cached[0] == index:
+            return self._cached[1]
+        if not 0 <= index < self.chunk_count:
+            raise EvidenceCryptoError(f"Chunk {index} out of range")
+        self.file.seek(HEADER_SIZE + index * (self.chunk_size + TAG_SIZE))
+        sealed = self.file.read(self.chunk_size + TAG_SIZE)
+        data = self.cipher.decrypt_chunk(self.header, index, sealed, index == self.chunk_count - 1)
+        self._cached = (index, data)
+        return data
+
+    def readinto(self, buffer):
+        """Fill the buffer across chunk boundaries (short only at end of file)"""
+        filled = 0
+        while filled < len(buffer) and self.position < self.size:
+            index, offset = divmod(self.position, self.chunk_size)
+            data = self.read_chunk(index)[offset:offset + len(buffer) - filled]
+            buffer[filled:filled + len(data)] = data
+            filled += len(data)
+            self.position += len(data)
+        return filled
+
+    def close(self):
+        if not self.closed:
+            self.file.close()
+        super().close()
+
+
+def _remove_quietly(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def encrypt_file(src_path, dst_path, cipher, remove_source=True):
+    """
+    Stream-encrypt a closed file to dst_path (temp name, fsync, atomic rename)
+    With remove_source the plaintext is removed even when encryption fails
+
+    Returns:
+        plaintext bytes encrypted
+    """
+    tmp_path = dst_path + ".tmp"
+    try:
+        with open(src_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            total = cipher.encrypt_stream(src, dst)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, dst_path)
+    finally:
+        _remove_quietly(tmp_path)
+        if remove_source:
+            _remove_quietly(src_path)
+    return total
+
+
+def write_encrypted_bytes(path, data, cipher):
+    """Write an in-memory buffer straight to an encrypted file (no plaintext on disk)"""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(cipher.encrypt_bytes(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        _remove_quietly(tmp_path)
+
+
+def decrypt_file(src_path, dst_path, cipher):
+    """Stream-decrypt an encrypted file to plaintext (chunk by chunk)"""
+    with cipher.open(src_path) as reader, open(dst_path, 'wb') as dst:
+        for index in range(reader.chunk_count):
+            dst.write(reader.read_chunk(index))
+
+
+_plaintext_dir = None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _sweep_stale_plaintext(root):
+    """Remove private plaintext directories left behind by processes that died"""
+    for name in os.listdir(root):
+        if not name.startswith(PLAINTEXT_DIR_PREFIX):
+            continue
+        pid = name[len(PLAINTEXT_DIR_PREFIX):].split("_", 1)[0]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def plaintext_dir():
+    """
+    Private (0700) per-process directory for plaintext work files
+    Lives in /dev/shm when available, so unencrypted evidence being
+    recorded or processed stays in memory and never reaches the evidence
+    directory; removed at exit, and by the next process after a crash
+    """
+    global _plaintext_dir
+    if _plaintext_dir is None or not os.path.isdir(_plaintext_dir):
+        root = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+        _sweep_stale_plaintext(root)
+        _plaintext_dir = tempfile.mkdtemp(prefix=f"{PLAINTEXT_DIR_PREFIX}{os.getpid()}_", dir=root)
+        os.chmod(_plaintext_dir, 0o700)
+        atexit.register(shutil.rmtree, _plaintext_dir, True)
+    return _plaintext_dir
+
+
+def plaintext_path(name):
+    """
+    Unique path for a plaintext work file in the private directory
+    The extension of `name` is kept (OpenCV picks the container from it)
+    """
+    stem, extension = os.path.splitext(os.path.basename(strip_encrypted_suffix(name)))
+    fd, path = tempfile.mkstemp(prefix=stem + "_", suffix=extension, dir=plaintext_dir())
+    os.close(fd)
+    return path
+
+
+# Configured cipher, or None when encryption at rest is disabled
+evidence_cipher = None
+
+
+def is_encrypted(path):
+    """True for evidence stored encrypted at rest"""
+    return path.endswith(ENCRYPTED_SUFFIX)
+
+
+def strip_encrypted_suffix(path):
+    """Name the evidence had before encryption"""
+    return path[:-len(ENCRYPTED_SUFFIX)] if is_encrypted(path) else path
+
+
+def resolve_cipher(cipher=None):
+    """The given cipher, else the configured one; raises when there is no key"""
+    cipher = cipher or evidence_cipher
+    if cipher is None:
+        raise EvidenceCryptoError("Encrypted evidence but no evidence key is configured")
+    return cipher
+
+
+def open_evidence(path, cipher=None):
+    """Binary plaintext reader for any evidence file (.enc is decrypted chunk by chunk)"""
+    if is_encrypted(path):
+        return resolve_cipher(cipher).open(path)
+    return open(path, 'rb')
+
+
+@contextlib.contextmanager
+def decrypted_copy(path, cipher=None):
+    """
+    Plaintext path for tools that only open files by name (OpenCV)
+    Encrypted evidence is decrypted into the private plaintext directory
+    and removed when the block exits, including when decryption fails;
+    plaintext evidence is passed through
+    """
+    if not is_encrypted(path):
+        yield path
+        return
+    cipher = resolve_cipher(cipher)
+    plain_path = plaintext_path(path)
+    try:
+        decrypt_file(path, plain_path, cipher)
+        yield plain_path
+    finally:
+        _remove_quietly(plain_path)
+
+
+def configure_evidence_encryption(settings=None):
+    """Enable or disable encryption at rest from evidence settings"""
+    global evidence_cipher
+    settings = settings or {}
+    if not settings.get("encrypt_at_rest"):
+        evidence_cipher = None
+        return None
+    if not CRYPTO_AVAILABLE:
+        print("⚠️ Evidence encryption requested but cryptography is not installed")
+        evidence_cipher = None
+        return None
+    evidence_cipher = EvidenceCipher(load_or_create_key(settings.get("key_path", DEFAULT_KEY_PATH)),
+                                     settings.get("encryption_chunk_kb", DEFAULT_CHUNK_SIZE // 1024) * 1024)
+    print("🔐 Evidence encryption at rest enabled")
+    return evidence_cipher
+
+
+def benchmark_encryption(size_mb=100, chunk_size=DEFAULT_CHUNK_SIZE, write_block=256 * 1024):
+    """
+    Compare plain and encrypted evidence writes (MB/s), plus random chunk reads
+
+    Returns:
+        dict with plain_mb_s, encrypted_mb_s, decrypt_mb_s and random_chunk_ms
+    """
+    cipher = EvidenceCipher(os.urandom(32), chunk_size)
+    work_dir = tempfile.mkdtemp(prefix="hershield_crypto_bench_")
+    block = os.urandom(write_block)
+    blocks = max(1, int(size_mb * 1024 * 1024 // write_block))
+    size = blocks * write_block
+
+    class _Source:
+        """Generates the payload on the fly so the benchmark holds one block in memory"""
+
+        def __init__(self):
+            self.remaining = size
+
+        def read(self, n):
+            n = min(n, self.remaining)
+            self.remaining -= n
+            return (block * (n // write_block + 1))[:n]
+
+    try:
+        plain_path = os.path.join(work_dir, "plain.bin")
+        start = time.perf_counter()
+        with open(plain_path, 'wb') as f:
+            for _ in range(blocks):
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+        plain_seconds = time.perf_counter() - start
+
+        encrypted_path = os.path.join(work_dir, "encrypted.bin" + ENCRYPTED_SUFFIX)
+        start = time.perf_counter()
+        with open(encrypted_path, 'wb') as f:
+            cipher.encrypt_stream(_Source(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        encrypted_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decrypt_file(encrypted_path, os.path.join(work_dir, "decrypted.bin"), cipher)
+        decrypt_seconds = time.perf_counter() - start
+
+        with cipher.open(encrypted_path) as reader:
+            indexes = [int(i * 7919) % reader.chunk_count for i in range(200)]
+            start = time.perf_counter()
+            for index in indexes:
+                reader._cached = (None, b'')
+                reader.read_chunk(index)
+            random_ms = (time.perf_counter() - start) * 1000.0 / len(indexes)
+
+        mb = size / (1024.0 * 1024.0)
+        return {
+            'size_mb': mb,
+            'chunk_kb': chunk_size // 1024,
+            'plain_mb_s': mb / plain_seconds,
+            'encrypted_mb_s': mb / encrypted_seconds,
+            'decrypt_mb_s': mb / decrypt_seconds,
+            'random_chunk_ms': random_ms,
+            'overhead_pct': 100.0 * (os.path.getsize(encrypted_path) - size) / size
+        }
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark chunked evidence encryption")
+    parser.add_argument("--size-mb", type=float, default=100)
+    parser.add_argument("--chunk-kb", type=int, default=DEFAULT_CHUNK_SIZE // 1024)
+    args = parser.parse_args()
+
+    if not CRYPTO_AVAILABLE:
+        print("❌ cryptography package not installed")
+    else:
+        result = benchmark_encryption(args.size_mb, args.chunk_kb * 1024)
+        print(f"📊 {result['size_mb']:.0f} MB, {result['chunk_kb']} KB chunks")
+        print(f"  plain write     : {result['plain_mb_s']:.0f} MB/s")
+        print(f"  encrypted write : {result['encrypted_mb_s']:.0f} MB/s")
+        print(f"  decrypt         : {result['decrypt_mb_s']:.0f} MB/s")
+        print(f"  random chunk    : {result['random_chunk_ms']:.2f} ms")
+        print(f"  size overhead   : {result['overhead_pct']:.3f}%")
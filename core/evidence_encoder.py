@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Evidence Encoder
+Splits evidence recording into a capture side and an encoder thread
+joined by a bounded frame queue. The encoder writes at a constant output
+FPS: frames are duplicated to fill gaps and dropped when they arrive
+faster than the declared rate, so recordings play back in real time
+"""
+
+import queue
+import threading
+import time
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+
+class FrameEncoder:
+    """
+    Constant-FPS video encoder fed from a capture loop
+
+    submit() never blocks the caller: when the queue is full the frame is
+    dropped and counted. The encoder maps timestamped frames onto output
+    slots spaced 1/fps apart (sample and hold).
+    """
+
+    def __init__(self, filename, fps, frame_size, fourcc='mp4v', queue_size=64, on_first_frame=None, writer=None):
+        """
+        Args:
+            filename: Output video path
+            fps: Output frame rate declared to the container
+            frame_size: (width, height); frames are resized on the encoder thread
+            fourcc: Codec FourCC
+            queue_size: Frames buffered between capture and encoder
+            on_first_frame: Optional callback(writer, timestamp) run on the
+                encoder thread before the first frame (e.g. pre-trigger prefix)
+            writer: Optional pre-built writer with the cv2.VideoWriter interface
+                (e.g. SegmentedVideoWriter); filename/fourcc are then unused
+        """
+        self.filename = filename
+        self.fps = float(fps)
+        self.frame_size = tuple(frame_size)
+        self.fourcc = fourcc
+        self.on_first_frame = on_first_frame
+
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.writer = writer
+        self.thread = None
+        self.running = False
+
+        self.stats = {
+            'captured': 0,
+            'dropped_queue': 0,
+            'written': 0,
+            'duplicated': 0,
+            'dropped_rate': 0,
+            'prefix_frames': 0,
+            'first_capture': None,
+            'last_capture': None,
+            'encode_seconds': 0.0
+        }
+
+    def start(self):
+        """Open the writer and start the encoder thread"""
+        if not CV2_AVAILABLE:
+            return False
+
+        if self.writer is None:
+            self.writer = cv2.VideoWriter(self.filename, cv2.VideoWriter_fourcc(*self.fourcc),
+                                          self.fps, self.frame_size)
+        if not self.writer.isOpened():
+            self.writer = None
+            return False
+
+        self.running = True
+        self.thread = threading.Thread(target=self._encode_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def submit(self, frame, timestamp=None):
+        """Hand a captured frame to the encoder; returns False if it was dropped"""
+        timestamp = timestamp or time.time()
+        self.stats['captured'] += 1
+        if self.stats['first_capture'] is None:
+            self.stats['first_capture'] = timestamp
+        self.stats['last_capture'] = timestamp
+
+        try:
+            self.frames.put_nowait((frame, timestamp))
+            return True
+        except queue.Full:
+            self.stats['dropped_queue'] += 1
+            return False
+
+    def _write(self, frame, slot_time):
+        encode_start = time.perf_counter()
+        if getattr(self.writer, 'timestamped', False):
+            self.writer.write(frame, slot_time)
+        else:
+            self.writer.write(frame)
+        self.stats['encode_seconds'] += time.perf_counter() - encode_start
+        self.stats['written'] += 1
+
+    def _encode_loop(self):
+        """Map incoming frames onto constant-rate output slots"""
+        step = 1.0 / self.fps
+        next_slot = None
+        last_frame = None
+
+        while self.running or not self.frames.empty():
+            try:
+                frame, timestamp = self.frames.get(timeout=0.2)
+            except queue.Empty:
+                continue
+
+            if frame.shape[1] != self.frame_size[0] or frame.shape[0] != self.frame_size[1]:
+                frame = cv2.resize(frame, self.frame_size)
+
+            if next_slot is None:
+                if self.on_first_frame:
+                    try:
+                        prefix = self.on_first_frame(self.writer, timestamp)
+                        self.stats['prefix_frames'] = (prefix or {}).get('frames_written', 0)
+                    except Exception as e:
+                        print(f"Encoder prefix error: {e}")
+                next_slot = timestamp
+
+            # Slots that passed before this frame arrived repeat the previous frame
+            while last_frame is not None and next_slot + step / 2 <= timestamp:
+                self._write(last_frame, next_slot)
+                self.stats['duplicated'] += 1
+                next_slot += step
+
+            if next_slot - step / 2 <= timestamp:
+                self._write(frame, next_slot)
+                next_slot += step
+            else:
+                # Arrived faster than the output rate: slot already filled
+                self.stats['dropped_rate'] += 1
+            last_frame = frame
+
+    def stop(self):
+        """Drain the queue, finish the file and return the final stats"""
+        if self.thread:
+            self.running = False
+            self.thread.join()
+            self.thread = None
+        if self.writer:
+            self.writer.release()
+            self.writer = None
+        return self.get_stats()
+
+    def get_stats(self):
+        """Capture FPS, encode FPS and drop counts"""
+        stats = dict(self.stats)
+        span = (stats['last_capture'] - stats['first_capture']) if stats['first_capture'] else 0
+        stats['capture_fps'] = (stats['captured'] - 1) / span if span > 0 else 0.0
+        stats['encode_fps'] = stats['written'] / stats['encode_seconds'] if stats['encode_seconds'] else 0.0
+        stats['output_fps'] = self.fps
+        stats['queued'] = self.frames.qsize()
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from core.camera_service import camera_service
+
+    subscription = camera_service.subscribe("encoder_test")
+    if not subscription.isOpened():
+        print("❌ No camera available for testing")
+    else:
+        width = int(subscription.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(subscription.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        encoder = FrameEncoder("encoder_test.mp4", 20, (width, height))
+        encoder.start()
+
+        start = time.time()
+        while time.time() - start < 5:
+            ret, frame, timestamp = subscription.read_with_timestamp()
+            if ret:
+                encoder.submit(frame, timestamp)
+
+        subscription.release()
+        stats = encoder.stop()
+        print(f"✅ capture {stats['capture_fps']:.1f} FPS, encode {stats['encode_fps']:.1f} FPS, "
+              f"{stats['written']} written ({stats['duplicated']} dup, {stats['dropped_rate']} over-rate, "
+              f"{stats['dropped_queue']} queue drops)")
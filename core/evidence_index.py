@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Evidence Index
+SQLite catalogue of every evidence file, updated when the file is written
+- Records path, size, timestamps, incident id, media type and SHA-256
+- Listing, byte totals and cleanup are indexed queries, not directory scans
+- Directories written before the index existed are scanned once on first use
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+MEDIA_TYPES = {
+    '.jpg': 'snapshot', '.jpeg': 'snapshot', '.png': 'snapshot',
+    '.wav': 'audio', '.mp3': 'audio', '.m4a': 'audio',
+    '.mp4': 'video', '.avi': 'video', '.mkv': 'video',
+    '.json': 'manifest'
+}
+
+DEFAULT_EVIDENCE_DIRS = ["evidence", "data/evidence"]
+
+# Incident priorities, most important first; evidence without one is 'unclassified'
+INCIDENT_PRIORITIES = ('confirmed', 'auto_confirmed', 'unclassified', 'test', 'false_alarm')
+
+# Files that are still being written or are derived artifacts
+SKIP_SUFFIXES = ('.part.avi', '.part.mp4', '.part.wav', '.part.jpg', '.part.avi.enc', '.part.wav.enc',
+                 '.tmp', '.distress.npz')
+
+
+def media_kind(path):
+    """Media class of a file from its extension (encrypted files by their inner extension)"""
+    if path.endswith('.enc'):
+        path = path[:-4]
+    return MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), 'other')
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Streaming SHA-256 of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class EvidenceIndex:
+    """
+    Evidence file catalogue
+    Writers call record() once a file is closed; readers query the table
+    The database is created on first use, not when the module is imported
+    """
+
+    def __init__(self, db_path="data/evidence_index.db"):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.init_lock = threading.Lock()
+        self.initialized = False
+        self.scanned_dirs = set()
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _db(self):
+        if not self.initialized:
+            self.init_database()
+        return self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Create the evidence, incident and scanned-directory tables (once; on first use by default)"""
+        with self.init_lock:
+            if self.initialized:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS evidence (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT UNIQUE NOT NULL,
+                    directory TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    media_type TEXT NOT NULL,
+                    incident_id TEXT,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT,
+                    created_at REAL NOT NULL,
+                    modified_at REAL NOT NULL,
+                    indexed_at REAL NOT NULL,
+                    variant TEXT DEFAULT 'original',
+                    source_path TEXT
+                )
+            ''')
+            # Older indexes lack the proxy columns
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(evidence)')]
+            if 'variant' not in columns:
+                conn.execute("ALTER TABLE evidence ADD COLUMN variant TEXT DEFAULT 'original'")
+            if 'source_path' not in columns:
+                conn.execute("ALTER TABLE evidence ADD COLUMN source_path TEXT")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_dir_created ON evidence (directory, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_type_created ON evidence (media_type, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_incident ON evidence (incident_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_evidence_source ON evidence (source_path)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS incidents (
+                    incident_id TEXT PRIMARY KEY,
+                    priority TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS scanned_dirs (
+                    directory TEXT PRIMARY KEY,
+                    scanned_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            self.scanned_dirs = {row[0] for row in conn.execute('SELECT directory FROM scanned_dirs')}
+            conn.close()
+            self.initialized = True
+
+    def record(self, path, incident_id=None, media_type=None, sha256=None, created_at=None, variant='original',
+               source_path=None):
+        """
+        Add or refresh a closed evidence file (one stat, one streaming hash)
+
+        Args:
+            path: Evidence file that will not be written again
+            incident_id: Incident/session the file belongs to
+            media_type: 'snapshot', 'audio', 'video', ... (default: from extension)
+            sha256: Known hash (e.g. from a segment manifest), else computed
+            created_at: Capture time (default: file mtime)
+            variant: 'original' or the kind of downsampled proxy
+            source_path: Original a proxy was made from
+
+        Returns:
+            dict row, or None if the file does not exist
+        """
+        try:
+            st = os.stat(path)
+            sha256 = sha256 or file_sha256(path)
+        except OSError as e:
+            self.logger.error(f"Cannot index {path}: {e}")
+            return None
+
+        path = os.path.abspath(path)
+        row = {
+            'path': path,
+            'directory': os.path.dirname(path),
+            'filename': os.path.basename(path),
+            'media_type': media_type or media_kind(path),
+            'incident_id': incident_id,
+            'size': st.st_size,
+            'sha256': sha256,
+            'created_at': created_at or st.st_mtime,
+            'modified_at': st.st_mtime,
+            'indexed_at': time.time(),
+            'variant': variant,
+            'source_path': os.path.abspath(source_path) if source_path else None
+        }
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        with self.lock:
+            conn = self._db()
+            # Keep the incident id of an earlier record when re-indexing without one
+            if incident_id is None:
+                existing = conn.execute('SELECT incident_id FROM evidence WHERE path = ?', (path,)).fetchone()
+                if existing:
+                    row['incident_id'] = existing[0]
+            conn.execute(f'INSERT OR REPLACE INTO evidence ({columns}) VALUES ({placeholders})',
+                         list(row.values()))
+            conn.commit()
+            conn.close()
+        return row
+
+    def set_incident_priority(self, incident_id, priority):
+        """Classify an incident (confirmed, auto_confirmed, test, false_alarm)"""
+        if priority not in INCIDENT_PRIORITIES:
+            raise ValueError(f"Unknown incident priority: {priority}")
+        with self.lock:
+            conn = self._db()
+            conn.execute('INSERT OR REPLACE INTO incidents (incident_id, priority, updated_at) VALUES (?, ?, ?)',
+                         (incident_id, priority, time.time()))
+            conn.commit()
+            conn.close()
+
+    def get_incident_priority(self, incident_id):
+        with self.lock:
+            conn = self._db()
+            row = conn.execute('SELECT priority FROM incidents WHERE incident_id = ?', (incident_id,)).fetchone()
+            conn.close()
+        return row[0] if row else 'unclassified'
+
+    def get(self, path):
+        """Index row for a path, or None"""
+        with self.lock:
+            conn = self._db()
+            row = conn.execute('SELECT * FROM evidence WHERE path = ?', (os.path.abspath(path),)).fetchone()
+            conn.close()
+        return dict(row) if row else None
+
+    def proxies_for(self, path):
+        """Proxy rows generated from an original, smallest first"""
+        with self.lock:
+            conn = self._db()
+            rows = conn.execute('SELECT * FROM evidence WHERE source_path = ? ORDER BY size',
+                                (os.path.abspath(path),)).fetchall()
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def forget(self, path):
+        """Drop a path from the index (file left untouched)"""
+        with self.lock:
+            conn = self._db()
+            conn.execute('DELETE FROM evidence WHERE path = ?', (os.path.abspath(path),))
+            conn.commit()
+            conn.close()
+
+    def delete(self, path):
+        """
+        Delete an evidence file and its index row
+
+        Returns:
+            bytes freed (0 if the file was already gone)
+        """
+        row = self.get(path)
+        freed = 0
+        try:
+            os.remove(path)
+            freed = row['size'] if row else 0
+        except FileNotFoundError:
+            pass
+        self.forget(path)
+        return freed
+
+    def ensure_scanned(self, directory):
+        """
+        One-time import of files written before the index existed
+        Uses a single os.scandir pass; later calls are free
+        """
+        directory = os.path.abspath(directory)
+        if not self.initialized:
+            # scanned_dirs is loaded with the database
+            self.init_database()
+        if directory in self.scanned_dirs:
+            return 0
+        if not os.path.isdir(directory):
+            return 0
+
+        added = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.endswith(SKIP_SUFFIXES):
+                    continue
+                if self.get(entry.path) is None and self.record(entry.path):
+                    added += 1
+
+        with self.lock:
+            conn = self._db()
+            conn.execute('INSERT OR REPLACE INTO scanned_dirs (directory, scanned_at) VALUES (?, ?)',
+                         (directory, time.time()))
+            conn.commit()
+            conn.close()
+        self.scanned_dirs.add(directory)
+        if added:
+            self.logger.info(f"Indexed {added} existing evidence files in {directory}")
+        return added
+
+    def _where(self, directory=None, media_type=None, incident_id=None, before=None, since=None):
+        clauses, params = [], []
+        if directory:
+            self.ensure_scanned(directory)
+            clauses.append('directory = ?')
+            params.append(os.path.abspath(directory))
+        if media_type:
+            clauses.append('media_type = ?')
+            params.append(media_type)
+        if incident_id:
+            clauses.append('incident_id = ?')
+            params.append(incident_id)
+        if before is not None:
+            clauses.append('created_at < ?')
+            params.append(before)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def list_files(self, directory=None, media_type=None, incident_id=None, since=None, limit=None,
+                   newest_first=True):
+        """
+        Evidence rows matching the filters
+
+        Returns:
+            list of dicts (path, filename, media_type, incident_id, size, sha256, created_at, ...)
+        """
+        where, params = self._where(directory, media_type, incident_id, since=since)
+        query = f"SELECT * FROM evidence{where} ORDER BY created_at {'DESC' if newest_first else 'ASC'}"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        with self.lock:
+            conn = self._db()
+            rows = conn.execute(query, params).fetchall()
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def total_bytes(self, directory=None, media_type=None, incident_id=None):
+        """Sum of indexed file sizes matching the filters"""
+        where, params = self._where(directory, media_type, incident_id)
+        with self.lock:
+            conn = self._db()
+            total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM evidence{where}", params).fetchone()[0]
+            conn.close()
+        return total
+
+    def usage(self, directory=None):
+        """Bytes and file counts per media type"""
+        where, params = self._where(directory)
+        with self.lock:
+            conn = self._db()
+            rows = conn.execute(f'''
+                SELECT media_type, COUNT(*), COALESCE(SUM(size), 0) FROM evidence{where} GROUP BY media_type
+            ''', params).fetchall()
+            conn.close()
+        return {row[0]: {'files': row[1], 'bytes': row[2]} for row in rows}
+
+    def retention_rows(self, directory=None):
+        """All rows with their incident priority, oldest first (for retention passes)"""
+        where, params = self._where(directory)
+        with self.lock:
+            conn = self._db()
+            rows = conn.execute(f'''
+                SELECT evidence.*, COALESCE(incidents.priority, 'unclassified') AS priority
+                FROM evidence LEFT JOIN incidents USING (incident_id){where}
+                ORDER BY created_at
+            ''', params).fetchall()
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def cleanup_candidates(self, directory=None, max_age_hours=None, max_files=None, max_bytes=None):
+        """
+        Paths to delete so that the remaining files are newer than max_age_hours,
+        at most max_files and at most max_bytes in total (oldest go first)
+        """
+        where, params = self._where(directory)
+        with self.lock:
+            conn = self._db()
+            rows = conn.execute(f"SELECT path, size, created_at FROM evidence{where} ORDER BY created_at DESC",
+                                params).fetchall()
+            conn.close()
+
+        cutoff = time.time() - max_age_hours * 3600 if max_age_hours is not None else None
+        kept_bytes = 0
+        candidates = []
+        for position, (path, size, created_at) in enumerate(rows):
+            too_old = cutoff is not None and created_at < cutoff
+            too_many = max_files is not None and position >= max_files
+            too_big = max_bytes is not None and kept_bytes + size > max_bytes
+            if too_old or too_many or too_big:
+                candidates.append(path)
+            else:
+                kept_bytes += size
+        return candidates
+
+    def cleanup(self, directory=None, max_age_hours=None, max_files=None, max_bytes=None):
+        """
+        Delete evidence outside the age/count/byte limits
+
+        Returns:
+            dict with files_removed and bytes_freed
+        """
+        removed, freed = 0, 0
+        for path in self.cleanup_candidates(directory, max_age_hours, max_files, max_bytes):
+            try:
+                freed += self.delete(path)
+                removed += 1
+                self.logger.info(f"Removed old evidence: {os.path.basename(path)}")
+            except Exception as e:
+                self.logger.error(f"Failed to remove {path}: {e}")
+        return {'files_removed': removed, 'bytes_freed': freed}
+
+
+# Global instance (the database file appears on first use)
+evidence_index = EvidenceIndex()
+
+
+# Example usage
+if __name__ == "__main__":
+    for evidence_dir in DEFAULT_EVIDENCE_DIRS:
+        evidence_index.ensure_scanned(evidence_dir)
+        print(f"📁 {evidence_dir}: {evidence_index.usage(evidence_dir)}")
+    for row in evidence_index.list_files(limit=10):
+        print(f"  {row['filename']} ({row['media_type']}, {row['size']} bytes, incident {row['incident_id']})")
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Evidence Proxies
+Smaller stand-ins for evidence files: reduced-FPS, downscaled video,
+contact sheets of video keyframes, re-encoded low-resolution snapshots
+and narrowband (optionally G.711 mu-law) audio. Proxies are written
+under a temporary name and atomically moved into place.
+
+ProxyTranscoder builds proxies for new evidence on a low-priority worker
+pool; during live capture it keeps running, one job at a time, so proxies
+of closed segments are ready while recording continues. The upload queue
+sends an original's proxies before the original (delivery_order).
+
+Proxies of encrypted originals (".enc") are encrypted as well. Audio and
+snapshots are decoded straight from the chunked decryptor; video is
+decrypted to a private temp file for the job, as OpenCV only opens paths.
+"""
+
+import multiprocessing
+import os
+import queue
+import struct
+import threading
+import time
+import wave
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+import core.evidence_crypto as evidence_crypto
+from core.evidence_index import evidence_index, media_kind
+from core.evidence_segments import finalize_segment
+
+try:
+    from core.camera_service import camera_service
+    CAMERA_SERVICE_AVAILABLE = True
+except ImportError:
+    CAMERA_SERVICE_AVAILABLE = False
+
+try:
+    from core.evidence_uploader import evidence_uploader, PRIORITIES
+    UPLOADER_AVAILABLE = True
+except ImportError:
+    UPLOADER_AVAILABLE = False
+
+
+def _init_worker(cipher=None):
+    """Pool initializer: lowest CPU priority, single-threaded OpenCV"""
+    evidence_crypto.evidence_cipher = cipher
+    if hasattr(os, 'nice'):
+        # Capture and encoding threads always win the CPU over transcoding
+        os.nice(19)
+    if CV2_AVAILABLE:
+        cv2.setNumThreads(1)
+
+
+def proxy_path(path, suffix, extension=None):
+    """<stem>_<suffix><ext> next to the original (.enc kept for encrypted originals)"""
+    stem, original_ext = os.path.splitext(evidence_crypto.strip_encrypted_suffix(path))
+    target = f"{stem}_{suffix}{extension or original_ext}"
+    return target + evidence_crypto.ENCRYPTED_SUFFIX if evidence_crypto.is_encrypted(path) else target
+
+
+def _temp_path(final_path):
+    # Plaintext work file; OpenCV picks the container from the extension
+    if evidence_crypto.is_encrypted(final_path):
+        # Never next to the evidence: encrypted into place by finalize_segment
+        return evidence_crypto.plaintext_path(final_path)
+    stem, extension = os.path.splitext(evidence_crypto.strip_encrypted_suffix(final_path))
+    return stem + ".part" + extension
+
+
+def _output_cipher(dst, cipher=None):
+    """Cipher for a proxy that is stored encrypted, else None"""
+    return evidence_crypto.resolve_cipher(cipher) if evidence_crypto.is_encrypted(dst) else None
+
+
+def downsample_video(src, dst, fps=1.0, max_width=320, fourcc='mp4v', cipher=None):
+    """
+    Re-encode a video at a low frame rate and width
+    Frames between samples are skipped with grab() (no decode)
+
+    Returns:
+        dict with frames_written and bytes_read/bytes_written, or None on failure
+    """
+    if not CV2_AVAILABLE:
+        return None
+    if evidence_crypto.is_encrypted(src):
+        with evidence_crypto.decrypted_copy(src, cipher) as plain:
+            return downsample_video(plain, dst, fps, max_width, fourcc, cipher)
+
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        return None
+
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    scale = min(1.0, float(max_width) / width) if width else 1.0
+    size = (max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2))
+    step = max(1, int(round(source_fps / fps)))
+
+    part = _temp_path(dst)
+    writer = cv2.VideoWriter(part, cv2.VideoWriter_fourcc(*fourcc), source_fps / step, size)
+    if not writer.isOpened():
+        cap.release()
+        return None
+
+    index = 0
+    written = 0
+    try:
+        while cap.grab():
+            if index % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+                    written += 1
+            index += 1
+    except Exception:
+        writer.release()
+        os.remove(part)
+        raise
+    finally:
+        cap.release()
+        writer.release()
+
+    if written == 0:
+        os.remove(part)
+        return None
+
+    _, size_written = finalize_segment(part, dst, _output_cipher(dst, cipher))
+    return {'frames_written': written, 'fps': source_fps / step, 'frame_size': size,
+            'bytes_read': os.path.getsize(src), 'bytes_written': size_written}
+
+
+def make_contact_sheet(src, dst, columns=4, rows=3, thumb_width=160, quality=70, cipher=None):
+    """
+    Grid of evenly spaced frames from a video, each labelled with its time
+
+    Returns:
+        dict with thumbnails and bytes_read/bytes_written, or None on failure
+    """
+    if not (CV2_AVAILABLE and NUMPY_AVAILABLE):
+        return None
+    if evidence_crypto.is_encrypted(src):
+        with evidence_crypto.decrypted_copy(src, cipher) as plain:
+            return make_contact_sheet(plain, dst, columns, rows, thumb_width, quality, cipher)
+
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        return None
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 0
+    count = columns * rows
+    step = max(1, total // count) if total else int(fps)
+
+    thumbs = []
+    index = 0
+    try:
+        while len(thumbs) < count and cap.grab():
+            if index % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    scale = float(thumb_width) / frame.shape[1]
+                    thumb = cv2.resize(frame, (thumb_width, int(frame.shape[0] * scale)),
+                                       interpolation=cv2.INTER_AREA)
+                    cv2.putText(thumb, f"{index / fps:.1f}s", (4, thumb.shape[0] - 6),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+                    thumbs.append(thumb)
+            index += 1
+    finally:
+        cap.release()
+
+    if not thumbs:
+        return None
+
+    blank = np.zeros_like(thumbs[0])
+    thumbs += [blank] * (-len(thumbs) % columns)
+    sheet = np.vstack([np.hstack(thumbs[i:i + columns]) for i in range(0, len(thumbs), columns)])
+
+    ok, jpeg = cv2.imencode('.jpg', sheet, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        return None
+    part = _temp_path(dst)
+    with open(part, 'wb') as f:
+        f.write(jpeg.tobytes())
+    _, size_written = finalize_segment(part, dst, _output_cipher(dst, cipher))
+    return {'thumbnails': len(thumbs), 'bytes_read': os.path.getsize(src), 'bytes_written': size_written}
+
+
+def downsample_image(src, dst, max_width=640, quality=60, cipher=None):
+    """
+    Re-encode a snapshot as a smaller, lower-quality JPEG
+
+    Returns:
+        dict with bytes_read/bytes_written, or None on failure
+    """
+    if not CV2_AVAILABLE:
+        return None
+
+    if evidence_crypto.is_encrypted(src):
+        with evidence_crypto.open_evidence(src, cipher) as f:
+            image = cv2.imdecode(np.frombuffer(f.read(), dtype=np.uint8), cv2.IMREAD_COLOR)
+    else:
+        image = cv2.imread(src)
+    if image is None:
+        return None
+
+    if image.shape[1] > max_width:
+        scale = float(max_width) / image.shape[1]
+        image = cv2.resize(image, (max_width, int(image.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+
+    ok, jpeg = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    if not ok:
+        return None
+
+    part = _temp_path(dst)
+    with open(part, 'wb') as f:
+        f.write(jpeg.tobytes())
+    _, size_written = finalize_segment(part, dst, _output_cipher(dst, cipher))
+    return {'bytes_read': os.path.getsize(src), 'bytes_written': size_written}
+
+
+def _mulaw_encode(samples):
+    """G.711 mu-law encode int16 samples (one byte per sample)"""
+    s = samples.astype(np.int32)
+    sign = (s < 0).astype(np.int32) << 7
+    magnitude = np.minimum(np.abs(s), 32635) + 0x84
+    exponent = np.clip(np.floor(np.log2(magnitude)).astype(np.int32) - 7, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def _write_mulaw_wav(path, data, rate):
+    """WAV container for mu-law audio (format tag 7), which the wave module cannot write"""
+    fmt = struct.pack('<HHIIHHH', 7, 1, rate, rate, 1, 8, 0)
+    fact = struct.pack('<I', len(data))
+    padding = b'\x00' if len(data) % 2 else b''
+    with open(path, 'wb') as f:
+        f.write(b'RIFF' + struct.pack('<I', 4 + 8 + len(fmt) + 8 + len(fact) + 8 + len(data) + len(padding)))
+        f.write(b'WAVE')
+        f.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+        f.write(b'fact' + struct.pack('<I', len(fact)) + fact)
+        f.write(b'data' + struct.pack('<I', len(data)) + data + padding)
+
+
+def downsample_audio(src, dst, rate=8000, mulaw=False, cipher=None):
+    """
+    Convert a 16-bit WAV to mono narrowband audio (speech stays intelligible)
+    With mulaw=True samples are G.711 mu-law coded: half the size again
+
+    Returns:
+        dict with bytes_read/bytes_written, or None on failure
+    """
+    if not NUMPY_AVAILABLE:
+        return None
+
+    with evidence_crypto.open_evidence(src, cipher) as f, wave.open(f, 'rb') as wf:
+        channels = wf.getnchannels()
+        source_rate = wf.getframerate()
+        if wf.getsampwidth() != 2:
+            return None
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    samples = samples.astype(np.float32)
+
+    if source_rate > rate:
+        # Box-filter then decimate: cheap anti-aliasing good enough for voice
+        factor = int(source_rate // rate)
+        usable = len(samples) // factor * factor
+        samples = samples[:usable].reshape(-1, factor).mean(axis=1)
+        rate = source_rate // factor
+    else:
+        rate = source_rate
+    pcm = np.clip(samples, -32768, 32767).astype(np.int16)
+
+    part = _temp_path(dst)
+    if mulaw:
+        _write_mulaw_wav(part, _mulaw_encode(pcm).tobytes(), int(rate))
+    else:
+        with wave.open(part, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(int(rate))
+            out.writeframes(pcm.tobytes())
+    _, size_written = finalize_segment(part, dst, _output_cipher(dst, cipher))
+    return {'bytes_read': os.path.getsize(src), 'bytes_written': size_written, 'rate': rate}
+
+
+def build_proxies(path, options):
+    """
+    Pool job: every proxy for one evidence file
+
+    Returns:
+        dict with source and proxies [(path, variant, media_type, result)]
+    """
+    kind = media_kind(path)
+    proxies = []
+    try:
+        if kind == 'video':
+            target = proxy_path(path, "lowres", ".mp4")
+            result = downsample_video(path, target, fps=options['video_fps'], max_width=options['video_width'])
+            if result:
+                proxies.append((target, 'lowres', 'video', result))
+            target = proxy_path(path, "sheet", ".jpg")
+            result = make_contact_sheet(path, target, options['sheet_columns'], options['sheet_rows'])
+            if result:
+                proxies.append((target, 'contact_sheet', 'snapshot', result))
+        elif kind == 'audio':
+            target = proxy_path(path, "lowres", ".wav")
+            result = downsample_audio(path, target, rate=options['audio_rate'], mulaw=True)
+            if result:
+                proxies.append((target, 'lowres', 'audio', result))
+        elif kind == 'snapshot':
+            target = proxy_path(path, "lowres", ".jpg")
+            result = downsample_image(path, target, max_width=options['image_width'], quality=50)
+            if result:
+                proxies.append((target, 'lowres', 'snapshot', result))
+        return {'source': path, 'proxies': proxies, 'error': None}
+    except Exception as e:
+        return {'source': path, 'proxies': proxies, 'error': str(e)}
+
+
+class ProxyTranscoder:
+    """
+    Background proxy pipeline
+    Jobs run on a lowest-priority (nice 19) process pool; while any of the
+    yield_to camera subscribers (live recording) is active, at most one job
+    runs at a time instead of one per worker
+    """
+
+    def __init__(self, workers=None, video_fps=5, video_width=320, image_width=480, audio_rate=8000,
+                 sheet_columns=4, sheet_rows=3, yield_to=("recorder", "live_stream")):
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.options = {
+            'video_fps': video_fps,
+            'video_width': video_width,
+            'image_width': image_width,
+            'audio_rate': audio_rate,
+            'sheet_columns': sheet_columns,
+            'sheet_rows': sheet_rows
+        }
+        self.yield_to = yield_to
+
+        self.jobs = queue.Queue()
+        self.pending = set()
+        self.in_flight = 0
+        self.pool = None
+        self.running = False
+        self.dispatch_thread = None
+        self.lock = threading.Lock()
+
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'proxies': 0,
+                      'bytes_in': 0, 'bytes_out': 0, 'throttled_checks': 0}
+
+    def submit(self, path, upload=True):
+        """Queue a closed original for proxy generation (duplicates are ignored)"""
+        path = os.path.abspath(path)
+        row = evidence_index.get(path)
+        if row and row['variant'] != 'original':
+            return False
+        with self.lock:
+            if path in self.pending or evidence_index.proxies_for(path):
+                return False
+            self.pending.add(path)
+        self.stats['submitted'] += 1
+        self.jobs.put((path, upload))
+        self.start()
+        return True
+
+    def start(self):
+        """Create the pool and dispatcher on first use"""
+        if self.running:
+            return True
+        if not CV2_AVAILABLE and not NUMPY_AVAILABLE:
+            return False
+        self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                         initargs=(evidence_crypto.evidence_cipher,))
+        self.running = True
+        self.dispatch_thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.dispatch_thread.start()
+        return True
+
+    def _capture_active(self):
+        return CAMERA_SERVICE_AVAILABLE and camera_service.has_subscriber(*self.yield_to)
+
+    def _dispatch_loop(self):
+        while self.running:
+            try:
+                path, upload = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # During live capture one niced job at a time: proxies of closed
+            # segments keep coming without competing with the recorder
+            while self.running and self._capture_active() and self.in_flight > 0:
+                self.stats['throttled_checks'] += 1
+                time.sleep(0.2)
+
+            with self.lock:
+                self.in_flight += 1
+            self.pool.apply_async(build_proxies, (path, self.options),
+                                  callback=lambda result, upload=upload: self._on_done(result, upload),
+                                  error_callback=lambda e, path=path: self._on_done(
+                                      {'source': path, 'proxies': [], 'error': str(e)}, False))
+
+    def _upload_priority(self, source):
+        """
+        Upload priority for proxies of `source`: ahead of the original
+        (PRIORITIES['proxy'], or below a snapshot original), None once the
+        original has been uploaded and the proxy no longer saves anything
+        """
+        original = evidence_uploader.get_upload(source)
+        if original is None:
+            return PRIORITIES['proxy']
+        if original['status'] == 'done':
+            return None
+        return min(PRIORITIES['proxy'], original['priority'] - 1)
+
+    def _on_done(self, result, upload):
+        """Register proxies in the index and queue them ahead of the original"""
+        source = result['source']
+        row = evidence_index.get(source) or {}
+        priority = self._upload_priority(source) if upload and UPLOADER_AVAILABLE else None
+        for proxy, variant, media_type, info in result['proxies']:
+            evidence_index.record(proxy, incident_id=row.get('incident_id'), media_type=media_type,
+                                  created_at=row.get('created_at'), variant=variant, source_path=source)
+            self.stats['proxies'] += 1
+            self.stats['bytes_out'] += info['bytes_written']
+            if priority is not None:
+                evidence_uploader.enqueue(proxy, kind=media_type, priority=priority)
+        if result['proxies']:
+            self.stats['bytes_in'] += result['proxies'][0][3]['bytes_read']
+
+        if result['error']:
+            self.stats['failed'] += 1
+            print(f"Proxy error for {os.path.basename(source)}: {result['error']}")
+        else:
+            self.stats['completed'] += 1
+        with self.lock:
+            self.pending.discard(source)
+            self.in_flight -= 1
+
+    def stop(self):
+        self.running = False
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['queued'] = self.jobs.qsize()
+        stats['in_progress'] = len(self.pending)
+        stats['capture_active'] = self._capture_active()
+        return stats
+
+
+def delivery_order(paths):
+    """
+    Order evidence for a slow link: every proxy first (smallest first),
+    then the originals; the upload queue uses it before sending an original
+
+    Returns:
+        list of paths
+    """
+    proxies, originals = [], []
+    for path in paths:
+        proxies.extend(row['path'] for row in evidence_index.proxies_for(path) if os.path.exists(row['path']))
+        originals.append(path)
+    return proxies + originals
+
+
+# Global instance
+proxy_transcoder = ProxyTranscoder()
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m core.evidence_proxy <evidence file> [...]")
+        sys.exit(1)
+
+    for source in sys.argv[1:]:
+        result = build_proxies(source, proxy_transcoder.options)
+        for proxy, variant, _, info in result['proxies']:
+            print(f"✅ {variant}: {proxy} ({info['bytes_read'] / 1024:.0f} KB -> {info['bytes_written'] / 1024:.0f} KB)")
+        if result['error']:
+            print(f"❌ {result['error']}")
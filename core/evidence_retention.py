@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Evidence Retention
+Priority-tiered retention with byte quotas, driven by the evidence index
+- Evidence of confirmed incidents is kept; test and false-alarm evidence goes first
+- Old evidence is downsampled (low-FPS video, smaller snapshots,
+  narrowband audio) before anything is deleted; a proxy the transcoder
+  already built (_lowres) replaces the original without re-transcoding,
+  otherwise encrypted evidence is decrypted for the job and its
+  downsampled copy is stored encrypted
+- Runs incrementally in the background: each pass has a bounded I/O and
+  deletion budget, so it never competes with live capture for long
+"""
+
+import os
+import threading
+import time
+import logging
+
+from core.evidence_index import evidence_index, DEFAULT_EVIDENCE_DIRS, INCIDENT_PRIORITIES
+from core.evidence_proxy import downsample_audio, downsample_image, downsample_video, proxy_path
+
+try:
+    from core.evidence_uploader import evidence_uploader
+    UPLOADER_AVAILABLE = True
+except ImportError:
+    UPLOADER_AVAILABLE = False
+
+
+MB = 1024 * 1024
+
+# None means "no limit" / "never"
+RETENTION_DEFAULTS = {
+    'media_quota_mb': {'video': 2048, 'audio': 512, 'snapshot': 256, 'manifest': 16, 'other': 64},
+    'priority_quota_mb': {'confirmed': None, 'auto_confirmed': 2048, 'unclassified': 1024,
+                          'test': 64, 'false_alarm': 32},
+    'downsample_after_hours': {'confirmed': None, 'auto_confirmed': 72, 'unclassified': 24,
+                               'test': 1, 'false_alarm': 0},
+    'delete_after_hours': {'confirmed': None, 'auto_confirmed': None, 'unclassified': None,
+                           'test': 24, 'false_alarm': 24},
+    'max_io_mb_per_pass': 64,
+    'max_deletes_per_pass': 50,
+    'min_age_seconds': 600,
+    'pass_interval': 300
+}
+
+# Proxy written for each media type when the transcoder has not built one:
+# (variant, file suffix, extension, function)
+DOWNSAMPLERS = {
+    'video': ('keyframes', 'keyframes', '.mp4', downsample_video),
+    'snapshot': ('proxy', 'proxy', '.jpg', downsample_image),
+    'audio': ('narrowband', '8k', '.wav', downsample_audio)
+}
+
+
+def _tier(priority):
+    """Rank of an incident priority (0 = most important)"""
+    return INCIDENT_PRIORITIES.index(priority) if priority in INCIDENT_PRIORITIES else len(INCIDENT_PRIORITIES)
+
+
+class EvidenceRetention:
+    """
+    Incremental retention engine
+    Each pass: expire test/false-alarm evidence, downsample aged originals,
+    then delete least-important, oldest files until every quota is met
+    """
+
+    def __init__(self, settings=None, directory=None):
+        self.directory = directory
+        self.settings = {}
+        self.configure(settings)
+
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.unreducible = set()
+        self._pending_uploads = set()
+
+        self.stats = {'passes': 0, 'downsampled': 0, 'deleted': 0, 'bytes_freed': 0, 'io_bytes': 0}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def configure(self, settings=None):
+        """Merge user settings over the defaults (nested dicts merge per key)"""
+        merged = {}
+        for key, default in RETENTION_DEFAULTS.items():
+            value = (settings or {}).get(key)
+            if isinstance(default, dict):
+                merged[key] = dict(default)
+                merged[key].update(value or {})
+            else:
+                merged[key] = default if value is None else value
+        self.settings = merged
+
+    def _protected(self, row, now):
+        """Evidence that must not be touched right now"""
+        if now - row['created_at'] < self.settings['min_age_seconds']:
+            return True
+        # Never shrink or delete a file before its upload has finished
+        return UPLOADER_AVAILABLE and row['path'] in self._pending_uploads
+
+    def _delete(self, row, reason, budget):
+        if budget['deletes'] <= 0:
+            return False
+        freed = evidence_index.delete(row['path'])
+        budget['deletes'] -= 1
+        self.stats['deleted'] += 1
+        self.stats['bytes_freed'] += freed
+        self.logger.info(f"Retention removed {row['filename']} ({row['priority']}, {reason})")
+        return True
+
+    def _existing_proxy(self, row):
+        """Smallest proxy of the same media type already built for an original (index row or None)"""
+        for proxy in evidence_index.proxies_for(row['path']):
+            if proxy['media_type'] == row['media_type'] and proxy['size'] < row['size'] and \
+                    os.path.exists(proxy['path']):
+                return proxy
+        return None
+
+    def _downsample(self, row, budget):
+        """Replace an original with its proxy; returns the new row or None"""
+        existing = self._existing_proxy(row)
+        if existing:
+            # The transcoder already paid for it: only the original goes
+            evidence_index.delete(row['path'])
+            self.stats['downsampled'] += 1
+            self.stats['bytes_freed'] += row['size']
+            self.logger.info(f"Retention replaced {row['filename']} with its {existing['variant']} proxy: "
+                             f"{row['size'] / MB:.1f} MB -> {existing['size'] / MB:.1f} MB")
+            existing['priority'] = row['priority']
+            return existing
+
+        variant, suffix, extension, function = DOWNSAMPLERS[row['media_type']]
+        if budget['io'] <= 0:
+            return None
+
+        target = proxy_path(row['path'], suffix, extension)
+        try:
+            result = function(row['path'], target)
+        except Exception as e:
+            self.logger.error(f"Downsample failed for {row['filename']}: {e}")
+            result = None
+        if not result or result['bytes_written'] >= row['size']:
+            # Nothing gained (already small or not decodable): keep the original
+            if result:
+                os.remove(target)
+            self.unreducible.add(row['path'])
+            return None
+
+        io_bytes = result['bytes_read'] + result['bytes_written']
+        budget['io'] -= io_bytes
+        self.stats['io_bytes'] += io_bytes
+
+        proxy = evidence_index.record(target, incident_id=row['incident_id'], media_type=row['media_type'],
+                                      created_at=row['created_at'], variant=variant)
+        evidence_index.delete(row['path'])
+        self.stats['downsampled'] += 1
+        self.stats['bytes_freed'] += max(0, row['size'] - result['bytes_written'])
+        self.logger.info(f"Retention downsampled {row['filename']}: "
+                         f"{row['size'] / MB:.1f} MB -> {result['bytes_written'] / MB:.1f} MB")
+        proxy['priority'] = row['priority']
+        return proxy
+
+    def run_pass(self):
+        """
+        One bounded retention pass
+
+        Returns:
+            dict with deleted, downsampled, bytes_freed and over-quota groups left
+        """
+        now = time.time()
+        settings = self.settings
+        budget = {'io': settings['max_io_mb_per_pass'] * MB, 'deletes': settings['max_deletes_per_pass']}
+        self._pending_uploads = set(evidence_uploader.pending_paths()) if UPLOADER_AVAILABLE else set()
+        before = dict(self.stats)
+
+        rows, protected = [], []
+        for row in evidence_index.retention_rows(self.directory):
+            (protected if self._protected(row, now) else rows).append(row)
+        kept = []
+
+        # 1. Expire evidence whose tier has a maximum age
+        for row in rows:
+            max_hours = settings['delete_after_hours'].get(row['priority'])
+            if max_hours is not None and now - row['created_at'] > max_hours * 3600 and \
+                    self._delete(row, "expired", budget):
+                continue
+            kept.append(row)
+        rows = kept
+
+        # 2. Downsample aged originals (least important tiers first)
+        for i, row in sorted(enumerate(rows), key=lambda item: (-_tier(item[1]['priority']), item[1]['created_at'])):
+            after_hours = settings['downsample_after_hours'].get(row['priority'])
+            if after_hours is None or row['variant'] != 'original' or row['media_type'] not in DOWNSAMPLERS:
+                continue
+            if row['path'] in self.unreducible or now - row['created_at'] <= after_hours * 3600:
+                continue
+            if budget['io'] <= 0:
+                break
+            proxy = self._downsample(row, budget)
+            if proxy:
+                rows[i] = proxy
+        # A reused proxy was already listed on its own
+        rows = list({row['path']: row for row in rows}.values())
+
+        # 3. Quotas: least important tier first, oldest first within a tier
+        rows.sort(key=lambda row: (-_tier(row['priority']), row['created_at']))
+        over_quota = []
+        for field, quotas in (('priority', settings['priority_quota_mb']), ('media_type', settings['media_quota_mb'])):
+            for group, quota_mb in quotas.items():
+                if quota_mb is None:
+                    continue
+                # Protected files count against the quota but are not candidates
+                usage = sum(row['size'] for row in rows + protected if row[field] == group)
+                for row in list(rows):
+                    if usage <= quota_mb * MB:
+                        break
+                    if row[field] != group or (field == 'media_type' and row['priority'] == 'confirmed'):
+                        continue
+                    if not self._delete(row, f"{field} quota {group}", budget):
+                        break
+                    usage -= row['size']
+                    rows.remove(row)
+                if usage > quota_mb * MB:
+                    over_quota.append(group)
+
+        self.stats['passes'] += 1
+        result = {key: self.stats[key] - before[key] for key in ('deleted', 'downsampled', 'bytes_freed', 'io_bytes')}
+        result['over_quota'] = over_quota
+        return result
+
+    def scan_directories(self):
+        """Index files written before the evidence index existed (once per directory)"""
+        added = 0
+        for directory in ([self.directory] if self.directory else DEFAULT_EVIDENCE_DIRS):
+            added += evidence_index.ensure_scanned(directory)
+        return added
+
+    def _loop(self):
+        try:
+            added = self.scan_directories()
+            if added:
+                self.logger.info(f"Retention indexed {added} existing evidence files")
+        except Exception as e:
+            self.logger.error(f"Evidence scan error: {e}")
+        while self.running:
+            try:
+                result = self.run_pass()
+                if result['deleted'] or result['downsampled']:
+                    self.logger.info(f"Retention pass: {result}")
+                # More work left: continue soon instead of waiting a full interval
+                busy = result['deleted'] >= self.settings['max_deletes_per_pass'] or \
+                    result['io_bytes'] >= self.settings['max_io_mb_per_pass'] * MB
+            except Exception as e:
+                self.logger.error(f"Retention pass error: {e}")
+                busy = False
+            self.wakeup.wait(5 if busy else self.settings['pass_interval'])
+            self.wakeup.clear()
+
+    def start(self):
+        """Run passes in the background (no-op if already running)"""
+        if self.running:
+            return True
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        print("🗂️ Evidence retention started")
+        return True
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['usage'] = evidence_index.usage(self.directory)
+        return stats
+
+
+# Global instance
+evidence_retention = EvidenceRetention()
+
+
+def start_evidence_retention(settings=None):
+    """Configure the global engine from evidence settings and start it"""
+    if settings:
+        evidence_retention.configure(settings)
+    return evidence_retention.start()
+
+
+# Example usage
+if __name__ == "__main__":
+    evidence_retention.scan_directories()
+    print(f"📊 Before: {evidence_index.usage()}")
+    print(f"🗂️ Pass: {evidence_retention.run_pass()}")
+    print(f"📊 After: {evidence_index.usage()}")
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Segmented Evidence Recording
+Video and audio are written as fixed-duration, independently playable
+segments. Each segment is written under a temporary name, fsync'd and
+atomically renamed when it closes, so a finished segment never changes
+and a crash loses at most the segment in progress. A JSON manifest lists
+every closed segment with its time range, size and SHA-256 hash.
+With a cipher, no plaintext is written next to the evidence: audio
+segments are built in memory and video segments in the private
+plaintext directory, then stream-encrypted into place (".enc").
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import wave
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from core.evidence_crypto import ENCRYPTED_SUFFIX, encrypt_file, plaintext_path, write_encrypted_bytes
+
+
+def _fsync_dir(path):
+    """Persist a rename by syncing the containing directory (POSIX only)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def finalize_segment(part_path, final_path, cipher=None):
+    """
+    Flush a closed segment to disk and move it to its final name
+    With a cipher the plaintext (a path, or the bytes of an in-memory
+    segment) is encrypted chunk by chunk next to final_path and removed
+
+    Returns:
+        tuple (sha256 hex digest, size in bytes) of the stored file
+    """
+    if cipher is not None:
+        encrypted_part = final_path + ".part"
+        if isinstance(part_path, bytes):
+            write_encrypted_bytes(encrypted_part, part_path, cipher)
+        else:
+            encrypt_file(part_path, encrypted_part, cipher)
+        part_path = encrypted_part
+    digest = hashlib.sha256()
+    with open(part_path, 'rb+') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+        f.flush()
+        os.fsync(f.fileno())
+    size = os.path.getsize(part_path)
+    os.replace(part_path, final_path)
+    _fsync_dir(os.path.dirname(final_path))
+    return digest.hexdigest(), size
+
+
+class SegmentManifest:
+    """
+    Manifest of closed segments for one recording session
+    Rewritten atomically (temp file + fsync + rename) after every segment
+    """
+
+    def __init__(self, path, session=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {
+            'session': session or os.path.splitext(os.path.basename(path))[0],
+            'created': time.time(),
+            'segments': []
+        }
+
+    def add(self, entry):
+        with self.lock:
+            self.data['segments'].append(entry)
+            self._write()
+
+    def close(self):
+        with self.lock:
+            self.data['closed'] = time.time()
+            self._write()
+
+    def _write(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(self.path))
+
+
+class _SegmentedWriter:
+    """Shared rotation and bookkeeping for video and audio segment writers"""
+
+    # Writers accept a per-frame timestamp (plain cv2/wave writers do not)
+    timestamped = True
+
+    def __init__(self, kind, base_path, extension, units_per_segment, rate, manifest=None, on_segment=None,
+                 cipher=None):
+        self.kind = kind
+        self.base_path = base_path
+        self.extension = extension
+        self.units_per_segment = max(1, int(units_per_segment))
+        self.rate = float(rate)
+        self.manifest = manifest
+        self.on_segment = on_segment
+        self.cipher = cipher
+
+        self.index = 0
+        self.units = 0
+        self.segment_start = None
+        self.next_timestamp = None
+        self.closed_segments = []
+        self._plain_path = None
+
+    def _paths(self):
+        """
+        (work path, final path) of the current segment; with a cipher the
+        work file is in the private plaintext directory
+        """
+        stem = f"{self.base_path}_{self.kind}_{self.index:04d}"
+        if self.cipher is None:
+            return stem + ".part" + self.extension, stem + self.extension
+        if self._plain_path is None:
+            self._plain_path = plaintext_path(stem + self.extension)
+        return self._plain_path, stem + self.extension
+
+    def _segment_data(self, part_path):
+        """What finalize_segment stores: the work file (in-memory writers return bytes)"""
+        return part_path
+
+    def _advance(self, timestamp, units):
+        """Track the time range covered by the current segment"""
+        if timestamp is None:
+            timestamp = self.next_timestamp if self.next_timestamp is not None else time.time()
+        if self.segment_start is None:
+            self.segment_start = timestamp
+        self.units += units
+        self.next_timestamp = timestamp + units / self.rate
+
+    def _close_segment(self, final=False):
+        """Finalize the current segment and record it in the manifest"""
+        self._release_current()
+        part_path, final_path = self._paths()
+        self._plain_path = None
+        if self.units == 0:
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+            return None
+
+        if self.cipher is not None:
+            final_path += ENCRYPTED_SUFFIX
+        sha256, size = finalize_segment(self._segment_data(part_path), final_path, self.cipher)
+        entry = {
+            'kind': self.kind,
+            'index': self.index,
+            'file': os.path.basename(final_path),
+            'path': final_path,
+            'start': self.segment_start,
+            'end': self.next_timestamp,
+            'duration': self.units / self.rate,
+            'units': self.units,
+            'bytes': size,
+            'sha256': sha256,
+            'final': final,
+            'encrypted': self.cipher is not None
+        }
+        self.closed_segments.append(entry)
+        if self.manifest:
+            self.manifest.add(entry)
+        if self.on_segment:
+            self.on_segment(entry)
+
+        self.index += 1
+        self.units = 0
+        self.segment_start = None
+        return entry
+
+    def _rotate_if_full(self):
+        if self.units >= self.units_per_segment:
+            self._close_segment()
+
+    def release(self):
+        """Close the last (possibly short) segment"""
+        self._close_segment(final=True)
+
+
+class SegmentedVideoWriter(_SegmentedWriter):
+    """
+    Drop-in for cv2.VideoWriter that rolls over every segment_seconds
+    Each segment is a complete container that plays on its own
+    """
+
+    def __init__(self, base_path, fourcc, fps, frame_size, segment_seconds=10,
+                 extension=".avi", manifest=None, on_segment=None, cipher=None):
+        super().__init__('video', base_path, extension, fps * segment_seconds, fps, manifest, on_segment, cipher)
+        self.fourcc = fourcc
+        self.fps = fps
+        self.frame_size = tuple(frame_size)
+        self.writer = None
+        self._open_current()
+
+    def _open_current(self):
+        part_path, _ = self._paths()
+        self.writer = cv2.VideoWriter(part_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, self.frame_size)
+
+    def _release_current(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+
+    def isOpened(self):
+        return self.writer is not None and self.writer.isOpened()
+
+    def write(self, frame, timestamp=None):
+        if self.writer is None:
+            self._open_current()
+        self.writer.write(frame)
+        self._advance(timestamp, 1)
+        if self.units >= self.units_per_segment:
+            self._close_segment()
+            self._open_current()
+
+
+class SegmentedWaveWriter(_SegmentedWriter):
+    """
+    Drop-in for a wave writer that rolls over every segment_seconds
+    Each segment is a complete WAV file with a valid header; with a cipher
+    it is built in memory (10 s of 44.1 kHz mono is under 1 MB)
+    """
+
+    def __init__(self, base_path, channels, sampwidth, rate, segment_seconds=10,
+                 manifest=None, on_segment=None, cipher=None):
+        super().__init__('audio', base_path, ".wav", rate * segment_seconds, rate, manifest, on_segment, cipher)
+        self.channels = channels
+        self.sampwidth = sampwidth
+        self.frame_bytes = channels * sampwidth
+        self.wf = None
+        self.buffer = None
+
+    def _paths(self):
+        if self.cipher is None:
+            return super()._paths()
+        stem = f"{self.base_path}_{self.kind}_{self.index:04d}"
+        return None, stem + self.extension
+
+    def _segment_data(self, part_path):
+        return self.buffer.getvalue() if self.cipher is not None else part_path
+
+    def _open_current(self):
+        part_path, _ = self._paths()
+        if self.cipher is not None:
+            self.buffer = io.BytesIO()
+            part_path = self.buffer
+        self.wf = wave.open(part_path, 'wb')
+        self.wf.setnchannels(self.channels)
+        self.wf.setsampwidth(self.sampwidth)
+        self.wf.setframerate(int(self.rate))
+
+    def _release_current(self):
+        if self.wf is not None:
+            self.wf.close()
+            self.wf = None
+
+    def writeframes(self, data, timestamp=None):
+        """Write PCM, splitting it across segment boundaries"""
+        while data:
+            if self.wf is None:
+                self._open_current()
+            room = (self.units_per_segment - self.units) * self.frame_bytes
+            piece, data = data[:room], data[room:]
+            self.wf.writeframes(piece)
+            self._advance(timestamp, len(piece) // self.frame_bytes)
+            timestamp = None
+            self._rotate_if_full()
+
+    def close(self):
+        self.release()
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Evidence Transcription
+Batch offline transcription of recorded evidence audio using Vosk
+Splits WAV files at silence boundaries, recognizes the chunks across a
+process pool (one model per worker) and writes time-aligned JSONL
+transcripts with keyword hits next to the evidence
+Encrypted recordings (".wav.enc") are read through the chunked decryptor,
+so no plaintext audio touches the disk; their transcripts are encrypted too
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+import time
+import wave
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import vosk
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+import core.evidence_crypto as evidence_crypto
+
+DEFAULT_MODEL_PATH = os.path.join("data/vosk_models", "vosk-model-en-us-0.22")
+DEFAULT_EVIDENCE_DIRS = ["evidence", "data/evidence"]
+# Matches single recordings and segments (emergency_<ts>_audio_0000.wav)
+DEFAULT_PATTERN = "emergency_*audio_*.wav"
+TRANSCRIPT_SUFFIX = ".transcript.jsonl"
+
+# Same list the live offline recognizer listens for
+DEFAULT_KEYWORDS = ["help", "save me", "emergency", "police", "fire", "ambulance", "danger", "attack"]
+
+
+# Per-process state, set once by the pool initializer
+_worker_model = None
+_worker_keywords = []
+
+
+def _init_worker(model_path, keywords, cipher=None):
+    """Load the Vosk model once per worker process"""
+    global _worker_model, _worker_keywords
+    evidence_crypto.evidence_cipher = cipher
+    vosk.SetLogLevel(-1)
+    _worker_model = vosk.Model(model_path)
+    _worker_keywords = keywords
+
+
+def transcript_path(wav_path):
+    """Transcript name for a recording (encrypted recordings get an encrypted transcript)"""
+    path = evidence_crypto.strip_encrypted_suffix(wav_path) + TRANSCRIPT_SUFFIX
+    if evidence_crypto.is_encrypted(wav_path):
+        path += evidence_crypto.ENCRYPTED_SUFFIX
+    return path
+
+
+def find_keyword_hits(words, keywords):
+    """
+    Match (possibly multi-word) keywords against recognized words
+
+    Args:
+        words: List of Vosk word dicts with 'word', 'start' and 'end'
+        keywords: Keywords/phrases to look for
+
+    Returns:
+        list of dicts with keyword, start and end time
+    """
+    tokens = [w.get('word', '').lower() for w in words]
+    hits = []
+
+    for keyword in keywords:
+        parts = keyword.lower().split()
+        if not parts:
+            continue
+        span = len(parts)
+        for i in range(len(tokens) - span + 1):
+            if tokens[i:i + span] == parts:
+                hits.append({
+                    'keyword': keyword,
+                    'start': words[i]['start'],
+                    'end': words[i + span - 1]['end']
+                })
+
+    hits.sort(key=lambda h: h['start'])
+    return hits
+
+
+def find_silence_chunks(wav_path, frame_ms=30, silence_db=-40.0, min_silence_ms=400,
+                        max_chunk_seconds=30.0, min_chunk_seconds=0.5):
+    """
+    Split a WAV file into speech chunks at silence boundaries
+    Reads the file in blocks so long recordings are never fully loaded
+
+    Returns:
+        tuple (chunks, params) where chunks is a list of (start_frame, end_frame)
+        and params holds sample_rate, channels, sampwidth and total_frames
+    """
+    with evidence_crypto.open_evidence(wav_path) as f, wave.open(f, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        sampwidth = wf.getsampwidth()
+        total_frames = wf.getnframes()
+
+        if sampwidth != 2:
+            raise ValueError(f"Unsupported sample width {sampwidth} in {wav_path}")
+
+        window = max(1, int(sample_rate * frame_ms / 1000))
+        energies = []
+        block_windows = 1000
+
+        while True:
+            data = wf.readframes(window * block_windows)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+            if channels > 1:
+                samples = samples[:len(samples) - len(samples) % channels]
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            usable = len(samples) - len(samples) % window
+            if usable:
+                blocks = samples[:usable].reshape(-1, window)
+                energies.append(np.sqrt(np.mean(blocks ** 2, axis=1)))
+            if usable < len(samples):
+                tail = samples[usable:]
+                energies.append(np.array([np.sqrt(np.mean(tail ** 2))]))
+
+    params = {
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'sampwidth': sampwidth,
+        'total_frames': total_frames
+    }
+
+    if not energies:
+        return [], params
+
+    energy = np.concatenate(energies)
+    level_db = 20 * np.log10(energy / 32768.0 + 1e-10)
+    silent = level_db < silence_db
+
+    min_silence_windows = max(1, int(min_silence_ms / frame_ms))
+    max_chunk_windows = max(1, int(max_chunk_seconds * 1000 / frame_ms))
+    min_chunk_windows = max(1, int(min_chunk_seconds * 1000 / frame_ms))
+
+    # Cut points sit in the middle of every long-enough silent run
+    cuts = [0]
+    run_start = None
+    for i, is_silent in enumerate(silent):
+        if is_silent and run_start is None:
+            run_start = i
+        elif not is_silent and run_start is not None:
+            if i - run_start >= min_silence_windows:
+                cuts.append((run_start + i) // 2)
+            run_start = None
+    cuts.append(len(silent))
+
+    chunks = []
+    for start, end in zip(cuts[:-1], cuts[1:]):
+        # Break overlong speech at its quietest window
+        while end - start > max_chunk_windows:
+            search_from = start + max_chunk_windows // 2
+            split = search_from + int(np.argmin(energy[search_from:start + max_chunk_windows]))
+            chunks.append((start, split))
+            start = split
+        chunks.append((start, end))
+
+    frames = []
+    for start, end in chunks:
+        if end - start < min_chunk_windows or silent[start:end].all():
+            continue
+        frames.append((start * window, min(end * window, total_frames)))
+
+    return frames, params
+
+
+def _transcribe_chunk(job):
+    """
+    Recognize one chunk inside a pool worker
+    A failing chunk is reported with an 'error' instead of raising, so one
+    unreadable or undecodable chunk does not abort the rest of the batch
+    """
+    wav_path, start_frame, end_frame, params = job
+    cpu_start = time.process_time()
+
+    try:
+        segments = _recognize_chunk(wav_path, start_frame, end_frame, params)
+        error = None
+    except Exception as e:
+        segments = []
+        error = f"chunk {start_frame}-{end_frame}: {e}"
+
+    return {
+        'file': wav_path,
+        'segments': segments,
+        'error': error,
+        'audio_seconds': (end_frame - start_frame) / params['sample_rate'] if error is None else 0.0,
+        'cpu_seconds': time.process_time() - cpu_start
+    }
+
+
+def _recognize_chunk(wav_path, start_frame, end_frame, params):
+    """Decode and recognize frames [start_frame, end_frame) of one recording"""
+    with evidence_crypto.open_evidence(wav_path) as f, wave.open(f, 'rb') as wf:
+        wf.setpos(start_frame)
+        data = wf.readframes(end_frame - start_frame)
+
+    if params['channels'] > 1:
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, params['channels'])
+        data = samples.mean(axis=1).astype(np.int16).tobytes()
+
+    recognizer = vosk.KaldiRecognizer(_worker_model, params['sample_rate'])
+    recognizer.SetWords(True)
+
+    offset = start_frame / params['sample_rate']
+    results = []
+    step = 8000 * 2  # bytes per feed, ~0.2s at 44.1kHz mono
+
+    for pos in range(0, len(data), step):
+        if recognizer.AcceptWaveform(data[pos:pos + step]):
+            results.append(json.loads(recognizer.Result()))
+    results.append(json.loads(recognizer.FinalResult()))
+
+    segments = []
+    for result in results:
+        words = result.get('result', [])
+        text = result.get('text', '').strip()
+        if not text or not words:
+            continue
+
+        aligned = [{
+            'word': w['word'],
+            'start': round(w['start'] + offset, 3),
+            'end': round(w['end'] + offset, 3),
+            'conf': round(w.get('conf', 0.0), 3)
+        } for w in words]
+
+        hits = find_keyword_hits(aligned, _worker_keywords)
+        segments.append({
+            'start': aligned[0]['start'],
+            'end': aligned[-1]['end'],
+            'text': text,
+            'words': aligned,
+            'keywords': sorted({h['keyword'] for h in hits}),
+            'keyword_hits': hits
+        })
+
+    return segments
+
+
+class EvidenceTranscriber:
+    """
+    Batch transcription of evidence audio
+    Every worker process loads the Vosk model once and recognizes
+    silence-delimited chunks from any file in the batch
+    """
+
+    def __init__(self, model_path=None, keywords=None, workers=None):
+        self.model_path = model_path or DEFAULT_MODEL_PATH
+        self.workers = workers or os.cpu_count() or 1
+
+        if keywords is None:
+            keywords = list(DEFAULT_KEYWORDS)
+            try:
+                from core.custom_keyword_manager import keyword_manager
+                for keyword in keyword_manager.get_keywords():
+                    if keyword not in keywords:
+                        keywords.append(keyword)
+            except Exception as e:
+                print(f"Custom keywords unavailable for transcription: {e}")
+        self.keywords = keywords
+
+    def is_available(self):
+        """Check if batch transcription can run"""
+        return VOSK_AVAILABLE and NUMPY_AVAILABLE and os.path.exists(self.model_path)
+
+    def find_audio_files(self, evidence_dirs=None, pattern=DEFAULT_PATTERN, overwrite=False):
+        """List WAV evidence (plain or encrypted) that has no up-to-date transcript yet"""
+        files = []
+        for evidence_dir in evidence_dirs or DEFAULT_EVIDENCE_DIRS:
+            found = glob.glob(os.path.join(evidence_dir, pattern)) + \
+                glob.glob(os.path.join(evidence_dir, pattern + evidence_crypto.ENCRYPTED_SUFFIX))
+            for wav_path in sorted(found):
+                if evidence_crypto.strip_encrypted_suffix(wav_path).endswith(".part.wav"):
+                    continue  # segment still being written
+                transcript = transcript_path(wav_path)
+                if not overwrite and os.path.exists(transcript) and \
+                        os.path.getmtime(transcript) >= os.path.getmtime(wav_path):
+                    continue
+                files.append(wav_path)
+        return files
+
+    def transcribe(self, wav_files):
+        """
+        Transcribe a batch of WAV files
+
+        Returns:
+            dict with per-file transcript paths and throughput figures
+            (real-time factor overall and per core); files whose chunks
+            partly failed still get a transcript and are listed in 'errors'
+        """
+        if not self.is_available():
+            return {'error': f'Vosk, NumPy or model at {self.model_path} not available'}
+
+        wall_start = time.time()
+        jobs = []
+        chunk_counts = {}
+        errors = {}
+
+        for wav_path in wav_files:
+            try:
+                chunks, params = find_silence_chunks(wav_path)
+            except Exception as e:
+                errors[wav_path] = [str(e)]
+                continue
+            chunk_counts[wav_path] = len(chunks)
+            jobs.extend((wav_path, start, end, params) for start, end in chunks)
+
+        # Longest chunks first keeps the pool evenly loaded at the tail
+        jobs.sort(key=lambda job: job[2] - job[1], reverse=True)
+
+        segments = {path: [] for path in chunk_counts}
+        audio_seconds = 0.0
+        cpu_seconds = 0.0
+        failed_chunks = 0
+        workers = max(1, min(self.workers, len(jobs)))
+
+        if jobs:
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(self.model_path, self.keywords,
+                                                evidence_crypto.evidence_cipher)) as pool:
+                for result in pool.imap_unordered(_transcribe_chunk, jobs):
+                    if result['error']:
+                        # Keep the other chunks; the file's transcript is partial
+                        errors.setdefault(result['file'], []).append(result['error'])
+                        failed_chunks += 1
+                        continue
+                    segments[result['file']].extend(result['segments'])
+                    audio_seconds += result['audio_seconds']
+                    cpu_seconds += result['cpu_seconds']
+
+        transcripts = {}
+        for wav_path, file_segments in segments.items():
+            file_segments.sort(key=lambda s: s['start'])
+            transcripts[wav_path] = self._write_transcript(wav_path, file_segments)
+
+        wall_seconds = time.time() - wall_start
+        keyword_hits = sum(len(s['keyword_hits']) for f in segments.values() for s in f)
+
+        report = {
+            'files': len(transcripts),
+            'chunks': len(jobs),
+            'failed_chunks': failed_chunks,
+            'workers': workers,
+            'audio_seconds': audio_seconds,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            # Processing time per second of audio; < 1.0 is faster than real time
+            'rtf': wall_seconds / audio_seconds if audio_seconds else 0,
+            'rtf_per_core': cpu_seconds / audio_seconds if audio_seconds else 0,
+            'keyword_hits': keyword_hits,
+            'transcripts': transcripts,
+            'errors': errors
+        }
+
+        print(f"📝 Transcribed {report['files']} file(s), {report['chunks']} chunks, "
+              f"{audio_seconds:.1f}s audio in {wall_seconds:.1f}s "
+              f"(RTF {report['rtf']:.2f}, {report['rtf_per_core']:.2f}/core on {workers} workers)")
+        return report
+
+    def transcribe_directories(self, evidence_dirs=None, overwrite=False):
+        """Transcribe every pending evidence recording in the given directories"""
+        return self.transcribe(self.find_audio_files(evidence_dirs, overwrite=overwrite))
+
+    def _write_transcript(self, wav_path, segments):
+        """Write segments as JSONL next to the recording (atomic replace, encrypted for .enc audio)"""
+        path = transcript_path(wav_path)
+        source = os.path.basename(wav_path)
+        lines = "".join(json.dumps(dict(segment, file=source)) + "\n" for segment in segments)
+
+        if evidence_crypto.is_encrypted(wav_path):
+            evidence_crypto.write_encrypted_bytes(path, lines.encode('utf-8'),
+                                                  evidence_crypto.resolve_cipher())
+            return path
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(lines)
+        os.replace(tmp_path, path)
+        return path
+
+
+def transcribe_evidence(evidence_dirs=None, workers=None, overwrite=False):
+    """Convenience wrapper: transcribe all pending evidence audio"""
+    transcriber = EvidenceTranscriber(workers=workers)
+    return transcriber.transcribe_directories(evidence_dirs, overwrite=overwrite)
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    dirs = sys.argv[1:] or None
+    report = transcribe_evidence(dirs)
+
+    if report.get('error'):
+        print(f"❌ {report['error']}")
+    else:
+        for wav_path, transcript in report['transcripts'].items():
+            print(f"✅ {wav_path} -> {transcript}")
+        for wav_path, file_errors in report['errors'].items():
+            print(f"⚠️ {wav_path}: {'; '.join(file_errors)}")
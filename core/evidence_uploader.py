@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Evidence Upload Queue
+Persistent, prioritized and resumable upload of evidence files
+- Queue lives in SQLite, so pending uploads survive restarts and crashes
+- Files go up in chunks; an interrupted upload resumes at the server's offset
+- Snapshots go first, then low-bitrate proxies, then full audio and video;
+  a large upload
+  yields between chunks whenever something more important is waiting
+- Bandwidth is shaped with a token bucket, failures back off exponentially
+
+Protocol (see core/upload_standin_server.py for a local implementation):
+    POST /uploads                 {name, size, sha256, kind} -> {upload_id, offset}
+    GET  /uploads/<id>            -> {offset, status}
+    PUT  /uploads/<id>?offset=N   raw chunk -> {offset, status}
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlparse
+
+from core.evidence_index import evidence_index, file_sha256, media_kind
+
+
+# Lower number uploads first; proxies go before any full-size audio or video
+PRIORITIES = {
+    'snapshot': 0,
+    'proxy': 1,
+    'audio': 2,
+    'video': 3,
+    'other': 4
+}
+
+
+class UploadError(Exception):
+    """Upload request failed (network error or error status)"""
+
+    def __init__(self, message, status=None, payload=None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload or {}
+
+
+class TokenBucket:
+    """Token-bucket bandwidth shaper (bytes per second with a burst allowance)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def consume(self, amount):
+        """Block until `amount` bytes may be sent"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount or self.tokens >= self.capacity:
+                self.tokens -= amount
+                return
+            time.sleep((min(amount, self.capacity) - self.tokens) / self.rate)
+
+
+class EvidenceUploadQueue:
+    """
+    SQLite-backed upload queue with chunked, resumable uploads
+    One worker thread drains the queue in priority order
+    The database is created on first use, not when the module is imported
+    """
+
+    def __init__(self, endpoint=None, db_path="data/evidence_uploads.db", chunk_size=256 * 1024,
+                 max_bytes_per_sec=None, timeout=15, base_backoff=2.0, max_backoff=300.0):
+        self.endpoint = endpoint
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.shaper = TokenBucket(max_bytes_per_sec, burst=chunk_size) if max_bytes_per_sec else None
+
+        self.running = False
+        self.worker = None
+        self.wakeup = threading.Event()
+        self.db_lock = threading.Lock()
+        self.init_lock = threading.Lock()
+        self.initialized = False
+        self._conn = None
+
+        self.stats = {
+            'bytes_sent': 0,
+            'chunks_sent': 0,
+            'completed': 0,
+            'retries': 0,
+            'preemptions': 0,
+            'send_seconds': 0.0
+        }
+
+    def _db(self):
+        if not self.initialized:
+            self.init_database()
+        return self._connect()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_database(self):
+        """Create the uploads table (once; on first use by default)"""
+        with self.init_lock:
+            if self.initialized:
+                return
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS uploads (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT UNIQUE NOT NULL,
+                    kind TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    upload_id TEXT,
+                    offset INTEGER DEFAULT 0,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    created_at TEXT,
+                    completed_at TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_uploads_ready ON uploads (status, priority, next_attempt_at)')
+            conn.commit()
+            conn.close()
+            self.initialized = True
+
+    def enqueue(self, path, kind=None, priority=None, sha256=None):
+        """
+        Add a finished evidence file to the queue (no-op if already queued)
+
+        Args:
+            path: Closed evidence file (never a file still being written)
+            kind: 'snapshot', 'audio' or 'video' (default: from extension)
+            priority: Override the kind's priority (lower goes first)
+            sha256: Known hash (e.g. from a segment manifest), else computed
+
+        Returns:
+            queue row id, or None if the file does not exist
+        """
+        if not os.path.isfile(path):
+            return None
+
+        kind = kind or media_kind(path)
+        priority = PRIORITIES.get(kind, PRIORITIES['other']) if priority is None else priority
+        size = os.path.getsize(path)
+        if not sha256:
+            # Reuse the hash taken when the file was indexed
+            indexed = evidence_index.get(path)
+            sha256 = indexed['sha256'] if indexed and indexed['size'] == size and indexed['sha256'] \
+                else file_sha256(path)
+
+        with self.db_lock:
+            conn = self._db()
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO uploads (path, kind, priority, size, sha256, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (os.path.abspath(path), kind, priority, size, sha256, datetime.now().isoformat()))
+            row_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
+
+        self.wakeup.set()
+        return row_id
+
+    def segment_callback(self, kind, segment_path, segment_info=None, final=False):
+        """Adapter for LiveStreamingService's upload_callback"""
+        return self.enqueue(segment_path, kind=kind, sha256=(segment_info or {}).get('sha256'))
+
+    def _next_ready(self, below_priority=None):
+        """Highest-priority pending upload whose backoff has expired"""
+        query = "SELECT * FROM uploads WHERE status = 'pending' AND next_attempt_at <= ?"
+        params = [time.time()]
+        if below_priority is not None:
+            query += " AND priority < ?"
+            params.append(below_priority)
+        query += " ORDER BY priority, id LIMIT 1"
+
+        with self.db_lock:
+            conn = self._db()
+            row = conn.execute(query, params).fetchone()
+            conn.close()
+        return dict(row) if row else None
+
+    def _update(self, row_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.db_lock:
+            conn = self._db()
+            conn.execute(f"UPDATE uploads SET {columns} WHERE id = ?", list(fields.values()) + [row_id])
+            conn.commit()
+            conn.close()
+
+    def _request(self, method, path, body=None, headers=None):
+        """One HTTP request on a kept-alive connection; raises UploadError"""
+        parsed = urlparse(self.endpoint)
+        try:
+            if self._conn is None:
+                connection_class = HTTPSConnection if parsed.scheme == 'https' else HTTPConnection
+                self._conn = connection_class(parsed.hostname, parsed.port, timeout=self.timeout)
+            self._conn.request(method, parsed.path.rstrip('/') + path, body=body, headers=headers or {})
+            response = self._conn.getresponse()
+            data = response.read()
+        except Exception as e:
+            # Drop the connection; the next request reconnects
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            raise UploadError(f"{type(e).__name__}: {e}")
+
+        try:
+            payload = json.loads(data) if data else {}
+        except ValueError:
+            payload = {}
+        if response.status >= 400:
+            raise UploadError(f"HTTP {response.status}", status=response.status, payload=payload)
+        return payload
+
+    def _resume_offset(self, item):
+        """Create the remote upload, or ask the server how much it already has"""
+        if item['upload_id']:
+            try:
+                return self._request('GET', f"/uploads/{item['upload_id']}").get('offset', 0)
+            except UploadError as e:
+                if e.status != 404:
+                    raise
+                # Server forgot the upload: start over
+
+        payload = self._request('POST', "/uploads", json.dumps({
+            'name': os.path.basename(item['path']),
+            'size': item['size'],
+            'sha256': item['sha256'],
+            'kind': item['kind']
+        }).encode('utf-8'), {'Content-Type': 'application/json'})
+        item['upload_id'] = payload['upload_id']
+        self._update(item['id'], upload_id=item['upload_id'], offset=0)
+        return payload.get('offset', 0)
+
+    def _upload(self, item):
+        """
+        Send chunks of one file until done or preempted
+
+        Returns:
+            'done', 'preempted' or 'missing'
+        """
+        if not os.path.exists(item['path']):
+            self._update(item['id'], status='failed', last_error='file missing')
+            return 'missing'
+
+        offset = self._resume_offset(item)
+        self._update(item['id'], offset=offset)
+
+        with open(item['path'], 'rb') as f:
+            while offset < item['size']:
+                # Yield between chunks when a more important file is waiting
+                if item['priority'] > 0 and self._next_ready(below_priority=item['priority']):
+                    self.stats['preemptions'] += 1
+                    return 'preempted'
+
+                f.seek(offset)
+                chunk = f.read(self.chunk_size)
+                if self.shaper:
+                    self.shaper.consume(len(chunk))
+
+                send_start = time.perf_counter()
+                try:
+                    payload = self._request('PUT', f"/uploads/{item['upload_id']}?offset={offset}", chunk,
+                                            {'Content-Type': 'application/octet-stream'})
+                except UploadError as e:
+                    if e.status == 409 and 'offset' in e.payload:
+                        # Server has a different offset (e.g. partial chunk before a drop)
+                        offset = e.payload['offset']
+                        self._update(item['id'], offset=offset)
+                        continue
+                    raise
+                self.stats['send_seconds'] += time.perf_counter() - send_start
+
+                offset = payload.get('offset', offset + len(chunk))
+                self.stats['bytes_sent'] += len(chunk)
+                self.stats['chunks_sent'] += 1
+                self._update(item['id'], offset=offset)
+
+                if payload.get('status') == 'corrupt':
+                    raise UploadError("Server hash mismatch", payload=payload)
+
+        self._update(item['id'], status='done', completed_at=datetime.now().isoformat(), last_error=None)
+        self.stats['completed'] += 1
+        return 'done'
+
+    def _backoff(self, item, error):
+        """Schedule a retry with exponential backoff and jitter"""
+        attempts = item['attempts'] + 1
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.5, 1.0)
+        self.stats['retries'] += 1
+        message = str(error) if isinstance(error, UploadError) else f"{type(error).__name__}: {error}"
+        updates = {'attempts': attempts, 'next_attempt_at': time.time() + delay, 'last_error': message}
+        if isinstance(error, UploadError) and error.payload.get('status') == 'corrupt':
+            # Restart from scratch with a fresh upload
+            updates.update(upload_id=None, offset=0)
+        self._update(item['id'], **updates)
+
+    def _proxies_first(self, item):
+        """
+        Proxies go before their original (delivery_order): a ready original
+        yields to the first of its proxies that is not sent yet, queueing
+        proxies that were built but never queued
+
+        Returns:
+            the row to upload now
+        """
+        try:
+            from core.evidence_proxy import delivery_order
+        except ImportError:
+            return item
+        for path in delivery_order([item['path']]):
+            if path == item['path']:
+                break
+            row = self.get_upload(path)
+            if row is None:
+                self.enqueue(path, priority=min(PRIORITIES['proxy'], item['priority'] - 1))
+                row = self.get_upload(path)
+            if row and row['status'] == 'pending' and row['next_attempt_at'] <= time.time():
+                return row
+        return item
+
+    def process_next(self):
+        """
+        Work on the most important ready upload
+
+        Returns:
+            False if nothing was ready
+        """
+        item = self._next_ready()
+        if not item:
+            return False
+        item = self._proxies_first(item)
+        try:
+            self._upload(item)
+        except Exception as e:
+            # Anything else (unreadable file, malformed reply) backs off the
+            # item too, so one bad file cannot stop the queue
+            self._backoff(item, e)
+        return True
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                busy = self.process_next()
+            except Exception as e:
+                # e.g. the queue database is locked: keep the worker alive
+                print(f"⚠️ Evidence upload worker error: {e}")
+                busy = False
+            if not busy:
+                self.wakeup.wait(1.0)
+                self.wakeup.clear()
+
+    def start(self):
+        """Start the background worker (requires an endpoint)"""
+        if not self.endpoint:
+            print("⚠️ No evidence upload endpoint configured")
+            return False
+        if self.running:
+            return True
+        self.running = True
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.worker:
+            self.worker.join(timeout=self.timeout)
+            self.worker = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def drain(self, timeout=None):
+        """Process uploads on the calling thread until the queue is empty (or timeout)"""
+        start = time.time()
+        while timeout is None or time.time() - start < timeout:
+            if self.process_next():
+                continue
+            if self.pending_count() == 0:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def pending_count(self):
+        with self.db_lock:
+            conn = self._db()
+            count = conn.execute("SELECT COUNT(*) FROM uploads WHERE status = 'pending'").fetchone()[0]
+            conn.close()
+        return count
+
+    def pending_paths(self):
+        """Absolute paths still waiting to be (fully) uploaded"""
+        with self.db_lock:
+            conn = self._db()
+            rows = conn.execute("SELECT path FROM uploads WHERE status = 'pending'").fetchall()
+            conn.close()
+        return [row[0] for row in rows]
+
+    def get_upload(self, path):
+        """Queue row of one file, or None if it was never queued"""
+        with self.db_lock:
+            conn = self._db()
+            row = conn.execute("SELECT * FROM uploads WHERE path = ?", (os.path.abspath(path),)).fetchone()
+            conn.close()
+        return dict(row) if row else None
+
+    def get_queue(self):
+        """All queue rows, most important first"""
+        with self.db_lock:
+            conn = self._db()
+            rows = conn.execute("SELECT * FROM uploads ORDER BY status != 'pending', priority, id").fetchall()
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['throughput_bps'] = stats['bytes_sent'] / stats['send_seconds'] if stats['send_seconds'] else 0.0
+        stats['pending'] = self.pending_count()
+        return stats
+
+
+# Global instance; the endpoint comes from evidence settings when uploads are enabled
+# and the database file appears on first use
+evidence_uploader = EvidenceUploadQueue()
+
+
+def start_evidence_uploads(settings=None):
+    """Configure the global queue from evidence settings and start its worker"""
+    settings = settings or {}
+    endpoint = settings.get('upload_endpoint')
+    if not endpoint:
+        return False
+    evidence_uploader.endpoint = endpoint
+    rate = settings.get('upload_max_kbps')
+    if rate:
+        evidence_uploader.shaper = TokenBucket(rate * 1024 / 8.0, burst=evidence_uploader.chunk_size)
+    return evidence_uploader.start()
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Usage: python -m core.evidence_uploader <endpoint> <file> [file ...]")
+        sys.exit(1)
+
+    evidence_uploader.endpoint = sys.argv[1]
+    for path in sys.argv[2:]:
+        evidence_uploader.enqueue(path)
+    evidence_uploader.drain()
+    print(f"📊 {evidence_uploader.get_stats()}")
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Evidence Video Scoring
+Batch distress analysis of recorded evidence videos
+Each file is decoded on its own reader thread, non-sampled frames are
+skipped with grab() instead of a full decode, and files are scored in
+parallel across a process pool. Per-file timelines of distress scores
+are written as compressed columnar .npz files next to the evidence
+Encrypted videos (".mp4.enc") are decrypted to a private temp file for the
+duration of their job, since OpenCV only opens files by name; timelines
+hold scores only, no imagery, and are written in plain
+"""
+
+import glob
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from core.distress_detection import DistressDetector
+import core.evidence_crypto as evidence_crypto
+
+
+DEFAULT_EVIDENCE_DIRS = ["evidence", "data/evidence"]
+DEFAULT_PATTERN = "*.mp4"
+TIMELINE_SUFFIX = ".distress.npz"
+
+# Same sampling the live analyzer uses
+DEFAULT_SAMPLE_EVERY = 5
+
+# Columns stored in every timeline file
+TIMELINE_COLUMNS = (
+    'frame_index', 'time_s', 'distress_score', 'distress_detected',
+    'motion_intensity', 'red_percentage', 'push_magnitude'
+)
+
+
+def _init_worker(cipher=None):
+    """Keep OpenCV single-threaded inside pool workers (the pool is the parallelism)"""
+    cv2.setNumThreads(1)
+    evidence_crypto.evidence_cipher = cipher
+
+
+def _decode_frames(cap, sample_every, frames, stop, counts):
+    """
+    Reader thread: grab every frame, decode only the sampled ones
+    Puts (frame_index, time_s, frame) on the queue, then None
+    counts['grabbed'] and counts['decoded'] track grab() and retrieve() calls
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    index = 0
+    try:
+        while not stop.is_set():
+            if not cap.grab():
+                break
+            counts['grabbed'] += 1
+            if index % sample_every == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                counts['decoded'] += 1
+                pos_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+                time_s = pos_ms / 1000.0 if pos_ms > 0 else (index / fps if fps else 0.0)
+                frames.put((index, time_s, frame))
+            index += 1
+    finally:
+        frames.put(None)
+
+
+def score_video(job):
+    """
+    Score one video inside a pool worker
+
+    Args:
+        job: tuple (video_path, sample_every)
+
+    Returns:
+        dict with timeline columns and per-file throughput figures
+    """
+    video_path, sample_every = job
+    try:
+        with evidence_crypto.decrypted_copy(video_path) as source:
+            return _score_source(video_path, source, sample_every)
+    except evidence_crypto.EvidenceCryptoError as e:
+        return {'file': video_path, 'error': str(e)}
+
+
+def _score_source(video_path, source, sample_every):
+    """Score the decodable file `source`, reporting it as `video_path`"""
+    cpu_start = time.process_time()
+    wall_start = time.time()
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        return {'file': video_path, 'error': 'Could not open video'}
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+
+    frames = queue.Queue(maxsize=8)
+    stop = threading.Event()
+    counts = {'grabbed': 0, 'decoded': 0}
+    reader = threading.Thread(target=_decode_frames, args=(cap, sample_every, frames, stop, counts),
+                              daemon=True)
+    reader.start()
+
+    detector = DistressDetector()
+    columns = {name: [] for name in TIMELINE_COLUMNS}
+
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            index, time_s, frame = item
+            result = detector.analyze_frame(frame)
+
+            columns['frame_index'].append(index)
+            columns['time_s'].append(time_s)
+            columns['distress_score'].append(result['distress_score'])
+            columns['distress_detected'].append(result['distress_detected'])
+            columns['motion_intensity'].append(result['motion'].get('intensity', 0))
+            columns['red_percentage'].append(result['red_color'].get('percentage', 0))
+            columns['push_magnitude'].append(result['pushing'].get('magnitude', 0))
+    finally:
+        stop.set()
+        # Unblock the reader if it is waiting on a full queue
+        while reader.is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                reader.join(timeout=0.1)
+        cap.release()
+
+    return {
+        'file': video_path,
+        'columns': columns,
+        # Frames walked with grab() vs. actually decoded with retrieve()
+        'frames_grabbed': counts['grabbed'],
+        'frames_decoded': counts['decoded'],
+        'frames_analyzed': len(columns['frame_index']),
+        'video_seconds': (counts['grabbed'] / fps) if fps else 0.0,
+        'wall_seconds': time.time() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start
+    }
+
+
+def load_timeline(timeline_path):
+    """Load a timeline file back into a dict of NumPy columns"""
+    with np.load(timeline_path) as data:
+        return {name: data[name] for name in data.files}
+
+
+class EvidenceVideoScorer:
+    """
+    Batch re-scoring of evidence videos with the current DistressDetector
+    One process per file; decoding overlaps analysis inside each process
+    """
+
+    def __init__(self, workers=None, sample_every=DEFAULT_SAMPLE_EVERY):
+        self.workers = workers or os.cpu_count() or 1
+        self.sample_every = max(1, int(sample_every))
+
+    def is_available(self):
+        """Check if batch scoring can run"""
+        return CV2_AVAILABLE
+
+    def find_video_files(self, evidence_dirs=None, pattern=DEFAULT_PATTERN, overwrite=False):
+        """List evidence videos (plain or encrypted) that have no up-to-date timeline yet"""
+        files = []
+        for evidence_dir in evidence_dirs or DEFAULT_EVIDENCE_DIRS:
+            found = glob.glob(os.path.join(evidence_dir, pattern)) + \
+                glob.glob(os.path.join(evidence_dir, pattern + evidence_crypto.ENCRYPTED_SUFFIX))
+            for video_path in sorted(found):
+                timeline = video_path + TIMELINE_SUFFIX
+                if not overwrite and os.path.exists(timeline) and \
+                        os.path.getmtime(timeline) >= os.path.getmtime(video_path):
+                    continue
+                files.append(video_path)
+        return files
+
+    def score(self, video_files):
+        """
+        Score a batch of video files
+
+        Returns:
+            dict with per-file timeline paths and summaries plus aggregate
+            throughput (analyzed FPS overall and per core)
+        """
+        if not self.is_available():
+            return {'error': 'OpenCV not available'}
+
+        wall_start = time.time()
+
+        # Largest files first keeps the pool evenly loaded at the tail
+        jobs = sorted(video_files, key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0,
+                      reverse=True)
+        jobs = [(path, self.sample_every) for path in jobs]
+        workers = max(1, min(self.workers, len(jobs)))
+
+        timelines = {}
+        summaries = {}
+        errors = {}
+        totals = {'frames_grabbed': 0, 'frames_decoded': 0, 'frames_analyzed': 0,
+                  'video_seconds': 0.0, 'cpu_seconds': 0.0}
+
+        if jobs:
+            with multiprocessing.Pool(workers, initializer=_init_worker,
+                                      initargs=(evidence_crypto.evidence_cipher,)) as pool:
+                for result in pool.imap_unordered(score_video, jobs):
+                    video_path = result['file']
+                    if result.get('error'):
+                        errors[video_path] = result['error']
+                        continue
+
+                    timelines[video_path] = self._write_timeline(video_path, result['columns'])
+                    scores = result['columns']['distress_score']
+                    summaries[video_path] = {
+                        'frames_analyzed': result['frames_analyzed'],
+                        'video_seconds': result['video_seconds'],
+                        'max_distress_score': max(scores) if scores else 0,
+                        'distress_frames': sum(1 for d in result['columns']['distress_detected'] if d)
+                    }
+                    for key in totals:
+                        totals[key] += result[key]
+
+        wall_seconds = time.time() - wall_start
+        analyzed_fps = totals['frames_analyzed'] / wall_seconds if wall_seconds > 0 else 0.0
+
+        report = {
+            'files': len(timelines),
+            'workers': workers,
+            'sample_every': self.sample_every,
+            'wall_seconds': wall_seconds,
+            'analyzed_fps': analyzed_fps,
+            'analyzed_fps_per_core': analyzed_fps / workers,
+            # Processing time per second of video; < 1.0 is faster than real time
+            'rtf': wall_seconds / totals['video_seconds'] if totals['video_seconds'] else 0,
+            'timelines': timelines,
+            'summaries': summaries,
+            'errors': errors
+        }
+        report.update(totals)
+
+        print(f"📹 Scored {report['files']} video(s), {totals['frames_analyzed']} of "
+              f"{totals['frames_grabbed']} frames analyzed in {wall_seconds:.1f}s "
+              f"({analyzed_fps:.1f} FPS, {report['analyzed_fps_per_core']:.1f}/core on {workers} workers)")
+        return report
+
+    def score_directories(self, evidence_dirs=None, overwrite=False):
+        """Score every pending evidence video in the given directories"""
+        return self.score(self.find_video_files(evidence_dirs, overwrite=overwrite))
+
+    def _write_timeline(self, video_path, columns):
+        """Write timeline columns as a compressed .npz next to the video (atomic replace)"""
+        timeline_path = video_path + TIMELINE_SUFFIX
+        tmp_path = timeline_path + ".tmp.npz"
+
+        np.savez_compressed(
+            tmp_path,
+            frame_index=np.asarray(columns['frame_index'], dtype=np.int32),
+            time_s=np.asarray(columns['time_s'], dtype=np.float32),
+            distress_score=np.asarray(columns['distress_score'], dtype=np.float32),
+            distress_detected=np.asarray(columns['distress_detected'], dtype=np.bool_),
+            motion_intensity=np.asarray(columns['motion_intensity'], dtype=np.float32),
+            red_percentage=np.asarray(columns['red_percentage'], dtype=np.float32),
+            push_magnitude=np.asarray(columns['push_magnitude'], dtype=np.float32)
+        )
+        os.replace(tmp_path, timeline_path)
+        return timeline_path
+
+
+def score_evidence_videos(evidence_dirs=None, workers=None, overwrite=False):
+    """Convenience wrapper: score all pending evidence videos"""
+    scorer = EvidenceVideoScorer(workers=workers)
+    return scorer.score_directories(evidence_dirs, overwrite=overwrite)
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    args = sys.argv[1:]
+    overwrite = '--overwrite' in args
+    paths = [a for a in args if a != '--overwrite']
+
+    scorer = EvidenceVideoScorer()
+    files = [p for p in paths if os.path.isfile(p)]
+    if files:
+        report = scorer.score(files)
+    else:
+        report = scorer.score_directories(paths or None, overwrite=overwrite)
+
+    if report.get('error'):
+        print(f"❌ {report['error']}")
+    else:
+        for video_path, timeline in report['timelines'].items():
+            summary = report['summaries'][video_path]
+            print(f"✅ {video_path} -> {timeline} "
+                  f"(max score {summary['max_distress_score']:.0f}, "
+                  f"{summary['distress_frames']} distress frames)")
+        for video_path, error in report['errors'].items():
+            print(f"❌ {video_path}: {error}")
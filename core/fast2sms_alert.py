@@ -6,6 +6,8 @@ Uses international gateway for instant SMS delivery
 
 import requests
 from core.user_config import user_config
+from core.alert_payload import create_alert_payload
+from core.http_client import http_client
 
 class Fast2SMSAlert:
     """Send emergency alerts via Fast2SMS Quick SMS API"""
@@ -14,15 +16,16 @@ class Fast2SMSAlert:
         self.api_key = "YOUR_FAST2SMS_API_KEY"  # Replace with actual API key
         self.base_url = "https://www.fast2sms.com/dev/bulkV2"
 
-    def send_alert(self, user_email, reason="Emergency alert", location=None):
-        """Send emergency alert via Fast2SMS Quick SMS"""
+    def send_alert(self, user_email, reason="Emergency alert", location=None, payload=None):
+        """Send emergency alert via Fast2SMS Quick SMS (payload: pre-rendered AlertPayload)"""
 
         if self.api_key == "YOUR_FAST2SMS_API_KEY":
             print("[ERROR] Fast2SMS API key not configured")
             return False
 
         # Create SMS message (keep it short for SMS)
-        sms_message = self._create_sms_message(reason, location)
+        payload = payload or create_alert_payload(user_email, reason, location)
+        sms_message = payload.render('sms')
 
         # Get emergency contacts
         contacts = self._get_sms_contacts()
@@ -50,17 +53,6 @@ class Fast2SMSAlert:
         # Send SMS
         return self._send_sms(sms_message, phone_numbers)
 
-    def _create_sms_message(self, reason, location):
-        """Create a concise SMS message"""
-        user_info = user_config.get_user_info()
-        name = user_info.get('name', 'User')
-
-        message = f"🚨 HER SHIELD ALERT 🚨\n{name}: {reason}"
-        if location:
-            message += f"\nLocation: {location}"
-
-        return message
-
     def _get_sms_contacts(self):
         """Get emergency contacts for SMS"""
         user_info = user_config.get_user_info()
@@ -83,7 +75,7 @@ class Fast2SMSAlert:
             }
 
             # Make API request
-            response = requests.post(self.base_url, data=payload, timeout=30)
+            response = http_client.post(self.base_url, data=payload, timeout=30)
 
             if response.status_code == 200:
                 result = response.json()
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Parallel Frame Analysis Pipeline
+Hands camera frames to a pool of worker processes through shared memory
+so distress analysis is no longer tied to the capture thread or the GIL
+
+- Frames are written into fixed shared-memory slots (no pickling of pixels)
+- Runs of consecutive frames go to the same worker, whose DistressDetector
+  keeps its temporal state (previous frames, LK tracks, motion history)
+  across the run; it is only primed with the real previous frame when a
+  run starts or a frame was dropped
+- Frames that wait longer than max_latency are dropped, not queued
+- Results come back in timestamp order
+"""
+
+import heapq
+import queue
+import threading
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+try:
+    import cv2
+    import numpy as np
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+from core.distress_detection import DistressDetector
+
+
+def _worker_loop(shm_name, frame_shape, task_queue, result_queue):
+    """
+    Worker process: analyze frames from shared slots in submit order
+    The detector carries its state from one frame to the next; it is only
+    primed from the slot's previous frame when the task asks for it or the
+    frame before this one never reached the detector (dropped as stale)
+    Tasks older than their deadline are reported as dropped without analysis
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frame_size = int(np.prod(frame_shape))
+    detector = DistressDetector()
+    last_seq = None
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            seq, timestamp, slot, deadline, motion_history, prime = task
+            if time.time() > deadline:
+                result_queue.put((seq, timestamp, slot, None, 0.0, False))
+                continue
+
+            offset = slot * 2 * frame_size
+            pair = np.ndarray((2,) + tuple(frame_shape), dtype=np.uint8,
+                              buffer=shm.buf, offset=offset)
+
+            primed = prime or last_seq != seq - 1
+            cpu_start = time.process_time()
+            try:
+                if primed:
+                    detector.prime(pair[0], motion_history)
+                result = detector.analyze_frame(pair[1])
+            except Exception as e:
+                result = {'error': str(e), 'distress_detected': False, 'distress_score': 0, 'indicators': []}
+            cpu_ms = (time.process_time() - cpu_start) * 1000
+            last_seq = seq
+
+            # Release the view before the slot can be reused
+            del pair
+            result_queue.put((seq, timestamp, slot, result, cpu_ms, primed))
+    finally:
+        shm.close()
+
+
+class FramePipeline:
+    """
+    Deadline-aware pool of distress-analysis workers
+
+    submit() copies a frame into a free slot and returns immediately; when
+    every slot is busy the frame is dropped. Frames are handed to workers in
+    runs of run_length consecutive frames, so each worker's detector sees a
+    continuous sequence. results() returns finished analyses in timestamp
+    order.
+    """
+
+    def __init__(self, workers=None, max_latency=0.5, slots_per_worker=4, run_length=15, on_result=None):
+        """
+        Args:
+            workers: Number of worker processes (CPU count - 1 by default)
+            max_latency: Seconds a frame may wait before it is dropped as stale
+            slots_per_worker: Shared-memory frame slots per worker
+            run_length: Consecutive frames analyzed by one worker before the
+                next worker takes over (the LK re-seed interval by default)
+            on_result: Optional callback(result) called in timestamp order
+        """
+        self.workers = workers or max(1, mp.cpu_count() - 1)
+        self.max_latency = max_latency
+        self.num_slots = self.workers * slots_per_worker
+        self.run_length = run_length
+        self.on_result = on_result
+
+        self.frame_shape = None
+        self.running = False
+        self._shm = None
+        self._slots = None
+        self._processes = []
+        self._task_queues = []
+        self._result_queue = None
+        self._collector = None
+
+        self._lock = threading.Lock()
+        self._free_slots = []
+        self._prev_frame = None
+        self._run_worker = -1
+        self._run_left = 0
+        self._gap = True  # the next queued frame does not follow the last one
+        self._next_seq = 0
+        self._next_emit = 0
+        self._pending = []  # heap of (seq, result)
+        self._ready = []
+        self._motion_history = []
+        self.max_history = DistressDetector().max_history
+
+        self.stats = {
+            'submitted': 0,
+            'analyzed': 0,
+            'dropped_busy': 0,
+            'dropped_stale': 0,
+            'primed': 0,
+            'worker_cpu_ms': 0.0,
+            'latency_ms': [],
+            'started_at': None
+        }
+
+    def start(self, frame_shape):
+        """Allocate shared slots for frames of frame_shape and spawn workers"""
+        if not CV2_AVAILABLE:
+            print("⚠️ OpenCV not available, frame pipeline disabled")
+            return False
+        if self.running:
+            return True
+
+        self.frame_shape = tuple(frame_shape)
+        frame_size = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=self.num_slots * 2 * frame_size)
+        self._slots = np.ndarray((self.num_slots, 2) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = list(range(self.num_slots))
+
+        self._task_queues = [mp.Queue() for _ in range(self.workers)]
+        self._result_queue = mp.Queue()
+        for task_queue in self._task_queues:
+            process = mp.Process(
+                target=_worker_loop,
+                args=(self._shm.name, self.frame_shape, task_queue, self._result_queue),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+        self.running = True
+        self.stats['started_at'] = time.time()
+        self._collector = threading.Thread(target=self._collect_results, daemon=True)
+        self._collector.start()
+
+        print(f"✅ Frame pipeline started: {self.workers} workers, {self.num_slots} slots")
+        return True
+
+    def submit(self, frame, timestamp=None):
+        """
+        Queue a frame for analysis
+
+        Returns:
+            True if the frame was queued, False if it was dropped
+        """
+        if not self.running and not self.start(frame.shape):
+            return False
+
+        if frame.shape != self.frame_shape:
+            frame = cv2.resize(frame, (self.frame_shape[1], self.frame_shape[0]))
+
+        timestamp = timestamp or time.time()
+        prev_frame = self._prev_frame if self._prev_frame is not None else frame
+
+        with self._lock:
+            if not self._free_slots:
+                self.stats['dropped_busy'] += 1
+                # Still the newest frame: the next submitted frame is compared to it
+                self._prev_frame = frame.copy()
+                self._gap = True
+                return False
+            slot = self._free_slots.pop()
+            seq = self._next_seq
+            self._next_seq += 1
+            motion_history = list(self._motion_history)
+
+        # Start the next run on the next worker; within a run the worker's
+        # detector already holds the previous frame unless one was dropped
+        if self._run_left <= 0:
+            self._run_worker = (self._run_worker + 1) % self.workers
+            self._run_left = self.run_length
+            self._gap = True
+        self._run_left -= 1
+        prime = self._gap
+        self._gap = False
+
+        # The previous frame is always stored: the worker also primes from it
+        # when the frame before this one was dropped as stale
+        self._slots[slot, 0] = prev_frame
+        self._slots[slot, 1] = frame
+        self._prev_frame = frame.copy()
+
+        self.stats['submitted'] += 1
+        self._task_queues[self._run_worker].put(
+            (seq, timestamp, slot, timestamp + self.max_latency, motion_history, prime))
+        return True
+
+    def _collect_results(self):
+        """Collector thread: free slots and release results in sequence order"""
+        while self.running:
+            try:
+                seq, timestamp, slot, result, cpu_ms, primed = self._result_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            ordered = []
+            with self._lock:
+                self._free_slots.append(slot)
+                if result is None:
+                    self.stats['dropped_stale'] += 1
+                else:
+                    self.stats['analyzed'] += 1
+                    self.stats['primed'] += int(primed)
+                    self.stats['worker_cpu_ms'] += cpu_ms
+                    self.stats['latency_ms'].append((time.time() - timestamp) * 1000)
+                    self.stats['latency_ms'] = self.stats['latency_ms'][-500:]
+                    result['frame_timestamp'] = timestamp
+                heapq.heappush(self._pending, (seq, result))
+
+                # Sequence numbers follow submit order, so this is timestamp order
+                while self._pending and self._pending[0][0] == self._next_emit:
+                    _, ready = heapq.heappop(self._pending)
+                    self._next_emit += 1
+                    if ready is None:
+                        continue
+                    intensity = ready.get('motion', {}).get('intensity')
+                    if intensity is not None:
+                        self._motion_history.append(intensity)
+                        self._motion_history = self._motion_history[-self.max_history:]
+                    ordered.append(ready)
+
+                if self.on_result is None:
+                    self._ready.extend(ordered)
+
+            if self.on_result is not None:
+                for ready in ordered:
+                    self.on_result(ready)
+
+    def results(self):
+        """Return (and clear) analyses finished so far, oldest first"""
+        with self._lock:
+            ready, self._ready = self._ready, []
+        return ready
+
+    def get_stats(self):
+        """Throughput summary, including sustained analyzed FPS per core"""
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = sorted(self.stats['latency_ms'])
+
+        elapsed = time.time() - stats['started_at'] if stats['started_at'] else 0
+        analyzed_fps = stats['analyzed'] / elapsed if elapsed > 0 else 0.0
+        stats.pop('latency_ms')
+        stats.update({
+            'workers': self.workers,
+            'elapsed_s': elapsed,
+            'analyzed_fps': analyzed_fps,
+            'analyzed_fps_per_core': analyzed_fps / self.workers,
+            'worker_cpu_ms_per_frame': stats['worker_cpu_ms'] / stats['analyzed'] if stats['analyzed'] else 0.0,
+            'latency_p50_ms': latencies[len(latencies) // 2] if latencies else 0.0,
+            'latency_p95_ms': latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        })
+        return stats
+
+    def stop(self):
+        """Stop workers and free shared memory"""
+        if not self.running:
+            return
+
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+
+        self.running = False
+        if self._collector:
+            self._collector.join(timeout=1)
+
+        self._processes = []
+        self._task_queues = []
+        self._slots = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        print("✅ Frame pipeline stopped")
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+
+    if not CV2_AVAILABLE:
+        print("❌ OpenCV not available")
+        sys.exit(1)
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 0
+    cap = cv2.VideoCapture(source)
+    pipeline = FramePipeline()
+
+    start = time.time()
+    while time.time() - start < 15:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        pipeline.submit(frame)
+        for result in pipeline.results():
+            if result.get('distress_detected'):
+                print(f"🚨 Distress score {result['distress_score']:.0f}: {result['indicators']}")
+
+    cap.release()
+    stats = pipeline.get_stats()
+    pipeline.stop()
+
+    print(f"📊 {stats['analyzed']} analyzed, {stats['dropped_busy']} dropped busy, "
+          f"{stats['dropped_stale']} dropped stale")
+    print(f"   {stats['analyzed_fps']:.1f} FPS ({stats['analyzed_fps_per_core']:.1f} per core), "
+          f"latency p95 {stats['latency_p95_ms']:.0f} ms")
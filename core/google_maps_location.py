@@ -7,7 +7,7 @@ Provides high-accuracy location using Google's geolocation services
 import json
 import os
 import time
-import requests
+from core.http_client import http_client
 import subprocess
 import platform
 import logging
@@ -179,7 +179,7 @@ class GoogleMapsLocationService:
         }
         
         try:
-            response = requests.post(url, json=request_data, timeout=10)
+            response = http_client.post(url, json=request_data, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -227,7 +227,7 @@ class GoogleMapsLocationService:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -275,7 +275,7 @@ class GoogleMapsLocationService:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -363,7 +363,7 @@ class GoogleMapsLocationService:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = http_client.get(url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
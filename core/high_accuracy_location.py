@@ -8,7 +8,7 @@ import json
 import os
 import time
 import threading
-import requests
+from core.http_client import http_client
 import subprocess
 import platform
 import logging
@@ -192,7 +192,7 @@ class HighAccuracyLocationService:
         
         for service in services:
             try:
-                response = requests.get(service['url'], timeout=5)
+                response = http_client.get(service['url'], timeout=5)
                 if response.status_code == 200:
                     location = service['parser'](response.json())
                     if location:
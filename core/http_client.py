@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+One keep-alive session for every provider API (Twilio, Telegram, Discord,
+Fast2SMS, IP geolocation, Google Maps)
+- Per-host connection pools, so repeated calls skip DNS, TCP and TLS setup
+- Retry policy: connection failures are always retried; read errors and
+  429/5xx responses only for idempotent methods, honouring Retry-After up
+  to a few seconds (an alert POST is never sent twice)
+- Pre-warming: when protection starts, connections to the configured
+  messaging providers are opened and kept alive, so the first alert goes
+  out on an established TLS session; the free location APIs are warmed
+  once and never pinged again
+"""
+
+import threading
+import time
+import logging
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.user_config import user_config
+
+
+# Always used for location lookups (warmed once, not kept alive)
+LOCATION_PROVIDERS = [
+    "http://ip-api.com/",
+    "https://ipapi.co/",
+    "https://ipinfo.io/",
+    "https://nominatim.openstreetmap.org/"
+]
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+class CappedRetry(Retry):
+    """Retry policy that never waits longer than max_retry_after for a Retry-After header"""
+
+    def __init__(self, *args, max_retry_after=2.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response):
+        # A 429 asking for 20 s must not hold up an alert-path lookup with a 3 s timeout
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class HTTPClient:
+    """Pooled keep-alive HTTP session with retries and connection pre-warming"""
+
+    def __init__(self, pool_hosts=16, pool_size=8, retries=2, backoff_factor=0.3, keepalive_interval=45,
+                 max_retry_after=2.0):
+        """
+        Args:
+            pool_hosts: Number of per-host pools kept open
+            pool_size: Connections kept per host (concurrent alerts to one provider)
+            retries: Retry budget per request
+            backoff_factor: Exponential backoff base between retries (seconds)
+            keepalive_interval: Seconds between refreshes of warmed connections
+                (below the ~60 s idle timeout most providers use)
+            max_retry_after: Longest Retry-After wait honoured per retry (seconds)
+        """
+        retry = CappedRetry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            max_retry_after=max_retry_after
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = "HerShield-Safety-System"
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self.keepalive_interval = keepalive_interval
+        self.warm_origins = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.stats = {'requests': 0, 'errors': 0}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the shared session (same arguments as requests)"""
+        kwargs.setdefault("timeout", 10)
+        with self.lock:
+            self.stats['requests'] += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self.lock:
+                self.stats['errors'] += 1
+            raise
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _ping(self, origin):
+        """Cheap request that leaves a live connection in the pool; returns seconds"""
+        start = time.perf_counter()
+        self.session.head(origin, timeout=5, allow_redirects=False)
+        return time.perf_counter() - start
+
+    def warm(self, urls, keep_alive=True):
+        """
+        Open connections to the given providers and measure the handshake saved
+
+        The first request to an origin pays DNS + TCP + TLS; the second one
+        reuses the pooled connection. The difference is the setup time a
+        warmed alert no longer pays.
+
+        Args:
+            urls: Provider URLs (one connection per origin)
+            keep_alive: Refresh these connections from the keepalive loop
+
+        Returns:
+            dict origin -> {'cold_ms', 'warm_ms', 'saved_ms'} (or {'error'})
+        """
+        results = {}
+        for origin in dict.fromkeys(_origin(url) for url in urls if url):
+            try:
+                cold = self._ping(origin)
+                warm = self._ping(origin)
+                results[origin] = {
+                    'cold_ms': round(cold * 1000, 1),
+                    'warm_ms': round(warm * 1000, 1),
+                    'saved_ms': round(max(0.0, cold - warm) * 1000, 1),
+                    'warmed_at': time.time(),
+                    'keep_alive': keep_alive
+                }
+            except requests.exceptions.RequestException as e:
+                results[origin] = {'error': str(e)}
+        with self.lock:
+            self.warm_origins.update(results)
+        return results
+
+    def _keepalive_loop(self):
+        while self.running:
+            self.wakeup.wait(self.keepalive_interval)
+            if not self.running:
+                break
+            for origin, entry in list(self.warm_origins.items()):
+                if not entry.get('keep_alive'):
+                    continue
+                try:
+                    # Refresh (or transparently re-open) the pooled connection
+                    self._ping(origin)
+                    entry['warmed_at'] = time.time()
+                except requests.exceptions.RequestException as e:
+                    self.logger.debug(f"Keep-warm failed for {origin}: {e}")
+
+    def start_keepalive(self, urls, warm_once=()):
+        """
+        Warm the providers in the background and keep their connections open
+
+        Args:
+            urls: Providers whose connections are refreshed every keepalive_interval
+            warm_once: Providers warmed at start only (no periodic pings)
+        """
+        if self.running:
+            return True
+        self.running = True
+        self.wakeup.clear()
+        if self.thread and self.thread.is_alive():
+            # Stopped and restarted before the old loop noticed: keep using it
+            return True
+
+        def run():
+            results = self.warm(warm_once, keep_alive=False)
+            results.update(self.warm(urls))
+            saved = [entry['saved_ms'] for entry in results.values() if 'saved_ms' in entry]
+            if saved:
+                print(f"🔥 Warmed {len(saved)} provider connection(s), "
+                      f"~{sum(saved) / len(saved):.0f} ms handshake saved per first request")
+            self._keepalive_loop()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        return True
+
+    def stop_keepalive(self):
+        self.running = False
+        self.wakeup.set()
+
+    def get_stats(self):
+        """Request counts, new connections per host and measured handshake savings"""
+        stats = dict(self.stats)
+        stats['connections_opened'] = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                stats['connections_opened'][f"{key.key_scheme}://{key.key_host}"] = pool.num_connections
+        stats['warm_origins'] = {origin: dict(entry) for origin, entry in self.warm_origins.items()}
+        return stats
+
+
+def provider_urls():
+    """Messaging provider endpoints worth keeping warm for the current configuration"""
+    messaging_config = user_config.get_messaging_config()
+    urls = []
+
+    if messaging_config.get("twilio_config", {}).get("sid"):
+        urls.append("https://api.twilio.com/")
+
+    if messaging_config.get("telegram_config", {}).get("bot_token"):
+        urls.append("https://api.telegram.org/")
+
+    discord_config = messaging_config.get("discord_config", {})
+    if discord_config.get("webhook_url"):
+        urls.append(discord_config["webhook_url"])
+    elif discord_config.get("bot_token"):
+        urls.append("https://discord.com/")
+
+    # Imported here: both modules use the shared client themselves
+    from core.fast2sms_alert import Fast2SMSAlert
+    fast2sms = Fast2SMSAlert()
+    if fast2sms.api_key != "YOUR_FAST2SMS_API_KEY":
+        urls.append(fast2sms.base_url)
+
+    return urls
+
+
+def location_urls():
+    """Location endpoints used on the alert path (warmed once at start)"""
+    urls = list(LOCATION_PROVIDERS)
+
+    from core.google_maps_location import GoogleMapsLocationService
+    if GoogleMapsLocationService().api_key:
+        urls.extend(["https://www.googleapis.com/", "https://maps.googleapis.com/"])
+
+    return urls
+
+
+# Global instance
+http_client = HTTPClient()
+
+
+def start_provider_prewarm():
+    """Keep configured messaging providers warm; warm the location APIs once"""
+    return http_client.start_keepalive(provider_urls(), warm_once=location_urls())
+
+
+# Example usage
+if __name__ == "__main__":
+    urls = location_urls() + provider_urls()
+    print(f"🌐 Warming {len(urls)} provider(s)...")
+    for origin, entry in http_client.warm(urls).items():
+        if 'error' in entry:
+            print(f"  ❌ {origin}: {entry['error']}")
+        else:
+            print(f"  ✅ {origin}: cold {entry['cold_ms']} ms, warm {entry['warm_ms']} ms, "
+                  f"saved {entry['saved_ms']} ms")
+    print(f"📊 Stats: {http_client.get_stats()}")
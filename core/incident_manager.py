@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Incident Manager
+Coalesces emergency triggers (voice keywords, AI audio threats, distress
+video, double-tap, manual buttons) into incidents
+- The first trigger opens an incident: one id, one full alert to every contact
+- Triggers within the incident window join it; instead of a fresh alert they
+  produce a compact update (queued per recipient through the alert outbox)
+- Each recipient gets at most `max_messages` per `rate_window`; updates over
+  budget are deferred and the latest state is sent once budget frees up
+- Messages the old one-alert-per-trigger path would have sent are counted
+  as duplicate sends avoided
+"""
+
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from datetime import datetime
+
+from core.alert_outbox import alert_outbox
+from core.alert_payload import AlertPayload, create_alert_payload
+from core.user_config import user_config
+
+
+DEFAULT_WINDOW = 120
+DEFAULT_MAX_MESSAGES = 4
+DEFAULT_RATE_WINDOW = 60
+
+
+def new_incident_id():
+    return f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def _summary(message, limit=80):
+    """First non-empty line of a trigger's alert message"""
+    for line in str(message or "").splitlines():
+        line = line.strip()
+        if line:
+            return line if len(line) <= limit else line[:limit - 3] + "..."
+    return "Emergency trigger"
+
+
+class RecipientRateLimiter:
+    """Sliding-window message budget per recipient"""
+
+    def __init__(self, max_messages, window):
+        self.max_messages = max_messages
+        self.window = window
+        self.sent = {}
+        self.lock = threading.Lock()
+
+    def _recent(self, key, now):
+        times = self.sent.setdefault(key, deque())
+        while times and now - times[0] >= self.window:
+            times.popleft()
+        return times
+
+    def allow(self, key):
+        """Record and allow a message if the recipient has budget left"""
+        now = time.time()
+        with self.lock:
+            times = self._recent(key, now)
+            if len(times) >= self.max_messages:
+                return False
+            times.append(now)
+            return True
+
+    def record(self, key):
+        """Count a message sent outside allow() (the initial alert)"""
+        with self.lock:
+            self._recent(key, time.time()).append(time.time())
+
+    def next_free(self, key):
+        """Seconds until the recipient may be messaged again"""
+        now = time.time()
+        with self.lock:
+            times = self._recent(key, now)
+            if len(times) < self.max_messages:
+                return 0.0
+            return times[0] + self.window - now
+
+
+class IncidentManager:
+    """One incident per emergency, however many triggers fire"""
+
+    def __init__(self, window=None, max_messages=None, rate_window=None, outbox=None, channels=None):
+        """
+        Args:
+            window: Seconds after the last trigger during which new triggers join the incident
+            max_messages: Messages per recipient per rate_window
+            rate_window: Seconds
+            outbox: AlertOutbox updates are queued in (default: the global outbox)
+            channels: Channels to update (default: the configured messaging services)
+        """
+        settings = user_config.get_messaging_config()
+        self.window = window if window is not None else settings.get("incident_window", DEFAULT_WINDOW)
+        self.limiter = RecipientRateLimiter(
+            max_messages if max_messages is not None else settings.get("recipient_max_messages", DEFAULT_MAX_MESSAGES),
+            rate_window if rate_window is not None else settings.get("recipient_rate_window", DEFAULT_RATE_WINDOW)
+        )
+        self.outbox = outbox or alert_outbox
+        self.channels = channels
+
+        self.incident = None
+        self.closed = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            'triggers': 0,
+            'incidents': 0,
+            'coalesced': 0,
+            'updates': 0,
+            'update_messages': 0,
+            'deferred': 0,
+            'messages_without_coalescing': 0
+        }
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def _recipients(self):
+        """(channel, recipient) pairs every broadcast reaches"""
+        channels = self.channels if self.channels is not None else self.outbox.configured_channels()
+        return [(channel, recipient) for channel in channels for recipient in self.outbox.recipients(channel)]
+
+    def _active(self, now):
+        incident = self.incident
+        if incident and now - incident['last_trigger'] <= self.window:
+            return incident
+        return None
+
+    def active_incident(self):
+        """Open incident (dict copy) or None"""
+        with self.lock:
+            incident = self._active(time.time())
+            return dict(incident, triggers=list(incident['triggers'])) if incident else None
+
+    def location(self, resolve):
+        """Location of the open incident, or resolve() for a new one"""
+        incident = self.active_incident()
+        if incident and incident.get('location'):
+            return incident['location']
+        return resolve()
+
+    def report(self, source, message, alert_id=None, location=None):
+        """
+        Register a trigger
+
+        Args:
+            source: Trigger type (e.g. 'voice_keyword_detection', 'double_tap')
+            message: Full alert text of the trigger (its first line is used in updates)
+            alert_id: Escalation/dialog id of the trigger
+            location: Location info resolved for the trigger
+
+        Returns:
+            dict with incident_id, new, alert_id (the escalation that owns the
+            incident) and trigger_number
+        """
+        now = time.time()
+        trigger = {'source': source, 'summary': _summary(message), 'alert_id': alert_id, 'time': now}
+
+        with self.lock:
+            self.stats['triggers'] += 1
+            incident = self._active(now)
+            if incident is None:
+                incident = {
+                    'incident_id': new_incident_id(),
+                    'alert_id': alert_id,
+                    'aliases': set(),
+                    'started': now,
+                    'last_trigger': now,
+                    'location': location,
+                    'triggers': [trigger],
+                    'updates': 0,
+                    'deferred': set(),
+                    'latest': None,
+                    'flush_timer': None
+                }
+                if self.incident:
+                    self._retire(self.incident)
+                self.incident = incident
+                self.stats['incidents'] += 1
+                new = True
+            else:
+                incident['last_trigger'] = now
+                incident['triggers'].append(trigger)
+                if alert_id:
+                    incident['aliases'].add(alert_id)
+                incident['location'] = incident['location'] or location
+                self.stats['coalesced'] += 1
+                new = False
+            result = {'incident_id': incident['incident_id'], 'new': new, 'alert_id': incident['alert_id'],
+                      'trigger_number': len(incident['triggers'])}
+
+        if new:
+            # The full alert goes to everyone: it counts against every recipient's budget
+            for key in self._recipients():
+                self.limiter.record(key)
+            self.logger.info(f"Incident {result['incident_id']} opened by {source}")
+        else:
+            reason = f"{trigger['summary']} ({result['trigger_number']} triggers so far)"
+            self.send_update(result['incident_id'], reason)
+            self.logger.info(f"Trigger {source} joined incident {result['incident_id']}")
+        return result
+
+    def send_update(self, incident_id, reason, broadcasts=1):
+        """
+        Compact update to every recipient with message budget left
+
+        Args:
+            incident_id: Open incident
+            reason: Update text
+            broadcasts: Full alerts the uncoalesced path would have sent for this
+                update (escalation used to send one per emergency contact)
+
+        Returns:
+            Number of messages queued now (the rest are deferred)
+        """
+        recipients = self._recipients()
+        self._count('messages_without_coalescing', broadcasts * len(recipients))
+        with self.lock:
+            incident = self._find(incident_id)
+            if incident is None:
+                return 0
+            incident['latest'] = reason
+
+        allowed = [key for key in recipients if self.limiter.allow(key)]
+        deferred = [key for key in recipients if key not in allowed]
+        queued = self._enqueue_update(incident, reason, allowed)
+
+        if deferred:
+            self._count('deferred', len(deferred))
+            with self.lock:
+                incident['deferred'].update(deferred)
+            self._schedule_flush(incident)
+        return queued
+
+    def _enqueue_update(self, incident, reason, recipients):
+        if not recipients:
+            return 0
+        with self.lock:
+            incident['updates'] += 1
+            number = incident['updates']
+
+        base = self.outbox.get_payload(incident['incident_id'])
+        if base is not None:
+            data = base.as_dict()
+            data.update(reason=reason, update_number=number, timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            payload = AlertPayload.from_dict(data)
+        else:
+            # The initial alert is still resolving its location
+            location = incident['location'] if isinstance(incident['location'], dict) else {}
+            base = create_alert_payload(user_config.get_user_info().get('email', ''), reason,
+                                        location_info=location, incident_id=incident['incident_id'])
+            data = base.as_dict()
+            data['update_number'] = number
+            payload = AlertPayload.from_dict(data)
+
+        by_channel = {}
+        for channel, recipient in recipients:
+            by_channel.setdefault(channel, []).append(recipient)
+        # Own outbox key per update: updates are separate messages, retries of one are not
+        update_key = f"{incident['incident_id']}#u{number}"
+        queued = 0
+        for channel, channel_recipients in by_channel.items():
+            queued += self.outbox.enqueue(update_key, channel, payload, recipients=channel_recipients)
+        self.outbox.start()
+
+        self._count('updates')
+        self._count('update_messages', queued)
+        return queued
+
+    def _schedule_flush(self, incident):
+        with self.lock:
+            if incident['flush_timer'] is not None or not incident['deferred']:
+                return
+            delay = min(self.limiter.next_free(key) for key in incident['deferred'])
+            timer = threading.Timer(max(0.05, delay), self._flush, args=(incident,))
+            timer.daemon = True
+            incident['flush_timer'] = timer
+        timer.start()
+
+    def _flush(self, incident):
+        """Send the latest state to recipients whose earlier updates were deferred"""
+        with self.lock:
+            incident['flush_timer'] = None
+            if incident.get('closed'):
+                return
+            pending = list(incident['deferred'])
+            reason = incident['latest']
+        allowed = [key for key in pending if self.limiter.allow(key)]
+        with self.lock:
+            incident['deferred'].difference_update(allowed)
+        self._enqueue_update(incident, reason, allowed)
+        self._schedule_flush(incident)
+
+    def _find(self, incident_or_alert_id):
+        """Incident by incident id or by any of its alert ids (caller holds the lock)"""
+        for incident in [self.incident] + list(self.closed.values()):
+            if incident and (incident_or_alert_id in (incident['incident_id'], incident['alert_id'])
+                             or incident_or_alert_id in incident['aliases']):
+                return incident
+        return None
+
+    def resolve_alert_id(self, alert_id):
+        """Escalation id owning the incident a (possibly coalesced) alert id belongs to"""
+        with self.lock:
+            incident = self._find(alert_id)
+            return incident['alert_id'] if incident else alert_id
+
+    def _retire(self, incident):
+        incident['closed'] = True
+        if incident['flush_timer'] is not None:
+            incident['flush_timer'].cancel()
+            incident['flush_timer'] = None
+        self.closed[incident['incident_id']] = incident
+        # Keep a few for late acknowledgments of coalesced alert ids
+        while len(self.closed) > 16:
+            self.closed.pop(next(iter(self.closed)))
+
+    def close(self, incident_or_alert_id=None):
+        """End an incident (e.g. acknowledged): the next trigger opens a new one"""
+        with self.lock:
+            incident = self._find(incident_or_alert_id) if incident_or_alert_id else self.incident
+            if incident is None:
+                return False
+            if incident is self.incident:
+                self.incident = None
+            self._retire(incident)
+        self.logger.info(f"Incident {incident['incident_id']} closed")
+        return True
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['duplicate_sends_avoided'] = max(0, stats['messages_without_coalescing'] - stats['update_messages'])
+        return stats
+
+
+# Global instance
+incident_manager = IncidentManager()
+
+
+def simulate_trigger_burst(triggers=10, interval=0.2, contacts=3, max_messages=DEFAULT_MAX_MESSAGES,
+                           rate_window=DEFAULT_RATE_WINDOW, settle=1.0):
+    """
+    Fire a burst of triggers at a temporary incident manager and count messages
+
+    Deliveries go to a recording adapter in a temporary outbox, so nothing is sent.
+
+    Returns:
+        dict with incidents, messages delivered per recipient, messages the
+        uncoalesced path would have sent and duplicate sends avoided
+    """
+    import os
+    import shutil
+    import tempfile
+    from core.alert_outbox import AlertOutbox
+
+    work_dir = tempfile.mkdtemp(prefix="hershield_incident_sim_")
+    delivered = []
+    recipients = [f"+1555000{i:04d}" for i in range(contacts)]
+
+    def record(payload, recipient, key):
+        delivered.append((recipient, payload.update_number))
+        return None
+
+    try:
+        outbox = AlertOutbox(db_path=os.path.join(work_dir, "outbox.db"), workers=2,
+                             adapters={'sim': (lambda: recipients, record)}, connectivity_check=lambda: True)
+        manager = IncidentManager(window=60, max_messages=max_messages, rate_window=rate_window,
+                                  outbox=outbox, channels=['sim'])
+
+        incident_ids = set()
+        for i in range(triggers):
+            result = manager.report('simulated_trigger', f"Trigger {i + 1}: keyword 'help'", alert_id=f"sim_{i}")
+            if result['new']:
+                # What send_alert does for a new incident
+                payload = AlertPayload("sim@example.com", "Simulated emergency", incident_id=result['incident_id'])
+                outbox.enqueue_incident(result['incident_id'], payload, ['sim'])
+                outbox.start()
+            incident_ids.add(result['incident_id'])
+            time.sleep(interval)
+
+        time.sleep(settle)
+        outbox.drain(timeout=30)
+        outbox.stop()
+
+        per_recipient = {recipient: sum(1 for to, _ in delivered if to == recipient) for recipient in recipients}
+        return {
+            'triggers': triggers,
+            'incidents': len(incident_ids),
+            'delivered': len(delivered),
+            'per_recipient': per_recipient,
+            'without_coalescing': triggers * contacts,
+            'stats': manager.get_stats()
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Simulate a burst of emergency triggers")
+    parser.add_argument("--triggers", type=int, default=10, help="Triggers fired")
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between triggers")
+    parser.add_argument("--contacts", type=int, default=3, help="Recipients")
+    parser.add_argument("--max-messages", type=int, default=DEFAULT_MAX_MESSAGES, help="Messages per recipient per window")
+    parser.add_argument("--rate-window", type=float, default=DEFAULT_RATE_WINDOW, help="Rate window (s)")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds to wait for deferred updates")
+    args = parser.parse_args()
+
+    result = simulate_trigger_burst(args.triggers, args.interval, args.contacts, args.max_messages,
+                                    args.rate_window, args.settle)
+    print(f"🧩 {result['triggers']} triggers -> {result['incidents']} incident(s)")
+    print(f"📨 Delivered {result['delivered']} message(s) (uncoalesced: {result['without_coalescing']}), "
+          f"per recipient: {result['per_recipient']}")
+    print(f"🛑 Duplicate sends avoided: {result['stats']['duplicate_sends_avoided']} | stats: {result['stats']}")
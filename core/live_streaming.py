@@ -5,24 +5,37 @@ Streams live video and audio to cloud during emergency
 Ensures evidence is preserved even if phone is destroyed
 """
 
+import queue
 import threading
 import time
 from datetime import datetime
 import os
 
 try:
-    import cv2
+    from core.camera_service import camera_service
+    from core.evidence_encoder import FrameEncoder
     VIDEO_AVAILABLE = True
 except ImportError:
     VIDEO_AVAILABLE = False
 
 try:
     import pyaudio
-    import wave
     AUDIO_AVAILABLE = True
 except ImportError:
     AUDIO_AVAILABLE = False
 
+from core.evidence_segments import SegmentManifest, SegmentedVideoWriter, SegmentedWaveWriter
+import core.evidence_crypto as evidence_crypto
+from core.evidence_index import evidence_index
+from core.evidence_proxy import proxy_transcoder
+from core.evidence_uploader import evidence_uploader
+
+try:
+    from core.pretrigger_buffer import pretrigger_buffer
+    PRETRIGGER_AVAILABLE = True
+except ImportError:
+    PRETRIGGER_AVAILABLE = False
+
 
 class LiveStreamingService:
     """
@@ -34,26 +47,50 @@ class LiveStreamingService:
         self.streaming = False
         self.video_thread = None
         self.audio_thread = None
+        self.upload_thread = None
+        self.upload_queue = queue.Queue()
+        self.video_stats = {}
         self.evidence_dir = "evidence"
+        self.segment_seconds = 10
+        self.session_base = None
+        self.incident_id = None
+        self.manifest = None
         os.makedirs(self.evidence_dir, exist_ok=True)
     
-    def start_streaming(self, upload_callback=None):
+    def start_streaming(self, upload_callback=None, incident_id=None, priority='auto_confirmed'):
         """
         Start live streaming
         
+        Video and audio are recorded as fixed-length segments listed in a
+        manifest; each segment is handed to the uploader once, when it closes
+        
         Args:
-            upload_callback: Function to upload chunks to cloud
+            upload_callback: Function(kind, segment_path, segment_info, final=False)
+                called once per closed segment; segment_info is its manifest
+                entry (time range, size, sha256); defaults to the persistent
+                evidence upload queue
+            incident_id: Incident the session's evidence belongs to (its
+                retention priority applies); default: the session on its own
+            priority: Retention priority of a session without an incident
         """
         if self.streaming:
             return False
         
         self.streaming = True
         print("🎥 Starting live streaming...")
+        upload_callback = upload_callback or evidence_uploader.segment_callback
+        
+        # One session (file prefix + manifest) shared by video and audio
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_base = os.path.join(self.evidence_dir, f"emergency_{timestamp}")
+        self.manifest = SegmentManifest(self.session_base + ".manifest.json")
+        self.incident_id = incident_id or os.path.basename(self.session_base)
+        if incident_id is None:
+            evidence_index.set_incident_priority(self.incident_id, priority)
         
         # Start video streaming
         self.video_thread = threading.Thread(
             target=self._stream_video,
-            args=(upload_callback,),
             daemon=True
         )
         self.video_thread.start()
@@ -61,11 +98,18 @@ class LiveStreamingService:
         # Start audio streaming
         self.audio_thread = threading.Thread(
             target=self._stream_audio,
-            args=(upload_callback,),
             daemon=True
         )
         self.audio_thread.start()
         
+        # Uploads run off the recording threads so slow networks never stall them
+        self.upload_thread = threading.Thread(
+            target=self._upload_segments,
+            args=(upload_callback,),
+            daemon=True
+        )
+        self.upload_thread.start()
+        
         return True
     
     def stop_streaming(self):
@@ -73,70 +117,98 @@ class LiveStreamingService:
         self.streaming = False
         print("🛑 Stopping live streaming...")
     
-    def _stream_video(self, upload_callback):
+    def _queue_segment(self, segment):
+        """Called by segment writers when a segment is closed and fsync'd"""
+        evidence_index.record(segment['path'], incident_id=self.incident_id,
+                              sha256=segment['sha256'], created_at=segment['start'])
+        # Proxies are built while recording continues (one low-priority job at a time)
+        proxy_transcoder.submit(segment['path'])
+        self.upload_queue.put(segment)
+    
+    def _upload_segments(self, upload_callback):
+        """Send each newly closed segment to the uploader exactly once"""
+        while True:
+            try:
+                segment = self.upload_queue.get(timeout=0.5)
+            except queue.Empty:
+                recording = any(t is not None and t.is_alive() for t in (self.video_thread, self.audio_thread))
+                if not self.streaming and not recording:
+                    break
+                continue
+            
+            if upload_callback:
+                try:
+                    upload_callback(segment['kind'], segment['path'], segment, final=segment['final'])
+                    print(f"☁️ Queued {segment['kind']} segment {segment['index']}: {segment['file']}")
+                except Exception as e:
+                    print(f"Upload error: {e}")
+        
+        if self.manifest:
+            self.manifest.close()
+            evidence_index.record(self.manifest.path, incident_id=self.incident_id,
+                                  media_type='manifest')
+            print(f"✅ Evidence manifest: {self.manifest.path}")
+    
+    def _stream_video(self):
         """Stream video in real-time"""
         if not VIDEO_AVAILABLE:
             print("⚠️ Video streaming not available")
             return
         
         try:
-            cap = cv2.VideoCapture(0)
+            fps = 20.0
+            cap = camera_service.subscribe("live_stream", max_fps=fps)
             
             if not cap.isOpened():
                 print("❌ Camera not available")
                 return
             
-            # Video writer setup
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            video_file = os.path.join(self.evidence_dir, f"emergency_video_{timestamp}.avi")
-            
-            fourcc = cv2.VideoWriter_fourcc(*'XVID')
-            fps = 20.0
+            # Segmented writer setup: resize and encode run on the encoder thread
             frame_size = (640, 480)
-            out = cv2.VideoWriter(video_file, fourcc, fps, frame_size)
-            
-            frame_count = 0
-            chunk_size = 100  # Upload every 100 frames
+            writer = SegmentedVideoWriter(
+                self.session_base, 'XVID', fps, frame_size,
+                segment_seconds=self.segment_seconds,
+                manifest=self.manifest, on_segment=self._queue_segment,
+                cipher=evidence_crypto.evidence_cipher
+            )
+            on_first_frame = None
+            if PRETRIGGER_AVAILABLE:
+                # Open with the seconds before the trigger, up to the first live frame
+                on_first_frame = lambda writer, first_ts: pretrigger_buffer.write_video_prefix(
+                    writer, fps, frame_size, first_ts)
+            encoder = FrameEncoder(None, fps, frame_size, on_first_frame=on_first_frame, writer=writer)
+            if not encoder.start():
+                print("❌ Could not create video writer")
+                cap.release()
+                return
             
-            print(f"📹 Recording video to: {video_file}")
+            print(f"📹 Recording video segments to: {self.session_base}_video_*.avi")
             
             while self.streaming:
-                ret, frame = cap.read()
+                ret, frame, captured_at = cap.read_with_timestamp()
                 if not ret:
                     continue
                 
-                # Resize frame
-                frame = cv2.resize(frame, frame_size)
-                
-                # Write to file
-                out.write(frame)
-                
-                frame_count += 1
-                
-                # Upload chunk to cloud
-                if upload_callback and frame_count % chunk_size == 0:
-                    try:
-                        upload_callback('video', video_file, frame_count)
-                        print(f"☁️ Uploaded video chunk: {frame_count} frames")
-                    except Exception as e:
-                        print(f"Upload error: {e}")
+                encoder.submit(frame, captured_at)
             
             cap.release()
-            out.release()
-            
-            # Final upload
-            if upload_callback:
-                try:
-                    upload_callback('video', video_file, frame_count, final=True)
-                    print(f"✅ Final video uploaded: {video_file}")
-                except Exception as e:
-                    print(f"Final upload error: {e}")
+            # Closes the last, shorter segment as final
+            self.video_stats = encoder.stop()
+            print(f"📊 Video: capture {self.video_stats['capture_fps']:.1f} FPS, "
+                  f"encode {self.video_stats['encode_fps']:.1f} FPS, "
+                  f"{self.video_stats['dropped_rate'] + self.video_stats['dropped_queue']} dropped, "
+                  f"{self.video_stats['duplicated']} duplicated")
         
         except Exception as e:
             print(f"Video streaming error: {e}")
     
-    def _stream_audio(self, upload_callback):
-        """Stream audio in real-time"""
+    def _stream_audio(self):
+        """
+        Stream audio in real-time
+        While the voice listener feeds the pre-trigger ring, its microphone
+        stream is shared (tap_audio) and the prefix ends where the shared
+        chunks begin; otherwise a stream of our own is opened
+        """
         if not AUDIO_AVAILABLE:
             print("⚠️ Audio streaming not available")
             return
@@ -148,78 +220,103 @@ class LiveStreamingService:
             CHANNELS = 1
             RATE = 44100
             
-            p = pyaudio.PyAudio()
-            stream = p.open(
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=RATE,
-                input=True,
-                frames_per_buffer=CHUNK
-            )
-            
-            # Audio file setup
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            audio_file = os.path.join(self.evidence_dir, f"emergency_audio_{timestamp}.wav")
+            tap = None
+            if PRETRIGGER_AVAILABLE:
+                tap = pretrigger_buffer.tap_audio()
+                if tap is not None:
+                    # Segments follow the shared microphone's rate
+                    RATE = pretrigger_buffer.audio_rate
+            p = None
+            stream = None
+            if tap is None:
+                p, stream = self._open_microphone(FORMAT, CHANNELS, RATE, CHUNK)
             
-            wf = wave.open(audio_file, 'wb')
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(p.get_sample_size(FORMAT))
-            wf.setframerate(RATE)
+            # Segmented audio setup: every segment is a complete WAV file
+            wf = SegmentedWaveWriter(
+                self.session_base, CHANNELS, pyaudio.get_sample_size(FORMAT), RATE,
+                segment_seconds=self.segment_seconds,
+                manifest=self.manifest, on_segment=self._queue_segment,
+                cipher=evidence_crypto.evidence_cipher
+            )
             
-            chunk_count = 0
-            chunk_size = 100  # Upload every 100 chunks
+            # Open with the buffered audio from before the trigger; a tapped
+            # recording writes it when the first shared chunk arrives
+            if tap is None and PRETRIGGER_AVAILABLE and pretrigger_buffer.audio_rate == RATE:
+                self._write_audio_prefix(wf, time.time())
             
-            print(f"🎤 Recording audio to: {audio_file}")
+            print(f"🎤 Recording audio segments to: {self.session_base}_audio_*.wav"
+                  f"{' (shared pre-trigger microphone)' if tap is not None else ''}")
             
+            chunk_seconds = float(CHUNK) / RATE
+            prefix_written = tap is None
             while self.streaming:
                 try:
-                    data = stream.read(CHUNK, exception_on_overflow=False)
-                    wf.writeframes(data)
-                    
-                    chunk_count += 1
-                    
-                    # Upload chunk to cloud
-                    if upload_callback and chunk_count % chunk_size == 0:
+                    if stream is None:
                         try:
-                            upload_callback('audio', audio_file, chunk_count)
-                            print(f"☁️ Uploaded audio chunk: {chunk_count} chunks")
-                        except Exception as e:
-                            print(f"Upload error: {e}")
+                            chunk = tap.get(timeout=0.5)
+                        except queue.Empty:
+                            continue
+                        if chunk is None:
+                            # The listener released the microphone: continue on our own stream
+                            print("⚠️ Pre-trigger microphone closed, opening audio stream")
+                            p, stream = self._open_microphone(FORMAT, CHANNELS, RATE, CHUNK)
+                            tap = None
+                            continue
+                        start, data = chunk
+                        if not prefix_written:
+                            self._write_audio_prefix(wf, start)
+                            prefix_written = True
+                    else:
+                        data = stream.read(CHUNK, exception_on_overflow=False)
+                        start = time.time() - chunk_seconds
+                    wf.writeframes(data, start)
                 
                 except Exception as e:
                     print(f"Audio chunk error: {e}")
                     continue
             
-            stream.stop_stream()
-            stream.close()
-            p.terminate()
+            if tap is not None:
+                pretrigger_buffer.untap_audio(tap)
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+                p.terminate()
+            # Closes the last, shorter segment as final
             wf.close()
-            
-            # Final upload
-            if upload_callback:
-                try:
-                    upload_callback('audio', audio_file, chunk_count, final=True)
-                    print(f"✅ Final audio uploaded: {audio_file}")
-                except Exception as e:
-                    print(f"Final upload error: {e}")
         
         except Exception as e:
             print(f"Audio streaming error: {e}")
     
+    @staticmethod
+    def _open_microphone(audio_format, channels, rate, chunk):
+        """Open a PyAudio input stream; returns (PyAudio, stream)"""
+        p = pyaudio.PyAudio()
+        stream = p.open(
+            format=audio_format,
+            channels=channels,
+            rate=rate,
+            input=True,
+            frames_per_buffer=chunk
+        )
+        return p, stream
+    
+    def _write_audio_prefix(self, wf, before):
+        """Write the pre-trigger ring's audio up to `before`"""
+        prefix = pretrigger_buffer.write_audio_prefix(wf, before)
+        if prefix['samples_written']:
+            print(f"⏪ Audio starts {prefix['seconds']:.1f}s before trigger")
+    
     def get_evidence_files(self):
-        """Get list of all evidence files"""
+        """Get list of all evidence files (from the evidence index)"""
         try:
-            files = []
-            for filename in os.listdir(self.evidence_dir):
-                filepath = os.path.join(self.evidence_dir, filename)
-                if os.path.isfile(filepath):
-                    files.append({
-                        'filename': filename,
-                        'filepath': filepath,
-                        'size': os.path.getsize(filepath),
-                        'created': os.path.getctime(filepath)
-                    })
-            return files
+            return [{
+                'filename': row['filename'],
+                'filepath': row['path'],
+                'size': row['size'],
+                'created': row['created_at'],
+                'media_type': row['media_type'],
+                'incident_id': row['incident_id']
+            } for row in evidence_index.list_files(self.evidence_dir)]
         except Exception as e:
             print(f"Error getting evidence files: {e}")
             return []
@@ -13,10 +13,18 @@ import socket
 import subprocess
 import platform
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import sqlite3
 from pathlib import Path
 
+
+# Pending alerts older than this are stale: contacts are not alerted hours later
+MAX_RETRY_AGE_HOURS = 6
+# Stored for the record only, never handed to the outbox (received_alert is another device's)
+UNDELIVERED_ALERT_TYPES = ('system_test', 'test', 'received_alert')
+# PRAGMA user_version once legacy pending alerts have been expired
+SCHEMA_VERSION = 1
+
 class OfflineAlertSystem:
     """Offline alert system for emergency situations"""
     
@@ -59,9 +67,28 @@ class OfflineAlertSystem:
                     user_info TEXT,
                     status TEXT DEFAULT 'pending',
                     retry_count INTEGER DEFAULT 0,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    incident_id TEXT
                 )
             ''')
+
+            # Databases created before alerts were linked to incidents
+            columns = [row[1] for row in cursor.execute('PRAGMA table_info(alerts)')]
+            if 'incident_id' not in columns:
+                cursor.execute('ALTER TABLE alerts ADD COLUMN incident_id TEXT')
+
+            # One-time: alerts queued before retries were age/type filtered would
+            # otherwise all be delivered the first time the outbox runs
+            if cursor.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                cutoff = (datetime.now() - timedelta(hours=MAX_RETRY_AGE_HOURS)).isoformat()
+                cursor.execute(f'''
+                    UPDATE alerts SET status = 'expired'
+                    WHERE status = 'pending'
+                    AND (timestamp < ? OR alert_type IN ({",".join("?" * len(UNDELIVERED_ALERT_TYPES))}))
+                ''', (cutoff,) + UNDELIVERED_ALERT_TYPES)
+                if cursor.rowcount:
+                    self.logger.info(f"Expired {cursor.rowcount} stale pending alert(s)")
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
             
             # Create network devices table
             cursor.execute('''
@@ -83,21 +110,22 @@ class OfflineAlertSystem:
         except Exception as e:
             self.logger.error(f"Database initialization error: {e}")
 
-    def store_alert_offline(self, alert_type, message, location_data=None, user_info=None):
+    def store_alert_offline(self, alert_type, message, location_data=None, user_info=None, incident_id=None):
         """Store alert in offline database"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO alerts (timestamp, alert_type, message, location_data, user_info)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO alerts (timestamp, alert_type, message, location_data, user_info, incident_id)
+                VALUES (?, ?, ?, ?, ?, ?)
             ''', (
                 datetime.now().isoformat(),
                 alert_type,
                 message,
                 json.dumps(location_data) if location_data else None,
-                json.dumps(user_info) if user_info else None
+                json.dumps(user_info) if user_info else None,
+                incident_id
             ))
             
             alert_id = cursor.lastrowid
@@ -118,7 +146,7 @@ class OfflineAlertSystem:
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, timestamp, alert_type, message, location_data, user_info, retry_count
+                SELECT id, timestamp, alert_type, message, location_data, user_info, retry_count, incident_id
                 FROM alerts 
                 WHERE status = 'pending'
                 ORDER BY timestamp ASC
@@ -133,7 +161,8 @@ class OfflineAlertSystem:
                     'message': row[3],
                     'location_data': json.loads(row[4]) if row[4] else None,
                     'user_info': json.loads(row[5]) if row[5] else None,
-                    'retry_count': row[6]
+                    'retry_count': row[6],
+                    'incident_id': row[7]
                 }
                 alerts.append(alert)
             
@@ -164,6 +193,24 @@ class OfflineAlertSystem:
         except Exception as e:
             self.logger.error(f"Error marking alert as sent: {e}")
 
+    def expire_alert(self, alert_id):
+        """Mark a pending alert as too old (or not meant) to be delivered"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                UPDATE alerts
+                SET status = 'expired'
+                WHERE id = ?
+            ''', (alert_id,))
+
+            conn.commit()
+            conn.close()
+
+        except Exception as e:
+            self.logger.error(f"Error expiring alert: {e}")
+
     def increment_retry_count(self, alert_id):
         """Increment retry count for failed alert"""
         try:
@@ -402,12 +449,12 @@ class OfflineAlertSystem:
         self.discovery_thread = threading.Thread(target=discovery_loop, daemon=True)
         self.discovery_thread.start()
 
-    def send_offline_alert(self, alert_type, message, location_data=None, user_info=None):
+    def send_offline_alert(self, alert_type, message, location_data=None, user_info=None, incident_id=None):
         """Send alert using offline methods"""
         success_methods = []
         
         # Store in offline database
-        alert_id = self.store_alert_offline(alert_type, message, location_data, user_info)
+        alert_id = self.store_alert_offline(alert_type, message, location_data, user_info, incident_id)
         if alert_id:
             success_methods.append("offline_storage")
         
@@ -526,23 +573,56 @@ Please contact emergency services immediately.
             return False
 
     def retry_pending_alerts(self):
-        """Retry sending pending alerts when connectivity is restored"""
+        """
+        Hand pending alerts to the durable alert outbox, which delivers them
+        with backoff as soon as connectivity allows. Alerts that belong to an
+        incident already in the outbox add no duplicate deliveries.
+        Test and received alerts, and alerts older than MAX_RETRY_AGE_HOURS,
+        are expired instead of sent.
+        """
+        from core.alert_outbox import alert_outbox
+        from core.alert_payload import AlertPayload
+
         pending_alerts = self.get_pending_alerts()
-        
+        cutoff = (datetime.now() - timedelta(hours=MAX_RETRY_AGE_HOURS)).isoformat()
+        handed_over = 0
+
         for alert in pending_alerts:
+            if alert['alert_type'] in UNDELIVERED_ALERT_TYPES or alert['timestamp'] < cutoff:
+                self.expire_alert(alert['id'])
+                self.logger.info(f"Alert {alert['id']} ({alert['alert_type']}, {alert['timestamp']}) expired")
+                continue
             if alert['retry_count'] < 5:  # Max 5 retries
                 try:
-                    # Try to send via online methods
-                    # This would integrate with your existing alert system
                     self.logger.info(f"Retrying alert {alert['id']}")
+                    incident_id = alert['incident_id'] or f"offline-{alert['id']}"
+                    user_info = alert['user_info'] or {}
+                    location = alert['location_data'] or {}
+                    has_coordinates = 'latitude' in location and 'longitude' in location
+                    payload = AlertPayload(
+                        user_info.get('user_email') or user_info.get('email', ''),
+                        alert['message'],
+                        location_url=(f"https://maps.google.com/?q={location['latitude']},{location['longitude']}"
+                                      if has_coordinates else None),
+                        location_description=location.get('address'),
+                        coordinates=location if has_coordinates else None,
+                        user_info=user_info,
+                        timestamp=alert['timestamp'],
+                        incident_id=incident_id
+                    )
+                    alert_outbox.enqueue_incident(incident_id, payload)
+                    alert_outbox.start()
                     
-                    # If successful, mark as sent
-                    # self.mark_alert_sent(alert['id'])
+                    # Delivery (and its retries) is now tracked by the outbox
+                    self.mark_alert_sent(alert['id'])
+                    handed_over += 1
                     
                 except Exception as e:
                     self.increment_retry_count(alert['id'])
                     self.logger.error(f"Retry failed for alert {alert['id']}: {e}")
 
+        return handed_over
+
     def stop_monitoring(self):
         """Stop all monitoring services"""
         self.is_monitoring = False
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Pre-Trigger Evidence Buffer
+Always-on ring of the last few seconds of video (JPEG) and audio
+(zlib-compressed PCM), capped in memory. When an alert fires, the ring is
+written as the opening segment of the evidence recording, so the files
+cover what happened before the trigger and not only what came after
+
+The ring opens no microphone of its own: the voice listener, which already
+holds the input stream, feeds every chunk it reads (feed_from)
+"""
+
+import queue
+import threading
+import time
+import zlib
+from collections import deque
+
+try:
+    import cv2
+    import numpy as np
+    from core.camera_service import camera_service
+    VIDEO_AVAILABLE = True
+except ImportError:
+    VIDEO_AVAILABLE = False
+
+
+class _FeedingStream:
+    """Microphone stream wrapper: every chunk read is also added to the ring"""
+
+    def __init__(self, stream, ring):
+        self.stream = stream
+        self.ring = ring
+
+    def read(self, size, *args, **kwargs):
+        data = self.stream.read(size, *args, **kwargs)
+        self.ring.feed_audio(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class PreTriggerBuffer:
+    """
+    Bounded ring of recent compressed frames and audio chunks
+    Entries older than `seconds` are evicted, and the oldest video frames
+    go first whenever the ring exceeds max_memory_mb
+    """
+
+    def __init__(self, seconds=10, max_memory_mb=32, video_fps=10, jpeg_quality=80,
+                 capture_audio=True, audio_rate=44100, audio_chunk=1024):
+        self.seconds = seconds
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.video_fps = video_fps
+        self.jpeg_quality = jpeg_quality
+        self.capture_audio = capture_audio
+        # Mono int16; set to the feeding microphone's rate when one attaches
+        self.audio_rate = audio_rate
+        self.audio_chunk = audio_chunk
+
+        self.running = False
+        self.lock = threading.Lock()
+        self.video = deque()  # (timestamp, jpeg bytes)
+        self.audio = deque()  # (start timestamp, compressed PCM, sample count)
+        self.total_bytes = 0
+        self.evicted = 0
+        # Queues fed with every raw chunk, so recorders share the ring's
+        # microphone stream instead of opening a second one
+        self.audio_taps = []
+        self.audio_capturing = False
+
+        self.video_thread = None
+
+    def start(self):
+        """Start filling the ring (no-op if already running)"""
+        if self.running:
+            return True
+        if not VIDEO_AVAILABLE and not self.capture_audio:
+            print("⚠️ Pre-trigger buffer not available")
+            return False
+
+        self.running = True
+        if VIDEO_AVAILABLE:
+            self.video_thread = threading.Thread(target=self._video_loop, daemon=True)
+            self.video_thread.start()
+
+        print(f"⏪ Pre-trigger buffer started ({self.seconds}s, {self.max_bytes // (1024 * 1024)} MB cap)")
+        return True
+
+    def stop(self):
+        """Stop filling and drop buffered data"""
+        self.running = False
+        self.detach_audio()
+        with self.lock:
+            self.video.clear()
+            self.audio.clear()
+            self.total_bytes = 0
+
+    def _append(self, ring, entry, size):
+        """Add an entry and evict by age, then by memory cap"""
+        with self.lock:
+            ring.append(entry)
+            self.total_bytes += size
+
+            cutoff = entry[0] - self.seconds
+            for old_ring in (self.video, self.audio):
+                while old_ring and old_ring[0][0] < cutoff:
+                    self._evict(old_ring)
+
+            while self.total_bytes > self.max_bytes and (self.video or self.audio):
+                self._evict(self.video if self.video else self.audio)
+
+    def _evict(self, ring):
+        """Drop the oldest entry of a ring (caller holds the lock)"""
+        self.total_bytes -= len(ring.popleft()[1])
+        self.evicted += 1
+
+    def _video_loop(self):
+        """Compress frames from the shared camera into the ring"""
+        subscription = camera_service.subscribe("pretrigger", max_fps=self.video_fps, queue_size=1)
+        if not subscription.isOpened():
+            return
+
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        try:
+            while self.running:
+                ret, frame, timestamp = subscription.read_with_timestamp()
+                if not ret:
+                    continue
+                ok, jpeg = cv2.imencode('.jpg', frame, params)
+                if ok:
+                    data = jpeg.tobytes()
+                    self._append(self.video, (timestamp, data), len(data))
+        finally:
+            subscription.release()
+
+    def attach_audio(self, rate):
+        """
+        A capture loop that owns the microphone (mono int16 at `rate`) starts
+        feeding the ring; recorders can tap it from now on
+        """
+        with self.lock:
+            if self.audio_capturing and self.audio_rate == rate:
+                return
+            if self.audio_rate != rate:
+                # Chunks at another rate cannot be joined into one prefix
+                for _ in range(len(self.audio)):
+                    self._evict(self.audio)
+                self.audio_rate = rate
+            self.audio_capturing = True
+
+    def detach_audio(self):
+        """The feeding loop released the microphone; buffered audio is kept"""
+        with self.lock:
+            if not self.audio_capturing:
+                return
+            self.audio_capturing = False
+            # Tell tapped recorders to open their own stream
+            for tap in self.audio_taps:
+                tap.put(None)
+            self.audio_taps = []
+
+    def feed_audio(self, data, start=None):
+        """
+        Add one chunk read by the feeding loop
+
+        Args:
+            data: Raw mono int16 PCM
+            start: Capture time of the first sample (default: the chunk just ended)
+        """
+        if not self.running or not self.capture_audio or not self.audio_capturing:
+            return
+        samples = len(data) // 2
+        if start is None:
+            # read() returns once the chunk is complete, so it started one chunk ago
+            start = time.time() - float(samples) / self.audio_rate
+        packed = zlib.compress(data, 1)
+        self._append(self.audio, (start, packed, samples), len(packed))
+        with self.lock:
+            for tap in self.audio_taps:
+                tap.put((start, data))
+
+    def feed_from(self, source):
+        """
+        Feed the ring from an open speech_recognition microphone
+        (inside `with mic as source`): every chunk the recognizer reads is
+        also buffered, so no second input stream is needed
+
+        Returns:
+            True if the source is now feeding the ring
+        """
+        if not self.running or not self.capture_audio or getattr(source, 'stream', None) is None:
+            return False
+        if getattr(source, 'SAMPLE_WIDTH', 2) != 2 or isinstance(source.stream, _FeedingStream):
+            return isinstance(source.stream, _FeedingStream)
+        self.attach_audio(source.SAMPLE_RATE)
+        source.stream = _FeedingStream(source.stream, self)
+        return True
+
+    def tap_audio(self):
+        """
+        Share the microphone feeding the ring
+        Only one input stream per device is reliable, so a recorder started
+        while the ring is being fed reads its chunks from here
+
+        Returns:
+            queue.Queue of (start timestamp, raw PCM) for every chunk captured
+            from now on (None once the feeding loop detaches), or None if
+            nothing is feeding the ring
+        """
+        with self.lock:
+            if not self.audio_capturing:
+                return None
+            tap = queue.Queue()
+            self.audio_taps.append(tap)
+            return tap
+
+    def untap_audio(self, tap):
+        """Stop feeding a queue returned by tap_audio"""
+        with self.lock:
+            if tap in self.audio_taps:
+                self.audio_taps.remove(tap)
+
+    def snapshot(self, before=None):
+        """Copy of the buffered (video, audio) entries older than `before`"""
+        before = before or time.time()
+        with self.lock:
+            video = [entry for entry in self.video if entry[0] < before]
+            audio = [entry for entry in self.audio if entry[0] < before]
+        return video, audio
+
+    def write_video_prefix(self, writer, fps, frame_size, before):
+        """
+        Write buffered frames to an open VideoWriter at a constant fps
+        Frames are repeated or skipped by timestamp so the prefix lasts
+        exactly from the oldest buffered frame up to `before`, the capture
+        time of the first live frame, keeping the timeline continuous
+
+        Returns:
+            dict with frames_written, start_timestamp and seconds
+        """
+        video, _ = self.snapshot(before)
+        if not video or not VIDEO_AVAILABLE:
+            return {'frames_written': 0, 'start_timestamp': before, 'seconds': 0.0}
+
+        step = 1.0 / fps
+        timestamped = getattr(writer, 'timestamped', False)
+        index = 0
+        decoded_index = -1
+        frame = None
+        written = 0
+        t = video[0][0]
+
+        while t < before:
+            while index + 1 < len(video) and video[index + 1][0] <= t:
+                index += 1
+            if index != decoded_index:
+                frame = cv2.imdecode(np.frombuffer(video[index][1], dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame.shape[1] != frame_size[0] or frame.shape[0] != frame_size[1]:
+                    frame = cv2.resize(frame, frame_size)
+                decoded_index = index
+            if timestamped:
+                writer.write(frame, t)
+            else:
+                writer.write(frame)
+            written += 1
+            t += step
+
+        return {'frames_written': written, 'start_timestamp': video[0][0], 'seconds': written * step}
+
+    def write_audio_prefix(self, wave_file, before):
+        """
+        Write buffered audio to an open wave file (mono int16 at audio_rate)
+        The last chunk is trimmed at `before` so live audio continues seamlessly
+
+        Returns:
+            dict with samples_written, start_timestamp and seconds
+        """
+        _, audio = self.snapshot(before)
+        if not audio:
+            return {'samples_written': 0, 'start_timestamp': before, 'seconds': 0.0}
+
+        timestamped = getattr(wave_file, 'timestamped', False)
+        written = 0
+        for start, packed, samples in audio:
+            data = zlib.decompress(packed)
+            keep = min(samples, int((before - start) * self.audio_rate))
+            if keep <= 0:
+                continue
+            if timestamped:
+                wave_file.writeframes(data[:keep * 2], start)
+            else:
+                wave_file.writeframes(data[:keep * 2])
+            written += keep
+
+        return {'samples_written': written, 'start_timestamp': audio[0][0],
+                'seconds': float(written) / self.audio_rate}
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'running': self.running,
+                'video_frames': len(self.video),
+                'audio_chunks': len(self.audio),
+                'audio_taps': len(self.audio_taps),
+                'buffered_seconds': (self.video[-1][0] - self.video[0][0]) if len(self.video) > 1 else 0.0,
+                'memory_mb': self.total_bytes / (1024.0 * 1024.0),
+                'evicted': self.evicted
+            }
+
+
+# Global instance (started on demand when pre-trigger evidence is enabled)
+pretrigger_buffer = PreTriggerBuffer()
+
+
+def start_pretrigger_buffer(settings=None):
+    """Configure the global ring from evidence settings and start it"""
+    settings = settings or {}
+    pretrigger_buffer.seconds = settings.get('pretrigger_seconds', pretrigger_buffer.seconds)
+    pretrigger_buffer.max_bytes = int(settings.get('pretrigger_memory_mb', 32) * 1024 * 1024)
+    pretrigger_buffer.capture_audio = settings.get('pretrigger_audio', pretrigger_buffer.capture_audio)
+    return pretrigger_buffer.start()
+
+
+# Example usage
+if __name__ == "__main__":
+    pretrigger_buffer.start()
+    time.sleep(5)
+    print(f"📊 {pretrigger_buffer.get_stats()}")
+    pretrigger_buffer.stop()
@@ -8,6 +8,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from core.user_config import user_config
+from core.alert_payload import create_alert_payload
+from core.smtp_pool import get_smtp_pool
 
 class SMSAlert:
     """Send emergency alerts via free email-to-SMS gateways"""
@@ -16,15 +18,16 @@ class SMSAlert:
         self.config = user_config.get_messaging_config()["sms_config"]
         self.user_info = user_config.get_user_info()
 
-    def send_alert(self, user_email, reason="Emergency alert", location=None):
-        """Send emergency alert via SMS using email gateways"""
+    def send_alert(self, user_email, reason="Emergency alert", location=None, payload=None):
+        """Send emergency alert via SMS using email gateways (payload: pre-rendered AlertPayload)"""
 
         if not self.config["smtp_server"] or not self.config["username"] or not self.config["password"]:
             print("[ERROR] SMS (email) not configured")
             return False
 
         # Create SMS message (keep it short for SMS)
-        sms_message = self._create_sms_message(reason, location)
+        payload = payload or create_alert_payload(user_email, reason, location)
+        sms_message = payload.render('sms')
 
         # Get emergency contacts with carrier info
         contacts = self._get_sms_contacts()
@@ -32,32 +35,18 @@ class SMSAlert:
             print("[ERROR] No SMS-capable contacts configured")
             return False
 
+        # One pooled SMTP session sends to several gateways back to back
+        messages = [self._build_sms_email(contact_info, sms_message) for contact_info in contacts]
         sent_count = 0
-        for contact_info in contacts:
-            try:
-                if self._send_sms_via_email(contact_info, sms_message):
-                    sent_count += 1
-                    print(f"[SMS SENT] Alert sent to {contact_info['phone']}")
-            except Exception as e:
-                print(f"[SMS ERROR] Failed to send to {contact_info['phone']}: {e}")
+        for contact_info, result in zip(contacts, get_smtp_pool(self.config).send_messages(messages)):
+            if result['sent']:
+                sent_count += 1
+                print(f"[SMS SENT] Alert sent to {contact_info['phone']}")
+            else:
+                print(f"[SMS ERROR] Failed to send to {contact_info['phone']}: {result['error']}")
 
         return sent_count > 0
 
-    def _create_sms_message(self, reason, location):
-        """Create a concise SMS message"""
-        name = self.user_info['name']
-
-        message = f"🚨 HER SHIELD ALERT 🚨\n{name}: {reason}"
-
-        if location:
-            message += f"\nLocation: {location}"
-
-        # Keep under 160 characters for SMS
-        if len(message) > 160:
-            message = message[:157] + "..."
-
-        return message
-
     def _get_sms_contacts(self):
         """Get contacts that can receive SMS via email gateways"""
         contacts = []
@@ -158,27 +147,23 @@ class SMSAlert:
 
         return None
 
+    def _build_sms_email(self, contact_info, message):
+        """Email addressed to the contact's carrier gateway"""
+        msg = MIMEMultipart()
+        msg['From'] = self.config["username"]
+        msg['To'] = contact_info['email']
+        msg['Subject'] = ""  # SMS gateways often ignore subject
+
+        msg.attach(MIMEText(message, 'plain'))
+        return msg
+
     def _send_sms_via_email(self, contact_info, message):
         """Send SMS by emailing to carrier gateway"""
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.config["username"]
-            msg['To'] = contact_info['email']
-            msg['Subject'] = ""  # SMS gateways often ignore subject
-
-            msg.attach(MIMEText(message, 'plain'))
-
-            # Connect to SMTP server
-            server = smtplib.SMTP(self.config["smtp_server"], self.config["smtp_port"])
-            if self.config["use_tls"]:
-                server.starttls()
-
-            server.login(self.config["username"], self.config["password"])
-            server.send_message(msg)
-            server.quit()
-
-            return True
+            result = get_smtp_pool(self.config).send_messages([self._build_sms_email(contact_info, message)])[0]
+            if not result['sent']:
+                print(f"[SMS EMAIL ERROR] {result['error']}")
+            return result['sent']
 
         except Exception as e:
             print(f"[SMS EMAIL ERROR] {e}")
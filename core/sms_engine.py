@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+SMS Dispatch Engine
+Concurrent, rate-limit-aware SMS sending for Twilio and the system SMS path
+- Twilio messages go straight to the REST API over the shared keep-alive
+  HTTP client (no per-alert client or TLS setup)
+- A token bucket per provider keeps sends within the provider's limits;
+  up to `concurrency` messages are in flight at once
+- 429 responses pause the whole provider for Retry-After seconds and halve
+  its rate (recovering gradually); transient failures retry with
+  exponential backoff and jitter
+- Every message reports its latency, attempts and time spent rate-limited
+"""
+
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.http_client import http_client
+
+
+TWILIO_API_BASE = "https://api.twilio.com"
+
+# rate: requests per second, burst: bucket size, concurrency: requests in flight.
+# Twilio queues messages beyond a sender's throughput itself, so the client-side
+# limit is the REST API request rate; Android prompts after 30 SMS per 30 min.
+PROVIDER_LIMITS = {
+    'twilio': {'rate': 10.0, 'burst': 10, 'concurrency': 5},
+    'system': {'rate': 1.0 / 60, 'burst': 30, 'concurrency': 1}
+}
+
+
+class SMSSendError(Exception):
+    """SMS request failed; retry_after is set for rate limiting (429)"""
+
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable or retry_after is not None
+        self.retry_after = retry_after
+
+
+class ProviderLimiter:
+    """Thread-safe token bucket with a provider-wide pause for Retry-After"""
+
+    def __init__(self, rate, burst, concurrency):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start; returns seconds waited"""
+        start = time.monotonic()
+        self.slots.acquire()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - start
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(min(wait, 1.0))
+
+    def release(self):
+        self.slots.release()
+
+    def pause(self, seconds):
+        """Provider asked us to back off: hold every sender, drop the burst, halve the rate"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.rate = max(self.max_rate / 16, self.rate / 2)
+
+    def succeeded(self):
+        """Creep back towards the configured rate after a rate-limit"""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+class SMSEngine:
+    """Sends batches of SMS concurrently within each provider's limits"""
+
+    def __init__(self, limits=None, max_attempts=3, max_rate_limited=10, base_backoff=0.5, max_backoff=30.0,
+                 timeout=10, api_base=TWILIO_API_BASE):
+        """
+        Args:
+            limits: Per-provider overrides of PROVIDER_LIMITS
+            max_attempts: Tries per message for errors other than rate limiting
+            max_rate_limited: 429 responses tolerated per message
+            api_base: Twilio API root (point at the stand-in server for tests)
+        """
+        self.max_attempts = max_attempts
+        self.max_rate_limited = max_rate_limited
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.api_base = api_base.rstrip('/')
+
+        self.limits = {name: dict(values) for name, values in PROVIDER_LIMITS.items()}
+        for name, values in (limits or {}).items():
+            self.limits.setdefault(name, {}).update(values)
+        self.limiters = {name: ProviderLimiter(**values) for name, values in self.limits.items()}
+
+        workers = sum(values['concurrency'] for values in self.limits.values())
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sms")
+        self.lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0}
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    # Providers: each returns a message id or raises SMSSendError
+
+    def _twilio_send(self, account, to, body):
+        data = {'To': to, 'Body': body}
+        if account.get('messaging_service_sid'):
+            data['MessagingServiceSid'] = account['messaging_service_sid']
+        elif account.get('phone_number'):
+            data['From'] = account['phone_number']
+        else:
+            raise SMSSendError("No Twilio sender configured")
+
+        url = f"{self.api_base}/2010-04-01/Accounts/{account['sid']}/Messages.json"
+        try:
+            response = http_client.post(url, data=data, auth=(account['sid'], account['auth_token']),
+                                        timeout=self.timeout)
+        except Exception as e:
+            # May rarely duplicate a message the API accepted; a repeated alert beats a missing one
+            raise SMSSendError(f"Twilio request failed: {e}", retryable=True)
+
+        if response.status_code in (200, 201):
+            return response.json().get('sid')
+        try:
+            detail = response.json().get('message', response.text)
+        except ValueError:
+            detail = response.text
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            try:
+                retry_after = float(retry_after)
+            except (TypeError, ValueError):
+                retry_after = self.base_backoff
+            raise SMSSendError(f"Twilio rate limited: {detail}", status=429, retry_after=retry_after)
+        raise SMSSendError(f"Twilio HTTP {response.status_code}: {detail}", status=response.status_code,
+                           retryable=response.status_code >= 500)
+
+    def _system_send(self, account, to, body):
+        try:
+            result = subprocess.run(['termux-sms-send', '-n', to, body],
+                                    capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise SMSSendError("System SMS timed out", retryable=True)
+        except OSError as e:
+            raise SMSSendError(f"System SMS unavailable: {e}")
+        if result.returncode != 0:
+            raise SMSSendError(f"System SMS failed: {result.stderr.strip()}", retryable=True)
+        return None
+
+    def _send_one(self, provider, account, to, body, start):
+        """Send one message with rate limiting and retries"""
+        limiter = self.limiters[provider]
+        send = self._twilio_send if provider == 'twilio' else self._system_send
+        result = {'to': to, 'provider': provider, 'success': False, 'sid': None, 'error': None,
+                  'attempts': 0, 'throttled': 0.0, 'latency': None, 'retry_after': None}
+
+        failures = rate_limited = 0
+        while True:
+            result['attempts'] += 1
+            result['throttled'] += limiter.acquire()
+            try:
+                result['sid'] = send(account, to, body)
+                result['success'] = True
+                result['error'] = None
+                result['retry_after'] = None
+                limiter.succeeded()
+                break
+            except SMSSendError as e:
+                result['error'] = str(e)
+                # Set only while the last failure was a 429, so callers can reschedule
+                result['retry_after'] = e.retry_after
+                if e.retry_after is not None:
+                    rate_limited += 1
+                    if rate_limited > self.max_rate_limited:
+                        break
+                    self._count('rate_limited')
+                    limiter.pause(e.retry_after)
+                else:
+                    failures += 1
+                    if not e.retryable or failures >= self.max_attempts:
+                        break
+                    delay = min(self.max_backoff, self.base_backoff * (2 ** (failures - 1)))
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                self._count('retries')
+            finally:
+                limiter.release()
+
+        result['latency'] = time.monotonic() - start
+        self._count('sent' if result['success'] else 'failed')
+        return result
+
+    def send_batch(self, provider, messages, account=None):
+        """
+        Send messages concurrently through one provider
+
+        Args:
+            provider: 'twilio' or 'system'
+            messages: list of (phone_number, body)
+            account: Twilio credentials dict (sid, auth_token, phone_number
+                and/or messaging_service_sid)
+
+        Returns:
+            dict with total, sent, failed, seconds and per-message results
+            (to, success, sid, error, attempts, throttled, latency)
+        """
+        start = time.monotonic()
+        futures = [self.executor.submit(self._send_one, provider, account or {}, to, body, start)
+                   for to, body in messages]
+        results = [future.result() for future in futures]
+        return {
+            'total': len(results),
+            'sent': sum(1 for result in results if result['success']),
+            'failed': sum(1 for result in results if not result['success']),
+            'seconds': time.monotonic() - start,
+            'results': results
+        }
+
+    def get_stats(self):
+        return dict(self.stats)
+
+
+# Global instance
+sms_engine = SMSEngine()
+
+
+# Example usage
+if __name__ == "__main__":
+    from core.twilio_standin_server import measure_sms_throughput
+
+    result = measure_sms_throughput()
+    print(f"📱 Sent {result['sent']}/{result['total']} in {result['seconds']:.2f}s "
+          f"(server saw {result['server']['rate_limited']} 429s)")
+    for item in result['results']:
+        print(f"  {item['to']}: {'✅' if item['success'] else '❌'} {item['latency']:.2f}s "
+              f"({item['attempts']} attempt(s), {item['throttled']:.2f}s throttled)")
@@ -6,17 +6,17 @@ Sends SMS when internet is not available
 
 import os
 import json
-import time
 from datetime import datetime
 
 # Try to import SMS libraries
 try:
-    # Option 1: Twilio (most reliable)
-    from twilio.rest import Client
-    TWILIO_AVAILABLE = True
+    # Option 1: Twilio (most reliable), through the rate-limited SMS engine
+    from core.sms_engine import sms_engine
+    SMS_ENGINE_AVAILABLE = True
 except ImportError:
-    TWILIO_AVAILABLE = False
+    SMS_ENGINE_AVAILABLE = False
     print("⚠️ Twilio not available for SMS")
+TWILIO_AVAILABLE = SMS_ENGINE_AVAILABLE
 
 try:
     # Option 2: System SMS (for devices with SMS capability)
@@ -78,20 +78,8 @@ class SMSService:
             dict with success status and message
         """
         try:
-            # Format emergency message
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            message = f"""
-🚨 {alert_type} ALERT 🚨
-
-Person: {user_name}
-Time: {timestamp}
-Location: {location_text}
-
-This is an automated emergency alert from HerShield AI Safety System.
+            message = self._format_emergency_message(user_name, location_text, alert_type)
 
-IMMEDIATE ACTION REQUIRED!
-            """.strip()
-            
             # Try Twilio first
             if TWILIO_AVAILABLE and self.twilio_sid and self.twilio_token:
                 return self._send_via_twilio(phone_number, message)
@@ -112,27 +100,41 @@ IMMEDIATE ACTION REQUIRED!
                 'message': f'SMS send error: {str(e)}'
             }
     
+    def _format_emergency_message(self, user_name, location_text, alert_type):
+        """Emergency SMS text"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return f"""
+🚨 {alert_type} ALERT 🚨
+
+Person: {user_name}
+Time: {timestamp}
+Location: {location_text}
+
+This is an automated emergency alert from HerShield AI Safety System.
+
+IMMEDIATE ACTION REQUIRED!
+            """.strip()
+
+    def _twilio_account(self):
+        return {
+            'sid': self.twilio_sid,
+            'auth_token': self.twilio_token,
+            'phone_number': self.twilio_number
+        }
+
     def _send_via_twilio(self, phone_number, message):
         """Send SMS via Twilio"""
-        try:
-            client = Client(self.twilio_sid, self.twilio_token)
-            
-            sms = client.messages.create(
-                body=message,
-                from_=self.twilio_number,
-                to=phone_number
-            )
-            
+        result = sms_engine.send_batch('twilio', [(phone_number, message)], self._twilio_account())['results'][0]
+        if result['success']:
             return {
                 'success': True,
-                'message': f'SMS sent successfully via Twilio (SID: {sms.sid})',
-                'sid': sms.sid
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'message': f'Twilio SMS failed: {str(e)}'
+                'message': f"SMS sent successfully via Twilio (SID: {result['sid']})",
+                'sid': result['sid']
             }
+        return {
+            'success': False,
+            'message': f"Twilio SMS failed: {result['error']}"
+        }
     
     def _send_via_system(self, phone_number, message):
         """Send SMS via system (Android/Linux)"""
@@ -174,31 +176,49 @@ IMMEDIATE ACTION REQUIRED!
         Returns:
             dict with results for each contact
         """
-        results = []
-        
-        for contact in contacts:
-            phone = contact.get('phone', '')
-            name = contact.get('name', 'Emergency Contact')
-            
-            if phone:
+        targets = [(contact.get('name', 'Emergency Contact'), contact.get('phone', ''))
+                   for contact in contacts if contact.get('phone')]
+        message = self._format_emergency_message(user_name, location_text, alert_type)
+
+        # Concurrent sends; the engine's rate limiter replaces the old sleep between contacts
+        if TWILIO_AVAILABLE and self.twilio_sid and self.twilio_token:
+            provider, prefix = 'twilio', 'SMS sent successfully via Twilio'
+        elif SYSTEM_SMS_AVAILABLE and SMS_ENGINE_AVAILABLE:
+            provider, prefix = 'system', 'SMS sent via system'
+        else:
+            results = []
+            for name, phone in targets:
                 result = self.send_emergency_sms(phone, user_name, location_text, alert_type)
-                results.append({
-                    'contact_name': name,
-                    'phone': phone,
-                    'success': result['success'],
-                    'message': result['message']
-                })
-                
-                # Small delay between messages to avoid rate limiting
-                time.sleep(1)
-        
+                results.append({'contact_name': name, 'phone': phone,
+                                'success': result['success'], 'message': result['message']})
+            return {
+                'total': len(contacts),
+                'sent': sum(1 for r in results if r['success']),
+                'failed': sum(1 for r in results if not r['success']),
+                'results': results
+            }
+
+        batch = sms_engine.send_batch(provider, [(phone, message) for name, phone in targets],
+                                      self._twilio_account())
+        results = []
+        for (name, phone), result in zip(targets, batch['results']):
+            results.append({
+                'contact_name': name,
+                'phone': phone,
+                'success': result['success'],
+                'message': (f"{prefix} (SID: {result['sid']})" if result['sid'] else prefix)
+                if result['success'] else result['error'],
+                'latency': result['latency']
+            })
+
         return {
             'total': len(contacts),
             'sent': sum(1 for r in results if r['success']),
             'failed': sum(1 for r in results if not r['success']),
+            'seconds': batch['seconds'],
             'results': results
         }
-    
+
     def configure_twilio(self, account_sid, auth_token, phone_number):
         """Configure Twilio credentials"""
         try:
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+SMTP Session Pool
+Reusable authenticated SMTP sessions for email and email-to-SMS alerts
+- Connect, STARTTLS and login happen once per session, not once per contact
+- Each session sends many messages back to back; recipients are spread
+  over a small pool of sessions that send in parallel
+- Idle sessions are kept alive with NOOP and transparently reconnected
+  when the server has dropped them
+"""
+
+import queue
+import smtplib
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SMTPSession:
+    """One authenticated SMTP connection"""
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True, timeout=15):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.server = None
+        self.last_used = 0.0
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.use_tls:
+            server.starttls()
+            server.ehlo()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.server = server
+        self.last_used = time.monotonic()
+
+    def alive(self):
+        """NOOP round trip; False if the server has dropped the session"""
+        if not self.server:
+            return False
+        try:
+            return self.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, msg, to_addrs=None):
+        self.server.send_message(msg, to_addrs=to_addrs)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.server:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                try:
+                    self.server.close()
+                except OSError:
+                    pass
+        self.server = None
+
+
+class SMTPPool:
+    """
+    Small pool of authenticated SMTP sessions to one account
+    Sessions are opened lazily and reused across alerts
+    """
+
+    def __init__(self, host, port=587, username=None, password=None, use_tls=True,
+                 size=3, timeout=15, keepalive_interval=60, max_idle=300):
+        """
+        Args:
+            size: Maximum parallel sessions (most providers allow only a few)
+            keepalive_interval: Seconds of idleness after which a session is NOOP-checked
+            max_idle: Sessions idle longer than this are closed instead of kept
+        """
+        self.session_args = dict(host=host, port=port, username=username, password=password,
+                                 use_tls=use_tls, timeout=timeout)
+        self.size = size
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self.running = False
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {'connects': 0, 'reconnects': 0, 'messages': 0, 'failures': 0, 'noops': 0}
+
+        logging.basicConfig(level=logging.INFO)
+        self.logger = logging.getLogger(__name__)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _acquire(self):
+        """Idle session (NOOP-checked if it sat too long) or a new one"""
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    session = self.idle.get_nowait()
+                except queue.Empty:
+                    session = SMTPSession(**self.session_args)
+                    session.connect()
+                    self._count('connects')
+                    return session
+                if time.monotonic() - session.last_used < self.keepalive_interval:
+                    return session
+                self._count('noops')
+                if session.alive():
+                    return session
+                session.close()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _release(self, session, healthy=True):
+        if healthy and session.server:
+            self.idle.put(session)
+        else:
+            session.close()
+        self.slots.release()
+
+    def _send_batch(self, batch):
+        """Send a list of (msg, to_addrs) over one session; returns results"""
+        results = []
+        try:
+            session = self._acquire()
+        except Exception as e:
+            for msg, to_addrs in batch:
+                self._count('failures')
+                results.append({'to': to_addrs or msg['To'], 'sent': False, 'error': str(e), 'latency': None})
+            return results
+
+        healthy = True
+        try:
+            for msg, to_addrs in batch:
+                start = time.monotonic()
+                error = None
+                for attempt in range(2):
+                    try:
+                        session.send(msg, to_addrs)
+                        error = None
+                        break
+                    except (smtplib.SMTPException, OSError) as e:
+                        error = str(e)
+                        if isinstance(e, smtplib.SMTPException) and not isinstance(e, smtplib.SMTPServerDisconnected):
+                            # Rejected by the server (bad recipient etc.): not worth retrying
+                            break
+                        # Dropped between messages: reconnect once and resend
+                        session.close()
+                        if attempt:
+                            break
+                        try:
+                            session.connect()
+                            self._count('reconnects')
+                        except Exception as e:
+                            error = str(e)
+                            break
+                self._count('failures' if error else 'messages')
+                results.append({'to': to_addrs or msg['To'], 'sent': error is None, 'error': error,
+                                'latency': time.monotonic() - start})
+                if not session.server:
+                    healthy = False
+                    try:
+                        session.connect()
+                        self._count('reconnects')
+                        healthy = True
+                    except Exception:
+                        break
+        finally:
+            self._release(session, healthy)
+
+        # Messages left unsent when the session could not be re-established
+        for msg, to_addrs in batch[len(results):]:
+            self._count('failures')
+            results.append({'to': to_addrs or msg['To'], 'sent': False, 'error': 'session lost', 'latency': None})
+        return results
+
+    def send_messages(self, messages):
+        """
+        Send messages over the pool
+
+        Args:
+            messages: list of email.message.Message, or (message, to_addrs) pairs
+
+        Returns:
+            list of dicts: to, sent, error, latency (seconds) - in input order
+        """
+        messages = [item if isinstance(item, tuple) else (item, None) for item in messages]
+        if not messages:
+            return []
+
+        # Round-robin over as many sessions as useful; each session sends its share back to back
+        workers = min(self.size, len(messages))
+        batches = [messages[i::workers] for i in range(workers)]
+        futures = [self.executor.submit(self._send_batch, batch) for batch in batches]
+
+        per_batch = [future.result() for future in futures]
+        results = [None] * len(messages)
+        for i, batch_results in enumerate(per_batch):
+            for j, result in enumerate(batch_results):
+                results[i + j * workers] = result
+        return results
+
+    def warm(self):
+        """Open one authenticated session ahead of the first alert"""
+        try:
+            self._release(self._acquire())
+            return True
+        except Exception as e:
+            self.logger.warning(f"SMTP warm-up failed: {e}")
+            return False
+
+    def _keepalive_loop(self):
+        while self.running:
+            self.wakeup.wait(self.keepalive_interval)
+            if not self.running:
+                break
+            kept = []
+            while True:
+                try:
+                    session = self.idle.get_nowait()
+                except queue.Empty:
+                    break
+                idle_for = time.monotonic() - session.last_used
+                if idle_for > self.max_idle:
+                    session.close()
+                elif idle_for < self.keepalive_interval:
+                    kept.append(session)
+                else:
+                    self._count('noops')
+                    if session.alive():
+                        # NOOP counts as activity for the server's idle timer
+                        session.last_used = time.monotonic()
+                        kept.append(session)
+                    else:
+                        session.close()
+            for session in kept:
+                self.idle.put(session)
+
+    def start_keepalive(self):
+        if self.running:
+            return True
+        self.running = True
+        self.wakeup.clear()
+        self.thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+        self.thread.start()
+        return True
+
+    def close(self):
+        """Stop keepalive and close every idle session"""
+        self.running = False
+        self.wakeup.set()
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['idle_sessions'] = self.idle.qsize()
+        return stats
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_smtp_pool(config, size=3):
+    """
+    Shared pool for an SMTP account config (smtp_server, smtp_port, username,
+    password, use_tls); email and email-to-SMS alerts share it when they use
+    the same account
+    """
+    key = (config.get("smtp_server"), int(config.get("smtp_port") or 587),
+           config.get("username"), config.get("password"), bool(config.get("use_tls", True)))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SMTPPool(key[0], key[1], username=key[2], password=key[3], use_tls=key[4], size=size)
+            pool.start_keepalive()
+            _pools[key] = pool
+        return pool
+
+
+def warm_smtp_sessions(messaging_config):
+    """Open authenticated sessions in the background for the SMTP-based channels in use"""
+    services = str(messaging_config.get("messaging_service", "")).split(',')
+    configs = [messaging_config.get(key, {}) for service, key in (("email", "email_config"), ("sms", "sms_config"))
+               if service in services]
+    configs = [config for config in configs if config.get("smtp_server") and config.get("username")]
+    for config in configs:
+        threading.Thread(target=get_smtp_pool(config).warm, daemon=True).start()
+    return len(configs)
+
+
+# Example usage
+if __name__ == "__main__":
+    from core.smtp_standin_server import measure_smtp_throughput
+
+    result = measure_smtp_throughput()
+    print(f"📧 Per-message connections: {result['baseline_seconds']:.2f}s")
+    print(f"⚡ Pooled sessions: {result['pooled_seconds']:.2f}s ({result['speedup']:.1f}x)")
+    print(f"📊 Pool: {result['pool']}")
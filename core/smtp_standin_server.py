@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+SMTP Stand-in Server
+Minimal local SMTP server (EHLO, AUTH, MAIL, RCPT, DATA, NOOP, RSET, QUIT)
+with an injectable per-command round-trip delay, session setup cost,
+idle timeout and a one-off dropped session. Used to test and benchmark SMTPPool without a real mail
+provider. Messages are kept in memory.
+"""
+
+import base64
+import socketserver
+import threading
+import time
+from email.mime.text import MIMEText
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session; behaviour settings live on the server object"""
+
+    timeout = 30
+
+    def _reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+        self.wfile.flush()
+
+    def _readline(self):
+        line = self.rfile.readline()
+        if not line:
+            raise ConnectionError("client closed")
+        return line.decode('utf-8', 'replace').rstrip('\r\n')
+
+    def setup(self):
+        super().setup()
+        # Idle timeout: a silent client is disconnected, like real providers do
+        self.connection.settimeout(self.server.idle_timeout)
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.stats['sessions'] += 1
+        if server.setup_delay:
+            # Stands in for TCP + TLS handshake cost of a remote provider
+            time.sleep(server.setup_delay)
+        self._reply("220 hershield-standin ESMTP ready")
+
+        mail_from, recipients = None, []
+        accepted = 0
+        try:
+            while True:
+                line = self._readline()
+                command = line[:4].upper()
+
+                if command in ("EHLO", "HELO"):
+                    if command == "EHLO":
+                        self.wfile.write(b"250-hershield-standin\r\n250-AUTH PLAIN LOGIN\r\n")
+                    self._reply("250 OK")
+                elif command == "AUTH":
+                    parts = line.split()
+                    if len(parts) > 1 and parts[1].upper() == "LOGIN":
+                        self._reply("334 " + base64.b64encode(b"Username:").decode())
+                        self._readline()
+                        self._reply("334 " + base64.b64encode(b"Password:").decode())
+                        self._readline()
+                    elif len(parts) == 2:
+                        self._reply("334 ")
+                        self._readline()
+                    with server.lock:
+                        server.stats['logins'] += 1
+                    self._reply("235 Authentication successful")
+                elif command == "MAIL":
+                    mail_from, recipients = line.split(':', 1)[1].strip(), []
+                    self._reply("250 OK")
+                elif command == "RCPT":
+                    recipients.append(line.split(':', 1)[1].strip().strip('<>'))
+                    self._reply("250 OK")
+                elif command == "DATA":
+                    self._reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while True:
+                        data_line = self._readline()
+                        if data_line == ".":
+                            break
+                        data.append(data_line[1:] if data_line.startswith("..") else data_line)
+                    with server.lock:
+                        server.messages.append({'from': mail_from, 'to': recipients, 'data': "\n".join(data)})
+                        server.stats['messages'] += 1
+                    mail_from, recipients = None, []
+                    self._reply("250 OK queued")
+                    accepted += 1
+                    if server.take_drop(accepted):
+                        return  # provider closes the session between messages
+                elif command == "NOOP":
+                    with server.lock:
+                        server.stats['noops'] += 1
+                    self._reply("250 OK")
+                elif command == "RSET":
+                    mail_from, recipients = None, []
+                    self._reply("250 OK")
+                elif command == "QUIT":
+                    self._reply("221 Bye")
+                    return
+                else:
+                    self._reply("502 Command not implemented")
+        except (ConnectionError, OSError):
+            return
+
+
+class SMTPStandInServer(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server
+
+    Args:
+        port: 0 picks a free port
+        latency: Delay before every reply (simulated round trip)
+        setup_delay: Extra delay per new session (simulated TCP/TLS setup)
+        idle_timeout: Seconds of silence before the server drops a session
+        drop_after: Close the first session that has accepted this many
+            messages (0 = never)
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, latency=0.0, setup_delay=0.0, idle_timeout=120, drop_after=0):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.latency = latency
+        self.setup_delay = setup_delay
+        self.idle_timeout = idle_timeout
+        self.drop_after = drop_after
+        self.drops_left = 1 if drop_after else 0
+
+        self.lock = threading.Lock()
+        self.messages = []
+        self.stats = {'sessions': 0, 'logins': 0, 'messages': 0, 'noops': 0, 'dropped': 0}
+        self.thread = None
+
+    def take_drop(self, accepted):
+        """True once, for the session that reaches drop_after messages"""
+        with self.lock:
+            if self.drops_left and accepted >= self.drop_after:
+                self.drops_left -= 1
+                self.stats['dropped'] += 1
+                return True
+            return False
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def measure_smtp_throughput(recipients=5, rounds=3, latency=0.02, setup_delay=0.15, pool_size=3):
+    """
+    Send alerts to several recipients the old way (new session per message)
+    and through SMTPPool, against the stand-in server
+
+    Args:
+        recipients: Messages per alert
+        rounds: Alerts sent (pooled sessions are reused between them)
+
+    Returns:
+        dict with baseline/pooled seconds, speedup, sessions opened and pool stats
+    """
+    import smtplib
+    from core.smtp_pool import SMTPPool
+
+    server = SMTPStandInServer(latency=latency, setup_delay=setup_delay)
+    port = server.start()
+
+    def make_messages():
+        messages = []
+        for i in range(recipients):
+            msg = MIMEText("🚨 HER SHIELD ALERT 🚨\nBenchmark message", 'plain')
+            msg['From'] = "alerts@example.com"
+            msg['To'] = f"contact{i}@example.com"
+            msg['Subject'] = "HerShield benchmark"
+            messages.append(msg)
+        return messages
+
+    try:
+        # Baseline: connect + login for every message
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for msg in make_messages():
+                client = smtplib.SMTP("127.0.0.1", port, timeout=10)
+                client.login("alerts@example.com", "secret")
+                client.send_message(msg)
+                client.quit()
+        baseline = time.perf_counter() - start
+        baseline_sessions = server.stats['sessions']
+
+        pool = SMTPPool("127.0.0.1", port, username="alerts@example.com", password="secret",
+                        use_tls=False, size=pool_size)
+        start = time.perf_counter()
+        sent = 0
+        for _ in range(rounds):
+            sent += sum(1 for result in pool.send_messages(make_messages()) if result['sent'])
+        pooled = time.perf_counter() - start
+        pool_stats = pool.get_stats()
+        pool.close()
+
+        return {
+            'messages': recipients * rounds,
+            'sent': sent,
+            'baseline_seconds': baseline,
+            'pooled_seconds': pooled,
+            'speedup': baseline / pooled if pooled else 0.0,
+            'baseline_sessions': baseline_sessions,
+            'pooled_sessions': server.stats['sessions'] - baseline_sessions,
+            'pool': pool_stats
+        }
+    finally:
+        server.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark pooled SMTP alerts against a local stand-in server")
+    parser.add_argument("--recipients", type=int, default=5, help="Messages per alert")
+    parser.add_argument("--rounds", type=int, default=3, help="Alerts sent")
+    parser.add_argument("--latency", type=float, default=0.02, help="Per-reply delay (s)")
+    parser.add_argument("--setup-delay", type=float, default=0.15, help="Per-session setup delay (s)")
+    parser.add_argument("--pool-size", type=int, default=3, help="Parallel SMTP sessions")
+    args = parser.parse_args()
+
+    result = measure_smtp_throughput(args.recipients, args.rounds, args.latency, args.setup_delay, args.pool_size)
+    print(f"📧 Sent {result['sent']}/{result['messages']} messages")
+    print(f"🐢 New session per message: {result['baseline_seconds']:.2f}s ({result['baseline_sessions']} sessions)")
+    print(f"⚡ Pooled sessions: {result['pooled_seconds']:.2f}s ({result['pooled_sessions']} sessions)")
+    print(f"🚀 Speedup: {result['speedup']:.1f}x")
@@ -3,8 +3,9 @@
 Telegram Bot alert system as alternative to Twilio SMS
 """
 
-import requests
 from core.user_config import user_config
+from core.http_client import http_client
+from core.alert_payload import create_alert_payload
 
 class TelegramAlert:
     """Send emergency alerts via Telegram Bot"""
@@ -13,37 +14,18 @@ class TelegramAlert:
         self.config = user_config.get_messaging_config()["telegram_config"]
         self.user_info = user_config.get_user_info()
         self.base_url = f"https://api.telegram.org/bot{self.config['bot_token']}"
+        # Chat IDs reached by the last send_alert (partial deliveries settle per chat)
+        self.delivered = []
 
-    def send_alert(self, user_email, reason="Emergency alert", location=None):
-        """Send emergency alert via Telegram"""
+    def send_alert(self, user_email, reason="Emergency alert", location=None, payload=None):
+        """Send emergency alert via Telegram (payload: pre-rendered AlertPayload)"""
 
         if not self.config["bot_token"]:
             print("[ERROR] Telegram bot not configured")
             return False
 
-        # Create message
-        message = f"""
-🚨 HER SHIELD EMERGENCY ALERT 🚨
-
-👤 User: {self.user_info['name']}
-📧 Email: {self.user_info['email']}
-📱 Phone: {self.user_info['phone']}
-⚠️ Reason: {reason}
-
-{f'📍 Location: {location}' if location else ''}
-
-🏥 Medical Information:
-🩸 Blood Type: {self.user_info['medical_info']['blood_type'] or 'Not specified'}
-🤧 Allergies: {', '.join(self.user_info['medical_info']['allergies']) or 'None'}
-💊 Medications: {', '.join(self.user_info['medical_info']['medications']) or 'None'}
-🩺 Conditions: {', '.join(self.user_info['medical_info']['conditions']) or 'None'}
-
-📞 Emergency Contacts:
-{chr(10).join(f"• {contact}" for contact in self.user_info['emergency_contacts'])}
-
----
-🤖 Automated alert from HerShield safety system
-"""
+        payload = payload or create_alert_payload(user_email, reason, location)
+        message = payload.render('telegram')
 
         # Send to all configured chat IDs
         chat_ids = self.config.get("chat_ids", [])
@@ -52,6 +34,7 @@ class TelegramAlert:
             return False
 
         sent_count = 0
+        self.delivered = []
         for chat_id in chat_ids:
             try:
                 url = f"{self.base_url}/sendMessage"
@@ -61,10 +44,11 @@ class TelegramAlert:
                     "parse_mode": "HTML"
                 }
 
-                response = requests.post(url, data=data, timeout=10)
+                response = http_client.post(url, data=data, timeout=10)
                 if response.status_code == 200:
                     print(f"[TELEGRAM SENT] Alert sent to chat {chat_id}")
                     sent_count += 1
+                    self.delivered.append(str(chat_id))
                 else:
                     print(f"[TELEGRAM ERROR] Failed to send to {chat_id}: {response.text}")
 
@@ -130,7 +114,7 @@ def get_chat_updates():
 
     try:
         url = f"{alert.base_url}/getUpdates"
-        response = requests.get(url, timeout=10)
+        response = http_client.get(url, timeout=10)
 
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Twilio Stand-in Server
+Local HTTP server implementing the Twilio "create message" endpoint
+(POST /2010-04-01/Accounts/<sid>/Messages.json) with basic auth, an
+injectable response latency and a server-side rate limit answered with
+429 + Retry-After. Used to test and benchmark SMSEngine without sending
+real messages.
+"""
+
+import base64
+import json
+import math
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _TwilioHandler(BaseHTTPRequestHandler):
+    """Request handler; limits and counters live on the server object"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # requests stall ~40 ms on delayed ACKs and the benchmarks measure TCP
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8')) if length else {}
+        if server.latency:
+            time.sleep(server.latency)
+
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 4 or parts[:2] != ['2010-04-01', 'Accounts'] or parts[3] != 'Messages.json':
+            return self._send_json(404, {'code': 20404, 'message': 'The requested resource was not found'})
+
+        expected = base64.b64encode(f"{parts[2]}:{server.auth_token}".encode()).decode()
+        if self.headers.get('Authorization') != f"Basic {expected}":
+            return self._send_json(401, {'code': 20003, 'message': 'Authenticate'})
+
+        retry_after = server.take_token()
+        if retry_after:
+            with server.lock:
+                server.stats['rate_limited'] += 1
+            return self._send_json(429, {'code': 20429, 'message': 'Too Many Requests'},
+                                   {'Retry-After': str(retry_after)})
+
+        to = form.get('To', [''])[0]
+        if not to or not (form.get('From') or form.get('MessagingServiceSid')):
+            return self._send_json(400, {'code': 21604, 'message': "A 'To' and 'From' phone number is required"})
+
+        sid = "SM" + uuid.uuid4().hex
+        with server.lock:
+            server.messages.append({'sid': sid, 'to': to, 'body': form.get('Body', [''])[0]})
+            server.stats['accepted'] += 1
+        self._send_json(201, {'sid': sid, 'status': 'queued', 'to': to})
+
+
+class TwilioStandInServer(ThreadingHTTPServer):
+    """
+    Local Twilio messages API
+
+    Args:
+        port: 0 picks a free port
+        latency: Delay before each response (seconds)
+        rate: Requests per second accepted before answering 429 (None = unlimited)
+        burst: Requests accepted at once before the rate applies
+        auth_token: Token expected in basic auth
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, rate=None, burst=None, auth_token="standin-token"):
+        super().__init__(("127.0.0.1", port), _TwilioHandler)
+        self.latency = latency
+        self.rate = rate
+        self.capacity = float(burst or rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.auth_token = auth_token
+
+        self.lock = threading.Lock()
+        self.messages = []
+        self.stats = {'accepted': 0, 'rate_limited': 0}
+        self.thread = None
+
+    def take_token(self):
+        """0 if the request is allowed, otherwise whole seconds to wait"""
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return max(1, math.ceil((1 - self.tokens) / self.rate))
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.endpoint
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def measure_sms_throughput(contacts=10, latency=0.15, server_rate=None, server_burst=None,
+                           client_rate=10.0, concurrency=5, include_baseline=False):
+    """
+    Send one alert to several contacts through SMSEngine against the stand-in
+
+    Args:
+        server_rate: Server-side limit; set it below client_rate to exercise 429 handling
+        include_baseline: Also time the old serial path (one send, then sleep(1))
+
+    Returns:
+        dict with total, sent, seconds, per-message results, server stats
+        and baseline_seconds when requested
+    """
+    from core.sms_engine import SMSEngine
+
+    server = TwilioStandInServer(latency=latency, rate=server_rate, burst=server_burst)
+    endpoint = server.start()
+    account = {'sid': "AC" + "0" * 32, 'auth_token': server.auth_token, 'phone_number': "+15550000000"}
+    messages = [(f"+1555010{i:04d}", "🚨 HER SHIELD ALERT 🚨 Benchmark") for i in range(contacts)]
+
+    try:
+        engine = SMSEngine(limits={'twilio': {'rate': client_rate, 'burst': client_rate, 'concurrency': concurrency}},
+                           api_base=endpoint, base_backoff=0.1)
+        result = engine.send_batch('twilio', messages, account)
+        result['server'] = dict(server.stats)
+
+        if include_baseline:
+            serial = SMSEngine(limits={'twilio': {'rate': 1000, 'burst': 1000, 'concurrency': 1}},
+                               api_base=endpoint, max_attempts=1)
+            start = time.monotonic()
+            for message in messages:
+                serial.send_batch('twilio', [message], account)
+                time.sleep(1)
+            result['baseline_seconds'] = time.monotonic() - start
+        return result
+    finally:
+        server.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark SMSEngine against a local Twilio stand-in")
+    parser.add_argument("--contacts", type=int, default=10, help="Messages per alert")
+    parser.add_argument("--latency", type=float, default=0.15, help="Server response latency (s)")
+    parser.add_argument("--server-rate", type=float, default=None, help="Server requests/s before 429")
+    parser.add_argument("--client-rate", type=float, default=10.0, help="Engine requests/s")
+    parser.add_argument("--concurrency", type=int, default=5, help="Requests in flight")
+    parser.add_argument("--baseline", action="store_true", help="Also time the old serial path")
+    args = parser.parse_args()
+
+    result = measure_sms_throughput(args.contacts, args.latency, args.server_rate, None,
+                                    args.client_rate, args.concurrency, args.baseline)
+    print(f"📱 Sent {result['sent']}/{result['total']} in {result['seconds']:.2f}s "
+          f"({result['server']['rate_limited']} rate-limited responses)")
+    latencies = sorted(item['latency'] for item in result['results'])
+    print(f"⏱️ Latency: median {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s")
+    if 'baseline_seconds' in result:
+        print(f"🐢 Serial with sleep(1): {result['baseline_seconds']:.2f}s")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Upload Stand-in Server
+Local HTTP server speaking the evidence upload protocol, with injectable
+latency, packet loss (failed requests), mid-chunk disconnects and a
+bandwidth cap. Used to measure EvidenceUploadQueue throughput on bad
+networks without a real backend.
+"""
+
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class _UploadHandler(BaseHTTPRequestHandler):
+    """Request handler; network conditions live on the server object"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upload(self):
+        parts = urlparse(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'uploads':
+            return None
+        return self.server.uploads.get(parts[1])
+
+    def _simulate_network(self):
+        """Apply latency and loss; returns False if the request was 'lost'"""
+        conditions = self.server
+        if conditions.latency:
+            time.sleep(conditions.latency * random.uniform(0.5, 1.5))
+        if random.random() < conditions.loss_rate:
+            self.server.stats['lost'] += 1
+            self._discard_body()
+            self._send_json(503, {'error': 'simulated loss'})
+            return False
+        return True
+
+    def _discard_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+
+    def do_POST(self):
+        if not self._simulate_network():
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            meta = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send_json(400, {'error': 'bad json'})
+
+        upload_id = uuid.uuid4().hex
+        with self.server.lock:
+            self.server.uploads[upload_id] = {
+                'name': os.path.basename(meta.get('name', upload_id)),
+                'size': int(meta.get('size', 0)),
+                'sha256': meta.get('sha256'),
+                'kind': meta.get('kind'),
+                'path': os.path.join(self.server.storage_dir, upload_id),
+                'offset': 0,
+                'status': 'uploading'
+            }
+            open(self.server.uploads[upload_id]['path'], 'wb').close()
+        self._send_json(201, {'upload_id': upload_id, 'offset': 0})
+
+    def do_GET(self):
+        if not self._simulate_network():
+            return
+        upload = self._upload()
+        if upload is None:
+            return self._send_json(404, {'error': 'unknown upload'})
+        self._send_json(200, {'offset': upload['offset'], 'status': upload['status']})
+
+    def do_PUT(self):
+        if not self._simulate_network():
+            return
+        upload = self._upload()
+        if upload is None:
+            self._discard_body()
+            return self._send_json(404, {'error': 'unknown upload'})
+
+        offset = int(parse_qs(urlparse(self.path).query).get('offset', ['0'])[0])
+        length = int(self.headers.get('Content-Length', 0))
+        if offset != upload['offset']:
+            self._discard_body()
+            return self._send_json(409, {'offset': upload['offset']})
+
+        # A dropped connection keeps only part of the chunk, like a real server
+        disconnect = random.random() < self.server.disconnect_rate
+        receive = random.randint(0, length) if disconnect else length
+        data = self.rfile.read(receive)
+        if self.server.bandwidth:
+            time.sleep(len(data) / float(self.server.bandwidth))
+
+        with self.server.lock:
+            with open(upload['path'], 'ab') as f:
+                f.write(data)
+            upload['offset'] += len(data)
+            self.server.stats['bytes_received'] += len(data)
+            if upload['offset'] >= upload['size']:
+                upload['status'] = 'complete' if self._verify(upload) else 'corrupt'
+                if upload['status'] == 'complete':
+                    self.server.stats['completed'] += 1
+
+        if disconnect:
+            self.server.stats['disconnects'] += 1
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+
+        self._send_json(200, {'offset': upload['offset'], 'status': upload['status']})
+
+    def _verify(self, upload):
+        digest = hashlib.sha256()
+        with open(upload['path'], 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return upload['sha256'] in (None, digest.hexdigest())
+
+
+class UploadStandInServer(ThreadingHTTPServer):
+    """
+    Threaded stand-in for the evidence upload backend
+
+    Args:
+        port: Listen port (0 picks a free one)
+        latency: Mean seconds added to every request
+        loss_rate: Fraction of requests answered with 503
+        disconnect_rate: Fraction of chunk uploads cut off mid-body
+        bandwidth: Bytes per second accepted (None for unlimited)
+        storage_dir: Where received files go (default: temp dir)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, loss_rate=0.0, disconnect_rate=0.0, bandwidth=None, storage_dir=None):
+        super().__init__(("127.0.0.1", port), _UploadHandler)
+        self.latency = latency
+        self.loss_rate = loss_rate
+        self.disconnect_rate = disconnect_rate
+        self.bandwidth = bandwidth
+        self.storage_dir = storage_dir or tempfile.mkdtemp(prefix="hershield_uploads_")
+        os.makedirs(self.storage_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.uploads = {}
+        self.stats = {'bytes_received': 0, 'completed': 0, 'lost': 0, 'disconnects': 0}
+        self.thread = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.endpoint
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def measure_upload_throughput(file_sizes=None, latency=0.1, loss_rate=0.05, disconnect_rate=0.05,
+                              bandwidth=None, chunk_size=256 * 1024, max_bytes_per_sec=None):
+    """
+    Upload synthetic evidence through the stand-in server and report throughput
+
+    Args:
+        file_sizes: dict kind -> list of byte sizes (default: snapshots, audio, video)
+
+    Returns:
+        dict with goodput, retries, preemptions, completion order and server stats
+    """
+    from core.evidence_uploader import EvidenceUploadQueue
+
+    file_sizes = file_sizes or {
+        'video': [8 * 1024 * 1024],
+        'audio': [1024 * 1024, 1024 * 1024],
+        'snapshot': [150 * 1024] * 3
+    }
+    work_dir = tempfile.mkdtemp(prefix="hershield_upload_bench_")
+    server = UploadStandInServer(latency=latency, loss_rate=loss_rate, disconnect_rate=disconnect_rate,
+                                 bandwidth=bandwidth, storage_dir=os.path.join(work_dir, "server"))
+    endpoint = server.start()
+
+    try:
+        uploader = EvidenceUploadQueue(endpoint, db_path=os.path.join(work_dir, "queue.db"),
+                                       chunk_size=chunk_size, max_bytes_per_sec=max_bytes_per_sec,
+                                       timeout=5, base_backoff=0.05, max_backoff=1.0)
+
+        extensions = {'video': '.mp4', 'audio': '.wav', 'snapshot': '.jpg'}
+        total_bytes = 0
+        # Queue the video first so snapshots have to overtake it
+        for kind in ('video', 'audio', 'snapshot'):
+            for i, size in enumerate(file_sizes.get(kind, [])):
+                path = os.path.join(work_dir, f"{kind}_{i}{extensions[kind]}")
+                with open(path, 'wb') as f:
+                    f.write(os.urandom(size))
+                uploader.enqueue(path, kind=kind)
+                total_bytes += size
+
+        start = time.time()
+        finished = uploader.drain(timeout=600)
+        elapsed = time.time() - start
+        uploader.stop()
+
+        queue_rows = uploader.get_queue()
+        order = [os.path.basename(row['path']) for row in sorted(
+            (row for row in queue_rows if row['completed_at']), key=lambda row: row['completed_at'])]
+
+        stats = uploader.get_stats()
+        return {
+            'finished': finished,
+            'seconds': elapsed,
+            'payload_bytes': total_bytes,
+            'goodput_kbps': total_bytes * 8 / 1024.0 / elapsed if elapsed else 0.0,
+            'bytes_sent': stats['bytes_sent'],
+            'retries': stats['retries'],
+            'preemptions': stats['preemptions'],
+            'completion_order': order,
+            'server': dict(server.stats)
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure evidence upload throughput on a simulated network")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean request latency (s)")
+    parser.add_argument("--loss", type=float, default=0.05, help="Fraction of requests failing")
+    parser.add_argument("--disconnect", type=float, default=0.05, help="Fraction of chunks cut off")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="Server-side cap (0 = none)")
+    parser.add_argument("--chunk-kb", type=int, default=256, help="Upload chunk size")
+    args = parser.parse_args()
+
+    result = measure_upload_throughput(
+        latency=args.latency, loss_rate=args.loss, disconnect_rate=args.disconnect,
+        bandwidth=args.bandwidth_kbps * 1024 / 8.0 if args.bandwidth_kbps else None,
+        chunk_size=args.chunk_kb * 1024)
+
+    print(f"{'✅' if result['finished'] else '❌'} {result['payload_bytes'] / 1024:.0f} KB in "
+          f"{result['seconds']:.1f}s ({result['goodput_kbps']:.0f} kbps goodput)")
+    print(f"🔁 {result['retries']} retries, {result['preemptions']} preemptions, "
+          f"{result['bytes_sent'] / 1024:.0f} KB sent")
+    print(f"📋 Completion order: {', '.join(result['completion_order'])}")
+    print(f"🌐 Server: {result['server']}")
@@ -44,6 +44,11 @@ class UserConfig:
             },
             "alert_settings": {
                 "messaging_service": "twilio",  # twilio, email, telegram, etc.
+                "dispatch_deadline": 15,  # seconds send_alert waits for the first delivery
+                "channel_timeouts": {},  # per-channel overrides, e.g. {"email": 20}
+                "incident_window": 120,  # seconds; later triggers join the open incident as updates
+                "recipient_max_messages": 4,  # messages one recipient may get per rate window
+                "recipient_rate_window": 60,  # seconds
                 "twilio_config": {
                     "sid": "",
                     "auth_token": "",
@@ -83,6 +88,17 @@ class UserConfig:
                 "keywords": ["help", "save me", "emergency"],
                 "sensitivity": "medium",
                 "wake_word": "hey shield"
+            },
+            "evidence_settings": {
+                "pretrigger_enabled": False,
+                "pretrigger_seconds": 10,
+                "pretrigger_memory_mb": 32,
+                "pretrigger_audio": True,
+                "upload_endpoint": "",
+                "upload_max_kbps": 0,
+                "retention": {},
+                "encrypt_at_rest": False,
+                "encryption_chunk_kb": 64
             }
         }
 
@@ -301,6 +317,12 @@ class UserConfig:
         """Get messaging configuration"""
         return self.config["alert_settings"]
 
+    def get_evidence_settings(self):
+        """Get evidence capture settings (pre-trigger, uploads, retention, encryption)"""
+        settings = self.get_default_config()["evidence_settings"]
+        settings.update(self.config.get("evidence_settings", {}))
+        return settings
+
     def validate_config(self):
         """Validate that configuration is complete"""
         user_info = self.config["user_info"]
@@ -38,8 +38,8 @@ def generate_twiml_message(reason, location):
 
     return str(response)
 
-def make_emergency_call(service_type, reason, location):
-    """Make voice call to emergency services"""
+def make_emergency_call(service_type, reason, location, twiml=None):
+    """Make voice call to emergency services (twiml: pre-rendered call script)"""
     try:
         client = Client(TWILIO_SID, TWILIO_AUTH)
 
@@ -49,8 +49,8 @@ def make_emergency_call(service_type, reason, location):
             print(f"[ERROR] No numbers configured for {service_type}")
             return False
 
-        # Generate TwiML
-        twiml = generate_twiml_message(reason, location)
+        # Generate TwiML unless the alert payload already rendered it
+        twiml = twiml or generate_twiml_message(reason, location)
 
         success_count = 0
         for number in numbers:
@@ -81,18 +81,20 @@ def make_emergency_call(service_type, reason, location):
         print(f"[VOICE ERROR] {e}")
         return False
 
-def send_voice_alert(reason="Emergency alert", location=None):
-    """Send voice alerts to emergency services"""
+def send_voice_alert(reason="Emergency alert", location=None, payload=None):
+    """Send voice alerts to emergency services (payload: pre-rendered AlertPayload)"""
     print("[VOICE ALERT] Initiating emergency voice calls...")
 
     if not location:
         location = "Location not available"
 
+    twiml = payload.render('twiml') if payload else None
+
     # Call police
-    police_success = make_emergency_call("police", reason, location)
+    police_success = make_emergency_call("police", reason, location, twiml)
 
     # Call medical
-    medical_success = make_emergency_call("medical", reason, location)
+    medical_success = make_emergency_call("medical", reason, location, twiml)
 
     if police_success or medical_success:
         print("[VOICE ALERT] Emergency calls initiated")
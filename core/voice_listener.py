@@ -8,9 +8,11 @@ from core.ai_threat_detector import ThreatDetectionSystem
 from core.offline_speech_recognition import HybridSpeechRecognizer
 from core.offline_alert_system import OfflineAlertSystem
 from core.escalation_system import escalation_system
+from core.incident_manager import incident_manager
 from core.user_config import user_config
 from core.enhanced_location_service import EnhancedLocationService
 from core.camera_capture import capture_emergency_evidence
+from core.pretrigger_buffer import pretrigger_buffer
 
 # Enhanced keywords for domestic violence and danger situations
 KEYWORDS = [
@@ -48,20 +50,25 @@ class EnhancedVoiceListener:
         # Generate unique alert ID
         alert_id = f"ai_threat_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         
-        # Get current location and capture evidence
+        # Get current location
         location_data = self._get_emergency_location()
-        evidence_data = self._capture_emergency_evidence()
         
         # Create comprehensive alert message
         alert_message = f"🤖 AI THREAT DETECTED: {threat_description}\n\nAutomatic threat detection system has identified potential danger.\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\nImmediate response required!"
         
+        # Evidence is captured once per incident, filed under its id
+        incident = incident_manager.report('ai_threat_detection', alert_message, alert_id=alert_id,
+                                           location=location_data)
+        evidence_data = self._capture_emergency_evidence(incident)
+        
         # Start escalation process
         escalation_system.start_escalation(
             alert_id=alert_id,
             alert_type='ai_threat_detection',
             message=alert_message,
             location_data=location_data,
-            evidence_data=evidence_data
+            evidence_data=evidence_data,
+            incident=incident
         )
         
         print(f"[ESCALATION STARTED] Alert ID: {alert_id}")
@@ -73,9 +80,8 @@ class EnhancedVoiceListener:
         # Generate unique alert ID
         alert_id = f"voice_keyword_{int(time.time())}_{uuid.uuid4().hex[:8]}"
         
-        # Get current location and capture evidence
+        # Get current location
         location_data = self._get_emergency_location()
-        evidence_data = self._capture_emergency_evidence()
         
         # Determine severity based on keywords
         severity = self._assess_keyword_severity(keywords)
@@ -83,29 +89,38 @@ class EnhancedVoiceListener:
         # Create comprehensive alert message
         alert_message = f"🎤 VOICE EMERGENCY DETECTED\n\nKeywords: {', '.join(keywords)}\nFull text: \"{text}\"\nDetection method: {source}\nSeverity: {severity}\n\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\nImmediate assistance required!"
         
+        # Evidence is captured once per incident, filed under its id
+        incident = incident_manager.report('voice_keyword_detection', alert_message, alert_id=alert_id,
+                                           location=location_data)
+        evidence_data = self._capture_emergency_evidence(incident)
+        
         # Start escalation process
         escalation_system.start_escalation(
             alert_id=alert_id,
             alert_type='voice_keyword_detection',
             message=alert_message,
             location_data=location_data,
-            evidence_data=evidence_data
+            evidence_data=evidence_data,
+            incident=incident
         )
         
         print(f"[ESCALATION STARTED] Alert ID: {alert_id} | Severity: {severity}")
     
     def _get_emergency_location(self):
-        """Get current location for emergency"""
+        """Get current location for emergency (reused while an incident is open)"""
         try:
-            return self.location_service.get_emergency_location_info()
+            return incident_manager.location(self.location_service.get_emergency_location_info)
         except Exception as e:
             print(f"[LOCATION ERROR] {e}")
             return None
     
-    def _capture_emergency_evidence(self):
-        """Capture emergency evidence"""
+    def _capture_emergency_evidence(self, incident):
+        """Capture emergency evidence for a new incident (joined triggers reuse its recording)"""
+        if not incident['new']:
+            print(f"[EVIDENCE] Incident {incident['incident_id']} already recording")
+            return None
         try:
-            return capture_emergency_evidence()
+            return capture_emergency_evidence(incident['incident_id'])
         except Exception as e:
             print(f"[EVIDENCE ERROR] {e}")
             return None
@@ -212,6 +227,8 @@ class EnhancedVoiceListener:
         while self.is_listening:
             try:
                 with mic as source:
+                    # The pre-trigger ring buffers what this stream reads (no second stream)
+                    pretrigger_buffer.feed_from(source)
                     # Quick ambient noise adjustment
                     r.adjust_for_ambient_noise(source, duration=0.2)
                     # Shorter listening timeout for faster response
@@ -245,6 +262,7 @@ class EnhancedVoiceListener:
             except Exception as e:
                 print(f"[SPEECH LOOP ERROR] {e}")
                 time.sleep(0.1)  # Minimal delay on error
+        pretrigger_buffer.detach_audio()
 
 def listen_for_keyword(user_email):
     """
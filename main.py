@@ -66,6 +66,7 @@ except ImportError:
 # Import enhanced core systems
 try:
     from core.escalation_system import escalation_system
+    from core.incident_manager import incident_manager
     from core.alert_acknowledgment import acknowledgment_system
     from core.enhanced_location_service import EnhancedLocationService
     from core.google_maps_location import GoogleMapsLocationService
@@ -79,6 +80,49 @@ except ImportError:
     ENHANCED_FEATURES = False
     FIREBASE_ENABLED = False
 
+try:
+    from core.pretrigger_buffer import pretrigger_buffer, start_pretrigger_buffer
+    PRETRIGGER_AVAILABLE = True
+except ImportError:
+    PRETRIGGER_AVAILABLE = False
+
+try:
+    from core.evidence_crypto import configure_evidence_encryption
+    ENCRYPTION_AVAILABLE = True
+except ImportError:
+    ENCRYPTION_AVAILABLE = False
+
+try:
+    from core.evidence_index import evidence_index
+    EVIDENCE_INDEX_AVAILABLE = True
+except ImportError:
+    EVIDENCE_INDEX_AVAILABLE = False
+
+try:
+    from core.evidence_uploader import start_evidence_uploads
+    UPLOADER_AVAILABLE = True
+except ImportError:
+    UPLOADER_AVAILABLE = False
+
+try:
+    from core.http_client import http_client, start_provider_prewarm
+    HTTP_CLIENT_AVAILABLE = True
+except ImportError:
+    HTTP_CLIENT_AVAILABLE = False
+
+try:
+    from core.smtp_pool import warm_smtp_sessions
+    SMTP_POOL_AVAILABLE = True
+except ImportError:
+    SMTP_POOL_AVAILABLE = False
+
+try:
+    from core.alert_outbox import start_alert_outbox
+    from core.offline_alert_system import OfflineAlertSystem
+    OUTBOX_AVAILABLE = True
+except ImportError:
+    OUTBOX_AVAILABLE = False
+
 # Theme settings moved to import section
 
 # Custom pink color palette
@@ -1180,9 +1224,12 @@ class FuturisticHerShield:
         """Cleanup old evidence files in background"""
         def cleanup_background():
             try:
-                from core.camera_capture import cleanup_evidence_files
-                cleanup_evidence_files()
-                print("✅ Evidence cleanup completed")
+                # Tiered retention keeps running in the background in bounded passes
+                from core.evidence_retention import start_evidence_retention
+                retention_settings = user_config.get_evidence_settings().get("retention") \
+                    if ENHANCED_FEATURES else None
+                start_evidence_retention(retention_settings)
+                print("✅ Evidence retention started")
             except Exception as e:
                 print(f"Evidence cleanup error: {e}")
         
@@ -1276,6 +1323,35 @@ class FuturisticHerShield:
         
         print("✅ Voice monitoring thread started")
 
+        # Evidence encryption at rest applies to everything recorded from now on
+        if ENHANCED_FEATURES and ENCRYPTION_AVAILABLE:
+            try:
+                configure_evidence_encryption(user_config.get_evidence_settings())
+            except (ValueError, OSError) as e:
+                # Malformed HERSHIELD_EVIDENCE_KEY or a truncated key file must not stop protection
+                configure_evidence_encryption({})
+                print(f"⚠️ Evidence key unusable ({e}); recording evidence unencrypted")
+
+        # Optional always-on ring so evidence covers the moments before a trigger
+        if ENHANCED_FEATURES and PRETRIGGER_AVAILABLE:
+            evidence_settings = user_config.get_evidence_settings()
+            if evidence_settings.get("pretrigger_enabled"):
+                start_pretrigger_buffer(evidence_settings)
+
+        # Resume any evidence uploads left over from earlier sessions
+        if ENHANCED_FEATURES and UPLOADER_AVAILABLE:
+            start_evidence_uploads(user_config.get_evidence_settings())
+
+        # Open provider connections now so the first alert skips DNS/TCP/TLS setup
+        if HTTP_CLIENT_AVAILABLE:
+            start_provider_prewarm()
+        if SMTP_POOL_AVAILABLE:
+            warm_smtp_sessions(user_config.get_messaging_config())
+
+        # Deliver alerts queued in earlier sessions, including ones stored while offline
+        if OUTBOX_AVAILABLE:
+            start_alert_outbox(OfflineAlertSystem(), on_failure=self.report_alert_failure)
+
         # Auto-check system readiness (delayed)
         self.root.after(1000, self.check_system_readiness)
 
@@ -1286,6 +1362,12 @@ class FuturisticHerShield:
         """Stop protection with smart feedback"""
         self.listening = False
 
+        if PRETRIGGER_AVAILABLE:
+            pretrigger_buffer.stop()
+
+        if HTTP_CLIENT_AVAILABLE:
+            http_client.stop_keepalive()
+
         # Update button appearance
         self.protection_btn.configure(
             text="⚡ ACTIVATE INSTANT GUARDIAN ⚡",
@@ -1518,6 +1600,9 @@ class FuturisticHerShield:
             while self.listening:
                 try:
                     with mic as source:
+                        if PRETRIGGER_AVAILABLE:
+                            # The pre-trigger ring buffers what this stream reads (no second stream)
+                            pretrigger_buffer.feed_from(source)
                         print("🎧 Listening for emergency keywords...")
                         # Use longer timeouts for reliable detection
                         audio = r.listen(source, timeout=2, phrase_time_limit=5)
@@ -1572,6 +1657,9 @@ class FuturisticHerShield:
         except Exception as e:
             print(f"Reliable voice monitoring failed: {e}")
             self.root.after(0, lambda: self.update_status("⚠️ Voice monitoring unavailable"))
+        finally:
+            if PRETRIGGER_AVAILABLE:
+                pretrigger_buffer.detach_audio()
 
     def trigger_voice_alert(self, text, keywords):
         """Trigger alert when voice keywords are detected"""
@@ -1624,10 +1712,9 @@ class FuturisticHerShield:
                 # Enhanced immediate emergency with escalation
                 alert_id = f"immediate_emergency_{int(time.time())}_{uuid.uuid4().hex[:8]}"
 
-                # Get location and evidence immediately
-                location_data = self.location_service.get_emergency_location_info(
-                ) if hasattr(self, 'location_service') else None
-                evidence_data = capture_emergency_evidence()
+                # Get location immediately
+                location_data = incident_manager.location(
+                    self.location_service.get_emergency_location_info) if hasattr(self, 'location_service') else None
 
                 # Create urgent alert message
                 if text and keywords:
@@ -1635,13 +1722,17 @@ class FuturisticHerShield:
                 else:
                     alert_message = f"🚨 IMMEDIATE MANUAL EMERGENCY\n\nUser activated immediate emergency protocol.\nNo confirmation required - CRITICAL SITUATION\n\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 
+                incident, evidence_data = self._report_and_capture(
+                    alert_id, 'immediate_emergency', alert_message, location_data)
+
                 # Start immediate escalation
                 escalation_system.start_escalation(
                     alert_id=alert_id,
                     alert_type='immediate_emergency',
                     message=alert_message,
                     location_data=location_data,
-                    evidence_data=evidence_data
+                    evidence_data=evidence_data,
+                    incident=incident
                 )
 
                 # Show immediate alert dialog (non-blocking) - prevent duplicates
@@ -2641,24 +2732,21 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
             # Get current location (already tracked)
             location_data = getattr(self, 'current_location', None)
 
-            # Instant evidence capture
-            evidence_data = None
-            try:
-                if hasattr(self, 'location_service'):
-                    evidence_data = capture_emergency_evidence()
-            except:
-                pass
-
             # Create urgent alert message
             alert_message = f"🚨 INSTANT AUDIO THREAT DETECTED\n\nThreat Type: {threat_type.upper()}\nConfidence: {confidence:.1%}\nDescription: {description}\n\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n⚠️ IMMEDIATE RESPONSE REQUIRED ⚠️"
 
+            # Instant evidence capture (once per incident)
+            incident, evidence_data = self._report_and_capture(
+                alert_id, 'instant_audio_threat', alert_message, location_data)
+
             # Start INSTANT escalation
             escalation_system.start_escalation(
                 alert_id=alert_id,
                 alert_type='instant_audio_threat',
                 message=alert_message,
                 location_data=location_data,
-                evidence_data=evidence_data
+                evidence_data=evidence_data,
+                incident=incident
             )
 
             # Show instant alert dialog
@@ -2784,6 +2872,12 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
         """Update status display"""
         self.status_display.configure(text=text)
 
+    def report_alert_failure(self, delivery):
+        """An outbox delivery was given up on: tell the user who was not reached"""
+        message = f"❌ Alert not delivered via {delivery['channel']} to {delivery['recipient']}"
+        print(f"{message}: {delivery.get('last_error')}")
+        self.root.after(0, lambda: self.update_status(message))
+
     def trigger_alert(self, text, keywords):
         """Trigger enhanced futuristic alert with escalation"""
         self.alert_count += 1
@@ -2797,10 +2891,9 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
             # Enhanced alert with escalation system
             alert_id = f"futuristic_alert_{int(time.time())}_{uuid.uuid4().hex[:8]}"
 
-            # Get location and evidence
-            location_data = self.location_service.get_emergency_location_info(
-            ) if hasattr(self, 'location_service') else None
-            evidence_data = capture_emergency_evidence()
+            # Get location
+            location_data = incident_manager.location(
+                self.location_service.get_emergency_location_info) if hasattr(self, 'location_service') else None
 
             # Assess severity
             severity = self._assess_keyword_severity(keywords)
@@ -2808,13 +2901,17 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
             # Create alert message
             alert_message = f"🎤 FUTURISTIC VOICE EMERGENCY\n\nKeywords: {', '.join(keywords)}\nText: \"{text}\"\nSeverity: {severity}\n\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\nImmediate assistance required!"
 
+            incident, evidence_data = self._report_and_capture(
+                alert_id, 'futuristic_voice_detection', alert_message, location_data)
+
             # Start escalation
             escalation_system.start_escalation(
                 alert_id=alert_id,
                 alert_type='futuristic_voice_detection',
                 message=alert_message,
                 location_data=location_data,
-                evidence_data=evidence_data
+                evidence_data=evidence_data,
+                incident=incident
             )
 
             # Show enhanced alert dialog
@@ -2849,21 +2946,25 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
                 # Enhanced manual emergency with escalation
                 alert_id = f"manual_futuristic_{int(time.time())}_{uuid.uuid4().hex[:8]}"
 
-                # Get location and evidence
-                location_data = self.location_service.get_emergency_location_info(
-                ) if hasattr(self, 'location_service') else None
-                evidence_data = capture_emergency_evidence()
+                # Get location
+                location_data = incident_manager.location(
+                    self.location_service.get_emergency_location_info) if hasattr(self, 'location_service') else None
 
                 # Create alert message
                 alert_message = f"🚨 MANUAL FUTURISTIC EMERGENCY\n\nUser manually activated emergency protocol via futuristic interface.\nImmediate assistance required!\n\nLocation: {self._format_location_brief(location_data)}\nTime: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 
+                # User-triggered: evidence is retained as confirmed
+                incident, evidence_data = self._report_and_capture(
+                    alert_id, 'manual_futuristic_emergency', alert_message, location_data, priority='confirmed')
+
                 # Start escalation
                 escalation_system.start_escalation(
                     alert_id=alert_id,
                     alert_type='manual_futuristic_emergency',
                     message=alert_message,
                     location_data=location_data,
-                    evidence_data=evidence_data
+                    evidence_data=evidence_data,
+                    incident=incident
                 )
 
                 # Show enhanced alert dialog
@@ -2954,6 +3055,28 @@ Lat: {loc.get('latitude', 0):.6f}, Lon: {loc.get('longitude', 0):.6f}
         else:
             return "Location unavailable"
 
+    def _report_and_capture(self, alert_id, alert_type, message, location_data, priority='auto_confirmed'):
+        """
+        Register a trigger with the incident manager, then capture evidence
+        once per incident, filed under the incident id
+
+        Returns:
+            tuple (incident, evidence_data); evidence_data is None for a
+            trigger that joined an open incident (its recording is running)
+        """
+        incident = incident_manager.report(alert_type, message, alert_id=alert_id, location=location_data)
+        if not incident['new']:
+            print(f"📎 Trigger joined incident {incident['incident_id']} - evidence already recording")
+            if priority == 'confirmed' and EVIDENCE_INDEX_AVAILABLE:
+                # The user confirmed an incident an automatic trigger opened
+                evidence_index.set_incident_priority(incident['incident_id'], 'confirmed')
+            return incident, None
+        try:
+            return incident, capture_emergency_evidence(incident['incident_id'], priority=priority)
+        except Exception as e:
+            print(f"Evidence capture error: {e}")
+            return incident, None
+
     def quick_call(self, service):
         """Quick call to emergency services"""
         try:
@@ -4352,7 +4475,10 @@ class InstantThreatDialog:
         """Acknowledge threat and stop escalation"""
         try:
             if ENHANCED_FEATURES and hasattr(escalation_system, 'acknowledge_alert'):
-                escalation_system.acknowledge_alert(self.escalation_id)
+                false_alarm = messagebox.askyesno(
+                    "False Alarm?", "Was this a false alarm?\n\nFalse-alarm evidence is only kept for 24 hours.")
+                escalation_system.acknowledge_alert(
+                    self.escalation_id, false_alarm=false_alarm)
                 messagebox.showinfo(
                     "Threat Acknowledged", "✅ Threat acknowledged!\nEscalation stopped.")
             else:
@@ -4574,7 +4700,10 @@ class InstantVoiceAlertDialog:
         """Acknowledge alert"""
         try:
             if ENHANCED_FEATURES and hasattr(escalation_system, 'acknowledge_alert'):
-                escalation_system.acknowledge_alert(self.escalation_id)
+                false_alarm = messagebox.askyesno(
+                    "False Alarm?", "Was this a false alarm?\n\nFalse-alarm evidence is only kept for 24 hours.")
+                escalation_system.acknowledge_alert(
+                    self.escalation_id, false_alarm=false_alarm)
                 messagebox.showinfo(
                     "Alert Acknowledged", "✅ Voice alert acknowledged!\nEscalation stopped.")
             else:
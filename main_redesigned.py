@@ -46,6 +46,24 @@ except ImportError:
     print("⚠️ Distress detection not available")
     DISTRESS_DETECTION_AVAILABLE = False
 
+try:
+    from core.incident_manager import incident_manager
+    INCIDENT_MANAGER_AVAILABLE = True
+except ImportError:
+    INCIDENT_MANAGER_AVAILABLE = False
+
+try:
+    from core.camera_service import camera_service
+    CAMERA_SERVICE_AVAILABLE = True
+except ImportError:
+    CAMERA_SERVICE_AVAILABLE = False
+
+try:
+    from core.frame_pipeline import FramePipeline
+    FRAME_PIPELINE_AVAILABLE = True
+except ImportError:
+    FRAME_PIPELINE_AVAILABLE = False
+
 try:
     import speech_recognition as sr
     SPEECH_AVAILABLE = True
@@ -612,7 +630,7 @@ class SOSApplication:
             self.update_status(f"🚨 Emergency confirmed in {result['response_time']:.1f}s")
             
             # Trigger full emergency protocol
-            self.root.after(500, self.trigger_emergency)
+            self.root.after(500, lambda: self.trigger_emergency("double_tap"))
             
         elif result['status'] == 'WINDOW_EXPIRED':
             # Window expired, new window started
@@ -643,7 +661,7 @@ class SOSApplication:
         
         update_countdown()
     
-    def trigger_emergency(self):
+    def trigger_emergency(self, source="manual_emergency"):
         """Trigger full emergency protocol"""
         if self.emergency_active:
             return
@@ -659,13 +677,21 @@ class SOSApplication:
         self.show_emergency_window()
         
         # Start emergency actions in background
-        threading.Thread(target=self.execute_emergency_protocol, daemon=True).start()
+        threading.Thread(target=self.execute_emergency_protocol, args=(source,), daemon=True).start()
     
-    def execute_emergency_protocol(self):
+    def execute_emergency_protocol(self, source="manual_emergency"):
         """Execute emergency protocol in background"""
         try:
             print("🚨 EXECUTING EMERGENCY PROTOCOL")
             
+            # A re-trigger of an open incident (e.g. after a reset) is sent as a compact update
+            if INCIDENT_MANAGER_AVAILABLE:
+                incident = incident_manager.report(source, f"{source.replace('_', ' ').upper()}: emergency confirmed")
+                if not incident['new']:
+                    print(f"🧩 Joined incident {incident['incident_id']} (trigger #{incident['trigger_number']})")
+                    self.update_status("✅ Emergency update sent to contacts")
+                    return
+            
             # Check internet connection
             is_online = self.check_internet()
             
@@ -866,7 +892,7 @@ class SOSApplication:
         )
         
         if response:
-            self.trigger_emergency()
+            self.trigger_emergency("voice_keyword")
         else:
             self.update_layer1_status("⚪ READY")
             self.update_status("Voice alert cancelled")
@@ -893,13 +919,20 @@ class SOSApplication:
     def distress_monitoring_loop(self):
         """Monitor camera for distress indicators"""
         try:
-            cap = cv2.VideoCapture(0)
+            # Shared with the recorder/streamer instead of a second device handle
+            if CAMERA_SERVICE_AVAILABLE:
+                cap = camera_service.subscribe("distress_monitor")
+            else:
+                cap = cv2.VideoCapture(0)
             
             if not cap.isOpened():
                 self.root.after(0, lambda: messagebox.showerror("Error", "Camera not available"))
                 return
             
             print("📹 Starting distress monitoring...")
+            
+            # Analysis runs in worker processes; stale frames are dropped there
+            pipeline = FramePipeline() if FRAME_PIPELINE_AVAILABLE else None
             frame_count = 0
             
             while self.distress_monitoring:
@@ -909,10 +942,17 @@ class SOSApplication:
                 
                 frame_count += 1
                 
-                # Analyze every 5th frame for performance
-                if frame_count % 5 == 0:
-                    result = distress_detector.analyze_frame(frame)
-                    
+                if pipeline is not None:
+                    pipeline.submit(frame)
+                    results = pipeline.results()
+                elif frame_count % 5 == 0:
+                    # Analyze every 5th frame for performance
+                    results = [distress_detector.analyze_frame(frame)]
+                    time.sleep(0.1)
+                else:
+                    results = []
+                
+                for result in results:
                     # Update distress score
                     self.distress_score = result['distress_score']
                     self.root.after(0, lambda s=self.distress_score: self.update_distress_score(s))
@@ -922,12 +962,18 @@ class SOSApplication:
                         print(f"🚨 DISTRESS DETECTED! Score: {result['distress_score']}")
                         print(f"Indicators: {result['indicators']}")
                         self.root.after(0, lambda r=result: self.handle_distress_detection(r))
+                        self.distress_monitoring = False
                         break
-                
-                time.sleep(0.1)
             
             cap.release()
             
+            if pipeline is not None:
+                stats = pipeline.get_stats()
+                pipeline.stop()
+                print(f"📊 Distress analysis: {stats['analyzed_fps']:.1f} FPS "
+                      f"({stats['analyzed_fps_per_core']:.1f} per core), "
+                      f"{stats['dropped_busy'] + stats['dropped_stale']} frames dropped")
+            
         except Exception as e:
             print(f"Distress monitoring error: {e}")
             self.root.after(0, lambda: self.update_status(f"⚠️ Distress error: {e}"))
@@ -948,7 +994,7 @@ class SOSApplication:
         )
         
         if response:
-            self.trigger_emergency()
+            self.trigger_emergency("distress_monitor")
         else:
             self.update_layer3_status("⚪ READY")
             self.update_status("Distress alert cancelled")
@@ -1016,6 +1062,9 @@ class SOSApplication:
                 "Are you sure you want to cancel the emergency protocol?"
             )
             if response:
+                # Cancelled: the next trigger is a new incident, not an update
+                if INCIDENT_MANAGER_AVAILABLE:
+                    incident_manager.close()
                 self.reset_system()
     
     def reset_system(self):
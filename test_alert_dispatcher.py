@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Alert Dispatcher Tests
+Runs AlertDispatcher with in-process channels of known speed: first-success
+return, overall deadline, per-channel timeouts and completion reporting
+Run with: python -m pytest -q test_alert_dispatcher.py (or python test_alert_dispatcher.py)
+"""
+
+import threading
+import time
+
+from core.alert_dispatcher import AlertDispatcher
+
+
+def _channel(delay, result=True, release=None, error=None):
+    """Channel that answers after `delay` seconds (or once `release` is set)"""
+    def send(alert_data):
+        if release is not None:
+            release.wait(10)
+        else:
+            time.sleep(delay)
+        if error:
+            raise RuntimeError(error)
+        return result
+    return send
+
+
+def test_returns_at_first_success():
+    """dispatch() returns as soon as one channel delivers; slower channels finish in the background"""
+    dispatcher = AlertDispatcher()
+    done = threading.Event()
+    try:
+        report = dispatcher.dispatch({
+            'telegram': _channel(0.1),
+            'email': _channel(1.0),
+            'discord': _channel(0.05, result=False)
+        }, {'reason': 'test'}, deadline=5.0, on_complete=lambda final: done.set())
+
+        assert report['first_success'] == 'telegram'
+        assert 0.1 <= report['first_success_latency'] < 0.5
+        assert report['returned_after'] < 0.5
+        assert report['channels']['discord']['status'] == 'failed'
+        assert report['channels']['email']['status'] == 'pending'
+        assert not report['complete']
+
+        assert done.wait(3)
+        assert report['complete']
+        assert report['channels']['email']['status'] == 'sent'
+    finally:
+        dispatcher.shutdown()
+
+
+def test_deadline_bounds_the_wait():
+    """With no success, dispatch() gives up at the deadline and marks channels past their timeout"""
+    dispatcher = AlertDispatcher()
+    release = threading.Event()
+    try:
+        start = time.monotonic()
+        report = dispatcher.dispatch({
+            'sms': _channel(0, release=release),
+            'email': _channel(0, release=release)
+        }, {'reason': 'test'}, deadline=0.5, timeouts={'sms': 0.2, 'email': 5.0})
+        waited = time.monotonic() - start
+
+        assert 0.5 <= waited < 1.0
+        assert report['first_success'] is None
+        assert report['channels']['sms']['status'] == 'timeout'
+        assert report['channels']['email']['status'] == 'pending'
+    finally:
+        release.set()
+        dispatcher.shutdown()
+
+
+def test_failures_complete_early_and_late_results_flagged():
+    """All channels failing returns at once with errors; a success after its timeout is flagged late"""
+    dispatcher = AlertDispatcher()
+    try:
+        report = dispatcher.dispatch({
+            'telegram': _channel(0.05, error="connection refused"),
+            'discord': _channel(0.05, result={'delivered': []})
+        }, {'reason': 'test'}, deadline=5.0)
+
+        assert report['complete']
+        assert report['returned_after'] < 0.5
+        assert report['channels']['telegram']['error'] == "connection refused"
+        assert report['channels']['discord']['status'] == 'failed'
+
+        report = dispatcher.dispatch({
+            'email': _channel(0.3, result={'delivered': ["a@example.com", "b@example.com"]})
+        }, {'reason': 'test'}, deadline=5.0, timeouts={'email': 0.1})
+
+        entry = report['channels']['email']
+        assert report['first_success'] == 'email'
+        assert entry['status'] == 'sent' and entry['late']
+        assert entry['recipients'] == ["a@example.com", "b@example.com"]
+    finally:
+        dispatcher.shutdown()
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_returns_at_first_success, test_deadline_bounds_the_wait,
+             test_failures_complete_early_and_late_results_flagged]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
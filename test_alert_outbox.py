@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Alert Outbox Tests
+Runs AlertOutbox on a throwaway database with in-process channel adapters:
+idempotent enqueueing, lease loss, exponential backoff, giving up and
+Retry-After handling
+Run with: python -m pytest -q test_alert_outbox.py (or python test_alert_outbox.py)
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from core.alert_outbox import AlertOutbox, DeliveryError
+from core.alert_payload import AlertPayload
+
+
+PAYLOAD = AlertPayload("test@example.com", "Outbox test", location_url="https://maps.google.com/?q=0,0",
+                       user_info={'name': 'Test'})
+
+
+@contextmanager
+def _outbox(send, **options):
+    """Outbox with one 'test' channel whose adapter is `send`"""
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = AlertOutbox(db_path=os.path.join(tmp, "outbox.db"), adapters={'test': (lambda: [], send)},
+                             connectivity_check=lambda: True, connectivity_interval=0.1, **options)
+        try:
+            yield outbox
+        finally:
+            outbox.stop()
+            # Workers must be gone before their database is removed
+            for thread in outbox.threads:
+                thread.join(timeout=2)
+
+
+def test_enqueue_is_idempotent():
+    """Re-submitting an incident queues nothing new and a delivered recipient is never sent twice"""
+    sent = []
+
+    def send(payload, recipient, key):
+        sent.append((recipient, key))
+        return f"id-{recipient}"
+
+    with _outbox(send) as outbox:
+        assert outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1", "+2"]) == 2
+        assert outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1", "+2", "+3"]) == 1
+
+        outbox.start()
+        assert outbox.drain(timeout=5)
+        assert outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1", "+2", "+3"]) == 0
+        assert outbox.drain(timeout=5)
+
+        assert sorted(recipient for recipient, _ in sent) == ["+1", "+2", "+3"]
+        # Adapters get a stable per-recipient key to pass on to providers
+        assert len({key for _, key in sent}) == 3
+        assert {row['provider_id'] for row in outbox.get_deliveries("inc-1")} == {"id-+1", "id-+2", "id-+3"}
+        assert outbox.get_stats()['states'] == {'sent': 3}
+
+
+def test_lost_lease_is_not_sent():
+    """A row reclaimed after its lease expired is only sent by the worker that holds the new claim"""
+    sent = []
+    with _outbox(lambda payload, recipient, key: sent.append(recipient) or "ok", lease=0.05) as outbox:
+        outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1"])
+        stale = outbox._claim(10)
+        time.sleep(0.1)
+        fresh = outbox._claim(10)
+
+        assert [row['id'] for row in fresh] == [row['id'] for row in stale]
+        assert not outbox._deliver(stale[0])
+        assert sent == []
+        assert outbox._deliver(fresh[0])
+        assert sent == ["+1"]
+        # The stale worker cannot overwrite the outcome either
+        assert not outbox._record(stale[0], state='failed')
+        assert outbox.get_deliveries()[0]['state'] == 'sent'
+
+
+def test_backoff_then_give_up():
+    """Failures back off exponentially; after max_attempts the row fails and is reported"""
+    failures = []
+
+    def send(payload, recipient, key):
+        raise DeliveryError("provider down")
+
+    with _outbox(send, base_backoff=1.0, max_attempts=3) as outbox:
+        outbox.on_failure(failures.append)
+        outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1"])
+
+        for attempt in (1, 2):
+            now = time.time()
+            row = outbox._claim(10)[0]
+            assert not outbox._deliver(row)
+            stored = outbox.get_deliveries()[0]
+            delay = stored['next_attempt_at'] - now
+            # base * 2^(attempt-1), jittered down to half
+            assert stored['state'] == 'pending' and stored['attempts'] == attempt
+            assert 0.5 * 2 ** (attempt - 1) <= delay <= 2 ** (attempt - 1) + 0.1
+            assert outbox._claim(10) == []
+            outbox.release("inc-1")
+
+        assert not outbox._deliver(outbox._claim(10)[0])
+        assert outbox.get_deliveries()[0]['state'] == 'failed'
+        assert [row['recipient'] for row in outbox.get_failed("inc-1")] == ["+1"]
+        assert failures[0]['attempts'] == 3 and failures[0]['last_error'] == "provider down"
+        assert outbox.get_stats()['retries'] == 2
+
+
+def test_non_retryable_fails_at_once():
+    """An error a resend cannot fix fails the row after a single attempt"""
+    def send(payload, recipient, key):
+        raise DeliveryError("invalid number", retryable=False)
+
+    with _outbox(send) as outbox:
+        outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1"])
+        outbox._deliver(outbox._claim(10)[0])
+
+        row = outbox.get_deliveries()[0]
+        assert row['state'] == 'failed' and row['attempts'] == 1
+
+
+def test_rate_limit_pauses_channel_without_spending_attempts():
+    """A 429 holds the whole channel until Retry-After and does not count as an attempt"""
+    calls = []
+
+    def send(payload, recipient, key):
+        calls.append(recipient)
+        raise DeliveryError("429 Too Many Requests", retryable=False, retry_after=2.0)
+
+    with _outbox(send) as outbox:
+        outbox.enqueue("inc-1", 'test', PAYLOAD, recipients=["+1", "+2"])
+        first, second = outbox._claim(10)
+        now = time.time()
+        outbox._deliver(first)
+        outbox._deliver(second)
+
+        # Only the first row reached the provider; the second waits out the same pause
+        assert calls == ["+1"]
+        for row in outbox.get_deliveries():
+            assert row['state'] == 'pending' and row['attempts'] == 0
+            assert 1.9 <= row['next_attempt_at'] - now <= 2.1
+        assert outbox.get_stats()['rate_limited'] == 1
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_enqueue_is_idempotent, test_lost_lease_is_not_sent, test_backoff_then_give_up,
+             test_non_retryable_fails_at_once, test_rate_limit_pauses_channel_without_spending_attempts]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Evidence Encryption Tests
+Round-trips evidence through EvidenceCipher with a small chunk size and
+checks that tampering, truncation and a wrong key fail loudly
+Run with: python -m pytest -q test_evidence_crypto.py (or python test_evidence_crypto.py)
+"""
+
+import os
+import tempfile
+
+from core import evidence_crypto
+from core.evidence_crypto import EvidenceCipher, EvidenceCryptoError, HEADER_SIZE, TAG_SIZE
+
+
+CHUNK = 1024
+
+
+def _encrypted(tmp, data, cipher, name="clip.wav"):
+    """Plain file of `data` encrypted to <name>.enc (the plaintext is removed)"""
+    plain = os.path.join(tmp, name)
+    with open(plain, 'wb') as f:
+        f.write(data)
+    path = plain + evidence_crypto.ENCRYPTED_SUFFIX
+    assert evidence_crypto.encrypt_file(plain, path, cipher) == len(data)
+    assert not os.path.exists(plain)
+    return path
+
+
+def _raises(function, *args):
+    try:
+        function(*args)
+    except EvidenceCryptoError:
+        return True
+    return False
+
+
+def _read_all(path, cipher):
+    with evidence_crypto.open_evidence(path, cipher) as reader:
+        return reader.read()
+
+
+def test_round_trip_and_random_access():
+    """Files, buffers and empty files decrypt to the original bytes; seeks cross chunk boundaries"""
+    cipher = EvidenceCipher(os.urandom(32), chunk_size=CHUNK)
+    data = os.urandom(CHUNK * 3 + 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _encrypted(tmp, data, cipher)
+        assert os.path.getsize(path) == HEADER_SIZE + len(data) + 4 * TAG_SIZE
+        assert _read_all(path, cipher) == data
+
+        with cipher.open(path) as reader:
+            assert reader.size == len(data)
+            reader.seek(CHUNK - 10)
+            assert reader.read(20) == data[CHUNK - 10:CHUNK + 10]
+            reader.seek(-50, 2)
+            assert reader.read() == data[-50:]
+
+        buffered = os.path.join(tmp, "snap.jpg.enc")
+        evidence_crypto.write_encrypted_bytes(buffered, data[:500], cipher)
+        assert _read_all(buffered, cipher) == data[:500]
+
+        empty = _encrypted(tmp, b"", cipher, name="empty.wav")
+        assert _read_all(empty, cipher) == b""
+
+        with evidence_crypto.decrypted_copy(path, cipher) as plain_path:
+            with open(plain_path, 'rb') as f:
+                assert f.read() == data
+        assert not os.path.exists(plain_path)
+        assert not [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+
+
+def test_tampering_detected():
+    """A flipped byte, a header edit or a file cut at a chunk boundary fails authentication"""
+    cipher = EvidenceCipher(os.urandom(32), chunk_size=CHUNK)
+    data = os.urandom(CHUNK * 3 + 100)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _encrypted(tmp, data, cipher)
+        with open(path, 'rb') as f:
+            original = f.read()
+
+        flipped = bytearray(original)
+        flipped[HEADER_SIZE + CHUNK + TAG_SIZE + 5] ^= 0x01
+        with open(path, 'wb') as f:
+            f.write(bytes(flipped))
+        with cipher.open(path) as reader:
+            # Untouched chunks still decrypt on their own
+            assert reader.read_chunk(0) == data[:CHUNK]
+            assert _raises(reader.read_chunk, 1)
+
+        header_edit = bytearray(original)
+        header_edit[HEADER_SIZE - 1] ^= 0x01
+        with open(path, 'wb') as f:
+            f.write(bytes(header_edit))
+        assert _raises(_read_all, path, cipher)
+
+        # Drop the last chunk: chunk 2 now looks final but was not sealed as final
+        with open(path, 'wb') as f:
+            f.write(original[:HEADER_SIZE + 3 * (CHUNK + TAG_SIZE)])
+        assert _raises(_read_all, path, cipher)
+
+        with open(path, 'wb') as f:
+            f.write(b"not evidence at all")
+        assert _raises(cipher.open, path)
+
+
+def test_wrong_or_missing_key():
+    """Another key cannot read the evidence, keys must be 32 bytes, and .enc needs a configured key"""
+    cipher = EvidenceCipher(os.urandom(32), chunk_size=CHUNK)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _encrypted(tmp, os.urandom(2000), cipher)
+
+        assert _raises(_read_all, path, EvidenceCipher(os.urandom(32), chunk_size=CHUNK))
+        try:
+            EvidenceCipher(os.urandom(16))
+            assert False, "short key accepted"
+        except ValueError:
+            pass
+
+        saved = evidence_crypto.evidence_cipher
+        evidence_crypto.evidence_cipher = None
+        try:
+            assert _raises(evidence_crypto.open_evidence, path)
+        finally:
+            evidence_crypto.evidence_cipher = saved
+
+
+def test_key_file_created_once():
+    """The key file is created 0600 on first use and read back unchanged afterwards"""
+    with tempfile.TemporaryDirectory() as tmp:
+        key_path = os.path.join(tmp, "keys", "evidence.key")
+        saved = os.environ.pop("HERSHIELD_EVIDENCE_KEY", None)
+        try:
+            key = evidence_crypto.load_or_create_key(key_path)
+            assert len(key) == 32
+            assert os.stat(key_path).st_mode & 0o777 == 0o600
+            assert evidence_crypto.load_or_create_key(key_path) == key
+        finally:
+            if saved is not None:
+                os.environ["HERSHIELD_EVIDENCE_KEY"] = saved
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_round_trip_and_random_access, test_tampering_detected, test_wrong_or_missing_key,
+             test_key_file_created_once]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Evidence Index Tests
+Runs EvidenceIndex against a throwaway database and evidence directory:
+recording, filtered queries, one-time scans and age/count/byte cleanup
+Run with: python -m pytest -q test_evidence_index.py (or python test_evidence_index.py)
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+from core.evidence_index import EvidenceIndex
+
+
+def _write(directory, name, size, mtime=None):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b"x" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_record_and_query():
+    """record() stores size, hash and media type; queries filter by directory, type and incident"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EvidenceIndex(os.path.join(tmp, "index.db"))
+        evidence = os.path.join(tmp, "evidence")
+        os.makedirs(evidence)
+        now = time.time()
+        snapshot = _write(evidence, "snap.jpg", 100, now - 30)
+        audio = _write(evidence, "clip.wav", 200, now - 20)
+        video = _write(evidence, "clip.avi.enc", 300, now - 10)
+
+        row = index.record(snapshot, incident_id="inc-1")
+        index.record(audio, incident_id="inc-1")
+        index.record(video, incident_id="inc-2")
+
+        assert row['media_type'] == 'snapshot'
+        assert row['size'] == 100
+        assert row['sha256'] == hashlib.sha256(b"x" * 100).hexdigest()
+        assert index.get(video)['media_type'] == 'video'
+        assert [r['filename'] for r in index.list_files(evidence)] == ["clip.avi.enc", "clip.wav", "snap.jpg"]
+        assert [r['filename'] for r in index.list_files(evidence, incident_id="inc-1", newest_first=False)] == \
+            ["snap.jpg", "clip.wav"]
+        assert index.total_bytes(evidence) == 600
+        assert index.total_bytes(evidence, media_type='audio') == 200
+        assert index.usage(evidence)['video'] == {'files': 1, 'bytes': 300}
+
+        # Re-indexing without an incident keeps the earlier one
+        assert index.record(audio)['incident_id'] == "inc-1"
+        assert index.record(os.path.join(evidence, "missing.wav")) is None
+
+
+def test_scan_existing_files_once():
+    """Files written before the index existed are imported on first query; partial files are skipped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EvidenceIndex(os.path.join(tmp, "index.db"))
+        evidence = os.path.join(tmp, "evidence")
+        os.makedirs(evidence)
+        _write(evidence, "old.jpg", 10)
+        _write(evidence, "segment.part.wav", 10)
+
+        assert index.ensure_scanned(evidence) == 1
+        _write(evidence, "later.jpg", 10)
+        assert index.ensure_scanned(evidence) == 0
+        assert [r['filename'] for r in index.list_files(evidence)] == ["old.jpg"]
+
+        # A fresh instance on the same database remembers the scan
+        assert EvidenceIndex(index.db_path).ensure_scanned(evidence) == 0
+
+
+def test_cleanup_limits():
+    """cleanup() removes the oldest files beyond the age, count and byte limits"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EvidenceIndex(os.path.join(tmp, "index.db"))
+        evidence = os.path.join(tmp, "evidence")
+        os.makedirs(evidence)
+        now = time.time()
+        paths = [_write(evidence, f"snap{i}.jpg", 100, now - (5 - i) * 3600) for i in range(5)]
+        for path in paths:
+            index.record(path)
+
+        assert index.cleanup_candidates(evidence, max_age_hours=2.5) == paths[:3][::-1]
+        assert index.cleanup_candidates(evidence, max_files=4) == [paths[0]]
+        assert index.cleanup_candidates(evidence, max_bytes=250) == paths[:3][::-1]
+
+        result = index.cleanup(evidence, max_files=2)
+        assert result == {'files_removed': 3, 'bytes_freed': 300}
+        assert [os.path.exists(path) for path in paths] == [False, False, False, True, True]
+        assert index.total_bytes(evidence) == 200
+
+
+def test_database_created_on_first_use():
+    """Constructing an index touches no disk; the first query creates the database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "nested", "index.db")
+        index = EvidenceIndex(db_path)
+        assert not os.path.exists(db_path)
+        assert index.list_files() == []
+        assert os.path.exists(db_path)
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_record_and_query, test_scan_existing_files_once, test_cleanup_limits,
+             test_database_created_on_first_use]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Evidence Retention Tests
+Runs EvidenceRetention passes over a throwaway evidence index: priority and
+media quotas, expiry, the per-pass delete budget and pending-upload protection
+Run with: python -m pytest -q test_evidence_retention.py (or python test_evidence_retention.py)
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import core.evidence_retention as retention_module
+from core.evidence_index import EvidenceIndex
+from core.evidence_retention import EvidenceRetention, MB
+from core.evidence_uploader import EvidenceUploadQueue
+
+
+# No downsampling and no minimum age unless a test asks for it
+SETTINGS = {
+    'downsample_after_hours': {'auto_confirmed': None, 'unclassified': None, 'test': None, 'false_alarm': None},
+    'delete_after_hours': {'test': None, 'false_alarm': None},
+    'min_age_seconds': 0
+}
+
+
+@contextmanager
+def _evidence_dir():
+    """Point the retention module at a temporary index and upload queue"""
+    saved = retention_module.evidence_index, retention_module.evidence_uploader
+    with tempfile.TemporaryDirectory() as tmp:
+        index = EvidenceIndex(os.path.join(tmp, "index.db"))
+        uploader = EvidenceUploadQueue(db_path=os.path.join(tmp, "uploads.db"))
+        retention_module.evidence_index = index
+        retention_module.evidence_uploader = uploader
+        evidence = os.path.join(tmp, "evidence")
+        os.makedirs(evidence)
+        try:
+            yield index, uploader, evidence
+        finally:
+            retention_module.evidence_index, retention_module.evidence_uploader = saved
+
+
+def _add(index, directory, name, size_mb, age_hours, incident_id=None, priority=None):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b"x" * int(size_mb * MB))
+    index.record(path, incident_id=incident_id, sha256="0" * 64, created_at=time.time() - age_hours * 3600)
+    if incident_id and priority:
+        index.set_incident_priority(incident_id, priority)
+    return path
+
+
+def _retention(directory, **overrides):
+    settings = {key: dict(value) if isinstance(value, dict) else value for key, value in SETTINGS.items()}
+    for key, value in overrides.items():
+        if isinstance(value, dict):
+            settings.setdefault(key, {}).update(value)
+        else:
+            settings[key] = value
+    return EvidenceRetention(settings, directory=directory)
+
+
+def test_priority_quota_deletes_oldest_first():
+    """Over its tier quota, the oldest evidence of that tier goes until the quota is met"""
+    with _evidence_dir() as (index, _, evidence):
+        paths = [_add(index, evidence, f"test{i}.jpg", 0.4, 4 - i, "drill", 'test') for i in range(4)]
+
+        result = _retention(evidence, priority_quota_mb={'test': 1}).run_pass()
+
+        assert result['deleted'] == 2
+        assert result['bytes_freed'] == 2 * int(0.4 * MB)
+        assert result['over_quota'] == []
+        assert [os.path.exists(path) for path in paths] == [False, False, True, True]
+
+
+def test_media_quota_spares_confirmed_evidence():
+    """A media quota removes less important evidence first and never deletes confirmed incidents"""
+    with _evidence_dir() as (index, _, evidence):
+        confirmed = [_add(index, evidence, f"confirmed{i}.jpg", 0.4, 10 - i, "attack", 'confirmed') for i in range(3)]
+        unclassified = _add(index, evidence, "walk.jpg", 0.4, 1)
+
+        result = _retention(evidence, media_quota_mb={'snapshot': 1}).run_pass()
+
+        assert result['deleted'] == 1
+        assert not os.path.exists(unclassified)
+        assert all(os.path.exists(path) for path in confirmed)
+        # Only confirmed evidence is left and it still exceeds the quota
+        assert result['over_quota'] == ['snapshot']
+
+
+def test_expiry_and_delete_budget():
+    """Expired false-alarm evidence is removed, at most max_deletes_per_pass files per pass"""
+    with _evidence_dir() as (index, _, evidence):
+        old = [_add(index, evidence, f"false{i}.jpg", 0.1, 30 + i, "oops", 'false_alarm') for i in range(3)]
+        recent = _add(index, evidence, "false_recent.jpg", 0.1, 1, "oops", 'false_alarm')
+        retention = _retention(evidence, delete_after_hours={'false_alarm': 24}, max_deletes_per_pass=2)
+
+        assert retention.run_pass()['deleted'] == 2
+        assert retention.run_pass()['deleted'] == 1
+        assert retention.run_pass()['deleted'] == 0
+        assert not any(os.path.exists(path) for path in old)
+        assert os.path.exists(recent)
+
+
+def test_pending_uploads_and_new_files_protected():
+    """Files still queued for upload or younger than min_age_seconds are never deleted"""
+    with _evidence_dir() as (index, uploader, evidence):
+        queued = _add(index, evidence, "queued.jpg", 0.4, 5, "drill", 'test')
+        fresh = _add(index, evidence, "fresh.jpg", 0.4, 0, "drill", 'test')
+        older = _add(index, evidence, "older.jpg", 0.4, 4, "drill", 'test')
+        uploader.enqueue(queued, sha256="0" * 64)
+
+        result = _retention(evidence, priority_quota_mb={'test': 0.5}, min_age_seconds=600).run_pass()
+
+        assert result['deleted'] == 1
+        assert not os.path.exists(older)
+        assert os.path.exists(queued) and os.path.exists(fresh)
+        # Protected files still count against the quota
+        assert result['over_quota'] == ['test']
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_priority_quota_deletes_oldest_first, test_media_quota_spares_confirmed_evidence,
+             test_expiry_and_delete_budget, test_pending_uploads_and_new_files_protected]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Incident Manager Tests
+Fires triggers at an IncidentManager backed by a throwaway outbox with a
+recording channel: coalescing into one incident, per-recipient rate
+limiting and the deferred latest-state flush
+Run with: python -m pytest -q test_incident_manager.py (or python test_incident_manager.py)
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from core.alert_outbox import AlertOutbox
+from core.alert_payload import AlertPayload
+from core.incident_manager import IncidentManager, RecipientRateLimiter
+
+
+CONTACTS = ["+15550000001", "+15550000002"]
+
+
+@contextmanager
+def _manager(window=60, max_messages=4, rate_window=60):
+    """IncidentManager whose 'test' channel records (recipient, update_number, reason)"""
+    delivered = []
+
+    def record(payload, recipient, key):
+        delivered.append((recipient, payload.update_number, payload.reason))
+        return None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = AlertOutbox(db_path=os.path.join(tmp, "outbox.db"), adapters={'test': (lambda: CONTACTS, record)},
+                             connectivity_check=lambda: True, connectivity_interval=0.1)
+        manager = IncidentManager(window=window, max_messages=max_messages, rate_window=rate_window,
+                                  outbox=outbox, channels=['test'])
+        try:
+            yield manager, outbox, delivered
+        finally:
+            outbox.stop()
+            # Workers must be gone before their database is removed
+            for thread in outbox.threads:
+                thread.join(timeout=2)
+
+
+def _open(manager, outbox, alert_id="alert_1"):
+    """First trigger plus the full alert send_alert queues for a new incident"""
+    result = manager.report('voice_keyword_detection', "Keyword 'help' detected\nmore", alert_id=alert_id)
+    outbox.enqueue_incident(result['incident_id'], AlertPayload("user@example.com", "Emergency",
+                                                                incident_id=result['incident_id']), ['test'])
+    return result
+
+
+def test_triggers_coalesce_into_one_incident():
+    """Triggers inside the window join the open incident; closing it lets the next trigger open a new one"""
+    with _manager() as (manager, outbox, _):
+        first = _open(manager, outbox)
+        second = manager.report('double_tap', "Double tap", alert_id="alert_2")
+        third = manager.report('distress_video', "Distress in video", alert_id="alert_3")
+
+        assert first['new'] and not second['new'] and not third['new']
+        assert first['incident_id'] == second['incident_id'] == third['incident_id']
+        assert third['alert_id'] == "alert_1" and third['trigger_number'] == 3
+        # Acknowledging a coalesced alert id reaches the escalation that owns the incident
+        assert manager.resolve_alert_id("alert_3") == "alert_1"
+
+        assert manager.close("alert_2")
+        assert manager.active_incident() is None
+        fourth = manager.report('manual', "Manual button", alert_id="alert_4")
+        assert fourth['new'] and fourth['incident_id'] != first['incident_id']
+
+        stats = manager.get_stats()
+        assert stats['incidents'] == 2 and stats['coalesced'] == 2 and stats['triggers'] == 4
+
+
+def test_window_expiry_opens_new_incident():
+    """A trigger after the window has passed starts a fresh incident"""
+    with _manager(window=0.1) as (manager, outbox, _):
+        first = manager.report('manual', "First", alert_id="alert_1")
+        time.sleep(0.2)
+        second = manager.report('manual', "Second", alert_id="alert_2")
+
+        assert second['new'] and second['incident_id'] != first['incident_id']
+        # The retired incident still resolves its own alert ids
+        assert manager.resolve_alert_id("alert_1") == "alert_1"
+
+
+def test_updates_rate_limited_then_latest_state_flushed():
+    """Over budget, updates are deferred and only the latest state is sent once budget frees up"""
+    with _manager(max_messages=2, rate_window=1.0) as (manager, outbox, delivered):
+        _open(manager, outbox)
+        manager.report('double_tap', "Double tap", alert_id="alert_2")
+        manager.report('distress_video', "Distress in video", alert_id="alert_3")
+        manager.report('audio_threat', "Scream detected", alert_id="alert_4")
+
+        stats = manager.get_stats()
+        # Full alert + one update fill each recipient's budget of 2; the next two updates wait
+        assert stats['update_messages'] == len(CONTACTS)
+        assert stats['deferred'] == 2 * len(CONTACTS)
+        assert stats['messages_without_coalescing'] == 3 * len(CONTACTS)
+
+        time.sleep(1.2)
+        assert outbox.drain(timeout=5)
+        for contact in CONTACTS:
+            messages = sorted((number or 0, reason) for to, number, reason in delivered if to == contact)
+            assert [number for number, _ in messages] == [0, 1, 2]
+            assert messages[1][1].startswith("Double tap")
+            assert messages[2][1].startswith("Scream detected (4 triggers so far)")
+        # Three updates' worth of messages became two per recipient
+        assert manager.get_stats()['duplicate_sends_avoided'] == len(CONTACTS)
+
+
+def test_recipient_rate_limiter_window():
+    """The budget is per recipient and frees up as messages leave the sliding window"""
+    limiter = RecipientRateLimiter(max_messages=2, window=0.3)
+    limiter.record("a")
+    assert limiter.allow("a")
+    assert not limiter.allow("a")
+    assert limiter.allow("b")
+    assert 0.2 < limiter.next_free("a") <= 0.3
+    time.sleep(0.35)
+    assert limiter.next_free("a") == 0.0
+    assert limiter.allow("a")
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_triggers_coalesce_into_one_incident, test_window_expiry_opens_new_incident,
+             test_updates_rate_limited_then_latest_state_flushed, test_recipient_rate_limiter_window]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
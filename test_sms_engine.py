@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+SMS Engine Tests
+Runs SMSEngine against the local Twilio stand-in server: 429 handling,
+non-retryable client errors and per-message reporting
+Run with: python -m pytest -q test_sms_engine.py (or python test_sms_engine.py)
+"""
+
+from core.sms_engine import SMSEngine
+from core.twilio_standin_server import TwilioStandInServer
+
+
+SID = "AC" + "0" * 32
+
+
+def _account(server, **overrides):
+    account = {'sid': SID, 'auth_token': server.auth_token, 'phone_number': "+15550000000"}
+    account.update(overrides)
+    return account
+
+
+def _engine(endpoint, rate=10.0, concurrency=5):
+    return SMSEngine(limits={'twilio': {'rate': rate, 'burst': rate, 'concurrency': concurrency}},
+                     api_base=endpoint, base_backoff=0.05)
+
+
+def test_rate_limit_pauses_and_halves_rate():
+    """A 429 holds the provider for Retry-After, halves its rate, then the message goes out"""
+    server = TwilioStandInServer(rate=1.0, burst=1)
+    endpoint = server.start()
+    engine = _engine(endpoint, concurrency=1)
+    try:
+        result = engine.send_batch('twilio', [("+15550100001", "first"), ("+15550100002", "second")],
+                                   _account(server))
+
+        first, second = result['results']
+        assert result['sent'] == 2
+        assert server.stats['rate_limited'] == 1
+        assert first['attempts'] == 1
+        assert second['attempts'] == 2
+        # Retry-After: 1 from the stand-in
+        assert second['throttled'] >= 0.9
+        # Halved by the 429, then one success worth of recovery
+        assert engine.limiters['twilio'].rate == 10.0 / 2 + 10.0 / 16
+        assert engine.get_stats()['rate_limited'] == 1
+    finally:
+        server.stop()
+
+
+def test_client_errors_not_retried():
+    """401 (bad credentials) and 400 (missing number) fail after a single attempt"""
+    server = TwilioStandInServer()
+    endpoint = server.start()
+    engine = _engine(endpoint)
+    try:
+        unauthorized = engine.send_batch('twilio', [("+15550100001", "test")],
+                                         _account(server, auth_token="wrong"))
+        bad_request = engine.send_batch('twilio', [("", "test")], _account(server))
+
+        for result in (unauthorized['results'][0], bad_request['results'][0]):
+            assert not result['success']
+            assert result['attempts'] == 1
+        assert "401" in unauthorized['results'][0]['error']
+        assert "400" in bad_request['results'][0]['error']
+        assert server.stats['accepted'] == 0
+        assert engine.get_stats()['retries'] == 0
+    finally:
+        server.stop()
+
+
+def test_reports_latency_and_attempts():
+    """Every message carries its sid, attempts, throttled time and latency"""
+    server = TwilioStandInServer(latency=0.1)
+    endpoint = server.start()
+    engine = _engine(endpoint, concurrency=3)
+    numbers = [f"+1555010{i:04d}" for i in range(3)]
+    try:
+        result = engine.send_batch('twilio', [(number, "test") for number in numbers], _account(server))
+
+        assert [item['to'] for item in result['results']] == numbers
+        assert {item['sid'] for item in result['results']} == {message['sid'] for message in server.messages}
+        for item in result['results']:
+            assert item['success'] and item['attempts'] == 1
+            assert item['throttled'] >= 0.0
+            assert 0.1 <= item['latency'] <= result['seconds']
+        # Sent concurrently: the batch takes about one round trip, not three
+        assert result['seconds'] < 0.3
+    finally:
+        server.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_rate_limit_pauses_and_halves_rate, test_client_errors_not_retried,
+             test_reports_latency_and_attempts]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+SMTP Pool Tests
+Runs SMTPPool against the local SMTP stand-in server: dropped sessions
+found by NOOP, a disconnect in the middle of a batch and result ordering
+Run with: python -m pytest -q test_smtp_pool.py (or python test_smtp_pool.py)
+"""
+
+import time
+from email.mime.text import MIMEText
+
+from core.smtp_pool import SMTPPool
+from core.smtp_standin_server import SMTPStandInServer
+
+
+def _messages(count):
+    messages = []
+    for i in range(count):
+        msg = MIMEText(f"🚨 HER SHIELD ALERT 🚨\nTest message {i}", 'plain')
+        msg['From'] = "alerts@example.com"
+        msg['To'] = f"contact{i}@example.com"
+        msg['Subject'] = "HerShield test"
+        messages.append(msg)
+    return messages
+
+
+def _pool(server, **kwargs):
+    return SMTPPool("127.0.0.1", server.port, username="alerts@example.com", password="secret",
+                    use_tls=False, timeout=5, **kwargs)
+
+
+def _delivered(server):
+    return sorted(address for message in server.messages for address in message['to'])
+
+
+def test_noop_detects_dropped_session():
+    """A session the server closed while idle fails its NOOP and is replaced"""
+    server = SMTPStandInServer(idle_timeout=0.3)
+    server.start()
+    pool = _pool(server, size=1, keepalive_interval=0.1)
+    try:
+        first = pool.send_messages(_messages(1))
+        time.sleep(0.8)  # server drops the idle session
+        second = pool.send_messages(_messages(1))
+
+        assert first[0]['sent'] and second[0]['sent']
+        stats = pool.get_stats()
+        assert stats['noops'] == 1
+        assert stats['connects'] == 2
+        assert server.stats['sessions'] == 2
+        assert server.stats['messages'] == 2
+    finally:
+        pool.close()
+        server.stop()
+
+
+def test_mid_batch_disconnect_resends_once():
+    """Messages after a dropped session are resent on a new one, none twice"""
+    server = SMTPStandInServer(drop_after=2)
+    server.start()
+    pool = _pool(server, size=1)
+    try:
+        messages = _messages(5)
+        results = pool.send_messages(messages)
+
+        assert all(result['sent'] for result in results)
+        assert server.stats['dropped'] == 1
+        assert server.stats['sessions'] == 2
+        assert pool.get_stats()['reconnects'] == 1
+        assert _delivered(server) == sorted(msg['To'] for msg in messages)
+    finally:
+        pool.close()
+        server.stop()
+
+
+def test_results_in_input_order():
+    """Batches run on parallel sessions, results still line up with the input"""
+    server = SMTPStandInServer(latency=0.005)
+    server.start()
+    pool = _pool(server, size=3)
+    try:
+        messages = _messages(8)
+        results = pool.send_messages(messages)
+
+        assert [result['to'] for result in results] == [msg['To'] for msg in messages]
+        assert all(result['sent'] and result['latency'] is not None for result in results)
+        assert _delivered(server) == sorted(msg['To'] for msg in messages)
+    finally:
+        pool.close()
+        server.stop()
+
+
+# Example usage
+if __name__ == "__main__":
+    tests = [test_noop_detects_dropped_session, test_mid_batch_disconnect_resends_once,
+             test_results_in_input_order]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    print(f"📊 {len(tests) - failed}/{len(tests)} passed")